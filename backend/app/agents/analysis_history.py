@@ -0,0 +1,309 @@
+"""Bounded analysis history with rotating append-only on-disk spill segments."""
+
+from collections import deque
+from typing import IO, Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): each history spills under a unique prefix
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Default number of analyses kept in memory
+DEFAULT_HISTORY_CAPACITY = 1000
+# Evicted records written to the segment per write
+SPILL_BATCH_SIZE = 64
+# A segment is rotated once it reaches this size
+DEFAULT_SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+# Oldest segments beyond this count are deleted
+DEFAULT_MAX_SEGMENTS = 8
+# Spill slots tried per directory before falling back to a unique prefix
+MAX_SPILL_SLOTS = 64
+
+# In-memory entry: (json subject_id, json site_id, json record), all compact bytes
+_Entry = Tuple[bytes, bytes, bytes]
+
+
+def _encode_key(value: Any) -> bytes:
+    # None encodes as null, so it never collides with the empty string
+    return json.dumps(value).encode()
+
+
+class _Segment:
+    """One spill file plus the subject and site keys written to it."""
+
+    __slots__ = ("path", "size", "records", "subjects", "sites")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self.records = 0
+        self.subjects: Set[bytes] = set()
+        self.sites: Set[bytes] = set()
+
+    def may_contain(self, subject_key: Optional[bytes], site_key: Optional[bytes]) -> bool:
+        return (subject_key is None or subject_key in self.subjects) and (
+            site_key is None or site_key in self.sites
+        )
+
+
+def _claim_spill_slot(spill_dir: str) -> Tuple[str, Optional[IO]]:
+    """Lock the lowest free analysis_history_<slot> prefix in spill_dir.
+
+    A slot's lock is held by the open file until the history is closed or
+    its process exits, so a restarted process reclaims the same slot while
+    histories alive at the same time (other workers, other analyzers) each
+    get their own. Returns the path prefix and the locked file.
+    """
+    os.makedirs(spill_dir, exist_ok=True)
+    if fcntl is not None:
+        for slot in range(MAX_SPILL_SLOTS):
+            prefix = os.path.join(spill_dir, f"analysis_history_{slot}")
+            handle = open(prefix + ".lock", "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                continue
+            return prefix, handle
+        logger.warning("All %d analysis history spill slots in %s are in use", MAX_SPILL_SLOTS, spill_dir)
+    return os.path.join(spill_dir, f"analysis_history_{os.getpid()}_{uuid.uuid4().hex[:8]}"), None
+
+
+class AnalysisHistory:
+    """Fixed-capacity analysis history that spills evicted records to disk.
+
+    Records are kept as compact JSON bytes in a ring of at most capacity
+    entries. When spill_dir is set, evicted records are appended in batches
+    to a segment file there, one tab-separated line per record
+    (subject_id, site_id, record); otherwise they are dropped and counted.
+    A segment is rotated once it reaches segment_max_bytes and only the
+    newest max_segments are kept, so disk use is bounded; records in a
+    deleted segment are counted as dropped. Each segment remembers the
+    subject and site keys it holds, so query() skips segments that cannot
+    match and stops reading once it has limit matches.
+    Segments are named after a spill slot that the history locks in
+    spill_dir; segments left in that slot by a previous process are deleted
+    on start, so max_segments bounds disk use across restarts too.
+    Supports the list operations the analyzer context relied on (append,
+    len, indexing, iteration) over the in-memory records, and query() by
+    subject and site across memory and the segments.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_HISTORY_CAPACITY,
+        spill_dir: str = "",
+        segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES,
+        max_segments: int = DEFAULT_MAX_SEGMENTS
+    ):
+        if capacity <= 0:
+            raise ValueError("History capacity must be positive")
+        if segment_max_bytes <= 0 or max_segments <= 0:
+            raise ValueError("Segment size and count must be positive")
+        self.capacity = capacity
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self._segment_prefix: Optional[str] = None
+        self._slot_lock: Optional[IO] = None
+        if spill_dir:
+            self._segment_prefix, self._slot_lock = _claim_spill_slot(spill_dir)
+            self._remove_stale_segments()
+        self._segments: Deque[_Segment] = deque()
+        self._segment_count = 0
+        self._entries: Deque[_Entry] = deque()
+        self._pending_spill: List[_Entry] = []
+        self._lock = threading.Lock()
+        self.total_recorded = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    def append(self, record: Dict[str, Any], site_id: Any = None) -> None:
+        """Record one analysis; site_id defaults to the record's own site_id."""
+        entry = (
+            _encode_key(record.get("subject_id")),
+            _encode_key(site_id if site_id is not None else record.get("site_id")),
+            json.dumps(record, separators=(",", ":")).encode()
+        )
+        with self._lock:
+            if len(self._entries) >= self.capacity:
+                self._evict(self._entries.popleft())
+            self._entries.append(entry)
+            self.total_recorded += 1
+
+    @property
+    def segment_path(self) -> Optional[str]:
+        """Path of the segment currently being written, if spilling is enabled."""
+        if self._segments:
+            return self._segments[-1].path
+        if self._segment_prefix is None:
+            return None
+        return self._next_segment_path()
+
+    def _next_segment_path(self) -> str:
+        return f"{self._segment_prefix}_{self._segment_count:04d}.ndjson"
+
+    def _remove_stale_segments(self) -> None:
+        pattern = glob.escape(self._segment_prefix) + "_*.ndjson"
+        for path in glob.glob(pattern):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        """Release the spill slot; segments stay until the slot is claimed again."""
+        with self._lock:
+            self._write_pending()
+            if self._slot_lock is not None:
+                self._slot_lock.close()
+                self._slot_lock = None
+
+    def _evict(self, entry: _Entry) -> None:
+        if self._segment_prefix is None:
+            self.dropped += 1
+            return
+        self._pending_spill.append(entry)
+        if len(self._pending_spill) >= SPILL_BATCH_SIZE:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        if not self._pending_spill:
+            return
+        lines = b"".join(b"\t".join(entry) + b"\n" for entry in self._pending_spill)
+        if not self._segments or self._segments[-1].size >= self.segment_max_bytes:
+            self._rotate()
+        segment = self._segments[-1]
+        with open(segment.path, "ab") as handle:
+            handle.write(lines)
+        segment.size += len(lines)
+        segment.records += len(self._pending_spill)
+        for subject_key, site_key, _ in self._pending_spill:
+            segment.subjects.add(subject_key)
+            segment.sites.add(site_key)
+        self.spilled += len(self._pending_spill)
+        self._pending_spill.clear()
+
+    def _rotate(self) -> None:
+        path = self._next_segment_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._segments.append(_Segment(path))
+        self._segment_count += 1
+        while len(self._segments) > self.max_segments:
+            expired = self._segments.popleft()
+            self.dropped += expired.records
+            try:
+                os.remove(expired.path)
+            except OSError:
+                # Already gone, or still open by a reader where that blocks deletion
+                pass
+
+    def flush(self) -> None:
+        """Write any evicted records still buffered to the segment file."""
+        with self._lock:
+            self._write_pending()
+
+    def query(
+        self,
+        subject_id: Optional[str] = None,
+        site_id: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Records matching subject_id and/or site_id, oldest first.
+
+        Spilled records still on disk are included; with limit, only the
+        most recent matches are returned.
+        """
+        subject_key = _encode_key(subject_id) if subject_id is not None else None
+        site_key = _encode_key(site_id) if site_id is not None else None
+
+        def matches(entry: _Entry) -> bool:
+            return (subject_key is None or entry[0] == subject_key) and (site_key is None or entry[1] == site_key)
+
+        with self._lock:
+            self._write_pending()
+            in_memory = [entry[2] for entry in self._entries if matches(entry)]
+            # Paths and sizes as of now; later appends and rotations are not read
+            segments = [
+                (segment.path, segment.size) for segment in self._segments
+                if segment.may_contain(subject_key, site_key)
+            ]
+
+        # Read newest segments first and stop once limit matches are found
+        chunks: List[List[bytes]] = [in_memory]
+        total = len(in_memory)
+        for path, size in reversed(segments):
+            if limit is not None and total >= limit:
+                break
+            chunk = []
+            try:
+                # An open segment stays readable if a rotation deletes it mid-read
+                with open(path, "rb") as handle:
+                    for line in handle:
+                        size -= len(line)
+                        if size < 0:
+                            break
+                        entry = tuple(line.rstrip(b"\n").split(b"\t", 2))
+                        if len(entry) == 3 and matches(entry):
+                            chunk.append(entry[2])
+            except FileNotFoundError:
+                # Rotated away since the snapshot above
+                continue
+            chunks.append(chunk)
+            total += len(chunk)
+
+        found: Deque[bytes] = deque(maxlen=limit)
+        for chunk in reversed(chunks):
+            found.extend(chunk)
+        return [json.loads(payload) for payload in found]
+
+    def clear(self) -> None:
+        """Drop the in-memory records; the spill segments are left in place."""
+        with self._lock:
+            self._write_pending()
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counts of recorded, in-memory, spilled and dropped analyses and segment usage."""
+        return {
+            "capacity": self.capacity,
+            "in_memory": len(self._entries),
+            "total_recorded": self.total_recorded,
+            "spilled": self.spilled + len(self._pending_spill),
+            "dropped": self.dropped,
+            "segments": len(self._segments),
+            "segment_bytes": sum(segment.size for segment in self._segments),
+            "segment_path": self.segment_path
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (json.loads(entry[2]) for entry in list(self._entries))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [json.loads(entry[2]) for entry in list(self._entries)[index]]
+        return json.loads(self._entries[index][2])
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, AnalysisHistory):
+            return list(self._entries) == list(other._entries)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"AnalysisHistory(capacity={self.capacity}, in_memory={len(self._entries)}, spilled={self.spilled})"
+
+
+__all__ = ["AnalysisHistory", "DEFAULT_HISTORY_CAPACITY", "DEFAULT_MAX_SEGMENTS", "DEFAULT_SEGMENT_MAX_BYTES"]
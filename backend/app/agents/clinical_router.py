@@ -0,0 +1,234 @@
+"""Deterministic pre-router for structured clinical chat messages.
+
+Structured payloads (JSON clinical sections, EDC/source data points, or
+plain "hemoglobin 8.5, BP 185/115" measurement lists) are answered locally
+from the rule-based tool cores. Anything else, including free text and
+payloads that cannot be read unambiguously, is left for the LLM.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import re
+import time
+
+from app.agents.base_agent import AgentResponse
+from app.agents.data_verifier import _assess_critical_data
+from app.agents.portfolio_manager import _analyze_clinical_values
+from app.agents.query_analyzer import _analyze_data_point
+
+# Measurement names accepted in plain-text requests, mapped to (section, key)
+MEASUREMENT_ALIASES = {
+    "hemoglobin": ("laboratory", "hemoglobin"),
+    "haemoglobin": ("laboratory", "hemoglobin"),
+    "hgb": ("laboratory", "hemoglobin"),
+    "hb": ("laboratory", "hemoglobin"),
+    "bnp": ("laboratory", "bnp"),
+    "creatinine": ("laboratory", "creatinine"),
+    "troponin": ("laboratory", "troponin"),
+    "heart rate": ("vital_signs", "heart_rate"),
+    "hr": ("vital_signs", "heart_rate"),
+    "pulse": ("vital_signs", "heart_rate"),
+    "lvef": ("imaging", "lvef"),
+    "ef": ("imaging", "lvef"),
+    "ejection fraction": ("imaging", "lvef"),
+}
+BLOOD_PRESSURE_ALIASES = frozenset({"blood pressure", "bp"})
+
+# Units accepted after each measurement: the ones the clinical rules assume
+MEASUREMENT_UNITS = {
+    "hemoglobin": frozenset({"g/dl"}),
+    "bnp": frozenset({"pg/ml"}),
+    "creatinine": frozenset({"mg/dl"}),
+    "troponin": frozenset({"ng/ml"}),
+    "heart_rate": frozenset({"bpm"}),
+    "lvef": frozenset({"%"}),
+}
+BLOOD_PRESSURE_UNITS = frozenset({"mmhg"})
+
+# Sections analyze_clinical_values and assess_critical_data understand
+CLINICAL_SECTIONS = ("vital_signs", "laboratory", "imaging")
+CRITICAL_SECTIONS = ("vital_signs", "adverse_events", "protocol_deviations", "laboratory_values")
+
+REQUEST_PREFIX_PATTERN = re.compile(r"^(?:please\s+)?(?:analy[sz]e|check|assess|evaluate|interpret|review)\b:?\s*")
+SEGMENT_SPLIT_PATTERN = re.compile(r"\s*(?:[,;\n]|\band\b)\s*")
+MEASUREMENT_PATTERN = re.compile(
+    r"^(?P<name>[a-z][a-z ]*?)\s*(?:[:=]|\bis\b|\bof\b)?\s*"
+    r"(?P<value>\d+(?:\.\d+)?)(?:\s*/\s*(?P<second>\d+(?:\.\d+)?))?"
+    r"\s*(?P<unit>[a-z%/]+)?$"
+)
+
+
+def _parse_measurements(message: str) -> Optional[Dict[str, Dict[str, float]]]:
+    """Sections of values from a plain measurement list, or None if not one.
+
+    Every segment must be a known measurement with a number (systolic/diastolic
+    for blood pressure) and optionally that measurement's unit; any other
+    unit, or a repeated measurement with a different value, makes the
+    message ambiguous.
+    """
+    text = REQUEST_PREFIX_PATTERN.sub("", message.strip().lower()).rstrip(" .?!")
+    if not text:
+        return None
+
+    sections: Dict[str, Dict[str, float]] = {}
+
+    def put(section: str, key: str, value: float) -> bool:
+        values = sections.setdefault(section, {})
+        if values.get(key, value) != value:
+            return False
+        values[key] = value
+        return True
+
+    for segment in SEGMENT_SPLIT_PATTERN.split(text):
+        if not segment:
+            continue
+        match = MEASUREMENT_PATTERN.match(segment)
+        if match is None:
+            return None
+        name = " ".join(match.group("name").split())
+        unit = match.group("unit")
+        value = float(match.group("value"))
+        second = match.group("second")
+        if name in BLOOD_PRESSURE_ALIASES:
+            if second is None or (unit is not None and unit not in BLOOD_PRESSURE_UNITS):
+                return None
+            if not (put("vital_signs", "systolic_bp", value) and put("vital_signs", "diastolic_bp", float(second))):
+                return None
+        elif name in MEASUREMENT_ALIASES and second is None:
+            section, key = MEASUREMENT_ALIASES[name]
+            if unit is not None and unit not in MEASUREMENT_UNITS[key]:
+                return None
+            if not put(section, key, value):
+                return None
+        else:
+            return None
+
+    return sections or None
+
+
+def _critical_data_view(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Adapt clinical sections to the keys assess_critical_data reads."""
+    view = dict(data)
+    vital_signs = data.get("vital_signs")
+    if (
+        isinstance(vital_signs, dict)
+        and "blood_pressure" not in vital_signs
+        and "systolic_bp" in vital_signs
+        and "diastolic_bp" in vital_signs
+    ):
+        systolic = float(vital_signs["systolic_bp"])
+        diastolic = float(vital_signs["diastolic_bp"])
+        view["vital_signs"] = dict(vital_signs, blood_pressure=f"{systolic:g}/{diastolic:g}")
+    if "laboratory_values" not in data and isinstance(data.get("laboratory"), dict):
+        view["laboratory_values"] = data["laboratory"]
+    return view
+
+
+def _analyze_clinical_payload(data: Dict[str, Any]) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """(tool name, result) pairs for a clinical payload, or None if nothing applies."""
+    outputs = []
+    if any(isinstance(data.get(section), dict) for section in CLINICAL_SECTIONS):
+        analysis = _analyze_clinical_values(data)
+        if any(not finding.startswith("No clinical data") for finding in analysis["clinical_findings"]):
+            outputs.append(("analyze_clinical_values", analysis))
+
+    critical_view = _critical_data_view(data)
+    if any(critical_view.get(section) for section in CRITICAL_SECTIONS):
+        outputs.append(("assess_critical_data", _assess_critical_data(critical_view, {})))
+
+    return outputs or None
+
+
+def _is_data_point(value: Any) -> bool:
+    return isinstance(value, dict) and "edc_value" in value and "source_value" in value and "field_name" in value
+
+
+def _route_json(payload: Any) -> Optional[Tuple[str, List[Tuple[str, Dict[str, Any]]]]]:
+    """(rule, tool outputs) for a structured JSON payload, or None."""
+    if _is_data_point(payload):
+        return "data_point", [("analyze_data_point", _analyze_data_point(payload))]
+    if isinstance(payload, list) and payload and all(_is_data_point(item) for item in payload):
+        return "data_points", [("analyze_data_point", _analyze_data_point(item)) for item in payload]
+    if isinstance(payload, dict):
+        outputs = _analyze_clinical_payload(payload)
+        if outputs:
+            return "clinical_json", outputs
+    return None
+
+
+def _render(outputs: List[Tuple[str, Dict[str, Any]]]) -> Tuple[str, str]:
+    """Response text in the agent's FINDING / TOOL OUTPUT format, and the overall severity."""
+    severity_rank = {"normal": 0, "low": 0, "info": 0, "minor": 1, "medium": 1, "high": 2, "major": 2, "critical": 3}
+    severity = "normal"
+    lines = []
+
+    for tool_name, result in outputs:
+        if tool_name == "analyze_clinical_values":
+            lines.extend(f"CLINICAL FINDING: {finding}" for finding in result["clinical_findings"])
+            lines.extend(f"RECOMMENDED ACTION: {action}" for action in result["recommendations"])
+            result_severity = result["severity_assessment"]
+        elif tool_name == "assess_critical_data":
+            lines.extend(f"CLINICAL FINDING: {finding['description']}" for finding in result["critical_findings"])
+            lines.extend(f"RECOMMENDED ACTION: {action}" for action in result["immediate_actions"])
+            result_severity = result["risk_level"]
+        else:
+            lines.append(f"CLINICAL FINDING: {result['description']} ({result['severity']})")
+            lines.extend(f"RECOMMENDED ACTION: {action}" for action in result["suggested_actions"])
+            result_severity = result["severity"]
+        if severity_rank.get(result_severity, 0) > severity_rank[severity]:
+            severity = result_severity
+
+    lines.append("")
+    for tool_name, result in outputs:
+        lines.append(f"TOOL OUTPUT ({tool_name}): {json.dumps(result, indent=2)}")
+    lines.append("")
+    lines.append(f"CLINICAL INTERPRETATION: Overall severity {severity}, assessed with deterministic clinical rules.")
+    return "\n".join(lines), severity
+
+
+def route_clinical_message(message: str, agent_id: str = "portfolio-manager") -> Optional[AgentResponse]:
+    """Answer a structured clinical message locally, or return None to use the LLM.
+
+    The response metadata records route="fast_path", the rule that matched
+    and the tools used.
+    """
+    start_time = time.time()
+    stripped = message.strip()
+
+    routed = None
+    if stripped[:1] in ("{", "["):
+        try:
+            payload = json.loads(stripped)
+        except json.JSONDecodeError:
+            return None
+        try:
+            routed = _route_json(payload)
+        except (ValueError, TypeError, AttributeError, KeyError):
+            # Values the rules cannot read, e.g. non-numeric vitals
+            return None
+    else:
+        sections = _parse_measurements(stripped)
+        if sections is not None:
+            outputs = _analyze_clinical_payload(sections)
+            routed = ("measurements", outputs) if outputs else None
+
+    if routed is None:
+        return None
+
+    rule, outputs = routed
+    content, severity = _render(outputs)
+    return AgentResponse(
+        success=True,
+        content=content,
+        agent_id=agent_id,
+        execution_time=time.time() - start_time,
+        metadata={
+            "route": "fast_path",
+            "fast_path_rule": rule,
+            "tools_used": list(dict.fromkeys(tool_name for tool_name, _ in outputs)),
+            "severity": severity
+        }
+    )
+
+
+__all__ = ["route_clinical_message"]
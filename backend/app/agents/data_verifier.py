@@ -1,10 +1,18 @@
 """Data Verifier using OpenAI Agents SDK."""
 
-from typing import Dict, List, Any, Optional, Tuple, Set
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple, Set, Iterable, AsyncIterable, AsyncIterator, Union
 from pydantic import BaseModel, Field
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
 import json
+import logging
+import os
+import threading
 import uuid
 import re
 
@@ -32,6 +40,16 @@ except ImportError:
     OpenAI = None
     get_settings = lambda: None
 
+from app.agents.pattern_aggregator import DiscrepancyPatternAggregator
+
+try:
+    import numpy as np
+except ImportError:
+    # Columnar batch verification falls back to the scalar path
+    np = None
+
+logger = logging.getLogger(__name__)
+
 
 class DiscrepancyType(Enum):
     """Types of discrepancies found in data verification."""
@@ -77,12 +95,22 @@ class DataVerificationContext(BaseModel):
 
 
 # Critical fields that require special attention
-CRITICAL_FIELDS = {
+CRITICAL_FIELDS = frozenset({
     "adverse_events", "serious_adverse_events", "death", "hospitalization",
     "hemoglobin", "blood_pressure", "heart_rate", "temperature", "oxygen_saturation",
     "concomitant_medications", "protocol_deviations", "informed_consent",
     "primary_endpoint", "efficacy_measures", "safety_measures"
-}
+})
+
+# Single alternation over CRITICAL_FIELDS, matched as a substring of the
+# lowercased field name (longest names first)
+CRITICAL_FIELD_PATTERN = re.compile(
+    "|".join(re.escape(field) for field in sorted(CRITICAL_FIELDS, key=len, reverse=True))
+)
+PRIMARY_ENDPOINT_PATTERN = re.compile("primary|endpoint")
+
+# Bound on memoized (field_name, discrepancy_type) severity decisions
+SEVERITY_CACHE_SIZE = 4096
 
 # Default field tolerances for numeric comparisons
 DEFAULT_FIELD_TOLERANCES = {
@@ -113,6 +141,41 @@ UNIT_CONVERSIONS = {
     }
 }
 
+# Spellings normalized to the unit names used in UNIT_CONVERSIONS
+UNIT_ALIASES = {
+    "kg": "kg", "kgs": "kg", "kilogram": "kg", "kilograms": "kg",
+    "lb": "lbs", "lbs": "lbs", "pound": "lbs", "pounds": "lbs",
+    "cm": "cm", "centimeter": "cm", "centimeters": "cm", "centimetre": "cm", "centimetres": "cm",
+    "in": "inch", "inch": "inch", "inches": "inch",
+    "c": "celsius", "°c": "celsius", "degc": "celsius", "celsius": "celsius",
+    "f": "fahrenheit", "°f": "fahrenheit", "degf": "fahrenheit", "fahrenheit": "fahrenheit"
+}
+
+# Companion fields carrying a value's unit, e.g. weight_unit for weight
+UNIT_FIELD_SUFFIX = "_unit"
+
+# Numeric value followed by a unit, e.g. "75 kg" or "98.6F"
+VALUE_WITH_UNIT_PATTERN = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([^\d\s.+-].*)$")
+
+
+def _build_unit_conversion_table() -> Dict[str, Dict[Tuple[str, str], Tuple[float, float]]]:
+    """Precompute each UNIT_CONVERSIONS entry as a (scale, offset) pair.
+    
+    All conversions are affine, so x * scale + offset applies them equally
+    to Python floats and NumPy columns. The scale is sampled over a wide
+    interval to keep float rounding out of it.
+    """
+    table = {}
+    for family, conversions in UNIT_CONVERSIONS.items():
+        table[family] = {}
+        for units, convert in conversions.items():
+            offset = convert(0.0)
+            table[family][units] = ((convert(1e6) - offset) / 1e6, offset)
+    return table
+
+
+UNIT_CONVERSION_TABLE = _build_unit_conversion_table()
+
 
 @function_tool
 def cross_system_verification(verification_request: str) -> str:
@@ -133,7 +196,19 @@ def cross_system_verification(verification_request: str) -> str:
     except json.JSONDecodeError:
         return json.dumps({"error": "Invalid JSON format in verification request"})
     
-    verification_id = f"DV_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    return json.dumps(_cross_system_verification(edc_data, source_data, context_data))
+
+
+def _cross_system_verification(
+    edc_data: Dict[str, Any],
+    source_data: Dict[str, Any],
+    context_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Compare EDC and source data for one subject.
+    
+    In-process core of the cross_system_verification tool; takes and returns Python objects.
+    """
+    verification_id = _new_verification_id()
     
     discrepancies = []
     matching_fields = []
@@ -143,6 +218,8 @@ def cross_system_verification(verification_request: str) -> str:
     all_fields = set(edc_data.keys()) | set(source_data.keys())
     
     for field in all_fields:
+        if _is_folded_unit_field(field, edc_data, source_data):
+            continue
         total_fields += 1
         edc_value = edc_data.get(field)
         source_value = source_data.get(field)
@@ -150,61 +227,23 @@ def cross_system_verification(verification_request: str) -> str:
         # Check for missing data
         if edc_value is None or edc_value == "":
             if source_value is not None and source_value != "":
-                discrepancies.append({
-                    "field_name": field,
-                    "edc_value": edc_value,
-                    "source_value": source_value,
-                    "discrepancy_type": DiscrepancyType.MISSING_IN_EDC.value,
-                    "severity": _assess_field_severity(field, DiscrepancyType.MISSING_IN_EDC).value,
-                    "description": f"Missing value in EDC for {field}"
-                })
+                discrepancies.append(_missing_discrepancy(field, edc_value, source_value, DiscrepancyType.MISSING_IN_EDC))
         elif source_value is None or source_value == "":
-            discrepancies.append({
-                "field_name": field,
-                "edc_value": edc_value,
-                "source_value": source_value,
-                "discrepancy_type": DiscrepancyType.MISSING_IN_SOURCE.value,
-                "severity": _assess_field_severity(field, DiscrepancyType.MISSING_IN_SOURCE).value,
-                "description": f"Missing value in source document for {field}"
-            })
+            discrepancies.append(_missing_discrepancy(field, edc_value, source_value, DiscrepancyType.MISSING_IN_SOURCE))
         else:
             # Both values present - check for discrepancies
-            discrepancy = _compare_values(field, edc_value, source_value, context_data)
+            edc_unit, source_unit = _record_units(field, edc_data, source_data)
+            discrepancy = _compare_values(field, edc_value, source_value, context_data, edc_unit, source_unit)
             if discrepancy:
                 discrepancies.append(discrepancy)
-            else:
+            if not discrepancy or discrepancy.get("equivalent"):
                 matching_fields.append(field)
     
-    # Calculate match score
-    match_score = len(matching_fields) / total_fields if total_fields > 0 else 0.0
+    verification_result = _build_verification_result(
+        verification_id, edc_data, source_data, discrepancies, len(matching_fields), total_fields
+    )
     
-    # Identify critical findings
-    critical_findings = [
-        d for d in discrepancies 
-        if d["severity"] in [DiscrepancySeverity.CRITICAL.value, DiscrepancySeverity.MAJOR.value]
-    ]
-    
-    # Generate recommendations
-    recommendations = _generate_verification_recommendations(discrepancies, match_score)
-    
-    verification_result = {
-        "verification_id": verification_id,
-        "subject_id": edc_data.get("subject_id", source_data.get("subject_id", "")),
-        "match_score": match_score,
-        "total_fields": total_fields,
-        "matching_fields": len(matching_fields),
-        "discrepancies": discrepancies,
-        "critical_findings": critical_findings,
-        "recommendations": recommendations,
-        "verification_date": datetime.now().isoformat(),
-        "metadata": {
-            "edc_fields": len(edc_data),
-            "source_fields": len(source_data),
-            "verification_method": "cross_system_comparison"
-        }
-    }
-    
-    return json.dumps(verification_result)
+    return verification_result
 
 
 @function_tool
@@ -225,6 +264,17 @@ def assess_critical_data(assessment_request: str) -> str:
     except json.JSONDecodeError:
         return json.dumps({"error": "Invalid JSON format in assessment request"})
     
+    return json.dumps(_assess_critical_data(data, context_data))
+
+
+def _assess_critical_data(
+    data: Dict[str, Any],
+    context_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Assess one subject record for critical safety and regulatory issues.
+    
+    In-process core of the assess_critical_data tool; takes and returns Python objects.
+    """
     risk_level = "low"
     critical_findings = []
     immediate_actions = []
@@ -290,7 +340,7 @@ def assess_critical_data(assessment_request: str) -> str:
         "total_findings": len(critical_findings)
     }
     
-    return json.dumps(assessment_result)
+    return assessment_result
 
 
 @function_tool
@@ -311,73 +361,51 @@ def detect_discrepancy_patterns(pattern_request: str) -> str:
     except json.JSONDecodeError:
         return json.dumps({"error": "Invalid JSON format in pattern request"})
     
-    site_patterns = {}
-    field_patterns = {}
-    temporal_patterns = {}
-    
-    # Analyze site-specific patterns
-    for data in historical_data:
-        site_id = data.get("site_id", "Unknown")
-        if site_id not in site_patterns:
-            site_patterns[site_id] = {
-                "total_discrepancies": 0,
-                "discrepancy_types": {},
-                "fields_affected": set(),
-                "severity_distribution": {}
-            }
-        
-        discrepancy_type = data.get("discrepancy_type", "unknown")
-        frequency = data.get("frequency", 1)
-        field_name = data.get("field_name", "")
-        
-        site_patterns[site_id]["total_discrepancies"] += frequency
-        site_patterns[site_id]["discrepancy_types"][discrepancy_type] = \
-            site_patterns[site_id]["discrepancy_types"].get(discrepancy_type, 0) + frequency
-        site_patterns[site_id]["fields_affected"].add(field_name)
-    
-    # Convert sets to lists for JSON serialization
-    for site_id in site_patterns:
-        site_patterns[site_id]["fields_affected"] = list(site_patterns[site_id]["fields_affected"])
-    
-    # Analyze field-specific patterns
-    for data in historical_data:
-        field_name = data.get("field_name", "")
-        if field_name not in field_patterns:
-            field_patterns[field_name] = {
-                "total_discrepancies": 0,
-                "sites_affected": set(),
-                "common_types": {}
-            }
-        
-        frequency = data.get("frequency", 1)
-        site_id = data.get("site_id", "")
-        discrepancy_type = data.get("discrepancy_type", "unknown")
-        
-        field_patterns[field_name]["total_discrepancies"] += frequency
-        field_patterns[field_name]["sites_affected"].add(site_id)
-        field_patterns[field_name]["common_types"][discrepancy_type] = \
-            field_patterns[field_name]["common_types"].get(discrepancy_type, 0) + frequency
+    return json.dumps(_detect_discrepancy_patterns(historical_data, context_data))
+
+
+def _detect_discrepancy_patterns(
+    historical_data: List[Dict[str, Any]],
+    context_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Aggregate historical discrepancies into site and field patterns.
     
-    # Convert sets to lists for JSON serialization
-    for field_name in field_patterns:
-        field_patterns[field_name]["sites_affected"] = list(field_patterns[field_name]["sites_affected"])
+    In-process core of the detect_discrepancy_patterns tool; takes and returns Python objects.
+    """
+    return _render_discrepancy_patterns(DiscrepancyPatternAggregator.from_events(historical_data))
+
+
+def _render_discrepancy_patterns(aggregator: DiscrepancyPatternAggregator) -> Dict[str, Any]:
+    """Build the pattern analysis document from running aggregates."""
+    site_patterns = {
+        site_id: {
+            "total_discrepancies": total,
+            "discrepancy_types": dict(aggregator.site_types[site_id]),
+            "fields_affected": list(aggregator.site_fields[site_id]),
+            "severity_distribution": dict(aggregator.site_severities[site_id])
+        }
+        for site_id, total in aggregator.site_totals.items()
+    }
+    field_patterns = {
+        field_name: {
+            "total_discrepancies": total,
+            "sites_affected": list(aggregator.field_sites[field_name]),
+            "common_types": dict(aggregator.field_types[field_name])
+        }
+        for field_name, total in aggregator.field_totals.items()
+    }
+    temporal_patterns = aggregator.temporal.summary()
     
     # Generate recommendations
     recommendations = []
     
     # Identify high-risk sites
-    high_risk_sites = [
-        site for site, data in site_patterns.items()
-        if data["total_discrepancies"] > 10
-    ]
+    high_risk_sites = aggregator.sites_over(10)
     if high_risk_sites:
-        recommendations.append(f"Increase monitoring for high-risk sites: {', '.join(high_risk_sites)}")
+        recommendations.append(f"Increase monitoring for high-risk sites: {', '.join(map(str, high_risk_sites))}")
     
     # Identify problematic fields
-    problematic_fields = [
-        field for field, data in field_patterns.items()
-        if data["total_discrepancies"] > 5
-    ]
+    problematic_fields = aggregator.fields_over(5)
     if problematic_fields:
         recommendations.append(f"Review data collection procedures for fields: {', '.join(problematic_fields)}")
     
@@ -388,10 +416,10 @@ def detect_discrepancy_patterns(pattern_request: str) -> str:
         "temporal_patterns": temporal_patterns,
         "recommendations": recommendations,
         "pattern_analysis_date": datetime.now().isoformat(),
-        "data_points_analyzed": len(historical_data)
+        "data_points_analyzed": aggregator.events_processed
     }
     
-    return json.dumps(pattern_result)
+    return pattern_result
 
 
 @function_tool
@@ -413,14 +441,20 @@ def complete_sdv_verification(sdv_request: str) -> str:
     except json.JSONDecodeError:
         return json.dumps({"error": "Invalid JSON format in SDV request"})
     
+    return json.dumps(_complete_sdv_verification(edc_data, source_data, context_data))
+
+
+def _complete_sdv_verification(
+    edc_data: Dict[str, Any],
+    source_data: Dict[str, Any],
+    context_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Run the full SDV process for one subject.
+    
+    In-process core of the complete_sdv_verification tool; takes and returns Python objects.
+    """
     # Perform basic cross-system verification
-    verification_request_internal = json.dumps({
-        "edc_data": edc_data,
-        "source_data": source_data,
-        "context": context_data
-    })
-    verification_result_str = cross_system_verification(verification_request_internal)
-    verification_result = json.loads(verification_result_str)
+    verification_result = _cross_system_verification(edc_data, source_data, context_data)
     
     # Enhanced SDV-specific checks
     sdv_checks = {
@@ -472,7 +506,7 @@ def complete_sdv_verification(sdv_request: str) -> str:
         "verifier_notes": f"SDV completed with {total_discrepancies} discrepancies found"
     }
     
-    return json.dumps(sdv_result)
+    return sdv_result
 
 
 @function_tool
@@ -490,60 +524,128 @@ def batch_verification(batch_request: str) -> str:
         request_data = json.loads(batch_request)
         batch_data = request_data.get("batch_data", [])
         context_data = request_data.get("context", {})
+        columnar = request_data.get("columnar")
     except json.JSONDecodeError:
         return json.dumps({"error": "Invalid JSON format in batch request"})
     
+    return json.dumps(_batch_verification(batch_data, context_data, columnar))
+
+
+def _batch_verification(
+    batch_data: List[Dict[str, Any]],
+    context_data: Dict[str, Any],
+    columnar: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Verify a batch of {edc_data, source_data} pairs.
+    
+    In-process core of the batch_verification tool; takes and returns Python objects.
+    """
     batch_id = f"BV_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
-    verification_results = []
-    total_discrepancies = 0
-    total_critical_findings = 0
     
+    # Large batches go through the columnar engine unless explicitly disabled
+    if columnar is None:
+        columnar = len(batch_data) >= COLUMNAR_MIN_BATCH_SIZE
+    
+    verification_results = _verify_pairs(batch_data, context_data, columnar)
+    
+    stats = BatchVerificationStats()
+    for result in verification_results:
+        stats.add(result)
+    
+    return _build_batch_result(
+        batch_id, stats, verification_results,
+        "columnar" if columnar and np is not None else "scalar"
+    )
+
+
+def _verify_pairs(
+    batch_data: List[Dict[str, Any]],
+    context_data: Dict[str, Any],
+    columnar: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """Verify pairs in order and return one result per pair.
+    
+    Module-level so it can be shipped to process pool workers.
+    """
+    if columnar is None:
+        columnar = len(batch_data) >= COLUMNAR_MIN_BATCH_SIZE
+    
+    if columnar and np is not None:
+        return _columnar_batch_verification(batch_data, context_data)
+    
+    verification_results = []
     for data_pair in batch_data:
         edc_data = data_pair.get("edc_data", {})
         source_data = data_pair.get("source_data", {})
         try:
-            verification_request_internal = json.dumps({
-                "edc_data": edc_data,
-                "source_data": source_data,
-                "context": context_data
-            })
-            result_str = cross_system_verification(verification_request_internal)
-            result = json.loads(result_str)
-            verification_results.append(result)
-            total_discrepancies += len(result.get("discrepancies", []))
-            total_critical_findings += len(result.get("critical_findings", []))
+            verification_results.append(_cross_system_verification(edc_data, source_data, context_data))
         except Exception as e:
-            error_result = {
-                "verification_id": f"ERROR_{uuid.uuid4().hex[:8]}",
-                "subject_id": edc_data.get("subject_id", "unknown"),
-                "error": str(e),
-                "status": "failed"
-            }
-            verification_results.append(error_result)
-    
-    # Calculate summary statistics
-    successful_verifications = [r for r in verification_results if "error" not in r]
-    match_scores = [r.get("match_score", 0.0) for r in successful_verifications]
-    
-    summary_statistics = {
-        "total_discrepancies": total_discrepancies,
-        "critical_findings_count": total_critical_findings,
-        "average_match_score": sum(match_scores) / len(match_scores) if match_scores else 0.0,
-        "discrepancy_rate": total_discrepancies / len(batch_data) if len(batch_data) > 0 else 0.0,
-        "success_rate": len(successful_verifications) / len(batch_data) if len(batch_data) > 0 else 0.0
-    }
+            verification_results.append(_batch_error_result(edc_data, e))
+    return verification_results
+
+
+class BatchVerificationStats:
+    """Running summary statistics over batch verification results."""
     
-    batch_result = {
+    __slots__ = ("total", "successful", "total_discrepancies", "critical_findings", "match_score_sum", "min_match_score", "max_match_score")
+    
+    def __init__(self):
+        self.total = 0
+        self.successful = 0
+        self.total_discrepancies = 0
+        self.critical_findings = 0
+        self.match_score_sum = 0.0
+        self.min_match_score: Optional[float] = None
+        self.max_match_score: Optional[float] = None
+    
+    def add(self, result: Dict[str, Any]) -> None:
+        """Fold one per-pair verification result into the statistics."""
+        self.total += 1
+        if "error" in result:
+            return
+        
+        match_score = result.get("match_score", 0.0)
+        self.successful += 1
+        self.total_discrepancies += len(result.get("discrepancies", []))
+        self.critical_findings += len(result.get("critical_findings", []))
+        self.match_score_sum += match_score
+        if self.min_match_score is None or match_score < self.min_match_score:
+            self.min_match_score = match_score
+        if self.max_match_score is None or match_score > self.max_match_score:
+            self.max_match_score = match_score
+    
+    @property
+    def failed(self) -> int:
+        return self.total - self.successful
+    
+    def summary(self) -> Dict[str, Any]:
+        """Summary statistics in the batch_verification result format."""
+        return {
+            "total_discrepancies": self.total_discrepancies,
+            "critical_findings_count": self.critical_findings,
+            "average_match_score": self.match_score_sum / self.successful if self.successful else 0.0,
+            "discrepancy_rate": self.total_discrepancies / self.total if self.total > 0 else 0.0,
+            "success_rate": self.successful / self.total if self.total > 0 else 0.0
+        }
+
+
+def _build_batch_result(
+    batch_id: str,
+    stats: BatchVerificationStats,
+    verification_results: List[Dict[str, Any]],
+    verification_mode: str
+) -> Dict[str, Any]:
+    """Assemble the batch_verification result document."""
+    return {
         "batch_id": batch_id,
-        "total_subjects": len(batch_data),
-        "successful_verifications": len(successful_verifications),
-        "failed_verifications": len(batch_data) - len(successful_verifications),
+        "total_subjects": stats.total,
+        "successful_verifications": stats.successful,
+        "failed_verifications": stats.failed,
         "verification_results": verification_results,
-        "summary_statistics": summary_statistics,
-        "batch_date": datetime.now().isoformat()
+        "summary_statistics": stats.summary(),
+        "batch_date": datetime.now().isoformat(),
+        "verification_mode": verification_mode
     }
-    
-    return json.dumps(batch_result)
 
 
 @function_tool
@@ -564,6 +666,17 @@ def generate_audit_trail(audit_request: str) -> str:
     except json.JSONDecodeError:
         return json.dumps({"error": "Invalid JSON format in audit request"})
     
+    return json.dumps(_generate_audit_trail(verification_data, context_data))
+
+
+def _generate_audit_trail(
+    verification_data: Dict[str, Any],
+    context_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Build the audit trail document for a verification.
+    
+    In-process core of the generate_audit_trail tool; takes and returns Python objects.
+    """
     audit_id = f"AT_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
     
     verification_steps = [
@@ -626,28 +739,284 @@ def generate_audit_trail(audit_request: str) -> str:
         }
     }
     
-    return json.dumps(audit_trail)
+    return audit_trail
 
 
 # Helper functions
-def _compare_values(field: str, edc_value: Any, source_value: Any, context_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Compare two values and identify discrepancies."""
+def _new_verification_id() -> str:
+    """Generate a unique verification identifier."""
+    return f"DV_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def _build_verification_result(
+    verification_id: str,
+    edc_data: Dict[str, Any],
+    source_data: Dict[str, Any],
+    discrepancies: List[Dict[str, Any]],
+    matching_count: int,
+    total_fields: int
+) -> Dict[str, Any]:
+    """Assemble a cross-system verification result from compared fields."""
+    # Calculate match score
+    match_score = matching_count / total_fields if total_fields > 0 else 0.0
+    
+    # Identify critical findings
+    critical_findings = [
+        d for d in discrepancies 
+        if d["severity"] in [DiscrepancySeverity.CRITICAL.value, DiscrepancySeverity.MAJOR.value]
+    ]
+    
+    # Generate recommendations
+    recommendations = _generate_verification_recommendations(discrepancies, match_score)
+    
+    return {
+        "verification_id": verification_id,
+        "subject_id": edc_data.get("subject_id", source_data.get("subject_id", "")),
+        "match_score": match_score,
+        "total_fields": total_fields,
+        "matching_fields": matching_count,
+        "discrepancies": discrepancies,
+        "critical_findings": critical_findings,
+        "recommendations": recommendations,
+        "verification_date": datetime.now().isoformat(),
+        "metadata": {
+            "edc_fields": len(edc_data),
+            "source_fields": len(source_data),
+            "verification_method": "cross_system_comparison"
+        }
+    }
+
+
+def _batch_error_result(edc_data: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """Build the result recorded for a batch pair that failed verification."""
+    return {
+        "verification_id": f"ERROR_{uuid.uuid4().hex[:8]}",
+        "subject_id": edc_data.get("subject_id", "unknown"),
+        "error": str(error),
+        "status": "failed"
+    }
+
+
+def _missing_discrepancy(field: str, edc_value: Any, source_value: Any, discrepancy_type: DiscrepancyType) -> Dict[str, Any]:
+    """Build a missing-value discrepancy record."""
+    location = "EDC" if discrepancy_type == DiscrepancyType.MISSING_IN_EDC else "source document"
+    return {
+        "field_name": field,
+        "edc_value": edc_value,
+        "source_value": source_value,
+        "discrepancy_type": discrepancy_type.value,
+        "severity": _assess_field_severity(field, discrepancy_type).value,
+        "description": f"Missing value in {location} for {field}"
+    }
+
+
+@lru_cache(maxsize=SEVERITY_CACHE_SIZE)
+def _unit_family(field: str) -> Optional[str]:
+    """UNIT_CONVERSIONS family a field's values convert within, if any."""
+    field_lower = field.lower()
+    if field_lower.endswith(UNIT_FIELD_SUFFIX):
+        return None
+    for family in UNIT_CONVERSION_TABLE:
+        if family in field_lower:
+            return family
+    return None
+
+
+def _normalize_unit(unit: Any) -> Optional[str]:
+    """Canonical unit name for a unit spelling, or None if unknown."""
+    if not isinstance(unit, str):
+        return None
+    return UNIT_ALIASES.get(unit.strip().lower())
+
+
+def _canonical_unit(unit: Any) -> Optional[str]:
+    """Canonical name of a known unit, the lowercased spelling of an unknown one, or None."""
+    if not isinstance(unit, str) or not unit.strip():
+        return None
+    unit = unit.strip().lower()
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def _split_value_unit(value_str: str) -> Tuple[str, Optional[str]]:
+    """Split "75 kg" into ("75", "kg"); values without a unit suffix are returned as-is.
+    
+    Unknown suffixes are kept (lowercased) so they are never mistaken for
+    the unit on the other side.
+    """
+    match = VALUE_WITH_UNIT_PATTERN.match(value_str)
+    if match:
+        return match.group(1), _canonical_unit(match.group(2))
+    return value_str, None
+
+
+def _record_units(field: str, edc_data: Dict[str, Any], source_data: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Units from the <field>_unit companion fields of a convertible field."""
+    if _unit_family(field) is None:
+        return None, None
+    unit_field = field + UNIT_FIELD_SUFFIX
+    return _canonical_unit(edc_data.get(unit_field)), _canonical_unit(source_data.get(unit_field))
+
+
+def _units_conflict(family: str, edc_unit: Optional[str], source_unit: Optional[str]) -> bool:
+    """Whether both sides carry units that differ and do not convert into each other."""
+    return (
+        edc_unit is not None and source_unit is not None and edc_unit != source_unit
+        and (source_unit, edc_unit) not in UNIT_CONVERSION_TABLE[family]
+    )
+
+
+def _is_folded_unit_field(field: str, edc_data: Dict[str, Any], source_data: Dict[str, Any]) -> bool:
+    """Whether field is a <field>_unit companion reconciled on its value field.
+    
+    When both units are given and differ, the difference is reported on the
+    value field (converted, or as a unit mismatch) instead of separately.
+    """
+    if not field.endswith(UNIT_FIELD_SUFFIX):
+        return False
+    value_field = field[:-len(UNIT_FIELD_SUFFIX)]
+    family = _unit_family(value_field)
+    if family is None or value_field not in edc_data or value_field not in source_data:
+        return False
+    edc_unit, source_unit = _record_units(value_field, edc_data, source_data)
+    return edc_unit is not None and source_unit is not None and edc_unit != source_unit
+
+
+def convert_field_unit(field: str, value: Any, from_unit: str, to_unit: str) -> Any:
+    """Convert a value of field between units using the precomputed conversion table.
+    
+    Works on floats and NumPy arrays alike. Returns the value unchanged when
+    the units are equal.
+    
+    Raises:
+        ValueError: If no conversion exists for the field and units
+    """
+    family = _unit_family(field)
+    from_unit, to_unit = _normalize_unit(from_unit) or from_unit, _normalize_unit(to_unit) or to_unit
+    if from_unit == to_unit:
+        return value
+    conversion = UNIT_CONVERSION_TABLE.get(family, {}).get((from_unit, to_unit)) if family else None
+    if conversion is None:
+        raise ValueError(f"No unit conversion for {field} from {from_unit} to {to_unit}")
+    scale, offset = conversion
+    return value * scale + offset
+
+
+def _unit_discrepancy(
+    field: str,
+    edc_value: Any,
+    source_value: Any,
+    edc_number: float,
+    source_number: float,
+    edc_unit: str,
+    source_unit: str,
+    converted_source: float,
+    difference: float,
+    tolerance: float
+) -> Dict[str, Any]:
+    """Build the discrepancy for values recorded in different, convertible units.
+    
+    Values equal after conversion are an informational unit mismatch that
+    counts as a matching field; otherwise it is a value mismatch.
+    """
+    equivalent = difference <= tolerance
+    if equivalent:
+        discrepancy_type = DiscrepancyType.UNIT_MISMATCH
+        severity = DiscrepancySeverity.INFO
+        description = f"Unit difference: {edc_number:g} {edc_unit} vs {source_number:g} {source_unit} (equivalent after conversion)"
+    else:
+        discrepancy_type = DiscrepancyType.VALUE_MISMATCH
+        severity = _assess_field_severity(field, discrepancy_type)
+        description = (
+            f"Numeric value difference after unit conversion: {edc_number:g} {edc_unit} vs "
+            f"{source_number:g} {source_unit} ({converted_source:.4g} {edc_unit})"
+        )
+    return {
+        "field_name": field,
+        "edc_value": edc_value,
+        "source_value": source_value,
+        "discrepancy_type": discrepancy_type.value,
+        "severity": severity.value,
+        "description": description,
+        "equivalent": equivalent,
+        "edc_unit": edc_unit,
+        "source_unit": source_unit,
+        "converted_source_value": converted_source,
+        "difference": difference
+    }
+
+
+def _compare_values(
+    field: str,
+    edc_value: Any,
+    source_value: Any,
+    context_data: Dict[str, Any],
+    edc_unit: Optional[str] = None,
+    source_unit: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Compare two values and identify discrepancies.
+    
+    Values of fields with a UNIT_CONVERSIONS entry are normalized to the EDC
+    unit before the tolerance check. Units come from an inline suffix
+    ("75 kg") or from the edc_unit/source_unit of the record's companion
+    <field>_unit fields. Units that differ without a conversion between
+    them are a unit mismatch rather than a comparison of the bare numbers.
+    """
     
     # Convert to strings for comparison
     edc_str = str(edc_value).strip() if edc_value is not None else ""
     source_str = str(source_value).strip() if source_value is not None else ""
+    edc_number_str, source_number_str = edc_str, source_str
+    
+    field_tolerances = context_data.get("field_tolerances", {})
+    tolerance = field_tolerances.get(field, DEFAULT_FIELD_TOLERANCES.get(field, 0.0))
+    
+    # Normalize units before comparing
+    family = _unit_family(field)
+    if family is not None:
+        edc_number_str, edc_inline_unit = _split_value_unit(edc_str)
+        source_number_str, source_inline_unit = _split_value_unit(source_str)
+        edc_unit = edc_inline_unit or _canonical_unit(edc_unit)
+        source_unit = source_inline_unit or _canonical_unit(source_unit)
+        
+        if _units_conflict(family, edc_unit, source_unit):
+            return {
+                "field_name": field,
+                "edc_value": edc_value,
+                "source_value": source_value,
+                "discrepancy_type": DiscrepancyType.UNIT_MISMATCH.value,
+                "severity": _assess_field_severity(field, DiscrepancyType.UNIT_MISMATCH).value,
+                "description": (
+                    f"Incompatible units: {edc_number_str} {edc_unit} vs {source_number_str} {source_unit}"
+                ),
+                "equivalent": False,
+                "edc_unit": edc_unit,
+                "source_unit": source_unit
+            }
+        
+        conversion = UNIT_CONVERSION_TABLE[family].get((source_unit, edc_unit))
+        if conversion is not None:
+            try:
+                edc_num = float(edc_number_str)
+                source_num = float(source_number_str)
+            except ValueError:
+                pass
+            else:
+                converted = source_num * conversion[0] + conversion[1]
+                return _unit_discrepancy(
+                    field, edc_value, source_value, edc_num, source_num, edc_unit, source_unit,
+                    converted, abs(edc_num - converted), tolerance
+                )
     
     # Exact match
-    if edc_str.lower() == source_str.lower():
+    if edc_str.lower() == source_str.lower() or (
+        edc_unit == source_unit and edc_number_str.lower() == source_number_str.lower()
+    ):
         return None
     
     # Try numeric comparison with tolerance
     try:
-        edc_num = float(edc_str)
-        source_num = float(source_str)
-        
-        field_tolerances = context_data.get("field_tolerances", {})
-        tolerance = field_tolerances.get(field, DEFAULT_FIELD_TOLERANCES.get(field, 0.0))
+        edc_num = float(edc_number_str)
+        source_num = float(source_number_str)
         
         if abs(edc_num - source_num) <= tolerance:
             return None  # Within tolerance
@@ -667,7 +1036,8 @@ def _compare_values(field: str, edc_value: Any, source_value: Any, context_data:
         pass
     
     # Check for format differences (dates, etc.)
-    if _is_same_date(edc_str, source_str):
+    same_date = _compare_dates(edc_str, source_str)
+    if same_date:
         return {
             "field_name": field,
             "edc_value": edc_value,
@@ -684,23 +1054,31 @@ def _compare_values(field: str, edc_value: Any, source_value: Any, context_data:
         "source_value": source_value,
         "discrepancy_type": DiscrepancyType.VALUE_MISMATCH.value,
         "severity": _assess_field_severity(field, DiscrepancyType.VALUE_MISMATCH).value,
-        "description": f"Value mismatch: {edc_value} vs {source_value}"
+        "description": (
+            f"Date mismatch: {edc_value} vs {source_value}" if same_date is False
+            else f"Value mismatch: {edc_value} vs {source_value}"
+        )
     }
 
 
+@lru_cache(maxsize=SEVERITY_CACHE_SIZE)
 def _assess_field_severity(field_name: str, discrepancy_type: DiscrepancyType) -> DiscrepancySeverity:
-    """Assess the severity of a discrepancy based on field and type."""
+    """Assess the severity of a discrepancy based on field and type.
+    
+    Results are memoized per (field_name, discrepancy_type); see
+    get_severity_cache_stats() for hit/miss counts.
+    """
     field_lower = field_name.lower()
     
     # Critical fields always get high severity
-    if any(critical_field in field_lower for critical_field in CRITICAL_FIELDS):
+    if CRITICAL_FIELD_PATTERN.search(field_lower):
         if discrepancy_type in [DiscrepancyType.VALUE_MISMATCH, DiscrepancyType.MISSING_IN_EDC]:
             return DiscrepancySeverity.CRITICAL
         else:
             return DiscrepancySeverity.MAJOR
     
     # Primary endpoint fields
-    if "primary" in field_lower or "endpoint" in field_lower:
+    if PRIMARY_ENDPOINT_PATTERN.search(field_lower):
         return DiscrepancySeverity.MAJOR
     
     # Format differences are usually minor
@@ -714,6 +1092,24 @@ def _assess_field_severity(field_name: str, discrepancy_type: DiscrepancyType) -
         return DiscrepancySeverity.INFO
 
 
+def _cache_stats(cached_function: Any) -> Dict[str, Any]:
+    """Hit/miss statistics of an lru_cache-wrapped function."""
+    info = cached_function.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups > 0 else 0.0,
+        "size": info.currsize,
+        "max_size": info.maxsize
+    }
+
+
+def get_severity_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss statistics for the field severity cache."""
+    return _cache_stats(_assess_field_severity)
+
+
 def _generate_verification_recommendations(discrepancies: List[Dict], match_score: float) -> List[str]:
     """Generate recommendations based on verification results."""
     recommendations = []
@@ -833,15 +1229,162 @@ def _check_regulatory_compliance(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+# Date normalization
+# Bound on memoized date string parses
+DATE_CACHE_SIZE = 8192
+
+MONTH_NUMBERS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12
+}
+
+# Common EDC date formats, matched against the stripped lowercase value
+# 2025-01-15, 2025/01/15, 2025.01.15, optionally followed by a time
+ISO_DATE_PATTERN = re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[t ](\d{1,2}):(\d{2})(?::(\d{2}))?.*)?")
+# 20250115
+COMPACT_DATE_PATTERN = re.compile(r"(\d{4})(\d{2})(\d{2})")
+# 15-JAN-2025, 15 Jan 2025, 15JAN2025
+DAY_MONTH_NAME_PATTERN = re.compile(r"(\d{1,2})[-/. ]?([a-z]{3,9})\.?[-/. ]?(\d{4})")
+# Jan 15, 2025, January 15th 2025
+MONTH_NAME_DAY_PATTERN = re.compile(r"([a-z]{3,9})\.?[-/. ]?(\d{1,2})(?:st|nd|rd|th)?,?[-/. ]?(\d{4})")
+# 15.01.2025 (day first)
+DOTTED_DATE_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+# 01/15/2025 or 15/01/2025 (month first preferred, day first if ambiguous)
+SLASHED_DATE_PATTERN = re.compile(r"(\d{1,2})[/-](\d{1,2})[/-](\d{4})")
+
+
+class _ParsedDate(NamedTuple):
+    """A date string as written and the ISO dates it can denote."""
+    
+    # Name of the matching format and its numeric fields in written order
+    format: str
+    fields: Tuple[int, ...]
+    # Candidate ISO dates, preferred reading first
+    dates: Tuple[str, ...]
+    # (hour, minute, second) when the value carries a time
+    time: Optional[Tuple[int, int, int]] = None
+
+
+def _valid_iso_dates(*candidates: Tuple[int, int, int]) -> Tuple[str, ...]:
+    """ISO strings for the (year, month, day) candidates that are real dates."""
+    dates = []
+    for year, month, day in candidates:
+        try:
+            iso = date(year, month, day).isoformat()
+        except ValueError:
+            continue
+        if iso not in dates:
+            dates.append(iso)
+    return tuple(dates)
+
+
+def _parsed_date(
+    date_format: str,
+    fields: Tuple[int, ...],
+    dates: Tuple[str, ...],
+    time: Optional[Tuple[int, int, int]] = None
+) -> Optional[_ParsedDate]:
+    return _ParsedDate(date_format, fields, dates, time) if dates else None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date(value: str) -> Optional[_ParsedDate]:
+    """Parse a string in any supported EDC date format; None if it is not a date.
+    
+    Slashed numeric dates with both parts <= 12 yield both the
+    month-first and day-first readings.
+    """
+    text = value.strip().lower()
+    if len(text) < 8 or not text[:1].isalnum():
+        return None
+    
+    match = ISO_DATE_PATTERN.fullmatch(text)
+    if match:
+        fields = (int(match[1]), int(match[2]), int(match[3]))
+        time = (int(match[4]), int(match[5]), int(match[6] or 0)) if match[4] else None
+        return _parsed_date("iso", fields, _valid_iso_dates(fields), time)
+    
+    match = COMPACT_DATE_PATTERN.fullmatch(text)
+    if match:
+        fields = (int(match[1]), int(match[2]), int(match[3]))
+        return _parsed_date("compact", fields, _valid_iso_dates(fields))
+    
+    match = DAY_MONTH_NAME_PATTERN.fullmatch(text)
+    if match and match[2] in MONTH_NUMBERS:
+        day, month, year = int(match[1]), MONTH_NUMBERS[match[2]], int(match[3])
+        return _parsed_date("day_month_name", (day, month, year), _valid_iso_dates((year, month, day)))
+    
+    match = MONTH_NAME_DAY_PATTERN.fullmatch(text)
+    if match and match[1] in MONTH_NUMBERS:
+        month, day, year = MONTH_NUMBERS[match[1]], int(match[2]), int(match[3])
+        return _parsed_date("month_name_day", (month, day, year), _valid_iso_dates((year, month, day)))
+    
+    match = DOTTED_DATE_PATTERN.fullmatch(text)
+    if match:
+        day, month, year = int(match[1]), int(match[2]), int(match[3])
+        return _parsed_date("dotted", (day, month, year), _valid_iso_dates((year, month, day)))
+    
+    match = SLASHED_DATE_PATTERN.fullmatch(text)
+    if match:
+        first, second, year = int(match[1]), int(match[2]), int(match[3])
+        return _parsed_date("slashed", (first, second, year), _valid_iso_dates((year, first, second), (year, second, first)))
+    
+    return None
+
+
+def normalize_date(value: Any) -> Optional[str]:
+    """Normalize a date in any supported EDC format to ISO YYYY-MM-DD.
+    
+    Ambiguous slashed dates resolve month first. Returns None for values
+    that are not dates.
+    """
+    if value is None:
+        return None
+    parsed = _parse_date(str(value))
+    return parsed.dates[0] if parsed else None
+
+
+def normalize_date_column(values: Iterable[Any]) -> List[Optional[str]]:
+    """Normalize a whole column of dates, parsing each distinct value once."""
+    values = list(values)
+    canonical = {value: normalize_date(value) for value in {str(v) for v in values if v is not None}}
+    return [None if value is None else canonical[str(value)] for value in values]
+
+
+def get_date_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss statistics for the parsed date cache."""
+    return _cache_stats(_parse_date)
+
+
+def _compare_dates(date1: str, date2: str) -> Optional[bool]:
+    """Whether two strings denote the same date; None if either is not a date.
+    
+    Strings in the same format are compared field by field, so 01/02/2025
+    and 02/01/2025 differ whichever field order the site uses. Strings in
+    different formats only match when each has a single reading; an
+    ambiguous slashed date never matches another format. Times are
+    compared when both strings carry one.
+    """
+    parsed1 = _parse_date(date1)
+    if parsed1 is None:
+        return None
+    parsed2 = _parse_date(date2)
+    if parsed2 is None:
+        return None
+    if parsed1.time is not None and parsed2.time is not None and parsed1.time != parsed2.time:
+        return False
+    if parsed1.format == parsed2.format:
+        return parsed1.fields == parsed2.fields
+    if len(parsed1.dates) > 1 or len(parsed2.dates) > 1:
+        return False
+    return parsed1.dates == parsed2.dates
+
+
 def _is_same_date(date1: str, date2: str) -> bool:
     """Check if two date strings represent the same date in different formats."""
-    # Simplified date comparison - could be enhanced with actual date parsing
-    # Remove common separators and compare
-    clean1 = re.sub(r'[/-]', '', date1.lower())
-    clean2 = re.sub(r'[/-]', '', date2.lower())
-    
-    # This is a simplified implementation
-    return False  # For now, assume different formats are not the same
+    return bool(_compare_dates(date1, date2))
 
 
 def _check_data_integrity(edc_data: Dict[str, Any], source_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -882,6 +1425,419 @@ def _check_data_consistency(edc_data: Dict[str, Any], source_data: Dict[str, Any
     }
 
 
+# Columnar batch verification
+# Batches at least this large use the columnar engine by default
+COLUMNAR_MIN_BATCH_SIZE = 64
+
+
+class _NumericColumn:
+    """Present/present value pairs of one field collected across a batch."""
+    
+    __slots__ = (
+        "pair_indices", "slot_indices", "edc_values", "source_values", "edc_numbers", "source_numbers",
+        "edc_units", "source_units"
+    )
+    
+    def __init__(self):
+        self.pair_indices: List[int] = []
+        self.slot_indices: List[int] = []
+        self.edc_values: List[Any] = []
+        self.source_values: List[Any] = []
+        self.edc_numbers: List[Any] = []
+        self.source_numbers: List[Any] = []
+        self.edc_units: List[Optional[str]] = []
+        self.source_units: List[Optional[str]] = []
+    
+    def append(
+        self,
+        pair_index: int,
+        slot_index: int,
+        edc_value: Any,
+        source_value: Any,
+        edc_number: Any,
+        source_number: Any,
+        edc_unit: Optional[str],
+        source_unit: Optional[str]
+    ) -> None:
+        self.pair_indices.append(pair_index)
+        self.slot_indices.append(slot_index)
+        self.edc_values.append(edc_value)
+        self.source_values.append(source_value)
+        self.edc_numbers.append(edc_number)
+        self.source_numbers.append(source_number)
+        self.edc_units.append(edc_unit)
+        self.source_units.append(source_unit)
+
+
+def _columnar_batch_verification(batch_data: List[Dict[str, Any]], context_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Verify a batch of EDC/source pairs with one vectorized pass per field.
+    
+    Each pair is scanned once: missing values and non-numeric mismatches are
+    resolved on the scalar path, while candidate numeric value pairs are
+    routed into a per-field column. Every column is then parsed and compared
+    against its field tolerance in a single NumPy pass. The per-pair results
+    match what cross_system_verification returns for the same input.
+    """
+    field_tolerances = context_data.get("field_tolerances", {})
+    columns: Dict[str, _NumericColumn] = {}
+    results: List[Optional[Dict[str, Any]]] = [None] * len(batch_data)
+    pair_slots: Dict[int, List[Optional[Dict[str, Any]]]] = {}
+    matching_counts: Dict[int, int] = {}
+    total_field_counts: Dict[int, int] = {}
+    
+    for pair_index, data_pair in enumerate(batch_data):
+        edc_data = data_pair.get("edc_data", {})
+        source_data = data_pair.get("source_data", {})
+        try:
+            slots: List[Optional[Dict[str, Any]]] = []
+            pending: List[Tuple[str, int, Any, Any, Any, Any, Optional[str], Optional[str]]] = []
+            matching = 0
+            total_fields = 0
+            
+            # Same field order as cross_system_verification
+            for field in set(edc_data.keys()) | set(source_data.keys()):
+                if _is_folded_unit_field(field, edc_data, source_data):
+                    continue
+                total_fields += 1
+                edc_value = edc_data.get(field)
+                source_value = source_data.get(field)
+                
+                if edc_value is None or edc_value == "":
+                    if source_value is not None and source_value != "":
+                        slots.append(_missing_discrepancy(field, edc_value, source_value, DiscrepancyType.MISSING_IN_EDC))
+                    continue
+                if source_value is None or source_value == "":
+                    slots.append(_missing_discrepancy(field, edc_value, source_value, DiscrepancyType.MISSING_IN_SOURCE))
+                    continue
+                
+                edc_unit, source_unit = _record_units(field, edc_data, source_data)
+                if type(edc_value) in (int, float) and type(source_value) in (int, float):
+                    edc_number, source_number = edc_value, source_value
+                else:
+                    edc_number = str(edc_value).strip()
+                    source_number = str(source_value).strip()
+                    if edc_number.lower() == source_number.lower() and edc_unit == source_unit:
+                        matching += 1
+                        continue
+                
+                # Provisionally a match; the column pass fills in mismatches
+                pending.append((field, len(slots), edc_value, source_value, edc_number, source_number, edc_unit, source_unit))
+                slots.append(None)
+                matching += 1
+        except Exception as e:
+            results[pair_index] = _batch_error_result(edc_data, e)
+            continue
+        
+        for field, slot_index, edc_value, source_value, edc_number, source_number, edc_unit, source_unit in pending:
+            column = columns.get(field)
+            if column is None:
+                column = columns[field] = _NumericColumn()
+            column.append(pair_index, slot_index, edc_value, source_value, edc_number, source_number, edc_unit, source_unit)
+        pair_slots[pair_index] = slots
+        matching_counts[pair_index] = matching
+        total_field_counts[pair_index] = total_fields
+    
+    for field, column in columns.items():
+        tolerance = field_tolerances.get(field, DEFAULT_FIELD_TOLERANCES.get(field, 0.0))
+        for position, discrepancy in _compare_numeric_column(field, column, tolerance, context_data):
+            pair_index = column.pair_indices[position]
+            pair_slots[pair_index][column.slot_indices[position]] = discrepancy
+            if not discrepancy.get("equivalent"):
+                matching_counts[pair_index] -= 1
+    
+    for pair_index, slots in pair_slots.items():
+        data_pair = batch_data[pair_index]
+        edc_data = data_pair.get("edc_data", {})
+        source_data = data_pair.get("source_data", {})
+        results[pair_index] = _build_verification_result(
+            _new_verification_id(),
+            edc_data,
+            source_data,
+            [slot for slot in slots if slot is not None],
+            matching_counts[pair_index],
+            total_field_counts[pair_index]
+        )
+    
+    return results
+
+
+def _compare_numeric_column(
+    field: str,
+    column: _NumericColumn,
+    tolerance: float,
+    context_data: Dict[str, Any]
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """Compare one field column and return (position, discrepancy) mismatches.
+    
+    Rows whose companion units differ are converted to the EDC unit with
+    per-row (scale, offset) arrays from UNIT_CONVERSION_TABLE before the
+    tolerance check; rows whose units do not convert take the scalar path.
+    """
+    mismatches: List[Tuple[int, Dict[str, Any]]] = []
+    positions = list(range(len(column.pair_indices)))
+    family = _unit_family(field)
+    
+    def compare_scalar(position: int) -> None:
+        discrepancy = _compare_values(
+            field, column.edc_values[position], column.source_values[position], context_data,
+            column.edc_units[position], column.source_units[position]
+        )
+        if discrepancy is not None:
+            mismatches.append((position, discrepancy))
+    
+    if family is not None:
+        compatible = []
+        for position in positions:
+            if _units_conflict(family, column.edc_units[position], column.source_units[position]):
+                compare_scalar(position)
+            else:
+                compatible.append(position)
+        positions = compatible
+    
+    try:
+        edc_array = np.asarray([column.edc_numbers[p] for p in positions], dtype=np.float64)
+        source_array = np.asarray([column.source_numbers[p] for p in positions], dtype=np.float64)
+    except (ValueError, TypeError, OverflowError):
+        # Column holds non-numeric text or ints too large for a float:
+        # scalar path for the entries that fail to parse
+        numeric_positions = []
+        for position in positions:
+            try:
+                float(column.edc_numbers[position])
+                float(column.source_numbers[position])
+                numeric_positions.append(position)
+            except (ValueError, TypeError, OverflowError):
+                compare_scalar(position)
+        positions = numeric_positions
+        edc_array = np.asarray([column.edc_numbers[p] for p in positions], dtype=np.float64)
+        source_array = np.asarray([column.source_numbers[p] for p in positions], dtype=np.float64)
+    
+    # Per-row unit conversion of the source values into EDC units
+    converted_rows = None
+    if family is not None:
+        conversions = UNIT_CONVERSION_TABLE[family]
+        row_conversions = [
+            conversions.get((column.source_units[p], column.edc_units[p]))
+            for p in positions
+        ]
+        if any(conversion is not None for conversion in row_conversions):
+            converted_rows = np.asarray([conversion is not None for conversion in row_conversions])
+            scales = np.asarray([conversion[0] if conversion else 1.0 for conversion in row_conversions])
+            offsets = np.asarray([conversion[1] if conversion else 0.0 for conversion in row_conversions])
+            with np.errstate(invalid="ignore", over="ignore"):
+                source_array = np.where(converted_rows, source_array * scales + offsets, source_array)
+    
+    with np.errstate(invalid="ignore", over="ignore"):
+        differences = np.abs(edc_array - source_array)
+        matched = (differences <= tolerance) | (edc_array == source_array) | (np.isnan(edc_array) & np.isnan(source_array))
+    
+    if converted_rows is not None:
+        # Converted rows are discrepancies either way: a unit or a value mismatch
+        for index in np.flatnonzero(converted_rows).tolist():
+            position = positions[index]
+            edc_number = float(edc_array[index])
+            source_number = float(column.source_numbers[position])
+            mismatches.append((position, _unit_discrepancy(
+                field, column.edc_values[position], column.source_values[position],
+                edc_number, source_number,
+                column.edc_units[position], column.source_units[position],
+                float(source_array[index]), float(differences[index]), tolerance
+            )))
+        matched = matched | converted_rows
+    
+    severity = _assess_field_severity(field, DiscrepancyType.VALUE_MISMATCH).value
+    for index in np.flatnonzero(~matched).tolist():
+        position = positions[index]
+        edc_value = column.edc_values[position]
+        source_value = column.source_values[position]
+        mismatches.append((position, {
+            "field_name": field,
+            "edc_value": edc_value,
+            "source_value": source_value,
+            "discrepancy_type": DiscrepancyType.VALUE_MISMATCH.value,
+            "severity": severity,
+            "description": f"Numeric value difference: {edc_value} vs {source_value}",
+            "difference": float(differences[index])
+        }))
+    
+    return mismatches
+
+
+# Parallel batch verification
+# Pairs per process pool task
+PARALLEL_SHARD_SIZE = 256
+# Batches at least this large are sharded across the process pool by default
+PARALLEL_MIN_BATCH_SIZE = 1024
+
+_verification_executor: Optional[ProcessPoolExecutor] = None
+_verification_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _configured_worker_count() -> int:
+    """Worker processes from Settings.verification_workers (0 means one per CPU)."""
+    settings = get_settings()
+    workers = getattr(settings, "verification_workers", 0) if settings else 0
+    return workers or os.cpu_count() or 1
+
+
+def get_verification_executor() -> Tuple[ProcessPoolExecutor, int]:
+    """Get the process-wide verification pool and its worker count, creating it on first use."""
+    global _verification_executor, _verification_workers
+    if _verification_executor is None:
+        with _executor_lock:
+            if _verification_executor is None:
+                _verification_workers = _configured_worker_count()
+                _verification_executor = ProcessPoolExecutor(max_workers=_verification_workers)
+    return _verification_executor, _verification_workers
+
+
+def shutdown_verification_executor() -> None:
+    """Shut down the process-wide verification pool, if one was started.
+    
+    Queued shards are cancelled and the call does not wait for running
+    ones, so it is safe to call from the event loop.
+    """
+    global _verification_executor
+    with _executor_lock:
+        executor, _verification_executor = _verification_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _discard_verification_executor(executor: Executor) -> None:
+    """Drop a broken process-wide pool so the next batch starts a new one."""
+    global _verification_executor
+    with _executor_lock:
+        if _verification_executor is not executor:
+            return
+        _verification_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _iter_shards(
+    batch_data: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    shard_size: int
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Group a sync or async stream of pairs into lists of up to shard_size."""
+    if hasattr(batch_data, "__aiter__"):
+        shard = []
+        async for pair in batch_data:
+            shard.append(pair)
+            if len(shard) >= shard_size:
+                yield shard
+                shard = []
+        if shard:
+            yield shard
+        return
+    
+    pairs = iter(batch_data)
+    while True:
+        shard = list(islice(pairs, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+async def _iter_parallel_verification(
+    batch_data: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    context_data: Dict[str, Any],
+    columnar: Optional[bool] = None,
+    executor: Optional[Executor] = None,
+    max_workers: Optional[int] = None,
+    shard_size: int = PARALLEL_SHARD_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """Verify pairs on a process pool, yielding per-pair results in input order.
+    
+    The input (sync or async iterable) is consumed lazily in shards of
+    shard_size pairs and at most two shards per worker are in flight, so
+    memory stays bounded for arbitrarily long inputs. A shard whose task
+    fails is reported as failed pairs without aborting the batch. If the
+    pool breaks (a worker died), the rest of the batch, including the
+    shards lost with the pool, is verified in-process on threads, and a
+    broken process-wide pool is discarded so the next batch gets a new one.
+    """
+    if executor is None:
+        executor, max_workers = get_verification_executor()
+    max_in_flight = 2 * max(1, max_workers or 1)
+    pool: Optional[Executor] = executor
+    
+    loop = asyncio.get_running_loop()
+    shards = _iter_shards(batch_data, shard_size)
+    in_flight: List[Tuple[List[Dict[str, Any]], "asyncio.Future[List[Dict[str, Any]]]"]] = []
+    exhausted = False
+    
+    def pool_broken() -> None:
+        nonlocal pool
+        if pool is not None:
+            logger.warning("Verification process pool is broken; verifying the rest of the batch in-process")
+            _discard_verification_executor(pool)
+            pool = None
+    
+    def submit(shard: List[Dict[str, Any]]) -> "asyncio.Future[List[Dict[str, Any]]]":
+        if pool is not None:
+            try:
+                return loop.run_in_executor(pool, _verify_pairs, shard, context_data, columnar)
+            except BrokenProcessPool:
+                pool_broken()
+        # Default thread pool: in-process, without blocking the event loop
+        return loop.run_in_executor(None, _verify_pairs, shard, context_data, columnar)
+    
+    try:
+        while True:
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    shard = await shards.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                in_flight.append((shard, submit(shard)))
+            
+            if not in_flight:
+                return
+            
+            shard, future = in_flight.pop(0)
+            try:
+                try:
+                    results = await future
+                except BrokenProcessPool:
+                    pool_broken()
+                    results = await submit(shard)
+            except Exception as e:
+                results = [
+                    _batch_error_result(pair.get("edc_data", {}) if isinstance(pair, dict) else {}, e)
+                    for pair in shard
+                ]
+            for result in results:
+                yield result
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        await shards.aclose()
+
+
+async def _parallel_batch_verification(
+    batch_data: Iterable[Dict[str, Any]],
+    context_data: Dict[str, Any],
+    columnar: Optional[bool] = None,
+    executor: Optional[Executor] = None,
+    max_workers: Optional[int] = None,
+    shard_size: int = PARALLEL_SHARD_SIZE
+) -> Dict[str, Any]:
+    """Verify a batch on a process pool without blocking the event loop."""
+    batch_id = f"BV_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    stats = BatchVerificationStats()
+    verification_results = []
+    
+    async for result in _iter_parallel_verification(
+        batch_data, context_data, columnar, executor, max_workers, shard_size
+    ):
+        stats.add(result)
+        verification_results.append(result)
+    
+    return _build_batch_result(batch_id, stats, verification_results, "parallel")
+
+
 # Create the Data Verifier Agent
 data_verifier_agent = Agent(
     name="Clinical Data Verifier",
@@ -941,6 +1897,7 @@ class DataVerifier:
         self.agent = data_verifier_agent
         self.context = DataVerificationContext()
         self.critical_fields = CRITICAL_FIELDS
+        self.pattern_aggregator = DiscrepancyPatternAggregator()
         self.field_tolerances = DEFAULT_FIELD_TOLERANCES.copy()
         
         # Configuration
@@ -957,74 +1914,104 @@ class DataVerifier:
         
         self.instructions = self.agent.instructions
     
+    def _context_data(self) -> Dict[str, Any]:
+        """Context passed to the in-process tool cores."""
+        return {"field_tolerances": self.context.field_tolerances}
+    
     async def cross_system_verification(self, edc_data: Dict[str, Any], source_data: Dict[str, Any]) -> Dict[str, Any]:
         """Perform cross-system data verification."""
-        verification_request = json.dumps({
-            "edc_data": edc_data,
-            "source_data": source_data,
-            "context": self.context.model_dump()
-        })
-        result_str = cross_system_verification(verification_request)
-        return json.loads(result_str)
+        return _cross_system_verification(edc_data, source_data, self._context_data())
     
     async def assess_critical_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Assess data for critical safety issues."""
-        assessment_request = json.dumps({
-            "data": data,
-            "context": self.context.model_dump()
-        })
-        result_str = assess_critical_data(assessment_request)
-        return json.loads(result_str)
-    
-    async def detect_discrepancy_patterns(self, historical_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Detect patterns in discrepancy data."""
-        pattern_request = json.dumps({
-            "historical_data": historical_data,
-            "context": self.context.model_dump()
-        })
-        result_str = detect_discrepancy_patterns(pattern_request)
-        return json.loads(result_str)
+        return _assess_critical_data(data, self._context_data())
+    
+    async def detect_discrepancy_patterns(self, historical_data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Detect patterns in discrepancy data.
+        
+        Args:
+            historical_data: Discrepancy events to analyze. When omitted, patterns
+                are read from the events recorded with record_discrepancy_events.
+        """
+        if historical_data is None:
+            return _render_discrepancy_patterns(self.pattern_aggregator)
+        return _detect_discrepancy_patterns(historical_data, self._context_data())
+    
+    def record_discrepancy_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Fold new discrepancy events into the persistent pattern aggregates."""
+        return self.pattern_aggregator.extend(events)
     
     async def complete_sdv_verification(self, edc_data: Dict[str, Any], source_data: Dict[str, Any]) -> Dict[str, Any]:
         """Complete SDV verification process."""
-        sdv_request = json.dumps({
-            "edc_data": edc_data,
-            "source_data": source_data,
-            "context": self.context.model_dump()
-        })
-        result_str = complete_sdv_verification(sdv_request)
-        return json.loads(result_str)
-    
-    async def batch_verification(self, batch_data: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, Any]:
-        """Perform batch verification."""
-        # Convert tuples to dicts for JSON serialization
-        batch_data_dicts = []
-        for edc_data, source_data in batch_data:
-            batch_data_dicts.append({
-                "edc_data": edc_data,
-                "source_data": source_data
-            })
+        return _complete_sdv_verification(edc_data, source_data, self._context_data())
+    
+    async def batch_verification(
+        self,
+        batch_data: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        columnar: Optional[bool] = None,
+        parallel: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Perform batch verification off the event loop.
         
-        batch_request = json.dumps({
-            "batch_data": batch_data_dicts,
-            "context": self.context.model_dump()
-        })
-        result_str = batch_verification(batch_request)
-        return json.loads(result_str)
+        Args:
+            batch_data: List of (edc_data, source_data) pairs
+            columnar: Force the columnar engine on or off; by default it is used
+                for batches of at least COLUMNAR_MIN_BATCH_SIZE pairs
+            parallel: Shard the batch across the verification process pool; by
+                default used for batches of at least PARALLEL_MIN_BATCH_SIZE pairs.
+                Smaller batches run on a worker thread.
+        """
+        batch_data_dicts = [
+            {"edc_data": edc_data, "source_data": source_data}
+            for edc_data, source_data in batch_data
+        ]
+        if parallel is None:
+            parallel = len(batch_data_dicts) >= PARALLEL_MIN_BATCH_SIZE
+        
+        if parallel:
+            return await _parallel_batch_verification(batch_data_dicts, self._context_data(), columnar)
+        return await asyncio.to_thread(_batch_verification, batch_data_dicts, self._context_data(), columnar)
+    
+    async def stream_batch_verification(
+        self,
+        batch_data: Union[Iterable[Tuple[Dict[str, Any], Dict[str, Any]]], AsyncIterable[Tuple[Dict[str, Any], Dict[str, Any]]]],
+        stats: Optional[BatchVerificationStats] = None,
+        columnar: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream per-pair verification results in input order from the process pool.
+        
+        Args:
+            batch_data: Sync or async iterable of (edc_data, source_data) pairs, consumed lazily
+            stats: Optional aggregator updated as each result is yielded
+            columnar: Force the columnar engine on or off within each shard
+        """
+        if hasattr(batch_data, "__aiter__"):
+            pairs = (
+                {"edc_data": edc_data, "source_data": source_data}
+                async for edc_data, source_data in batch_data
+            )
+        else:
+            pairs = (
+                {"edc_data": edc_data, "source_data": source_data}
+                for edc_data, source_data in batch_data
+            )
+        async for result in _iter_parallel_verification(pairs, self._context_data(), columnar):
+            if stats is not None:
+                stats.add(result)
+            yield result
     
     async def generate_audit_trail(self, verification_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate audit trail."""
-        audit_request = json.dumps({
-            "verification_data": verification_data,
-            "context": self.context.model_dump()
-        })
-        result_str = generate_audit_trail(audit_request)
-        return json.loads(result_str)
+        return _generate_audit_trail(verification_data, self._context_data())
     
     def assess_discrepancy_severity(self, field_name: str, discrepancy_type: DiscrepancyType) -> DiscrepancySeverity:
         """Assess severity of a discrepancy."""
         return _assess_field_severity(field_name, discrepancy_type)
     
+    def get_severity_cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics for the field severity cache."""
+        return get_severity_cache_stats()
+    
     def set_confidence_threshold(self, threshold: float) -> None:
         """Set confidence threshold."""
         if not 0.0 <= threshold <= 1.0:
@@ -1046,6 +2033,14 @@ __all__ = [
     "DataVerificationContext",
     "DiscrepancyType",
     "DiscrepancySeverity", 
+    "get_severity_cache_stats",
+    "convert_field_unit",
+    "normalize_date",
+    "normalize_date_column",
+    "get_date_cache_stats",
+    "BatchVerificationStats",
+    "get_verification_executor",
+    "shutdown_verification_executor",
     "cross_system_verification",
     "assess_critical_data",
     "detect_discrepancy_patterns",
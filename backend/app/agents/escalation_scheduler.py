@@ -0,0 +1,406 @@
+"""Deadline-ordered escalation of tracked queries.
+
+Each open query has one armed deadline: the time its next escalation
+level from the escalation rules falls due (created_at + after_hours).
+Deadlines sit in a min-heap, so finding the k due escalations costs
+O(k log n) instead of a scan over every query. When an escalation fires
+the query's escalation_level is raised, which re-arms the next level,
+and an "escalated" event is recorded. Only levels whose rule is marked
+"escalates" change the status to ESCALATED; reminders and follow-ups
+leave a pending or in-progress query's status as it is.
+
+The scheduler follows its QueryStore as a listener: saving a query
+(re)arms it and resolving, cancelling or deleting it disarms it, once
+the write is committed; reads flush the store first. Replaced
+heap entries are skipped lazily when they surface. A background asyncio
+task sleeps until the earliest deadline (at most check_interval) and
+fires what is due. Store reads and writes run in a worker thread, and
+the escalations fired at one wakeup are read with one lookup and
+written in one flush, so a backlog after downtime does not block the
+event loop. On start, and whenever the wall clock jumps relative to the
+monotonic clock, the heap is rebuilt from the store.
+"""
+
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import asyncio
+import heapq
+import inspect
+import logging
+import threading
+import time
+
+from app.agents.query_store import (
+    OPEN_STATUSES,
+    QueryEvent,
+    QueryStatus,
+    QueryStore,
+    QueryStoreListener,
+    TrackedQuery,
+    get_query_store
+)
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of a query's age when ranking follow-ups
+PRIORITY_WEIGHTS = {"critical": 3.0, "major": 2.0, "minor": 1.0}
+
+# Seconds the wall clock may drift from the monotonic clock before the heap is rebuilt
+CLOCK_JUMP_TOLERANCE = 5.0
+
+# Heap entry: (deadline, query_id, level); armed entry: (deadline, level, priority, created_at)
+_HeapEntry = Tuple[float, str, int]
+_Armed = Tuple[float, int, str, float]
+
+EscalationHandler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+
+class EscalationScheduler(QueryStoreListener):
+    """Min-heap of next escalation deadlines for the open queries in a store."""
+
+    def __init__(
+        self,
+        store: QueryStore,
+        rules: Dict[str, Dict[str, Any]],
+        on_escalation: Optional[EscalationHandler] = None,
+        check_interval: float = 60.0
+    ):
+        if check_interval <= 0:
+            raise ValueError("check_interval must be positive")
+        self.store = store
+        self.rules = rules
+        self.on_escalation = on_escalation
+        self.check_interval = check_interval
+        self._heap: List[_HeapEntry] = []
+        self._armed: Dict[str, _Armed] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fired_count = 0
+        self.rebuild_count = 0
+        store.subscribe(self)
+
+    # Deadlines
+
+    def _levels(self, priority: str) -> List[Dict[str, Any]]:
+        return self.rules.get(priority, self.rules["major"])["levels"]
+
+    def _deadline(self, priority: str, created_at: float, level: int) -> Optional[float]:
+        """Epoch time escalation level (1-based) falls due, None past the last level."""
+        levels = self._levels(priority)
+        if level > len(levels):
+            return None
+        return created_at + levels[level - 1]["after_hours"] * 3600
+
+    def _next_entry(self, query: TrackedQuery) -> Optional[_Armed]:
+        if query.status not in OPEN_STATUSES:
+            return None
+        created_at = query.created_at.timestamp()
+        level = query.escalation_level + 1
+        deadline = self._deadline(query.priority, created_at, level)
+        if deadline is None:
+            return None
+        return (deadline, level, query.priority, created_at)
+
+    def arm(self, query: TrackedQuery) -> None:
+        """Schedule the query's next escalation, or disarm it if none is left."""
+        armed = self._next_entry(query)
+        with self._lock:
+            if armed is None:
+                self._armed.pop(query.query_id, None)
+                return
+            if self._armed.get(query.query_id) == armed:
+                return
+            self._armed[query.query_id] = armed
+            heapq.heappush(self._heap, (armed[0], query.query_id, armed[1]))
+            is_earliest = self._heap[0][1] == query.query_id
+            self._compact()
+        if is_earliest:
+            self._wake()
+
+    def disarm(self, query_id: str) -> None:
+        """Drop a query's pending escalation."""
+        with self._lock:
+            self._armed.pop(query_id, None)
+
+    def _compact(self) -> None:
+        # Replaced entries are skipped lazily; rebuild once they outnumber live ones
+        if len(self._heap) > 2 * len(self._armed) + 64:
+            self._heap = [(armed[0], query_id, armed[1]) for query_id, armed in self._armed.items()]
+            heapq.heapify(self._heap)
+
+    def _is_live(self, entry: _HeapEntry) -> bool:
+        armed = self._armed.get(entry[1])
+        return armed is not None and armed[0] == entry[0] and armed[1] == entry[2]
+
+    def rebuild(self) -> int:
+        """Re-read every open query from the store and rebuild the heap in O(n)."""
+        armed: Dict[str, _Armed] = {}
+        for query in self.store.find(status=OPEN_STATUSES):
+            entry = self._next_entry(query)
+            if entry is not None:
+                armed[query.query_id] = entry
+        heap = [(entry[0], query_id, entry[1]) for query_id, entry in armed.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._armed, self._heap = armed, heap
+            self.rebuild_count += 1
+        self._wake()
+        return len(armed)
+
+    def next_deadline(self) -> Optional[float]:
+        """Epoch time of the earliest armed escalation."""
+        self.store.flush()
+        with self._lock:
+            while self._heap and not self._is_live(self._heap[0]):
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        self.store.flush()
+        return len(self._armed)
+
+    # QueryStoreListener
+
+    def query_saved(self, query: TrackedQuery) -> None:
+        self.arm(query)
+
+    def queries_deleted(self, query_ids: List[str]) -> None:
+        with self._lock:
+            for query_id in query_ids:
+                self._armed.pop(query_id, None)
+
+    def store_cleared(self) -> None:
+        with self._lock:
+            self._armed.clear()
+            self._heap.clear()
+
+    # Due escalations
+
+    def _follow_up(self, query_id: str, armed: _Armed, now: float) -> Dict[str, Any]:
+        deadline, level, priority, created_at = armed
+        rule = self._levels(priority)[level - 1]
+        age_hours = (now - created_at) / 3600
+        return {
+            "query_id": query_id,
+            "action": rule["action"],
+            "escalate_to": rule["escalate_to"],
+            "age_hours": round(age_hours, 1),
+            "priority": priority,
+            "escalation_level": level,
+            "due_at": datetime.fromtimestamp(deadline).isoformat(),
+            "priority_score": round(age_hours * PRIORITY_WEIGHTS.get(priority, 1.0))
+        }
+
+    def due(
+        self,
+        now: Optional[float] = None,
+        limit: Optional[int] = None,
+        priority: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Escalations due at now, earliest first, without firing them.
+
+        Walks the heap best-first from the root and stops at the first
+        deadline after now, so k due items cost O(k log k). With priority,
+        only that priority's escalations are returned and count toward limit.
+        """
+        now = time.time() if now is None else now
+        due: List[Dict[str, Any]] = []
+        self.store.flush()
+        with self._lock:
+            heap = self._heap
+            frontier = [(heap[0][0], 0)] if heap else []
+            while frontier and (limit is None or len(due) < limit):
+                deadline, index = heapq.heappop(frontier)
+                if deadline > now:
+                    break
+                entry = heap[index]
+                if self._is_live(entry):
+                    armed = self._armed[entry[1]]
+                    if priority is None or armed[2] == priority:
+                        due.append(self._follow_up(entry[1], armed, now))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child][0], child))
+        return due
+
+    def _pop_due(self, now: float) -> List[Tuple[str, int]]:
+        popped = []
+        self.store.flush()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                if self._is_live(entry):
+                    popped.append((entry[1], entry[2]))
+                    del self._armed[entry[1]]
+        return popped
+
+    async def fire_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Escalate every query whose deadline has passed; returns the escalations fired.
+
+        A query more than one level overdue (e.g. after downtime) jumps
+        straight to its current level instead of firing each one. The store
+        work runs in a worker thread; on_escalation runs on the event loop.
+        """
+        now = time.time() if now is None else now
+        fired = await asyncio.to_thread(self._escalate_due, now)
+
+        self.fired_count += len(fired)
+        if self.on_escalation is not None:
+            for escalation in fired:
+                try:
+                    outcome = self.on_escalation(escalation)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                except Exception:
+                    logger.exception("Escalation handler failed for %s", escalation["query_id"])
+        return fired
+
+    def _escalate_due(self, now: float) -> List[Dict[str, Any]]:
+        """Write the due escalations in one flush and return them (blocking)."""
+        popped = self._pop_due(now)
+        stored = self.store.get_many(query_id for query_id, _ in popped)
+        fired = []
+        events = []
+        for query_id, level in popped:
+            query = stored.get(query_id)
+            if query is None:
+                continue
+            if query.status not in OPEN_STATUSES or query.escalation_level >= level:
+                # Changed behind our back (e.g. by another worker); follow the stored state
+                self.arm(query)
+                continue
+
+            created_at = query.created_at.timestamp()
+            while True:
+                later = self._deadline(query.priority, created_at, level + 1)
+                if later is None or later > now:
+                    break
+                level += 1
+
+            escalation = self._follow_up(
+                query_id, (self._deadline(query.priority, created_at, level), level, query.priority, created_at), now
+            )
+            query.escalation_level = level
+            if any(rule.get("escalates") for rule in self._levels(query.priority)[:level]):
+                query.status = QueryStatus.ESCALATED
+            # Saving re-arms the next level through query_saved once flushed
+            self.store.save(query)
+            events.append((query_id, QueryEvent(
+                "escalated",
+                f"Escalated to level {level}: {escalation['action']} to {escalation['escalate_to']}",
+                metadata=escalation
+            )))
+            fired.append(escalation)
+
+        if fired:
+            self.store.add_events(events)
+            self.store.flush()
+        return fired
+
+    # Background task
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # Loop already closed
+                pass
+
+    def start(self) -> None:
+        """Rebuild from the store and start firing escalations in the running loop."""
+        if self.is_running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.rebuild()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def stop(self) -> None:
+        """Stop the background task."""
+        task, self._task = self._task, None
+        self._loop = self._wakeup = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        wall, monotonic = time.time(), time.monotonic()
+        while True:
+            self._wakeup.clear()
+            deadline = await asyncio.to_thread(self.next_deadline)
+            delay = self.check_interval if deadline is None else min(self.check_interval, max(0.0, deadline - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+            now_wall, now_monotonic = time.time(), time.monotonic()
+            if abs((now_wall - wall) - (now_monotonic - monotonic)) > CLOCK_JUMP_TOLERANCE:
+                logger.warning("Wall clock jumped; rebuilding the escalation schedule")
+                await asyncio.to_thread(self.rebuild)
+            wall, monotonic = now_wall, now_monotonic
+
+            try:
+                await self.fire_due(now_wall)
+            except Exception:
+                logger.exception("Firing due escalations failed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Scheduler state for metrics endpoints."""
+        next_deadline = self.next_deadline()
+        return {
+            "armed_queries": len(self),
+            "next_deadline": datetime.fromtimestamp(next_deadline).isoformat() if next_deadline else None,
+            "fired_escalations": self.fired_count,
+            "rebuilds": self.rebuild_count,
+            "running": self.is_running
+        }
+
+
+_escalation_scheduler: Optional[EscalationScheduler] = None
+_escalation_scheduler_lock = threading.Lock()
+
+
+def get_escalation_scheduler() -> EscalationScheduler:
+    """Process-wide scheduler for the process-wide query store."""
+    global _escalation_scheduler
+    store = get_query_store()
+    if _escalation_scheduler is None or _escalation_scheduler.store is not store:
+        with _escalation_scheduler_lock:
+            if _escalation_scheduler is None or _escalation_scheduler.store is not store:
+                from app.agents.query_tracker import ESCALATION_RULES
+                _escalation_scheduler = EscalationScheduler(
+                    store,
+                    ESCALATION_RULES,
+                    check_interval=get_settings().escalation_check_interval
+                )
+                _escalation_scheduler.rebuild()
+    return _escalation_scheduler
+
+
+async def shutdown_escalation_scheduler() -> None:
+    """Stop the process-wide scheduler's background task and drop it."""
+    global _escalation_scheduler
+    with _escalation_scheduler_lock:
+        scheduler, _escalation_scheduler = _escalation_scheduler, None
+    if scheduler is not None:
+        await scheduler.stop()
+        scheduler.store.unsubscribe(scheduler)
+
+
+__all__ = [
+    "EscalationScheduler",
+    "get_escalation_scheduler",
+    "shutdown_escalation_scheduler"
+]
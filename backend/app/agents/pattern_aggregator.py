@@ -0,0 +1,397 @@
+"""Incremental site and field aggregates over discrepancy events."""
+
+from collections import deque
+from datetime import date, datetime, timezone
+from math import sqrt
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Event keys checked, in order, for a discrepancy timestamp
+TIMESTAMP_KEYS = ("timestamp", "detected_at", "discrepancy_date", "date", "created_at")
+
+# Temporal engine defaults: daily buckets, 7- and 30-bucket rolling windows
+DEFAULT_BUCKET_SECONDS = 86400
+DEFAULT_WINDOWS = (7, 30)
+# Spike = bucket count at least SPIKE_Z_SCORE deviations above the key's baseline
+SPIKE_Z_SCORE = 3.0
+SPIKE_MIN_COUNT = 3
+SPIKE_MIN_BASELINE_BUCKETS = 7
+# Most recent spikes kept for reporting
+MAX_REPORTED_SPIKES = 100
+# Relative change across the longest window that counts as a trend
+TREND_THRESHOLD = 0.2
+
+
+class DiscrepancyPatternAggregator:
+    """Running per-site and per-field counters over discrepancy events.
+
+    Events are folded in once as they arrive, so pattern queries read the
+    counters in O(sites + fields) instead of rescanning the full history.
+    Each event is a dict with a site key, a field_name, a discrepancy_type,
+    an optional severity and a weight (e.g. frequency or discrepancy_count).
+    Insertion order is kept, so rendered lists are stable across calls.
+    Timestamped events also feed a TemporalPatternEngine (see temporal);
+    extend() and from_events() feed each batch to it sorted by timestamp,
+    so histories may be given newest first or unsorted.
+    """
+
+    def __init__(
+        self,
+        site_key: str = "site_id",
+        weight_key: str = "frequency",
+        default_weight: float = 1,
+        default_site: str = "Unknown",
+        **temporal_options: Any
+    ):
+        self.site_key = site_key
+        self.weight_key = weight_key
+        self.default_weight = default_weight
+        self.default_site = default_site
+        self.temporal_options = temporal_options
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all aggregates."""
+        self.events_processed = 0
+        self.site_totals: Dict[Any, float] = {}
+        self.site_types: Dict[Any, Dict[str, float]] = {}
+        self.site_fields: Dict[Any, Dict[str, float]] = {}
+        self.site_severities: Dict[Any, Dict[str, float]] = {}
+        self.field_totals: Dict[str, float] = {}
+        self.field_sites: Dict[str, Dict[Any, float]] = {}
+        self.field_types: Dict[str, Dict[str, float]] = {}
+        self.temporal = TemporalPatternEngine(**self.temporal_options)
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """Fold one discrepancy event into the aggregates."""
+        timed = self._fold(event)
+        if timed is not None:
+            self.temporal.add(*timed)
+
+    def _fold(self, event: Dict[str, Any]) -> Optional[Tuple[float, Any, str, float]]:
+        """Update the counters; returns the temporal engine's (timestamp, site, field, weight) if timestamped."""
+        weight = event.get(self.weight_key, self.default_weight)
+        site = event.get(self.site_key, self.default_site)
+        field_site = event.get(self.site_key, "")
+        field_name = event.get("field_name", "")
+        discrepancy_type = event.get("discrepancy_type", "unknown")
+        severity = event.get("severity")
+
+        if site not in self.site_totals:
+            self.site_totals[site] = 0
+            self.site_types[site] = {}
+            self.site_fields[site] = {}
+            self.site_severities[site] = {}
+        self.site_totals[site] += weight
+        _increment(self.site_types[site], discrepancy_type, weight)
+        _increment(self.site_fields[site], field_name, weight)
+        if severity is not None:
+            _increment(self.site_severities[site], severity, weight)
+
+        if field_name not in self.field_totals:
+            self.field_totals[field_name] = 0
+            self.field_sites[field_name] = {}
+            self.field_types[field_name] = {}
+        self.field_totals[field_name] += weight
+        _increment(self.field_sites[field_name], field_site, weight)
+        _increment(self.field_types[field_name], discrepancy_type, weight)
+
+        self.events_processed += 1
+
+        timestamp = _event_epoch(event)
+        return None if timestamp is None else (timestamp, site, field_name, weight)
+
+    def extend(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Fold a sequence of events in; returns how many were added.
+
+        Counters follow the input order; the temporal engine gets the
+        batch's timestamped events oldest first.
+        """
+        added = 0
+        timed = []
+        for event in events:
+            entry = self._fold(event)
+            if entry is not None:
+                timed.append(entry)
+            added += 1
+        timed.sort(key=lambda entry: entry[0])
+        for entry in timed:
+            self.temporal.add(*entry)
+        return added
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]], **options: Any) -> "DiscrepancyPatternAggregator":
+        """Build an aggregator over a complete event history in one pass."""
+        aggregator = cls(**options)
+        aggregator.extend(events)
+        return aggregator
+
+    def sites_over(self, threshold: float) -> List[Any]:
+        """Sites whose total weight exceeds threshold."""
+        return [site for site, total in self.site_totals.items() if total > threshold]
+
+    def fields_over(self, threshold: float) -> List[str]:
+        """Fields whose total weight exceeds threshold."""
+        return [field for field, total in self.field_totals.items() if total > threshold]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Sizes of the aggregate tables."""
+        return {
+            "events_processed": self.events_processed,
+            "sites": len(self.site_totals),
+            "fields": len(self.field_totals)
+        }
+
+
+def _increment(counter: Dict[Any, float], key: Any, weight: float) -> None:
+    counter[key] = counter.get(key, 0) + weight
+
+
+def _to_epoch(value: Any) -> Optional[float]:
+    """Seconds since the epoch for a timestamp value; naive times are taken as UTC."""
+    if type(value) is float or type(value) is int:
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc).timestamp()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def _event_epoch(event: Dict[str, Any]) -> Optional[float]:
+    """Timestamp of a discrepancy event, from the first TIMESTAMP_KEYS entry present."""
+    for key in TIMESTAMP_KEYS:
+        value = event.get(key)
+        if value is not None:
+            return _to_epoch(value)
+    return None
+
+
+class _BucketSeries:
+    """Per-key bucket counts: a fixed-size ring of recent buckets plus running baseline stats.
+
+    The ring holds the last ring_size buckets. Completed buckets, including
+    empty gaps, are folded into a running mean/variance (Welford), so memory
+    per key is constant however long the history is.
+    """
+
+    __slots__ = ("counts", "bucket_ids", "current_bucket", "current_count", "baseline_n", "baseline_mean", "baseline_m2")
+
+    def __init__(self, ring_size: int):
+        self.counts = [0.0] * ring_size
+        self.bucket_ids = [-1] * ring_size
+        self.current_bucket: Optional[int] = None
+        self.current_count = 0.0
+        self.baseline_n = 0
+        self.baseline_mean = 0.0
+        self.baseline_m2 = 0.0
+
+    def fold(self, count: float, repeat: int = 1) -> None:
+        """Merge repeat completed buckets of the same count into the baseline."""
+        n = self.baseline_n + repeat
+        delta = count - self.baseline_mean
+        self.baseline_mean += delta * repeat / n
+        self.baseline_m2 += delta * delta * self.baseline_n * repeat / n
+        self.baseline_n = n
+
+    def baseline_std(self) -> float:
+        return sqrt(self.baseline_m2 / self.baseline_n) if self.baseline_n else 0.0
+
+    def count_at(self, bucket: int) -> float:
+        slot = bucket % len(self.counts)
+        return self.counts[slot] if self.bucket_ids[slot] == bucket else 0.0
+
+
+class TemporalPatternEngine:
+    """Time-bucketed rolling windows, trend slopes and spike detection per site and field.
+
+    Designed for one pass over time-sorted events. Each site and field key
+    keeps a fixed-size ring of its most recent buckets, and spikes are
+    detected as each bucket completes. Events older than the ring span are
+    counted as late and skipped. Memory is O(keys * ring size) regardless of
+    history length.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+        windows: Tuple[int, ...] = DEFAULT_WINDOWS,
+        spike_z_score: float = SPIKE_Z_SCORE,
+        spike_min_count: float = SPIKE_MIN_COUNT
+    ):
+        if bucket_seconds <= 0 or not windows or min(windows) <= 0:
+            raise ValueError("bucket_seconds and windows must be positive")
+        self.bucket_seconds = bucket_seconds
+        self.windows = tuple(sorted(windows))
+        self.ring_size = self.windows[-1]
+        self.spike_z_score = spike_z_score
+        self.spike_min_count = spike_min_count
+        self.series: Dict[Tuple[str, Any], _BucketSeries] = {}
+        self.spikes: Deque[Dict[str, Any]] = deque(maxlen=MAX_REPORTED_SPIKES)
+        self.first_bucket: Optional[int] = None
+        self.latest_bucket: Optional[int] = None
+        self.events = 0
+        self.late_events = 0
+
+    def add(self, timestamp: float, site: Any, field_name: str, weight: float = 1) -> None:
+        """Count one event at a timestamp (seconds since the epoch) for its site and field."""
+        bucket = int(timestamp // self.bucket_seconds)
+        if self.latest_bucket is None or bucket > self.latest_bucket:
+            self.latest_bucket = bucket
+        if self.first_bucket is None or bucket < self.first_bucket:
+            self.first_bucket = bucket
+        self.events += 1
+
+        accepted = self._add_to_series(("site", site), bucket, weight)
+        accepted = self._add_to_series(("field", field_name), bucket, weight) and accepted
+        if not accepted:
+            if not self.late_events:
+                logger.warning(
+                    "Temporal pattern event at %s is older than the %d-bucket window and was skipped; "
+                    "feed events in time order", self._bucket_start(bucket), self.ring_size
+                )
+            self.late_events += 1
+
+    def _add_to_series(self, key: Tuple[str, Any], bucket: int, weight: float) -> bool:
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _BucketSeries(self.ring_size)
+
+        if bucket == series.current_bucket:
+            # Common case for sorted input: same bucket as the previous event
+            series.current_count += weight
+            series.counts[bucket % self.ring_size] += weight
+            return True
+
+        if series.current_bucket is None:
+            series.current_bucket = bucket
+        elif bucket > series.current_bucket:
+            self._complete_bucket(key, series)
+            gap = bucket - series.current_bucket - 1
+            if gap > 0:
+                series.fold(0.0, gap)
+            series.current_bucket = bucket
+            series.current_count = 0.0
+        elif bucket < series.current_bucket:
+            # Out of order: only buckets still inside the ring can take it
+            if bucket <= series.current_bucket - self.ring_size:
+                return False
+
+        if bucket == series.current_bucket:
+            series.current_count += weight
+
+        slot = bucket % self.ring_size
+        if series.bucket_ids[slot] != bucket:
+            series.bucket_ids[slot] = bucket
+            series.counts[slot] = 0.0
+        series.counts[slot] += weight
+        return True
+
+    def _complete_bucket(self, key: Tuple[str, Any], series: _BucketSeries) -> None:
+        """Check a finished bucket against the key's baseline, then fold it in."""
+        z_score = self._spike_z_score(series, series.current_count)
+        if z_score is not None:
+            self.spikes.append(self._spike_record(key, series.current_bucket, series.current_count, series, z_score))
+        series.fold(series.current_count)
+
+    def _spike_z_score(self, series: _BucketSeries, count: float) -> Optional[float]:
+        """z-score of count if it is a spike against the series baseline, else None."""
+        if series.baseline_n < SPIKE_MIN_BASELINE_BUCKETS or count < self.spike_min_count:
+            return None
+        std = series.baseline_std()
+        if std == 0.0:
+            return float("inf") if count > series.baseline_mean else None
+        z_score = (count - series.baseline_mean) / std
+        return z_score if z_score >= self.spike_z_score else None
+
+    def _spike_record(self, key: Tuple[str, Any], bucket: int, count: float, series: _BucketSeries, z_score: float) -> Dict[str, Any]:
+        return {
+            "dimension": key[0],
+            "key": key[1],
+            "bucket_start": self._bucket_start(bucket),
+            "count": count,
+            "baseline_mean": round(series.baseline_mean, 4),
+            "z_score": round(z_score, 2) if z_score != float("inf") else None
+        }
+
+    def _bucket_start(self, bucket: int) -> str:
+        return datetime.fromtimestamp(bucket * self.bucket_seconds, tz=timezone.utc).isoformat()
+
+    def _trend_slope(self, window_counts: List[float]) -> float:
+        """Least-squares slope of counts per bucket over the window."""
+        n = len(window_counts)
+        if n < 2:
+            return 0.0
+        x_mean = (n - 1) / 2
+        y_mean = sum(window_counts) / n
+        numerator = sum((x - x_mean) * (y - y_mean) for x, y in enumerate(window_counts))
+        denominator = n * (n * n - 1) / 12
+        return numerator / denominator
+
+    def _series_summary(self, key: Tuple[str, Any], series: _BucketSeries) -> Dict[str, Any]:
+        latest = self.latest_bucket
+        window_counts = [series.count_at(bucket) for bucket in range(latest - self.ring_size + 1, latest + 1)]
+        slope = self._trend_slope(window_counts)
+        window_mean = sum(window_counts) / len(window_counts)
+        relative_change = slope * (len(window_counts) - 1) / window_mean if window_mean > 0 else 0.0
+
+        if relative_change > TREND_THRESHOLD:
+            trend = "increasing"
+        elif relative_change < -TREND_THRESHOLD:
+            trend = "decreasing"
+        else:
+            trend = "stable"
+
+        # The latest bucket may still be filling; judge it against completed buckets
+        is_spike = series.current_bucket == latest and self._spike_z_score(series, series.current_count) is not None
+
+        return {
+            "rolling_totals": {str(window): sum(window_counts[-window:]) for window in self.windows},
+            "latest_bucket_count": window_counts[-1],
+            "trend_slope": round(slope, 4),
+            "trend": trend,
+            "baseline_mean": round(series.baseline_mean, 4),
+            "baseline_std": round(series.baseline_std(), 4),
+            "spike": is_spike
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Temporal patterns relative to the latest bucket seen; empty if no timestamped events."""
+        if self.latest_bucket is None:
+            return {}
+
+        sites: Dict[Any, Dict[str, Any]] = {}
+        fields: Dict[Any, Dict[str, Any]] = {}
+        current_spikes = []
+        for key, series in self.series.items():
+            series_summary = self._series_summary(key, series)
+            (sites if key[0] == "site" else fields)[key[1]] = series_summary
+            if series_summary["spike"]:
+                z_score = self._spike_z_score(series, series.current_count)
+                current_spikes.append(self._spike_record(key, series.current_bucket, series.current_count, series, z_score))
+
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "windows": list(self.windows),
+            "first_bucket_start": self._bucket_start(self.first_bucket),
+            "latest_bucket_start": self._bucket_start(self.latest_bucket),
+            "events_with_timestamp": self.events,
+            "late_events": self.late_events,
+            "sites": sites,
+            "fields": fields,
+            "spikes": list(self.spikes) + current_spikes
+        }
+
+
+__all__ = ["DiscrepancyPatternAggregator", "TemporalPatternEngine"]
@@ -1,6 +1,7 @@
 """Portfolio Manager using OpenAI Agents SDK - Corrected Implementation."""
 
 import json
+import time
 import uuid
 from datetime import datetime
 from typing import Dict, List, Any, Optional
@@ -28,7 +29,7 @@ class WorkflowContext(BaseModel):
 # Function tools with proper string-based signatures for OpenAI Agents SDK
 
 @function_tool
-def get_test_subject_data(subject_id: str) -> str:
+async def get_test_subject_data(subject_id: str) -> str:
     """Get real clinical data for a test subject from the test data service.
     
     Args:
@@ -38,31 +39,12 @@ def get_test_subject_data(subject_id: str) -> str:
         JSON string with complete clinical data including vital signs, labs, imaging
     """
     try:
-        from app.core.config import get_settings
-        from app.services.test_data_service import TestDataService
-        import asyncio
+        from app.services.test_data_service import get_test_data_service
         
-        settings = get_settings()
-        test_service = TestDataService(settings)
+        test_service = get_test_data_service()
         
-        # Get subject data synchronously (function tools can't be async)
-        try:
-            # Try to use existing event loop if available
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If loop is running, create a new thread for async operation
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, test_service.get_subject_data(subject_id, "both"))
-                    subject_data = future.result()
-            else:
-                subject_data = loop.run_until_complete(test_service.get_subject_data(subject_id, "both"))
-        except RuntimeError:
-            # No event loop, create new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            subject_data = loop.run_until_complete(test_service.get_subject_data(subject_id, "both"))
-            loop.close()
+        # Async tool: the SDK awaits this on the server's event loop
+        subject_data = await test_service.get_subject_data(subject_id, "both")
         
         if not subject_data:
             return json.dumps({"error": f"Subject {subject_id} not found", "available_subjects": test_service.get_available_subjects()})
@@ -83,113 +65,140 @@ def analyze_clinical_values(clinical_data: str) -> str:
         JSON string with clinical analysis and recommendations
     """
     try:
-        data = json.loads(clinical_data)
-        analysis = {
-            "clinical_findings": [],
-            "severity_assessment": "normal",
-            "recommendations": [],
-            "analysis_timestamp": datetime.now().isoformat()
-        }
-        
-        # Analyze vital signs
-        if "vital_signs" in data:
-            vs = data["vital_signs"]
-            
-            # Blood pressure analysis
-            if "systolic_bp" in vs and "diastolic_bp" in vs:
-                sys_bp = float(vs["systolic_bp"])
-                dia_bp = float(vs["diastolic_bp"])
-                
-                if sys_bp >= 180 or dia_bp >= 110:
-                    analysis["clinical_findings"].append(f"CRITICAL: BP {sys_bp}/{dia_bp} mmHg = Hypertensive crisis (normal <120/80)")
-                    analysis["severity_assessment"] = "critical"
-                    analysis["recommendations"].append("Emergency antihypertensive therapy required")
-                elif sys_bp >= 140 or dia_bp >= 90:
-                    analysis["clinical_findings"].append(f"MAJOR: BP {sys_bp}/{dia_bp} mmHg = Stage 2 hypertension (normal <120/80)")
-                    if analysis["severity_assessment"] == "normal":
-                        analysis["severity_assessment"] = "major"
-                    analysis["recommendations"].append("Antihypertensive therapy indicated")
-                elif sys_bp >= 130 or dia_bp >= 80:
-                    analysis["clinical_findings"].append(f"MINOR: BP {sys_bp}/{dia_bp} mmHg = Stage 1 hypertension (normal <120/80)")
-                    if analysis["severity_assessment"] == "normal":
-                        analysis["severity_assessment"] = "minor"
-                    analysis["recommendations"].append("Lifestyle modifications and monitoring")
-                else:
-                    analysis["clinical_findings"].append(f"NORMAL: BP {sys_bp}/{dia_bp} mmHg (normal <120/80)")
-            
-            # Heart rate analysis
-            if "heart_rate" in vs:
-                hr = float(vs["heart_rate"])
-                if hr > 120:
-                    analysis["clinical_findings"].append(f"ABNORMAL: Heart rate {hr} bpm = Tachycardia (normal 60-100)")
-                    analysis["recommendations"].append("Evaluate for underlying cardiac conditions")
-                elif hr < 50:
-                    analysis["clinical_findings"].append(f"ABNORMAL: Heart rate {hr} bpm = Bradycardia (normal 60-100)")
-                    analysis["recommendations"].append("Assess for conduction abnormalities")
-                else:
-                    analysis["clinical_findings"].append(f"NORMAL: Heart rate {hr} bpm (normal 60-100)")
-        
-        # Analyze laboratory values
-        if "laboratory" in data:
-            lab = data["laboratory"]
-            
-            # BNP analysis (heart failure marker)
-            if "bnp" in lab:
-                bnp = float(lab["bnp"])
-                if bnp > 400:
-                    analysis["clinical_findings"].append(f"CRITICAL: BNP {bnp} pg/mL = Severe heart failure (normal <100)")
-                    analysis["severity_assessment"] = "critical"
-                    analysis["recommendations"].append("Heart failure management required")
-                elif bnp > 100:
-                    analysis["clinical_findings"].append(f"ABNORMAL: BNP {bnp} pg/mL = Possible heart failure (normal <100)")
-                    if analysis["severity_assessment"] in ["normal", "minor"]:
-                        analysis["severity_assessment"] = "major"
-                    analysis["recommendations"].append("Cardiology consultation recommended")
-            
-            # Creatinine analysis (kidney function)
-            if "creatinine" in lab:
-                creat = float(lab["creatinine"])
-                if creat > 2.0:
-                    analysis["clinical_findings"].append(f"ABNORMAL: Creatinine {creat} mg/dL = Severe kidney dysfunction (normal 0.6-1.2)")
-                    analysis["recommendations"].append("Nephrology consultation required")
-                elif creat > 1.5:
-                    analysis["clinical_findings"].append(f"ABNORMAL: Creatinine {creat} mg/dL = Moderate kidney dysfunction (normal 0.6-1.2)")
-                    analysis["recommendations"].append("Monitor kidney function closely")
-            
-            # Troponin analysis (heart damage marker)
-            if "troponin" in lab:
-                trop = float(lab["troponin"])
-                if trop > 0.04:
-                    analysis["clinical_findings"].append(f"CRITICAL: Troponin {trop} ng/mL = Myocardial injury (normal <0.04)")
-                    analysis["severity_assessment"] = "critical"
-                    analysis["recommendations"].append("Immediate cardiology evaluation for MI")
-        
-        # Analyze imaging
-        if "imaging" in data:
-            img = data["imaging"]
-            
-            # LVEF analysis (heart function)
-            if "lvef" in img:
-                ef = float(img["lvef"])
-                if ef < 40:
-                    analysis["clinical_findings"].append(f"ABNORMAL: LVEF {ef}% = Reduced heart function (normal >50%)")
-                    analysis["recommendations"].append("Heart failure therapy indicated")
-                elif ef < 50:
-                    analysis["clinical_findings"].append(f"BORDERLINE: LVEF {ef}% = Borderline heart function (normal >50%)")
-                    analysis["recommendations"].append("Monitor cardiac function")
-                else:
-                    analysis["clinical_findings"].append(f"NORMAL: LVEF {ef}% (normal >50%)")
-        
-        if not analysis["clinical_findings"]:
-            analysis["clinical_findings"].append("No clinical data available for analysis")
-        
-        return json.dumps(analysis)
+        return json.dumps(_analyze_clinical_values(json.loads(clinical_data)))
         
     except Exception as e:
         return json.dumps({"error": str(e), "message": "Failed to analyze clinical values"})
 
+def _analyze_clinical_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Classify vital signs, labs and imaging against clinical thresholds.
+    
+    In-process core of the analyze_clinical_values tool; raises on values
+    that are not numeric.
+    """
+    analysis = {
+        "clinical_findings": [],
+        "severity_assessment": "normal",
+        "recommendations": [],
+        "analysis_timestamp": datetime.now().isoformat()
+    }
+    
+    # Analyze vital signs
+    if "vital_signs" in data:
+        vs = data["vital_signs"]
+        
+        # Blood pressure analysis
+        if "systolic_bp" in vs and "diastolic_bp" in vs:
+            sys_bp = float(vs["systolic_bp"])
+            dia_bp = float(vs["diastolic_bp"])
+            
+            if sys_bp >= 180 or dia_bp >= 110:
+                analysis["clinical_findings"].append(f"CRITICAL: BP {sys_bp}/{dia_bp} mmHg = Hypertensive crisis (normal <120/80)")
+                analysis["severity_assessment"] = "critical"
+                analysis["recommendations"].append("Emergency antihypertensive therapy required")
+            elif sys_bp >= 140 or dia_bp >= 90:
+                analysis["clinical_findings"].append(f"MAJOR: BP {sys_bp}/{dia_bp} mmHg = Stage 2 hypertension (normal <120/80)")
+                if analysis["severity_assessment"] == "normal":
+                    analysis["severity_assessment"] = "major"
+                analysis["recommendations"].append("Antihypertensive therapy indicated")
+            elif sys_bp >= 130 or dia_bp >= 80:
+                analysis["clinical_findings"].append(f"MINOR: BP {sys_bp}/{dia_bp} mmHg = Stage 1 hypertension (normal <120/80)")
+                if analysis["severity_assessment"] == "normal":
+                    analysis["severity_assessment"] = "minor"
+                analysis["recommendations"].append("Lifestyle modifications and monitoring")
+            else:
+                analysis["clinical_findings"].append(f"NORMAL: BP {sys_bp}/{dia_bp} mmHg (normal <120/80)")
+        
+        # Heart rate analysis
+        if "heart_rate" in vs:
+            hr = float(vs["heart_rate"])
+            if hr > 120:
+                analysis["clinical_findings"].append(f"ABNORMAL: Heart rate {hr} bpm = Tachycardia (normal 60-100)")
+                analysis["recommendations"].append("Evaluate for underlying cardiac conditions")
+            elif hr < 50:
+                analysis["clinical_findings"].append(f"ABNORMAL: Heart rate {hr} bpm = Bradycardia (normal 60-100)")
+                analysis["recommendations"].append("Assess for conduction abnormalities")
+            else:
+                analysis["clinical_findings"].append(f"NORMAL: Heart rate {hr} bpm (normal 60-100)")
+    
+    # Analyze laboratory values
+    if "laboratory" in data:
+        lab = data["laboratory"]
+        
+        # Hemoglobin analysis (anemia)
+        if "hemoglobin" in lab:
+            hgb = float(lab["hemoglobin"])
+            if hgb < 8:
+                analysis["clinical_findings"].append(f"CRITICAL: Hemoglobin {hgb} g/dL = Severe anemia (normal 12-16)")
+                analysis["severity_assessment"] = "critical"
+                analysis["recommendations"].append("Immediate evaluation for bleeding, iron deficiency")
+            elif hgb < 10:
+                analysis["clinical_findings"].append(f"ABNORMAL: Hemoglobin {hgb} g/dL = Moderate anemia (normal 12-16)")
+                if analysis["severity_assessment"] in ["normal", "minor"]:
+                    analysis["severity_assessment"] = "major"
+                analysis["recommendations"].append("Evaluate anemia and treatment response")
+            elif hgb < 12:
+                analysis["clinical_findings"].append(f"MINOR: Hemoglobin {hgb} g/dL = Mild anemia (normal 12-16)")
+                if analysis["severity_assessment"] == "normal":
+                    analysis["severity_assessment"] = "minor"
+                analysis["recommendations"].append("Monitor hemoglobin at next visit")
+            else:
+                analysis["clinical_findings"].append(f"NORMAL: Hemoglobin {hgb} g/dL (normal 12-16)")
+        
+        # BNP analysis (heart failure marker)
+        if "bnp" in lab:
+            bnp = float(lab["bnp"])
+            if bnp > 400:
+                analysis["clinical_findings"].append(f"CRITICAL: BNP {bnp} pg/mL = Severe heart failure (normal <100)")
+                analysis["severity_assessment"] = "critical"
+                analysis["recommendations"].append("Heart failure management required")
+            elif bnp > 100:
+                analysis["clinical_findings"].append(f"ABNORMAL: BNP {bnp} pg/mL = Possible heart failure (normal <100)")
+                if analysis["severity_assessment"] in ["normal", "minor"]:
+                    analysis["severity_assessment"] = "major"
+                analysis["recommendations"].append("Cardiology consultation recommended")
+        
+        # Creatinine analysis (kidney function)
+        if "creatinine" in lab:
+            creat = float(lab["creatinine"])
+            if creat > 2.0:
+                analysis["clinical_findings"].append(f"ABNORMAL: Creatinine {creat} mg/dL = Severe kidney dysfunction (normal 0.6-1.2)")
+                analysis["recommendations"].append("Nephrology consultation required")
+            elif creat > 1.5:
+                analysis["clinical_findings"].append(f"ABNORMAL: Creatinine {creat} mg/dL = Moderate kidney dysfunction (normal 0.6-1.2)")
+                analysis["recommendations"].append("Monitor kidney function closely")
+        
+        # Troponin analysis (heart damage marker)
+        if "troponin" in lab:
+            trop = float(lab["troponin"])
+            if trop > 0.04:
+                analysis["clinical_findings"].append(f"CRITICAL: Troponin {trop} ng/mL = Myocardial injury (normal <0.04)")
+                analysis["severity_assessment"] = "critical"
+                analysis["recommendations"].append("Immediate cardiology evaluation for MI")
+    
+    # Analyze imaging
+    if "imaging" in data:
+        img = data["imaging"]
+        
+        # LVEF analysis (heart function)
+        if "lvef" in img:
+            ef = float(img["lvef"])
+            if ef < 40:
+                analysis["clinical_findings"].append(f"ABNORMAL: LVEF {ef}% = Reduced heart function (normal >50%)")
+                analysis["recommendations"].append("Heart failure therapy indicated")
+            elif ef < 50:
+                analysis["clinical_findings"].append(f"BORDERLINE: LVEF {ef}% = Borderline heart function (normal >50%)")
+                analysis["recommendations"].append("Monitor cardiac function")
+            else:
+                analysis["clinical_findings"].append(f"NORMAL: LVEF {ef}% (normal >50%)")
+    
+    if not analysis["clinical_findings"]:
+        analysis["clinical_findings"].append("No clinical data available for analysis")
+    
+    return analysis
+
 @function_tool
-def get_subject_discrepancies(subject_id: str) -> str:
+async def get_subject_discrepancies(subject_id: str) -> str:
     """Get real discrepancies for a test subject from the test data service.
     
     Args:
@@ -199,31 +208,12 @@ def get_subject_discrepancies(subject_id: str) -> str:
         JSON string with discrepancies between EDC and source data
     """
     try:
-        from app.core.config import get_settings
-        from app.services.test_data_service import TestDataService
-        import asyncio
+        from app.services.test_data_service import get_test_data_service
         
-        settings = get_settings()
-        test_service = TestDataService(settings)
+        test_service = get_test_data_service()
         
-        # Get discrepancies synchronously
-        try:
-            # Try to use existing event loop if available
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If loop is running, create a new thread for async operation
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, test_service.get_discrepancies(subject_id))
-                    discrepancies = future.result()
-            else:
-                discrepancies = loop.run_until_complete(test_service.get_discrepancies(subject_id))
-        except RuntimeError:
-            # No event loop, create new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            discrepancies = loop.run_until_complete(test_service.get_discrepancies(subject_id))
-            loop.close()
+        # Async tool: the SDK awaits this on the server's event loop
+        discrepancies = await test_service.get_discrepancies(subject_id)
         
         if not discrepancies:
             return json.dumps({"message": f"No discrepancies found for subject {subject_id}"})
@@ -705,10 +695,18 @@ class PortfolioManager:
     async def process_message(self, message: str) -> 'AgentResponse':
         """Process a message and return a response."""
         from app.agents.base_agent import AgentResponse
+        from app.agents.clinical_router import route_clinical_message
+        from app.agents.response_cache import get_response_cache
+        
+        # Structured clinical payloads are answered by the rule-based tools
+        fast_response = route_clinical_message(message)
+        if fast_response is not None:
+            return fast_response
         
         try:
-            # Try OpenAI Agents SDK first
-            result = await Runner.run(
+            # Try OpenAI Agents SDK first; repeated prompts are served from the response cache
+            start_time = time.time()
+            output, cache_hit = await get_response_cache().run(
                 self.agent,
                 message,
                 context=self.context
@@ -716,10 +714,10 @@ class PortfolioManager:
             
             return AgentResponse(
                 success=True,
-                content=result.final_output,
+                content=output,
                 agent_id="portfolio-manager",
-                execution_time=getattr(result, 'execution_time', 0.0),
-                metadata=getattr(result, 'metadata', {})
+                execution_time=time.time() - start_time,
+                metadata={"route": "llm", "cache_hit": cache_hit}
             )
             
         except Exception as e:
@@ -824,11 +822,14 @@ class PortfolioManager:
     
     def get_performance_metrics(self) -> Dict[str, Any]:
         """Get performance metrics for the portfolio manager."""
+        from app.agents.response_cache import get_response_cache
+        
         return {
             "success_rate": 95.0,
             "workflows_executed": self.context.performance_metrics.get("workflows_executed", 0),
             "active_workflows": len(self.context.active_workflows),
-            "registered_agents": 4  # query_analyzer, data_verifier, query_generator, query_tracker
+            "registered_agents": 4,  # query_analyzer, data_verifier, query_generator, query_tracker
+            "response_cache": get_response_cache().stats()
         }
     
     async def check_agent_health(self) -> Dict[str, Any]:
@@ -1,12 +1,25 @@
 """Query Analyzer using OpenAI Agents SDK."""
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Iterator, AsyncIterator, Set, Tuple, Hashable
 from pydantic import BaseModel, Field
 from enum import Enum
 from datetime import datetime
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from itertools import islice, zip_longest
+import asyncio
+import hashlib
 import json
+import math
+import queue
+import re
+import threading
+import time
 import uuid
 
+from app.agents.analysis_history import AnalysisHistory
+from app.agents.pattern_aggregator import DiscrepancyPatternAggregator
+from app.core.cache import TTLCache
+
 # OpenAI Agents SDK imports
 try:
     from agents import Agent, function_tool, Context
@@ -67,7 +80,9 @@ class QuerySeverity(Enum):
 class QueryAnalysisContext(Context):
     """Context for Query Analyzer operations."""
     
-    analysis_history: List[Dict[str, Any]] = Field(default_factory=list)
+    model_config = {"arbitrary_types_allowed": True}
+    
+    analysis_history: AnalysisHistory = Field(default_factory=AnalysisHistory)
     detected_patterns: Dict[str, Any] = Field(default_factory=dict)
     performance_metrics: Dict[str, Any] = Field(default_factory=dict)
     medical_context: Dict[str, Any] = Field(default_factory=dict)
@@ -106,6 +121,56 @@ MAJOR_MEDICAL_TERMS = {
 }
 
 
+def _term_trie_regex(terms: Iterable[str]) -> str:
+    """Regex alternation for terms, factored into a character trie.
+    
+    Sharing prefixes keeps the work at each text position bounded by the
+    longest term instead of the number of terms. Spaces and hyphens inside
+    a term match any run of whitespace or hyphens.
+    """
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in " ".join(re.split(r"[\s-]+", term.strip())):
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def emit(node: Dict[str, Any]) -> str:
+        branches = [
+            (r"[\s-]+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Terminal node with longer continuations: try the longer terms first
+        return f"(?:{body})?" if "" in node else body
+    
+    return emit(trie)
+
+
+# Single automaton over all severity terms, matched on whole words (plurals included)
+MEDICAL_SEVERITY_PATTERN = re.compile(
+    r"(?<!\w)(?:(?P<critical>" + _term_trie_regex(CRITICAL_MEDICAL_TERMS) + r")"
+    r"|(?P<major>" + _term_trie_regex(MAJOR_MEDICAL_TERMS) + r"))(?:e?s)?(?!\w)"
+)
+
+
+def _scan_medical_severity(*texts: str) -> Optional[QuerySeverity]:
+    """Highest severity of the medical terms in lowercase texts, or None.
+    
+    Each text is scanned once, stopping at the first critical term.
+    """
+    severity = None
+    for text in texts:
+        for match in MEDICAL_SEVERITY_PATTERN.finditer(text):
+            if match.lastgroup == "critical":
+                return QuerySeverity.CRITICAL
+            severity = QuerySeverity.MAJOR
+    return severity
+
+
 @function_tool
 def analyze_data_point(
     context: QueryAnalysisContext,
@@ -115,11 +180,82 @@ def analyze_data_point(
     
     # Parse input data
     data_point_dict = json.loads(data_point)
+    analysis_result = _analyze_data_point(data_point_dict)
     
-    query_id = f"QA_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    # Store in context
+    context.analysis_history.append(analysis_result, site_id=data_point_dict.get("site_id"))
+    context.performance_metrics["analysis_cache"] = get_analysis_cache_stats()
     
+    return json.dumps(analysis_result)
+
+
+# Analysis result cache
+ANALYSIS_CACHE_SIZE = 4096
+ANALYSIS_CACHE_TTL_SECONDS = 3600.0
+
+_analysis_cache = TTLCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL_SECONDS)
+
+
+def _analysis_cache_key(data_point_dict: Dict[str, Any]) -> Hashable:
+    """Cache key for the data point fields the analysis depends on.
+    
+    Subject presence is part of the key because it affects confidence; the
+    subject itself is not, since it is only echoed into the result. Value
+    types are included because 12 and 12.0 are described differently.
+    Unhashable values fall back to a digest of their canonical JSON.
+    """
+    values = (
+        data_point_dict.get("field_name", ""),
+        data_point_dict.get("edc_value", ""),
+        data_point_dict.get("source_value", ""),
+        data_point_dict.get("visit", ""),
+        bool(data_point_dict.get("subject_id"))
+    )
+    key = values + tuple(type(value) for value in values)
+    try:
+        hash(key)
+    except TypeError:
+        return hashlib.blake2b(json.dumps(values, sort_keys=True, default=str).encode(), digest_size=16).digest()
+    return key
+
+
+def get_analysis_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss statistics for the analysis result cache."""
+    return _analysis_cache.stats()
+
+
+def _analyze_data_point(data_point_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze one parsed data point; does not touch the context.
+    
+    The deterministic part of the analysis is cached by content, so only
+    query_id, created_at and the subject are filled in per call on a hit.
+    """
+    cache_key = _analysis_cache_key(data_point_dict)
+    analysis = _analysis_cache.get(cache_key)
+    if analysis is None:
+        analysis = _analyze_content(data_point_dict)
+        _analysis_cache.set(cache_key, analysis)
+    
+    return {
+        "query_id": f"QA_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}",
+        "category": analysis["category"],
+        "severity": analysis["severity"],
+        "confidence": analysis["confidence"],
+        "subject_id": data_point_dict.get("subject_id", ""),
+        "visit": analysis["visit"],
+        "field_name": analysis["field_name"],
+        "description": analysis["description"],
+        "suggested_actions": list(analysis["suggested_actions"]),
+        "medical_context": analysis["medical_context"],
+        "regulatory_impact": analysis["regulatory_impact"],
+        "created_at": datetime.now().isoformat(),
+        "metadata": dict(analysis["metadata"])
+    }
+
+
+def _analyze_content(data_point_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Deterministic analysis fields of a data point."""
     # Extract key information
-    subject_id = data_point_dict.get("subject_id", "")
     visit = data_point_dict.get("visit", "")
     field_name = data_point_dict.get("field_name", "")
     edc_value = data_point_dict.get("edc_value", "")
@@ -146,31 +282,22 @@ def analyze_data_point(
     # Assess regulatory impact
     regulatory_impact = _assess_regulatory_impact(category, severity, field_name)
     
-    # Create analysis result
-    analysis_result = {
-        "query_id": query_id,
+    return {
         "category": category.value,
         "severity": severity.value,
         "confidence": confidence,
-        "subject_id": subject_id,
         "visit": visit,
         "field_name": field_name,
         "description": description,
         "suggested_actions": suggested_actions,
         "medical_context": medical_context,
         "regulatory_impact": regulatory_impact,
-        "created_at": datetime.now().isoformat(),
         "metadata": {
             "edc_value": edc_value,
             "source_value": source_value,
             "analysis_version": "1.0"
         }
     }
-    
-    # Store in context
-    context.analysis_history.append(analysis_result)
-    
-    return json.dumps(analysis_result)
 
 
 @function_tool
@@ -183,35 +310,182 @@ def batch_analyze_data(
     # Parse input data
     data_points_list = json.loads(data_points)
     
-    results = []
+    results = _batch_analyze_data(context, data_points_list)
     
-    for data_point in data_points_list:
+    return json.dumps(results)
+
+
+# Concurrent batch analysis
+# Items submitted to the worker pool per scheduling step
+RECOMMENDED_BATCH_SIZE = 25
+# Most items analyzed or queued on the pool at once
+MAX_BATCH_SIZE = 100
+# Seconds an item may run before it is reported as timed out
+ANALYSIS_ITEM_TIMEOUT = 30.0
+
+_analysis_executor: Optional[ThreadPoolExecutor] = None
+_analysis_executor_lock = threading.Lock()
+
+
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """Get the process-wide batch analysis thread pool, creating it on first use."""
+    global _analysis_executor
+    if _analysis_executor is None:
+        with _analysis_executor_lock:
+            if _analysis_executor is None:
+                _analysis_executor = ThreadPoolExecutor(thread_name_prefix="query-analysis")
+    return _analysis_executor
+
+
+def shutdown_analysis_executor() -> None:
+    """Shut down the batch analysis pool without waiting for timed-out items."""
+    global _analysis_executor
+    with _analysis_executor_lock:
+        executor, _analysis_executor = _analysis_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _analysis_error_result(data_point: Any, error: Exception) -> Dict[str, Any]:
+    """Placeholder result for a data point whose analysis failed or timed out."""
+    data_point = data_point if isinstance(data_point, dict) else {}
+    return {
+        "query_id": f"ERROR_{uuid.uuid4().hex[:8]}",
+        "category": QueryCategory.OTHER.value,
+        "severity": QuerySeverity.INFO.value,
+        "confidence": 0.0,
+        "subject_id": data_point.get("subject_id", ""),
+        "visit": data_point.get("visit", ""),
+        "field_name": data_point.get("field_name", ""),
+        "description": f"Analysis failed: {str(error)}",
+        "suggested_actions": ["Review data format", "Contact technical support"],
+        "error": str(error),
+        "created_at": datetime.now().isoformat()
+    }
+
+
+def _iter_batch_analysis(
+    data_points: Iterable[Any],
+    executor: Executor,
+    chunk_size: int = RECOMMENDED_BATCH_SIZE,
+    max_in_flight: int = MAX_BATCH_SIZE,
+    item_timeout: float = ANALYSIS_ITEM_TIMEOUT
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (input index, result) for each data point as its analysis finishes.
+    
+    Data points are submitted to the executor a chunk at a time, with at
+    most max_in_flight items outstanding. A failed item yields an error
+    result; an item still running item_timeout seconds after it started
+    yields a timeout error result and its late result is discarded.
+    
+    A timed-out item keeps its pool thread until it returns, so it still
+    counts towards max_in_flight. If timed-out items hold every slot and
+    none returns within item_timeout, the remaining data points yield
+    error results instead of waiting on (or adding to) a stuck pool.
+    """
+    chunk_size = max(1, min(chunk_size, max_in_flight))
+    items = enumerate(data_points)
+    pending: Dict[int, Any] = {}
+    started: Dict[int, float] = {}
+    # Timed-out items still running on the pool
+    abandoned: Set[int] = set()
+    completed: "queue.SimpleQueue[Tuple[int, Future]]" = queue.SimpleQueue()
+    next_timeout_check = time.monotonic() + item_timeout
+    exhausted = False
+    
+    def run(index: int, data_point: Any) -> Dict[str, Any]:
+        started[index] = time.monotonic()
+        return _analyze_data_point(data_point)
+    
+    while True:
+        while not exhausted and len(pending) + len(abandoned) + chunk_size <= max_in_flight:
+            chunk = list(islice(items, chunk_size))
+            exhausted = len(chunk) < chunk_size
+            for index, data_point in chunk:
+                pending[index] = data_point
+                future = executor.submit(run, index, data_point)
+                future.add_done_callback(lambda future, index=index: completed.put((index, future)))
+        if not pending:
+            if exhausted:
+                return
+            # Only timed-out items hold the slots; wait for one of them to return
+            try:
+                index, future = completed.get(timeout=item_timeout)
+            except queue.Empty:
+                error = RuntimeError("Analysis pool is occupied by timed-out items")
+                for index, data_point in items:
+                    yield index, _analysis_error_result(data_point, error)
+                return
+            abandoned.discard(index)
+            next_timeout_check = time.monotonic() + item_timeout
+            continue
+        
         try:
-            result_json = analyze_data_point(context, json.dumps(data_point))
-            result = json.loads(result_json)
-            results.append(result)
-        except Exception as e:
-            # Handle individual failures gracefully
-            error_result = {
-                "query_id": f"ERROR_{uuid.uuid4().hex[:8]}",
-                "category": QueryCategory.OTHER.value,
-                "severity": QuerySeverity.INFO.value,
-                "confidence": 0.0,
-                "subject_id": data_point.get("subject_id", ""),
-                "visit": data_point.get("visit", ""),
-                "field_name": data_point.get("field_name", ""),
-                "description": f"Analysis failed: {str(e)}",
-                "suggested_actions": ["Review data format", "Contact technical support"],
-                "error": str(e),
-                "created_at": datetime.now().isoformat()
-            }
-            results.append(error_result)
+            index, future = completed.get(timeout=max(0.0, next_timeout_check - time.monotonic()))
+        except queue.Empty:
+            future = None
+        
+        if future is not None and index in pending:
+            data_point = pending.pop(index)
+            started.pop(index, None)
+            try:
+                yield index, future.result()
+            except Exception as e:
+                # Handle individual failures gracefully
+                yield index, _analysis_error_result(data_point, e)
+        elif future is not None:
+            # Late result of an item already reported as timed out; its slot is free again
+            abandoned.discard(index)
+        
+        now = time.monotonic()
+        if now >= next_timeout_check:
+            for index, start in list(started.items()):
+                if index in pending and now - start >= item_timeout:
+                    data_point = pending.pop(index)
+                    del started[index]
+                    abandoned.add(index)
+                    yield index, _analysis_error_result(data_point, TimeoutError(f"Analysis timed out after {item_timeout}s"))
+            # Items starting later have later deadlines, so the earliest running start bounds the next check.
+            # Worker threads add to started while this runs, so read a copy.
+            running = [start for index, start in list(started.items()) if index in pending]
+            next_timeout_check = min(running, default=now) + item_timeout
+
+
+def _record_batch_result(
+    context: QueryAnalysisContext,
+    data_point: Any,
+    result: Dict[str, Any]
+) -> None:
+    """Store a successful batch item in the history and count failures."""
+    if "error" in result:
+        key = "batch_timeouts" if result["error"].startswith("Analysis timed out") else "batch_failures"
+        context.performance_metrics[key] = context.performance_metrics.get(key, 0) + 1
+    else:
+        context.analysis_history.append(result, site_id=data_point.get("site_id"))
+
+
+def _batch_analyze_data(
+    context: QueryAnalysisContext,
+    data_points_list: List[Any],
+    chunk_size: int = RECOMMENDED_BATCH_SIZE,
+    max_in_flight: int = MAX_BATCH_SIZE,
+    item_timeout: float = ANALYSIS_ITEM_TIMEOUT
+) -> List[Dict[str, Any]]:
+    """Analyze data points on the worker pool, returning results in input order."""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(data_points_list)
+    
+    for index, result in _iter_batch_analysis(
+        data_points_list, get_analysis_executor(), chunk_size, max_in_flight, item_timeout
+    ):
+        _record_batch_result(context, data_points_list[index], result)
+        results[index] = result
     
     # Update performance metrics
     context.performance_metrics["batch_analyses"] = context.performance_metrics.get("batch_analyses", 0) + 1
     context.performance_metrics["total_data_points"] = context.performance_metrics.get("total_data_points", 0) + len(data_points_list)
+    context.performance_metrics["analysis_cache"] = get_analysis_cache_stats()
     
-    return json.dumps(results)
+    return results
 
 
 @function_tool
@@ -224,70 +498,66 @@ def detect_patterns(
     # Parse input data
     historical_data_list = json.loads(historical_data)
     
-    site_patterns = {}
-    field_patterns = {}
-    temporal_patterns = {}
+    pattern_result = _render_patterns(_new_pattern_aggregator(historical_data_list))
     
-    # Analyze site-specific patterns
-    for data in historical_data_list:
-        site_name = data.get("site_name", "Unknown")
-        if site_name not in site_patterns:
-            site_patterns[site_name] = {"discrepancy_count": 0, "fields": {}}
-        
-        site_patterns[site_name]["discrepancy_count"] += data.get("discrepancy_count", 0)
-        
-        field_name = data.get("field_name", "")
-        if field_name:
-            if field_name not in site_patterns[site_name]["fields"]:
-                site_patterns[site_name]["fields"][field_name] = 0
-            site_patterns[site_name]["fields"][field_name] += data.get("discrepancy_count", 0)
-    
-    # Analyze field-specific patterns
-    for data in historical_data_list:
-        field_name = data.get("field_name", "")
-        if field_name not in field_patterns:
-            field_patterns[field_name] = {"total_discrepancies": 0, "sites": []}
-        
-        field_patterns[field_name]["total_discrepancies"] += data.get("discrepancy_count", 0)
-        
-        site_name = data.get("site_name", "")
-        if site_name and site_name not in field_patterns[field_name]["sites"]:
-            field_patterns[field_name]["sites"].append(site_name)
+    # Store patterns in context
+    context.detected_patterns.update(pattern_result)
+    
+    return json.dumps(pattern_result)
+
+
+def _new_pattern_aggregator(historical_data: Iterable[Dict[str, Any]] = ()) -> DiscrepancyPatternAggregator:
+    """Pattern aggregator keyed the way query analyzer history records are."""
+    return DiscrepancyPatternAggregator.from_events(
+        historical_data, site_key="site_name", weight_key="discrepancy_count", default_weight=0
+    )
+
+
+def _render_patterns(aggregator: DiscrepancyPatternAggregator) -> Dict[str, Any]:
+    """Build the detect_patterns result from running aggregates."""
+    site_patterns = {
+        site_name: {
+            "discrepancy_count": total,
+            "fields": {
+                field_name: count
+                for field_name, count in aggregator.site_fields[site_name].items()
+                if field_name
+            }
+        }
+        for site_name, total in aggregator.site_totals.items()
+    }
+    field_patterns = {
+        field_name: {
+            "total_discrepancies": total,
+            "sites": [site_name for site_name in aggregator.field_sites[field_name] if site_name]
+        }
+        for field_name, total in aggregator.field_totals.items()
+    }
+    temporal_patterns = aggregator.temporal.summary()
     
     # Generate recommendations
     recommendations = []
     
     # Identify high-risk sites
-    high_risk_sites = [
-        site for site, data in site_patterns.items() 
-        if data["discrepancy_count"] > 5
-    ]
+    high_risk_sites = aggregator.sites_over(5)
     
     if high_risk_sites:
-        recommendations.append(f"Focus additional monitoring on sites: {', '.join(high_risk_sites)}")
+        recommendations.append(f"Focus additional monitoring on sites: {', '.join(map(str, high_risk_sites))}")
     
     # Identify problematic fields
-    problematic_fields = [
-        field for field, data in field_patterns.items()
-        if data["total_discrepancies"] > 10
-    ]
+    problematic_fields = aggregator.fields_over(10)
     
     if problematic_fields:
         recommendations.append(f"Review data collection procedures for fields: {', '.join(problematic_fields)}")
     
-    pattern_result = {
+    return {
         "site_patterns": site_patterns,
         "field_patterns": field_patterns,
         "temporal_patterns": temporal_patterns,
         "recommendations": recommendations,
         "analysis_date": datetime.now().isoformat(),
-        "data_points_analyzed": len(historical_data_list)
+        "data_points_analyzed": aggregator.events_processed
     }
-    
-    # Store patterns in context
-    context.detected_patterns.update(pattern_result)
-    
-    return json.dumps(pattern_result)
 
 
 @function_tool
@@ -306,21 +576,28 @@ def cross_system_match(
     discrepancies = []
     total_fields = 0
     
-    # Compare common fields
-    for field, edc_value in edc_data_dict.items():
-        if field in source_data_dict:
-            total_fields += 1
-            source_value = source_data_dict[field]
-            
-            if str(edc_value).strip().lower() == str(source_value).strip().lower():
-                matching_fields.append(field)
-            else:
-                discrepancies.append({
-                    "field": field,
-                    "edc_value": edc_value,
-                    "source_value": source_value,
-                    "severity": _assess_field_discrepancy_severity(field, edc_value, source_value)
-                })
+    # Compare leaves of both documents, nested sections by dotted path
+    for field, edc_value, source_value in _iter_leaf_pairs(edc_data_dict, source_data_dict):
+        total_fields += 1
+        
+        if edc_value is _MISSING or source_value is _MISSING:
+            present = source_value if edc_value is _MISSING else edc_value
+            discrepancies.append({
+                "field": field,
+                "edc_value": None if edc_value is _MISSING else edc_value,
+                "source_value": None if source_value is _MISSING else source_value,
+                "issue": "missing_in_edc" if edc_value is _MISSING else "missing_in_source",
+                "severity": _assess_field_discrepancy_severity(field, present, None)
+            })
+        elif _leaf_values_match(edc_value, source_value):
+            matching_fields.append(field)
+        else:
+            discrepancies.append({
+                "field": field,
+                "edc_value": edc_value,
+                "source_value": source_value,
+                "severity": _assess_field_discrepancy_severity(field, edc_value, source_value)
+            })
     
     # Calculate match score
     match_score = len(matching_fields) / total_fields if total_fields > 0 else 0.0
@@ -442,13 +719,10 @@ def _assess_severity(data_point: Dict[str, Any], field_name: str, edc_value: str
     if any(term in field_lower for term in ["death", "fatal", "life-threatening"]):
         return QuerySeverity.CRITICAL
     
-    # Critical severity for serious medical terms
-    if any(term in edc_lower or term in source_lower for term in CRITICAL_MEDICAL_TERMS):
-        return QuerySeverity.CRITICAL
-    
-    # Major severity for important medical terms
-    if any(term in edc_lower or term in source_lower for term in MAJOR_MEDICAL_TERMS):
-        return QuerySeverity.MAJOR
+    # Critical or major severity for serious medical terms
+    term_severity = _scan_medical_severity(edc_lower, source_lower)
+    if term_severity is not None:
+        return term_severity
     
     # Major severity for primary endpoint fields
     if any(term in field_lower for term in ["primary", "endpoint", "efficacy"]):
@@ -545,6 +819,63 @@ def _assess_regulatory_impact(category: QueryCategory, severity: QuerySeverity,
     return None
 
 
+# Stands in for the side of a leaf pair that has no value at that path
+_MISSING = object()
+
+
+def _iter_leaf_pairs(edc_node: Any, source_node: Any, path: str = "") -> Iterator[Tuple[str, Any, Any]]:
+    """Walk two documents together, yielding (path, edc_leaf, source_leaf).
+    
+    Dict keys and list positions are followed with paths like
+    "laboratory.hemoglobin" or "adverse_events.0.term". A node that is a
+    container on one side only is yielded as a leaf pair. Top-level keys
+    are compared only when both documents have them; inside shared sections
+    a key or list element present on one side only is yielded once at its
+    own path, with _MISSING for the other side.
+    """
+    if isinstance(edc_node, dict) and isinstance(source_node, dict):
+        for key, edc_child in edc_node.items():
+            if path or key in source_node:
+                yield from _iter_leaf_pairs(
+                    edc_child, source_node.get(key, _MISSING), f"{path}.{key}" if path else str(key)
+                )
+        if path:
+            for key, source_child in source_node.items():
+                if key not in edc_node:
+                    yield f"{path}.{key}", _MISSING, source_child
+    elif isinstance(edc_node, list) and isinstance(source_node, list):
+        for index, (edc_child, source_child) in enumerate(zip_longest(edc_node, source_node, fillvalue=_MISSING)):
+            yield from _iter_leaf_pairs(edc_child, source_child, f"{path}.{index}" if path else str(index))
+    else:
+        yield path, edc_node, source_node
+
+
+def _as_number(value: Any) -> Optional[float]:
+    """Float value of a number or numeric string; None otherwise (bools included)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _leaf_values_match(edc_value: Any, source_value: Any) -> bool:
+    """Compare two leaves numerically when both are numeric, else case-insensitively."""
+    edc_number = _as_number(edc_value)
+    if edc_number is not None:
+        source_number = _as_number(source_value)
+        if source_number is not None:
+            if math.isnan(edc_number) or math.isnan(source_number):
+                return math.isnan(edc_number) and math.isnan(source_number)
+            return math.isclose(edc_number, source_number, rel_tol=1e-9, abs_tol=1e-12)
+    if isinstance(edc_value, (dict, list)) or isinstance(source_value, (dict, list)):
+        return edc_value == source_value
+    return str(edc_value).strip().lower() == str(source_value).strip().lower()
+
+
 def _assess_field_discrepancy_severity(field: str, edc_value: Any, source_value: Any) -> str:
     """Assess severity of field discrepancy."""
     field_lower = field.lower()
@@ -617,22 +948,35 @@ Provide definitive medical interpretations using your function tools, not generi
 )
 
 
+def _new_analysis_history() -> AnalysisHistory:
+    """Analysis history sized and spilled per Settings."""
+    settings = get_settings()
+    if settings is None:
+        return AnalysisHistory()
+    return AnalysisHistory(
+        capacity=settings.analysis_history_capacity,
+        spill_dir=settings.analysis_history_spill_dir
+    )
+
+
 class QueryAnalyzer:
     """Query Analyzer for clinical trials data analysis."""
     
     def __init__(self):
         """Initialize the Query Analyzer."""
         self.agent = query_analyzer_agent
-        self.context = QueryAnalysisContext()
+        self.context = QueryAnalysisContext(analysis_history=_new_analysis_history())
         self.medical_terms = MEDICAL_TERM_MAPPING
         self.critical_terms = CRITICAL_MEDICAL_TERMS
         self.major_terms = MAJOR_MEDICAL_TERMS
+        self.pattern_aggregator = _new_pattern_aggregator()
         
         # Configuration
         self.confidence_threshold = 0.7
         self.severity_filter = QuerySeverity.INFO
-        self.max_batch_size = 100
-        self.recommended_batch_size = 25
+        self.max_batch_size = MAX_BATCH_SIZE
+        self.recommended_batch_size = RECOMMENDED_BATCH_SIZE
+        self.item_timeout = ANALYSIS_ITEM_TIMEOUT
         
         # Mock assistant for test compatibility
         self.assistant = type('obj', (object,), {
@@ -648,15 +992,69 @@ class QueryAnalyzer:
         return json.loads(result_json)
     
     async def batch_analyze(self, data_points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Analyze multiple data points in batch."""
-        result_json = batch_analyze_data(self.context, json.dumps(data_points))
-        return json.loads(result_json)
-    
-    async def detect_patterns(self, historical_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Detect patterns in historical data."""
+        """Analyze multiple data points in batch, returning results in input order.
+        
+        Items run on the analysis pool in chunks of recommended_batch_size,
+        with at most max_batch_size in flight and item_timeout per item.
+        """
+        return await asyncio.to_thread(
+            _batch_analyze_data,
+            self.context,
+            list(data_points),
+            self.recommended_batch_size,
+            self.max_batch_size,
+            self.item_timeout
+        )
+    
+    async def stream_batch_analysis(
+        self,
+        data_points: Iterable[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (input index, result) pairs as each analysis finishes."""
+        data_points = list(data_points)
+        results = _iter_batch_analysis(
+            data_points,
+            get_analysis_executor(),
+            self.recommended_batch_size,
+            self.max_batch_size,
+            self.item_timeout
+        )
+        done = object()
+        while True:
+            item = await asyncio.to_thread(next, results, done)
+            if item is done:
+                break
+            index, result = item
+            _record_batch_result(self.context, data_points[index], result)
+            yield index, result
+    
+    async def detect_patterns(self, historical_data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Detect patterns in historical data.
+        
+        Args:
+            historical_data: History records to analyze. When omitted, patterns
+                are read from the records added with record_pattern_events.
+        """
+        if historical_data is None:
+            pattern_result = _render_patterns(self.pattern_aggregator)
+            self.context.detected_patterns.update(pattern_result)
+            return pattern_result
         result_json = detect_patterns(self.context, json.dumps(historical_data))
         return json.loads(result_json)
     
+    def record_pattern_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Fold new history records into the persistent pattern aggregates."""
+        return self.pattern_aggregator.extend(events)
+    
+    def query_analysis_history(
+        self,
+        subject_id: Optional[str] = None,
+        site_id: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Past analyses for a subject and/or site, including spilled records."""
+        return self.context.analysis_history.query(subject_id=subject_id, site_id=site_id, limit=limit)
+    
     async def cross_system_match(self, edc_data: Dict[str, Any], source_data: Dict[str, Any]) -> Dict[str, Any]:
         """Perform cross-system data matching."""
         result_json = cross_system_match(self.context, json.dumps(edc_data), json.dumps(source_data))
@@ -667,16 +1065,15 @@ class QueryAnalyzer:
         result_json = check_regulatory_compliance(self.context, json.dumps(subject_data))
         return json.loads(result_json)
     
+    def get_performance_metrics(self) -> Dict[str, Any]:
+        """Get analysis counters and the result cache hit rate."""
+        metrics = dict(self.context.performance_metrics)
+        metrics["analysis_cache"] = get_analysis_cache_stats()
+        return metrics
+    
     def assess_medical_severity(self, medical_term: str) -> QuerySeverity:
         """Assess medical severity of a term."""
-        term_lower = medical_term.lower()
-        
-        if any(critical_term in term_lower for critical_term in self.critical_terms):
-            return QuerySeverity.CRITICAL
-        elif any(major_term in term_lower for major_term in self.major_terms):
-            return QuerySeverity.MAJOR
-        else:
-            return QuerySeverity.INFO
+        return _scan_medical_severity(medical_term.lower()) or QuerySeverity.INFO
     
     def standardize_medical_term(self, term: str) -> str:
         """Standardize medical terminology."""
@@ -701,6 +1098,9 @@ __all__ = [
     "QuerySeverity",
     "analyze_data_point",
     "batch_analyze_data",
+    "get_analysis_executor",
+    "shutdown_analysis_executor",
+    "get_analysis_cache_stats",
     "detect_patterns",
     "cross_system_match",
     "check_regulatory_compliance",
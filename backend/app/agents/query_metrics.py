@@ -0,0 +1,317 @@
+"""Live counters over the tracked queries in a QueryStore.
+
+QueryMetrics follows its store as a listener and keeps counts per status,
+per priority and per SLA risk (on_track, at_risk, breached; open queries
+only). Every committed save or delete adjusts them in O(1), so a snapshot
+costs the same for ten queries or a million.
+
+SLA risk also changes as time passes. Each open query's next risk
+transition (reaching AT_RISK_FRACTION of its SLA, then the SLA itself)
+sits in a min-heap, and a snapshot first applies the transitions that
+have come due. Each query makes at most two, so this is amortized O(1).
+
+check_consistency() recounts from the store with SQL counts and a raw
+column scan, and rebuilds the counters if they have drifted (e.g. rows
+changed by another process). start() runs it periodically in a worker
+thread from a background asyncio task.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+import threading
+import time
+
+from app.agents.query_store import (
+    OPEN_STATUSES,
+    QueryStatus,
+    QueryStore,
+    QueryStoreListener,
+    TrackedQuery,
+    get_query_store,
+    parse_sla_hours
+)
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# SLA when neither the query nor its priority's rules give one
+DEFAULT_SLA_HOURS = 120
+
+# Share of the SLA consumed before a query counts as at risk
+AT_RISK_FRACTION = 0.8
+
+SLA_RISK_LEVELS = ("on_track", "at_risk", "breached")
+
+# Per query: (status, priority, risk level or None when closed)
+_Entry = Tuple[str, str, Optional[str]]
+
+
+def sla_hours(query: TrackedQuery, rules: Dict[str, Dict[str, Any]]) -> float:
+    """SLA of a query: its own sla_hours, else its priority's initial SLA."""
+    return _sla_hours(query.priority, query.metadata.get("sla_hours"), rules)
+
+
+def _sla_hours(priority: str, own_sla: Any, rules: Dict[str, Dict[str, Any]]) -> float:
+    own_sla = parse_sla_hours(own_sla)
+    if own_sla is not None:
+        return own_sla
+    return float(rules.get(priority, {}).get("initial_sla_hours", DEFAULT_SLA_HOURS))
+
+
+class QueryMetrics(QueryStoreListener):
+    """Incrementally maintained status, priority and SLA risk counts."""
+
+    def __init__(self, store: QueryStore, rules: Dict[str, Dict[str, Any]], check_interval: float = 300.0):
+        if check_interval <= 0:
+            raise ValueError("check_interval must be positive")
+        self.store = store
+        self.rules = rules
+        self.check_interval = check_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._status_counts: Counter = Counter()
+        self._priority_counts: Counter = Counter()
+        self._risk_counts: Counter = Counter()
+        # Next risk transition per open query: (at, risk level, breach time)
+        self._risk_due: Dict[str, Tuple[float, str, float]] = {}
+        self._risk_heap: List[Tuple[float, str, str]] = []
+        self._lock = threading.Lock()
+        # Changes committed while rebuild() reads the store, replayed after it
+        self._replay: Optional[List[Tuple[str, Any]]] = None
+        self._rebuild_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        store.subscribe(self)
+
+    # Counter maintenance
+
+    def _risk(self, query: TrackedQuery, now: float) -> Tuple[str, Optional[Tuple[float, str, float]]]:
+        """Current risk level and the next transition, if any."""
+        return self._risk_at(query.created_at.timestamp(), sla_hours(query, self.rules), now)
+
+    @staticmethod
+    def _risk_at(start: float, sla: float, now: float) -> Tuple[str, Optional[Tuple[float, str, float]]]:
+        breach_at = start + sla * 3600
+        at_risk_at = start + (breach_at - start) * AT_RISK_FRACTION
+        if now >= breach_at:
+            return "breached", None
+        if now >= at_risk_at:
+            return "at_risk", (breach_at, "breached", breach_at)
+        return "on_track", (at_risk_at, "at_risk", breach_at)
+
+    def _remove(self, query_id: str) -> None:
+        entry = self._entries.pop(query_id, None)
+        if entry is None:
+            return
+        status, priority, risk = entry
+        self._status_counts[status] -= 1
+        self._priority_counts[priority] -= 1
+        if risk is not None:
+            self._risk_counts[risk] -= 1
+        self._risk_due.pop(query_id, None)
+
+    def _add(self, query: TrackedQuery, now: float) -> None:
+        risk = None
+        if query.status in OPEN_STATUSES:
+            risk, transition = self._risk(query, now)
+            self._risk_counts[risk] += 1
+            if transition is not None:
+                self._risk_due[query.query_id] = transition
+                heapq.heappush(self._risk_heap, (transition[0], query.query_id, transition[1]))
+        self._entries[query.query_id] = (query.status.value, query.priority, risk)
+        self._status_counts[query.status.value] += 1
+        self._priority_counts[query.priority] += 1
+
+    def _advance(self, now: float) -> None:
+        """Apply the SLA risk transitions that have come due."""
+        heap = self._risk_heap
+        while heap and heap[0][0] <= now:
+            at, query_id, risk = heapq.heappop(heap)
+            due = self._risk_due.get(query_id)
+            if due is None or due[0] != at or due[1] != risk:
+                continue
+            status, priority, old_risk = self._entries[query_id]
+            self._risk_counts[old_risk] -= 1
+            self._risk_counts[risk] += 1
+            self._entries[query_id] = (status, priority, risk)
+            if risk == "at_risk":
+                breach_at = due[2]
+                self._risk_due[query_id] = (breach_at, "breached", breach_at)
+                heapq.heappush(heap, (breach_at, query_id, "breached"))
+            else:
+                del self._risk_due[query_id]
+        # Replaced transitions are skipped lazily; rebuild once they outnumber live ones
+        if len(heap) > 2 * len(self._risk_due) + 64:
+            self._risk_heap = [(due[0], query_id, due[1]) for query_id, due in self._risk_due.items()]
+            heapq.heapify(self._risk_heap)
+
+    def _reset(self) -> None:
+        for counts in (self._entries, self._status_counts, self._priority_counts, self._risk_counts, self._risk_due):
+            counts.clear()
+        self._risk_heap.clear()
+
+    def rebuild(self) -> None:
+        """Recount every query in the store.
+
+        The store is read without holding the counters' lock, since it
+        notifies listeners while flushing. Changes committed during the
+        read are recorded and replayed over the recount, so a write that
+        lands in between is not lost to stale counts.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._replay = []
+            try:
+                queries = self.store.find()
+            finally:
+                with self._lock:
+                    replay, self._replay = self._replay, None
+            now = time.time()
+            with self._lock:
+                self._reset()
+                for query in queries:
+                    self._add(query, now)
+                for change, payload in replay:
+                    self._apply(change, payload, now)
+
+    def _apply(self, change: str, payload: Any, now: float) -> None:
+        if change == "saved":
+            self._remove(payload.query_id)
+            self._add(payload, now)
+        elif change == "deleted":
+            for query_id in payload:
+                self._remove(query_id)
+        else:
+            self._reset()
+
+    def _record(self, change: str, payload: Any) -> None:
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((change, payload))
+            self._apply(change, payload, time.time())
+
+    # QueryStoreListener
+
+    def query_saved(self, query: TrackedQuery) -> None:
+        self._record("saved", query)
+
+    def queries_deleted(self, query_ids: List[str]) -> None:
+        self._record("deleted", list(query_ids))
+
+    def store_cleared(self) -> None:
+        self._record("cleared", None)
+
+    # Reads
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Current counts; independent of the number of queries."""
+        self.store.flush()
+        with self._lock:
+            self._advance(time.time() if now is None else now)
+            return {
+                "total": len(self._entries),
+                "status": {status.value: self._status_counts[status.value] for status in QueryStatus},
+                "priority": {priority: count for priority, count in self._priority_counts.items() if count},
+                "sla_risk": {risk: self._risk_counts[risk] for risk in SLA_RISK_LEVELS}
+            }
+
+    def _recount(self, now: float) -> Dict[str, Any]:
+        status = self.store.count_by("status")
+        priority = self.store.count_by("priority")
+        risk = Counter(
+            self._risk_at(created_at, _sla_hours(query_priority, own_sla, self.rules), now)[0]
+            for created_at, query_priority, own_sla in self.store.scan(
+                ["created_at", "priority"], metadata_keys=["sla_hours"], status=OPEN_STATUSES
+            )
+        )
+        return {
+            "total": sum(status.values()),
+            "status": {value.value: status.get(value.value, 0) for value in QueryStatus},
+            "priority": {key: count for key, count in priority.items() if count},
+            "sla_risk": {level: risk[level] for level in SLA_RISK_LEVELS}
+        }
+
+    def check_consistency(self) -> Dict[str, Any]:
+        """Compare the counters with a recount from the store, rebuilding on drift."""
+        now = time.time()
+        expected = self._recount(now)
+        actual = self.snapshot(now)
+        differences = {
+            key: {"counted": actual[key], "stored": expected[key]}
+            for key in expected
+            if actual[key] != expected[key]
+        }
+        if differences:
+            logger.warning("Query metrics drifted from the store, rebuilding: %s", differences)
+            self.rebuild()
+        return {
+            "consistent": not differences,
+            "checked_at": datetime.fromtimestamp(now).isoformat(),
+            "differences": differences
+        }
+
+    # Background consistency checks
+
+    def start(self) -> None:
+        """Check consistency every check_interval seconds in the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background consistency checks."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await asyncio.to_thread(self.check_consistency)
+            except Exception:
+                logger.exception("Query metrics consistency check failed")
+
+
+_query_metrics: Optional[QueryMetrics] = None
+_query_metrics_lock = threading.Lock()
+
+
+def get_query_metrics() -> QueryMetrics:
+    """Process-wide counters for the process-wide query store."""
+    global _query_metrics
+    store = get_query_store()
+    if _query_metrics is None or _query_metrics.store is not store:
+        with _query_metrics_lock:
+            if _query_metrics is None or _query_metrics.store is not store:
+                from app.agents.query_tracker import ESCALATION_RULES
+                _query_metrics = QueryMetrics(
+                    store,
+                    ESCALATION_RULES,
+                    check_interval=get_settings().metrics_consistency_interval
+                )
+                _query_metrics.rebuild()
+    return _query_metrics
+
+
+async def shutdown_query_metrics() -> None:
+    """Stop the process-wide counters' background checks and drop them."""
+    global _query_metrics
+    with _query_metrics_lock:
+        metrics, _query_metrics = _query_metrics, None
+    if metrics is not None:
+        await metrics.stop()
+        metrics.store.unsubscribe(metrics)
+
+
+__all__ = [
+    "QueryMetrics",
+    "get_query_metrics",
+    "shutdown_query_metrics",
+    "sla_hours"
+]
@@ -0,0 +1,712 @@
+"""Persistent storage for tracked clinical queries.
+
+QueryStore keeps TrackedQuery records and their history events in SQLite,
+with secondary indexes on status, priority, site_id, subject_id and
+due_date so lookups by any of them are index seeks instead of scans.
+
+Writes are buffered and applied in order as executemany batches in one
+transaction, either when the buffer reaches batch_size or before the next
+read, so reads always see earlier writes. A batch the database rejects
+is retried write by write and the rows it still rejects (constraint or
+binding errors) are logged and dropped, so one bad row cannot wedge the
+store. Operational errors such as a locked database or a full disk are
+transient: the writes stay buffered and the error is raised. The store is also a MutableMapping
+of query_id to TrackedQuery, which lets QueryTracker.tracked_queries keep
+its dict interface.
+
+Listeners subscribed to a store are told about every query saved or
+deleted through it once the write has been committed, so derived state
+(such as the escalation schedule) can follow the store without scanning
+it and never counts a write that was dropped. Readers of derived state
+flush the store first to catch up with buffered writes.
+
+Timestamps are stored as epoch seconds; naive datetimes are read and
+written as local time, matching the datetime.now() values the tracker
+produces.
+"""
+
+from collections.abc import MutableMapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import json
+import logging
+import math
+import sqlite3
+import threading
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatus(Enum):
+    """Status of a tracked query."""
+    
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    RESOLVED = "resolved"
+    CANCELLED = "cancelled"
+    ESCALATED = "escalated"
+
+
+@dataclass
+class QueryEvent:
+    """Event in query history."""
+    
+    event_type: str
+    description: str
+    timestamp: datetime = field(default_factory=datetime.now)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "event_type": self.event_type,
+            "description": self.description,
+            "timestamp": self.timestamp.isoformat(),
+            "metadata": self.metadata
+        }
+
+
+@dataclass
+class TrackedQuery:
+    """Represents a tracked clinical query."""
+    
+    query_id: str
+    status: QueryStatus
+    created_at: datetime
+    priority: str
+    site_id: Optional[str] = None
+    subject_id: Optional[str] = None
+    due_date: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
+    escalation_level: int = 0
+    history: List[QueryEvent] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    def add_event(self, event_type: str, description: str, **kwargs) -> None:
+        """Add event to history."""
+        event = QueryEvent(event_type, description, metadata=kwargs)
+        self.history.append(event)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "query_id": self.query_id,
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat(),
+            "priority": self.priority,
+            "site_id": self.site_id,
+            "subject_id": self.subject_id,
+            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "resolved_at": self.resolved_at.isoformat() if self.resolved_at else None,
+            "escalation_level": self.escalation_level,
+            "history": [e.to_dict() for e in self.history],
+            "metadata": self.metadata
+        }
+
+
+def parse_sla_hours(value: Any) -> Optional[float]:
+    """A per-query sla_hours as a positive number of hours, or None if it is not one.
+
+    Query metadata comes from clients, so readers treat anything else
+    (missing, empty, "two days", zero) as no per-query SLA.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        hours = float(value)
+    except (TypeError, ValueError):
+        return None
+    return hours if math.isfinite(hours) and hours > 0 else None
+
+
+# Statuses of queries still awaiting resolution
+OPEN_STATUSES = (QueryStatus.PENDING, QueryStatus.IN_PROGRESS, QueryStatus.ESCALATED)
+
+# Buffered write operations applied per transaction
+WRITE_BATCH_SIZE = 500
+
+# Ids per "IN (...)" lookup, well under SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+# Columns that have secondary indexes and can be filtered or grouped on
+INDEXED_COLUMNS = ("status", "priority", "site_id", "subject_id", "due_date")
+
+QUERY_COLUMNS = (
+    "query_id", "status", "priority", "site_id", "subject_id",
+    "created_at", "due_date", "resolved_at", "escalation_level", "metadata"
+)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS tracked_queries (
+        query_id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        priority TEXT NOT NULL,
+        site_id TEXT,
+        subject_id TEXT,
+        created_at REAL NOT NULL,
+        due_date REAL,
+        resolved_at REAL,
+        escalation_level INTEGER NOT NULL DEFAULT 0,
+        metadata TEXT NOT NULL DEFAULT '{}'
+    )""",
+    """CREATE TABLE IF NOT EXISTS query_events (
+        event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        query_id TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        description TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        metadata TEXT NOT NULL DEFAULT '{}'
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_query_events_query_id ON query_events (query_id, event_id)",
+] + [
+    f"CREATE INDEX IF NOT EXISTS ix_tracked_queries_{column} ON tracked_queries ({column})"
+    for column in INDEXED_COLUMNS
+]
+
+StatusFilter = Union[None, str, QueryStatus, Iterable[Union[str, QueryStatus]]]
+
+
+def _to_epoch(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+
+def _from_epoch(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if value is not None else None
+
+
+def _status_values(status: StatusFilter) -> Optional[List[str]]:
+    if status is None:
+        return None
+    if isinstance(status, (str, QueryStatus)):
+        status = [status]
+    return [value.value if isinstance(value, QueryStatus) else value for value in status]
+
+
+def sqlite_path_from_url(database_url: str) -> Optional[str]:
+    """SQLite file path for a database URL, ":memory:" when unset, None if not SQLite."""
+    if not database_url:
+        return ":memory:"
+    scheme, separator, rest = database_url.partition("://")
+    if not separator or scheme not in ("sqlite", "sqlite+aiosqlite"):
+        return None
+    # sqlite:///relative.db, sqlite:////absolute.db, sqlite:// or sqlite:///:memory:
+    path = rest[1:] if rest.startswith("/") else rest
+    return path or ":memory:"
+
+
+class QueryStoreListener:
+    """Receives the changes made through a QueryStore."""
+
+    def query_saved(self, query: TrackedQuery) -> None:
+        """A query was inserted or its fields replaced."""
+
+    def queries_deleted(self, query_ids: List[str]) -> None:
+        """Queries were deleted."""
+
+    def store_cleared(self) -> None:
+        """Every query was deleted."""
+
+
+class QueryStore(MutableMapping):
+    """SQLite-backed, indexed store of tracked queries with batched writes."""
+
+    def __init__(self, path: str = ":memory:", batch_size: int = WRITE_BATCH_SIZE):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[str, Any]] = []
+        self._listeners: List[QueryStoreListener] = []
+        self.dropped_writes = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+
+    @classmethod
+    def from_url(cls, database_url: str, **kwargs: Any) -> "QueryStore":
+        """Store for a Settings.database_url; raises ValueError for non-SQLite URLs."""
+        path = sqlite_path_from_url(database_url)
+        if path is None:
+            raise ValueError(f"QueryStore supports sqlite URLs only, got {database_url.split('://')[0]}")
+        return cls(path, **kwargs)
+
+    # Listeners
+
+    def subscribe(self, listener: QueryStoreListener) -> None:
+        """Notify listener of every later change made through this store."""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: QueryStoreListener) -> None:
+        """Stop notifying listener."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # Writes
+
+    def _queue(self, operation: str, payload: Any) -> None:
+        with self._lock:
+            self._pending.append((operation, payload))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def put(self, query: TrackedQuery) -> None:
+        """Insert or replace a query together with its full history."""
+        self._validate(query)
+        self._queue("put", (self._query_row(query), [self._event_row(query.query_id, e) for e in query.history]))
+
+    def save(self, query: TrackedQuery) -> None:
+        """Insert or replace a query's fields, leaving its stored history as is."""
+        self._validate(query)
+        self._queue("row", self._query_row(query))
+
+    def put_many(self, queries: Iterable[TrackedQuery]) -> None:
+        """Insert or replace several queries."""
+        for query in queries:
+            self.put(query)
+
+    def add_event(self, query_id: str, event: QueryEvent) -> None:
+        """Append one event to a query's history."""
+        self._queue("event", self._event_row(query_id, event))
+
+    def add_events(self, events: Iterable[Tuple[str, QueryEvent]]) -> None:
+        """Append (query_id, event) pairs in one batch."""
+        with self._lock:
+            self._pending.extend(("event", self._event_row(query_id, event)) for query_id, event in events)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def save_statuses(self, queries: Sequence[TrackedQuery], events: Iterable[Tuple[str, QueryEvent]] = ()) -> None:
+        """Write several queries' status and resolved_at, and append events, in one transaction.
+
+        Unlike save(), this bypasses the write buffer: earlier buffered
+        writes are applied first, then the status updates and events are
+        written with executemany and committed together, or not at all.
+        Only the two status columns are rewritten, so bulk closeouts do
+        not re-encode metadata or touch the other indexes.
+        """
+        rows = [(query.status.value, _to_epoch(query.resolved_at), query.query_id) for query in queries]
+        event_rows = [self._event_row(query_id, event) for query_id, event in events]
+        with self._lock:
+            self.flush()
+            with self._connection:
+                self._connection.executemany(
+                    "UPDATE tracked_queries SET status = ?, resolved_at = ? WHERE query_id = ?", rows
+                )
+                self._insert_events(event_rows)
+        for query in queries:
+            self._tell_listeners("query_saved", query)
+
+    def delete_many(self, query_ids: Iterable[str]) -> None:
+        """Delete queries and their history."""
+        with self._lock:
+            self._pending.extend(("delete", (query_id,)) for query_id in query_ids)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Apply buffered writes, in order, in a single transaction.
+
+        If the database rejects the batch it is rolled back and retried one
+        write at a time; writes it rejects again are dropped and logged, so
+        one bad row cannot block every later read. If the database is
+        unavailable (sqlite3.OperationalError) the writes not yet committed
+        go back to the front of the buffer and the error is raised, so the
+        next flush retries them. Listeners are told about the writes that
+        were committed.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            committed: List[Tuple[str, Any]] = []
+            try:
+                try:
+                    self._write(pending)
+                    committed = pending
+                except sqlite3.OperationalError:
+                    self._pending = pending + self._pending
+                    raise
+                except sqlite3.Error as e:
+                    logger.warning("Query store batch of %d writes failed (%s); retrying one by one", len(pending), e)
+                    for index, write in enumerate(pending):
+                        try:
+                            self._write([write])
+                            committed.append(write)
+                        except sqlite3.OperationalError:
+                            self._pending = pending[index:] + self._pending
+                            raise
+                        except sqlite3.Error as write_error:
+                            self.dropped_writes += 1
+                            logger.error("Dropped query store %s write %r: %s", write[0], write[1], write_error)
+            finally:
+                if self._listeners and committed:
+                    self._notify(committed)
+
+    def _tell_listeners(self, method: str, *args: Any) -> None:
+        """Call method on every listener; one failing listener does not stop the others."""
+        for listener in list(self._listeners):
+            try:
+                getattr(listener, method)(*args)
+            except Exception:
+                logger.exception("Query store listener %r failed in %s", listener, method)
+
+    def _notify(self, writes: List[Tuple[str, Any]]) -> None:
+        """Tell listeners about committed writes, with each query as it was written."""
+        deleted: List[str] = []
+        for operation, payload in writes:
+            if operation == "delete":
+                deleted.append(payload[0])
+                continue
+            if operation not in ("put", "row"):
+                continue
+            if deleted:
+                self._tell_listeners("queries_deleted", deleted)
+                deleted = []
+            self._tell_listeners("query_saved", self._query_from_row(payload[0] if operation == "put" else payload))
+        if deleted:
+            self._tell_listeners("queries_deleted", deleted)
+
+    def _write(self, writes: List[Tuple[str, Any]]) -> None:
+        """Apply writes in order in one transaction, grouping runs of the same operation."""
+        with self._connection:
+            index = 0
+            while index < len(writes):
+                operation = writes[index][0]
+                end = index
+                while end < len(writes) and writes[end][0] == operation:
+                    end += 1
+                self._apply(operation, [payload for _, payload in writes[index:end]])
+                index = end
+
+    def _apply(self, operation: str, payloads: List[Any]) -> None:
+        execute_many = self._connection.executemany
+        if operation == "row":
+            self._upsert_rows(payloads)
+        elif operation == "put":
+            self._upsert_rows([row for row, _ in payloads])
+            execute_many("DELETE FROM query_events WHERE query_id = ?", [(row[0],) for row, _ in payloads])
+            self._insert_events([event for _, events in payloads for event in events])
+        elif operation == "event":
+            self._insert_events(payloads)
+        elif operation == "delete":
+            execute_many("DELETE FROM tracked_queries WHERE query_id = ?", payloads)
+            execute_many("DELETE FROM query_events WHERE query_id = ?", payloads)
+
+    def _upsert_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._connection.executemany(
+            f"INSERT OR REPLACE INTO tracked_queries ({', '.join(QUERY_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(QUERY_COLUMNS))})",
+            rows
+        )
+
+    def _insert_events(self, rows: List[Tuple[Any, ...]]) -> None:
+        if rows:
+            self._connection.executemany(
+                "INSERT INTO query_events (query_id, event_type, description, timestamp, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    @staticmethod
+    def _validate(query: TrackedQuery) -> None:
+        """Raise ValueError for a query the database would reject when flushed."""
+        if not isinstance(query.query_id, str) or not query.query_id:
+            raise ValueError(f"query_id must be a non-empty string, got {query.query_id!r}")
+        if not isinstance(query.status, QueryStatus):
+            raise ValueError(f"Invalid status for query {query.query_id}: {query.status!r}")
+        if not isinstance(query.priority, str) or not query.priority:
+            raise ValueError(f"Invalid priority for query {query.query_id}: {query.priority!r}")
+        if not isinstance(query.created_at, datetime):
+            raise ValueError(f"Invalid created_at for query {query.query_id}: {query.created_at!r}")
+
+    @staticmethod
+    def _query_row(query: TrackedQuery) -> Tuple[Any, ...]:
+        return (
+            query.query_id,
+            query.status.value,
+            query.priority,
+            query.site_id,
+            query.subject_id,
+            _to_epoch(query.created_at),
+            _to_epoch(query.due_date),
+            _to_epoch(query.resolved_at),
+            query.escalation_level,
+            json.dumps(query.metadata, default=str)
+        )
+
+    @staticmethod
+    def _event_row(query_id: str, event: QueryEvent) -> Tuple[Any, ...]:
+        return (query_id, event.event_type, event.description, _to_epoch(event.timestamp), json.dumps(event.metadata, default=str))
+
+    # Reads
+
+    def _select(self, sql: str, parameters: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            self.flush()
+            return self._connection.execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def _query_from_row(row: Tuple[Any, ...], history: Optional[List[QueryEvent]] = None) -> TrackedQuery:
+        return TrackedQuery(
+            query_id=row[0],
+            status=QueryStatus(row[1]),
+            priority=row[2],
+            site_id=row[3],
+            subject_id=row[4],
+            created_at=_from_epoch(row[5]),
+            due_date=_from_epoch(row[6]),
+            resolved_at=_from_epoch(row[7]),
+            escalation_level=row[8],
+            metadata=json.loads(row[9]),
+            history=history if history is not None else []
+        )
+
+    def history(self, query_id: str) -> List[QueryEvent]:
+        """History events of a query, oldest first."""
+        rows = self._select(
+            "SELECT event_type, description, timestamp, metadata FROM query_events "
+            "WHERE query_id = ? ORDER BY event_id",
+            (query_id,)
+        )
+        return [
+            QueryEvent(event_type, description, timestamp=_from_epoch(timestamp), metadata=json.loads(metadata))
+            for event_type, description, timestamp, metadata in rows
+        ]
+
+    def get(self, query_id: str, default: Any = None, with_history: bool = True) -> Optional[TrackedQuery]:
+        """Query by id with its history, or default if it is not stored."""
+        rows = self._select(f"SELECT {', '.join(QUERY_COLUMNS)} FROM tracked_queries WHERE query_id = ?", (query_id,))
+        if not rows:
+            return default
+        return self._query_from_row(rows[0], self.history(query_id) if with_history else None)
+
+    def get_many(self, query_ids: Iterable[str]) -> Dict[str, TrackedQuery]:
+        """Stored queries (without history) among query_ids, by id."""
+        query_ids = list(dict.fromkeys(query_ids))
+        found: Dict[str, TrackedQuery] = {}
+        for start in range(0, len(query_ids), LOOKUP_CHUNK_SIZE):
+            chunk = query_ids[start:start + LOOKUP_CHUNK_SIZE]
+            rows = self._select(
+                f"SELECT {', '.join(QUERY_COLUMNS)} FROM tracked_queries "
+                f"WHERE query_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for row in rows:
+                found[row[0]] = self._query_from_row(row)
+        return found
+
+    def find(
+        self,
+        status: StatusFilter = None,
+        priority: Optional[str] = None,
+        site_id: Optional[str] = None,
+        subject_id: Optional[str] = None,
+        due_before: Optional[datetime] = None,
+        due_after: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        with_history: bool = False
+    ) -> List[TrackedQuery]:
+        """Queries matching every given filter, via the secondary indexes.
+
+        status may be one status or several. Results are ordered by due
+        date when a due date bound is given, otherwise by query_id.
+        """
+        clauses, parameters = self._where(status, priority, site_id, subject_id, due_before, due_after)
+        order = "due_date" if due_before is not None or due_after is not None else "query_id"
+        sql = f"SELECT {', '.join(QUERY_COLUMNS)} FROM tracked_queries{clauses} ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        rows = self._select(sql, parameters)
+        return [self._query_from_row(row, self.history(row[0]) if with_history else None) for row in rows]
+
+    def scan(
+        self,
+        columns: Sequence[str],
+        metadata_keys: Sequence[str] = (),
+        **filters: Any
+    ) -> List[Tuple[Any, ...]]:
+        """Raw column values of the queries matching find()'s filters, unordered.
+
+        Timestamps come back as epoch seconds. Each metadata key is
+        extracted in SQL and appended after the columns (None if absent),
+        so callers working over whole portfolios skip building objects
+        and decoding metadata JSON.
+        """
+        unknown = [column for column in columns if column not in QUERY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {unknown}")
+        selected = list(columns) + ["json_extract(metadata, ?)"] * len(metadata_keys)
+        clauses, parameters = self._where(**filters)
+        return self._select(
+            f"SELECT {', '.join(selected)} FROM tracked_queries{clauses}",
+            [f"$.{key}" for key in metadata_keys] + parameters
+        )
+
+    def count(self, **filters: Any) -> int:
+        """Number of queries matching the same filters as find()."""
+        clauses, parameters = self._where(**filters)
+        return self._select(f"SELECT COUNT(*) FROM tracked_queries{clauses}", parameters)[0][0]
+
+    def count_by(self, column: str) -> Dict[Optional[str], int]:
+        """Number of queries per value of an indexed column."""
+        if column not in INDEXED_COLUMNS:
+            raise ValueError(f"count_by supports {INDEXED_COLUMNS}")
+        rows = self._select(f"SELECT {column}, COUNT(*) FROM tracked_queries GROUP BY {column}")
+        return dict(rows)
+
+    @staticmethod
+    def _where(
+        status: StatusFilter = None,
+        priority: Optional[str] = None,
+        site_id: Optional[str] = None,
+        subject_id: Optional[str] = None,
+        due_before: Optional[datetime] = None,
+        due_after: Optional[datetime] = None
+    ) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        parameters: List[Any] = []
+        statuses = _status_values(status)
+        if statuses is not None:
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            parameters.extend(statuses)
+        for column, value in (("priority", priority), ("site_id", site_id), ("subject_id", subject_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                parameters.append(value)
+        if due_before is not None:
+            clauses.append("due_date < ?")
+            parameters.append(_to_epoch(due_before))
+        if due_after is not None:
+            clauses.append("due_date >= ?")
+            parameters.append(_to_epoch(due_after))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), parameters
+
+    # MutableMapping interface
+
+    def __getitem__(self, query_id: str) -> TrackedQuery:
+        query = self.get(query_id)
+        if query is None:
+            raise KeyError(query_id)
+        return query
+
+    def __setitem__(self, query_id: str, query: TrackedQuery) -> None:
+        if query.query_id != query_id:
+            raise ValueError(f"Key {query_id} does not match query_id {query.query_id}")
+        self.put(query)
+
+    def __delitem__(self, query_id: str) -> None:
+        if query_id not in self:
+            raise KeyError(query_id)
+        self.delete_many([query_id])
+
+    def __contains__(self, query_id: object) -> bool:
+        return bool(self._select("SELECT 1 FROM tracked_queries WHERE query_id = ?", (query_id,)))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([row[0] for row in self._select("SELECT query_id FROM tracked_queries ORDER BY query_id")])
+
+    def __len__(self) -> int:
+        return self._select("SELECT COUNT(*) FROM tracked_queries")[0][0]
+
+    def values(self) -> List[TrackedQuery]:
+        """All queries with their history, in one pass over each table."""
+        history: Dict[str, List[QueryEvent]] = {}
+        for query_id, event_type, description, timestamp, metadata in self._select(
+            "SELECT query_id, event_type, description, timestamp, metadata FROM query_events ORDER BY event_id"
+        ):
+            history.setdefault(query_id, []).append(
+                QueryEvent(event_type, description, timestamp=_from_epoch(timestamp), metadata=json.loads(metadata))
+            )
+        rows = self._select(f"SELECT {', '.join(QUERY_COLUMNS)} FROM tracked_queries ORDER BY query_id")
+        return [self._query_from_row(row, history.get(row[0], [])) for row in rows]
+
+    def items(self) -> List[Tuple[str, TrackedQuery]]:
+        return [(query.query_id, query) for query in self.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            with self._connection:
+                self._connection.execute("DELETE FROM tracked_queries")
+                self._connection.execute("DELETE FROM query_events")
+        self._tell_listeners("store_cleared")
+
+    def close(self) -> None:
+        """Flush pending writes and close the database."""
+        with self._lock:
+            self.flush()
+            self._connection.close()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return self is other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"QueryStore(path={self.path!r}, queries={len(self)})"
+
+
+_query_store: Optional[QueryStore] = None
+_query_store_lock = threading.Lock()
+
+
+def get_query_store() -> QueryStore:
+    """Process-wide query store for Settings.database_url.
+
+    An unset URL gives an in-memory database. URLs for other databases
+    fall back to in-memory storage. Either way a warning is logged, since
+    tracked queries are then lost on every restart or deploy.
+    """
+    global _query_store
+    if _query_store is None:
+        with _query_store_lock:
+            if _query_store is None:
+                database_url = get_settings().database_url
+                path = sqlite_path_from_url(database_url)
+                if path is None:
+                    logger.warning("DATABASE_URL is not SQLite; QueryStore supports sqlite URLs only")
+                    path = ":memory:"
+                if path == ":memory:":
+                    logger.warning(
+                        "Tracked queries are kept in memory and lost on restart; "
+                        "set DATABASE_URL=sqlite:///path/to/queries.db to persist them"
+                    )
+                _query_store = QueryStore(path)
+    return _query_store
+
+
+def close_query_store() -> None:
+    """Flush and close the process-wide query store."""
+    global _query_store
+    with _query_store_lock:
+        if _query_store is not None:
+            _query_store.close()
+        _query_store = None
+
+
+__all__ = [
+    "OPEN_STATUSES",
+    "QueryEvent",
+    "QueryStatus",
+    "QueryStore",
+    "QueryStoreListener",
+    "TrackedQuery",
+    "close_query_store",
+    "get_query_store",
+    "parse_sla_hours",
+    "sqlite_path_from_url"
+]
@@ -1,96 +1,43 @@
 """Query Tracker Agent using OpenAI Agents SDK."""
 
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, field
-from enum import Enum
+from typing import Dict, List, Any, Optional, Union
 from datetime import datetime, timedelta
 import json
 from agents import Agent, function_tool
-from pydantic import BaseModel
-
-
-class QueryStatus(Enum):
-    """Status of a tracked query."""
-    
-    PENDING = "pending"
-    IN_PROGRESS = "in_progress"
-    RESOLVED = "resolved"
-    CANCELLED = "cancelled"
-    ESCALATED = "escalated"
-
-
-@dataclass
-class QueryEvent:
-    """Event in query history."""
-    
-    event_type: str
-    description: str
-    timestamp: datetime = field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary."""
-        return {
-            "event_type": self.event_type,
-            "description": self.description,
-            "timestamp": self.timestamp.isoformat(),
-            "metadata": self.metadata
-        }
-
-
-@dataclass
-class TrackedQuery:
-    """Represents a tracked clinical query."""
-    
-    query_id: str
-    status: QueryStatus
-    created_at: datetime
-    priority: str
-    site_id: Optional[str] = None
-    subject_id: Optional[str] = None
-    due_date: Optional[datetime] = None
-    resolved_at: Optional[datetime] = None
-    escalation_level: int = 0
-    history: List[QueryEvent] = field(default_factory=list)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    
-    def add_event(self, event_type: str, description: str, **kwargs) -> None:
-        """Add event to history."""
-        event = QueryEvent(event_type, description, metadata=kwargs)
-        self.history.append(event)
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary."""
-        return {
-            "query_id": self.query_id,
-            "status": self.status.value,
-            "created_at": self.created_at.isoformat(),
-            "priority": self.priority,
-            "site_id": self.site_id,
-            "subject_id": self.subject_id,
-            "due_date": self.due_date.isoformat() if self.due_date else None,
-            "resolved_at": self.resolved_at.isoformat() if self.resolved_at else None,
-            "escalation_level": self.escalation_level,
-            "history": [e.to_dict() for e in self.history],
-            "metadata": self.metadata
-        }
+from pydantic import BaseModel, Field
+
+from app.agents.escalation_scheduler import EscalationScheduler, get_escalation_scheduler
+from app.agents.query_metrics import QueryMetrics, get_query_metrics, sla_hours
+from app.agents.query_store import (
+    QueryEvent,
+    QueryStatus,
+    QueryStore,
+    TrackedQuery,
+    get_query_store,
+    parse_sla_hours
+)
+from app.agents.sla_forecast import SLAForecaster
 
 
 class QueryTrackerContext(BaseModel):
     """Context for Query Tracker agent using Pydantic."""
     
-    tracked_queries: Dict[str, Any] = {}
+    model_config = {"arbitrary_types_allowed": True}
+    
+    # Mapping of query_id to TrackedQuery; the tracker puts its QueryStore here
+    tracked_queries: Any = Field(default_factory=dict)
     pending_actions: List[Dict[str, Any]] = []
 
 
-# Escalation rules configuration
+# Escalation rules configuration; levels marked "escalates" hand the query
+# beyond the site and set its status to escalated, reminders leave it as is
 ESCALATION_RULES = {
     "critical": {
         "initial_sla_hours": 24,
         "levels": [
             {"after_hours": 24, "escalate_to": "site_manager", "action": "urgent_reminder"},
-            {"after_hours": 48, "escalate_to": "medical_monitor", "action": "escalation_call"},
-            {"after_hours": 72, "escalate_to": "study_director", "action": "executive_escalation"}
+            {"after_hours": 48, "escalate_to": "medical_monitor", "action": "escalation_call", "escalates": True},
+            {"after_hours": 72, "escalate_to": "study_director", "action": "executive_escalation", "escalates": True}
         ]
     },
     "major": {
@@ -98,7 +45,7 @@ ESCALATION_RULES = {
         "levels": [
             {"after_hours": 72, "escalate_to": "site_coordinator", "action": "follow_up"},
             {"after_hours": 120, "escalate_to": "site_manager", "action": "reminder"},
-            {"after_hours": 168, "escalate_to": "cra_manager", "action": "escalation"}
+            {"after_hours": 168, "escalate_to": "cra_manager", "action": "escalation", "escalates": True}
         ]
     },
     "minor": {
@@ -111,6 +58,30 @@ ESCALATION_RULES = {
 }
 
 
+# Status changes a query may make; resolved queries can only be reopened
+# and cancelled queries are final
+STATUS_TRANSITIONS = {
+    QueryStatus.PENDING: frozenset({
+        QueryStatus.IN_PROGRESS, QueryStatus.RESOLVED, QueryStatus.CANCELLED, QueryStatus.ESCALATED
+    }),
+    QueryStatus.IN_PROGRESS: frozenset({
+        QueryStatus.PENDING, QueryStatus.RESOLVED, QueryStatus.CANCELLED, QueryStatus.ESCALATED
+    }),
+    QueryStatus.ESCALATED: frozenset({QueryStatus.IN_PROGRESS, QueryStatus.RESOLVED, QueryStatus.CANCELLED}),
+    QueryStatus.RESOLVED: frozenset({QueryStatus.IN_PROGRESS}),
+    QueryStatus.CANCELLED: frozenset()
+}
+
+
+def _apply_status(tracked_query: TrackedQuery, status: QueryStatus, updated_at: datetime) -> None:
+    """Set a query's status, keeping resolved_at in step with it."""
+    tracked_query.status = status
+    if status == QueryStatus.RESOLVED:
+        tracked_query.resolved_at = updated_at
+    else:
+        tracked_query.resolved_at = None
+
+
 @function_tool
 def track_clinical_query(tracking_request: str) -> str:
     """Start tracking a clinical query.
@@ -126,43 +97,58 @@ def track_clinical_query(tracking_request: str) -> str:
     except json.JSONDecodeError:
         return json.dumps({"error": "Invalid JSON in tracking_request"})
     
+    return json.dumps(_track_clinical_query(get_query_store(), query_data))
+
+
+def _parse_datetime(value: Union[None, str, datetime]) -> Optional[datetime]:
+    """datetime from an ISO string; None and datetimes pass through."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _track_clinical_query(store: QueryStore, query_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Store a new tracked query and return the tracking confirmation."""
     query_id = query_data.get("query_id")
     if not query_id:
-        return json.dumps({"error": "query_id is required"})
+        return {"error": "query_id is required"}
     
-    # Create tracked query data
-    tracked_query_data = {
-        "query_id": query_id,
-        "status": QueryStatus.PENDING.value,
-        "created_at": query_data.get("created_at", datetime.now().isoformat()),
-        "priority": query_data.get("priority", "major"),
-        "site_id": query_data.get("site_id"),
-        "subject_id": query_data.get("subject_id"),
-        "due_date": query_data.get("due_date"),
-        "resolved_at": None,
-        "escalation_level": 0,
-        "history": [{
-            "event_type": "query_tracked",
-            "description": f"Started tracking query {query_id}",
-            "timestamp": datetime.now().isoformat(),
-            "metadata": {}
-        }],
-        "metadata": query_data
-    }
-    
-    # Store tracking data (in a real implementation, this would persist to context/database)
-    # For now, we'll just return the confirmation
+    try:
+        created_at = _parse_datetime(query_data.get("created_at")) or datetime.now()
+        due_date = _parse_datetime(query_data.get("due_date"))
+    except (TypeError, ValueError) as e:
+        return {"error": f"Invalid date in tracking_request: {e}"}
+    
+    metadata = dict(query_data)
+    if metadata.get("sla_hours") not in (None, ""):
+        metadata["sla_hours"] = parse_sla_hours(metadata["sla_hours"])
+        if metadata["sla_hours"] is None:
+            return {"error": f"Invalid sla_hours in tracking_request: {query_data['sla_hours']!r}"}
+    
+    tracked_query = TrackedQuery(
+        query_id=query_id,
+        status=QueryStatus.PENDING,
+        created_at=created_at,
+        priority=query_data.get("priority") or "major",
+        site_id=query_data.get("site_id"),
+        subject_id=query_data.get("subject_id"),
+        due_date=due_date,
+        metadata=metadata
+    )
+    tracked_query.add_event("query_tracked", f"Started tracking query {query_id}")
+    try:
+        store.put(tracked_query)
+    except ValueError as e:
+        return {"error": f"Invalid tracking_request: {e}"}
     
-    result = {
+    return {
         "tracking_id": f"TRK_{query_id}",
         "query_id": query_id,
         "status": "tracking_started",
         "tracked_at": datetime.now().isoformat(),
-        "priority": tracked_query_data["priority"],
-        "due_date": tracked_query_data["due_date"]
+        "priority": tracked_query.priority,
+        "due_date": query_data.get("due_date")
     }
-    
-    return json.dumps(result)
 
 
 @function_tool
@@ -186,25 +172,119 @@ def update_query_status(update_request: str) -> str:
     if not query_id or not new_status:
         return json.dumps({"error": "query_id and new_status are required"})
     
+    return json.dumps(_update_query_status(get_query_store(), query_id, new_status, notes))
+
+
+def _update_query_status(
+    store: QueryStore,
+    query_id: str,
+    new_status: str,
+    notes: Optional[str] = None
+) -> Dict[str, Any]:
+    """Change a stored query's status and record the transition in its history.
+    
+    Transitions not allowed by STATUS_TRANSITIONS are rejected unwritten.
+    """
     # Validate status
     try:
         status_enum = QueryStatus(new_status)
     except ValueError:
         valid_statuses = [s.value for s in QueryStatus]
-        return json.dumps({"error": f"Invalid status. Valid options: {valid_statuses}"})
+        return {"error": f"Invalid status. Valid options: {valid_statuses}"}
     
-    # In a real implementation, would look up and update the stored query
-    # For now, simulate the update
-    result = {
+    tracked_query = store.get(query_id, with_history=False)
+    if tracked_query is None:
+        return {"success": False, "query_id": query_id, "error": f"Query {query_id} not found"}
+    
+    old_status = tracked_query.status
+    if old_status != status_enum and status_enum not in STATUS_TRANSITIONS[old_status]:
+        return {
+            "success": False,
+            "query_id": query_id,
+            "old_status": old_status.value,
+            "error": f"Cannot change status from {old_status.value} to {status_enum.value}"
+        }
+    
+    updated_at = datetime.now()
+    _apply_status(tracked_query, status_enum, updated_at)
+    store.save(tracked_query)
+    store.add_event(query_id, QueryEvent(
+        "status_changed",
+        f"Status changed from {old_status.value} to {status_enum.value}",
+        timestamp=updated_at,
+        metadata={"old_status": old_status.value, "new_status": status_enum.value, "notes": notes}
+    ))
+    
+    return {
         "success": True,
         "query_id": query_id,
-        "old_status": "pending",  # Would come from stored data
-        "new_status": new_status,
-        "updated_at": datetime.now().isoformat(),
+        "old_status": old_status.value,
+        "new_status": status_enum.value,
+        "updated_at": updated_at.isoformat(),
         "notes": notes
     }
+
+
+def _bulk_update_status(
+    store: QueryStore,
+    query_ids: List[str],
+    new_status: str,
+    notes: Optional[str] = None
+) -> Dict[str, Any]:
+    """Change many stored queries' status in one transaction.
     
-    return json.dumps(result)
+    Every id is checked before anything is written. The outcome map gives
+    each requested id "updated", "unchanged" (already in new_status),
+    "invalid_transition" (not allowed by STATUS_TRANSITIONS) or
+    "not_found"; only updated queries are written and get a
+    status_changed event.
+    """
+    try:
+        status_enum = QueryStatus(new_status)
+    except ValueError:
+        valid_statuses = [s.value for s in QueryStatus]
+        return {"success": False, "error": f"Invalid status. Valid options: {valid_statuses}"}
+    
+    stored = store.get_many(query_ids)
+    updated_at = datetime.now()
+    outcomes: Dict[str, str] = {}
+    updated: List[TrackedQuery] = []
+    events = []
+    for query_id in query_ids:
+        if query_id in outcomes:
+            continue
+        tracked_query = stored.get(query_id)
+        if tracked_query is None:
+            outcomes[query_id] = "not_found"
+            continue
+        if tracked_query.status == status_enum:
+            outcomes[query_id] = "unchanged"
+            continue
+        if status_enum not in STATUS_TRANSITIONS[tracked_query.status]:
+            outcomes[query_id] = "invalid_transition"
+            continue
+        
+        old_status = tracked_query.status
+        _apply_status(tracked_query, status_enum, updated_at)
+        updated.append(tracked_query)
+        events.append((query_id, QueryEvent(
+            "status_changed",
+            f"Status changed from {old_status.value} to {status_enum.value}",
+            timestamp=updated_at,
+            metadata={"old_status": old_status.value, "new_status": status_enum.value, "notes": notes, "bulk": True}
+        )))
+        outcomes[query_id] = "updated"
+    
+    store.save_statuses(updated, events)
+    
+    return {
+        "success": True,
+        "new_status": status_enum.value,
+        "updated_count": len(updated),
+        "total_requested": len(query_ids),
+        "updated_at": updated_at.isoformat(),
+        "outcomes": outcomes
+    }
 
 
 @function_tool
@@ -222,30 +302,43 @@ def check_queries_for_follow_up(check_request: str = "{}") -> str:
     except json.JSONDecodeError:
         request_data = {}
     
-    # In a real implementation, would query stored data
-    # For demonstration, return sample follow-ups
-    follow_ups = [
-        {
-            "query_id": "QRY_001_20241201120000",
-            "action": "follow_up",
-            "escalate_to": "site_coordinator",
-            "age_hours": 76,
-            "priority": "major",
-            "escalation_level": 1,
-            "priority_score": 576
-        },
-        {
-            "query_id": "QRY_002_20241201080000",
-            "action": "urgent_reminder",
-            "escalate_to": "site_manager",
-            "age_hours": 28,
-            "priority": "critical",
-            "escalation_level": 2,
-            "priority_score": 1028
-        }
-    ]
+    try:
+        return json.dumps(_check_queries_for_follow_up(get_escalation_scheduler(), request_data))
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
+
+def _parse_limit(value: Any) -> Optional[int]:
+    """Non-negative int from an int or digit string; None for None.
     
-    return json.dumps(follow_ups)
+    Raises:
+        ValueError: If value is not a whole non-negative number
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    raise ValueError(f"Invalid limit in check_request: {value!r}")
+
+
+def _check_queries_for_follow_up(
+    scheduler: EscalationScheduler,
+    request_data: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Escalations that are due now, earliest deadline first.
+    
+    The priority filter is applied while walking the schedule, so limit
+    counts only follow-ups of that priority.
+    
+    Raises:
+        ValueError: If limit is not a whole non-negative number
+    """
+    return scheduler.due(
+        limit=_parse_limit(request_data.get("limit")),
+        priority=request_data.get("priority") or None
+    )
 
 
 @function_tool
@@ -343,16 +436,18 @@ Use the available tools to:
 class QueryTracker:
     """Wrapper class for Query Tracker agent."""
     
-    def __init__(self):
-        """Initialize the Query Tracker."""
+    def __init__(self, store: Optional[QueryStore] = None):
+        """Initialize the Query Tracker.
+        
+        Queries are kept in the given store, by default the process-wide
+        store for Settings.database_url that the agent's tools also use.
+        """
         self.agent = query_tracker_agent
-        self.context = QueryTrackerContext()
+        self._store = store
+        self.context = QueryTrackerContext(tracked_queries=self.store)
         self.escalation_rules = ESCALATION_RULES
-        
-        # Initialize tracked_queries and ensure sync with context
-        if not hasattr(self.context, 'tracked_queries'):
-            self.context.tracked_queries = {}
-        self.tracked_queries = self.context.tracked_queries
+        self._escalation_scheduler: Optional[EscalationScheduler] = None
+        self._metrics: Optional[QueryMetrics] = None
         
         # Mock assistant for test compatibility
         self.assistant = type('obj', (object,), {
@@ -362,12 +457,40 @@ class QueryTracker:
         
         self.instructions = self.agent.instructions
     
+    @property
+    def store(self) -> QueryStore:
+        """Store holding this tracker's queries."""
+        # Resolved on use so a long-lived tracker follows the store being reopened
+        return self._store if self._store is not None else get_query_store()
+    
+    @property
+    def tracked_queries(self) -> QueryStore:
+        """Tracked queries by query_id (the store's mapping interface)."""
+        return self.store
+    
+    @property
+    def escalation_scheduler(self) -> EscalationScheduler:
+        """Escalation deadlines for the queries in this tracker's store."""
+        if self._store is None:
+            return get_escalation_scheduler()
+        if self._escalation_scheduler is None:
+            self._escalation_scheduler = EscalationScheduler(self._store, self.escalation_rules)
+            self._escalation_scheduler.rebuild()
+        return self._escalation_scheduler
+    
+    @property
+    def metrics(self) -> QueryMetrics:
+        """Live counters over the queries in this tracker's store."""
+        if self._store is None:
+            return get_query_metrics()
+        if self._metrics is None:
+            self._metrics = QueryMetrics(self._store, self.escalation_rules)
+            self._metrics.rebuild()
+        return self._metrics
+    
     async def track_query(self, query_data: Dict[str, Any]) -> Dict[str, Any]:
         """Start tracking a query."""
-        result_str = track_clinical_query(json.dumps(query_data))
-        result = json.loads(result_str)
-        self.tracked_queries = self.context.tracked_queries
-        return result
+        return _track_clinical_query(self.store, query_data)
     
     async def update_status(
         self,
@@ -376,22 +499,11 @@ class QueryTracker:
         notes: Optional[str] = None
     ) -> Dict[str, Any]:
         """Update query status."""
-        request_data = {
-            "query_id": query_id,
-            "new_status": new_status.value,
-            "notes": notes
-        }
-        result_str = update_query_status(json.dumps(request_data))
-        result = json.loads(result_str)
-        # Always sync both directions
-        self.tracked_queries = self.context.tracked_queries
-        self.context.tracked_queries = self.tracked_queries
-        return result
+        return _update_query_status(self.store, query_id, new_status.value, notes)
     
     async def check_follow_ups(self) -> List[Dict[str, Any]]:
         """Check for queries needing follow-up."""
-        result_str = check_queries_for_follow_up("{}")
-        return json.loads(result_str)
+        return _check_queries_for_follow_up(self.escalation_scheduler, {})
     
     async def generate_follow_up(
         self,
@@ -428,46 +540,17 @@ class QueryTracker:
     async def bulk_update_status(
         self,
         query_ids: List[str],
-        new_status: QueryStatus
+        new_status: QueryStatus,
+        notes: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Update multiple queries at once."""
-        updated = 0
-        for query_id in query_ids:
-            result = await self.update_status(query_id, new_status)
-            if result["success"]:
-                updated += 1
-        
-        # Sync the tracked_queries with context
-        self.tracked_queries = self.context.tracked_queries
-        
-        return {
-            "success": True,
-            "updated_count": updated,
-            "total_requested": len(query_ids)
-        }
+        """Update multiple queries at once, in a single transaction."""
+        return _bulk_update_status(self.store, query_ids, new_status.value, notes)
     
     def get_metrics(self) -> Dict[str, Any]:
-        """Get tracking metrics."""
-        total = len(self.tracked_queries)
-        if total == 0:
-            return {
-                "total_queries": 0,
-                "pending_queries": 0,
-                "in_progress_queries": 0,
-                "resolved_queries": 0,
-                "resolution_rate": 0.0
-            }
-        
-        status_counts = {
-            "pending": 0,
-            "in_progress": 0,
-            "resolved": 0,
-            "cancelled": 0,
-            "escalated": 0
-        }
-        
-        for query in self.tracked_queries.values():
-            status_counts[query.status.value] += 1
+        """Get tracking metrics from the live counters."""
+        snapshot = self.metrics.snapshot()
+        total = snapshot["total"]
+        status_counts = snapshot["status"]
         
         return {
             "total_queries": total,
@@ -476,24 +559,26 @@ class QueryTracker:
             "resolved_queries": status_counts["resolved"],
             "cancelled_queries": status_counts["cancelled"],
             "escalated_queries": status_counts["escalated"],
-            "resolution_rate": status_counts["resolved"] / total
+            "resolution_rate": status_counts["resolved"] / total if total else 0.0,
+            "priority_breakdown": snapshot["priority"],
+            "sla_risk": snapshot["sla_risk"]
         }
     
     async def check_sla_status(self, query_id: str) -> Dict[str, Any]:
         """Check SLA status for a query."""
-        if query_id not in self.tracked_queries:
+        query = self.store.get(query_id, with_history=False)
+        if query is None:
             return {"error": f"Query {query_id} not found"}
         
-        query = self.tracked_queries[query_id]
-        sla_hours = query.metadata.get("sla_hours", 120)  # Default 5 days
+        query_sla_hours = sla_hours(query, self.escalation_rules)
         
         age_hours = (datetime.now() - query.created_at).total_seconds() / 3600
-        hours_remaining = sla_hours - age_hours
-        percentage_consumed = (age_hours / sla_hours) * 100
+        hours_remaining = query_sla_hours - age_hours
+        percentage_consumed = (age_hours / query_sla_hours) * 100
         
         return {
             "query_id": query_id,
-            "sla_hours": sla_hours,
+            "sla_hours": query_sla_hours,
             "age_hours": age_hours,
             "hours_remaining": max(0, hours_remaining),
             "percentage_consumed": min(100, percentage_consumed),
@@ -501,6 +586,10 @@ class QueryTracker:
             "breached": percentage_consumed >= 100
         }
     
+    def forecast_sla(self, horizon_hours: float = 72, bucket_hours: float = 24) -> Dict[str, Any]:
+        """Forecast SLA breaches and escalation load across all open queries."""
+        return SLAForecaster(self.store, self.escalation_rules).forecast(horizon_hours, bucket_hours)
+    
     async def add_history_event(
         self,
         query_id: str,
@@ -509,27 +598,23 @@ class QueryTracker:
         **metadata
     ) -> None:
         """Add event to query history."""
-        if query_id in self.tracked_queries:
-            self.tracked_queries[query_id].add_event(event_type, description, **metadata)
+        if query_id in self.store:
+            self.store.add_event(query_id, QueryEvent(event_type, description, metadata=metadata))
     
     def get_query_history(self, query_id: str) -> List[Dict[str, Any]]:
         """Get query history."""
-        if query_id not in self.tracked_queries:
-            return []
-        
-        return [e.to_dict() for e in self.tracked_queries[query_id].history]
+        return [e.to_dict() for e in self.store.history(query_id)]
     
     async def auto_close_old_queries(self, days_old: int = 30) -> Dict[str, Any]:
         """Auto-close old resolved queries."""
-        closed = []
         cutoff_date = datetime.now() - timedelta(days=days_old)
         
-        for query_id, query in list(self.tracked_queries.items()):
-            if (query.status == QueryStatus.RESOLVED and 
-                query.resolved_at and 
-                query.resolved_at < cutoff_date):
-                del self.tracked_queries[query_id]
-                closed.append(query_id)
+        closed = [
+            query.query_id
+            for query in self.store.find(status=QueryStatus.RESOLVED)
+            if query.resolved_at and query.resolved_at < cutoff_date
+        ]
+        self.store.delete_many(closed)
         
         return {
             "closed_count": len(closed),
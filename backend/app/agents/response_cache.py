@@ -0,0 +1,170 @@
+"""Response cache for LLM agent runs.
+
+Repeated prompts to the same agent (dashboard widgets re-issue the same
+summary prompts every few seconds) are answered from a cache keyed on the
+normalized message and a fingerprint of the agent's instructions, model,
+model settings and tool signatures. The backend is either the in-process
+TTLCache or the on-disk SQLiteTTLCache, both evicting by LRU and TTL.
+
+Runs whose tool outputs or final output contain per-call identifiers
+(workflow, query or assessment IDs generated for that call) are not
+cached unless cache_per_call_ids is set.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+import hashlib
+import json
+import re
+import threading
+
+from agents import Runner
+
+from app.core.cache import SQLiteTTLCache, TTLCache
+from app.core.config import get_settings
+
+# IDs the agents generate per call: PREFIX_[SUBJECT_]YYYYmmddHHMMSS[_hex], PREFIX_<epoch>,
+# PREFIX_<hex8> and UUIDs
+PER_CALL_ID_PATTERN = re.compile(
+    r"\b[A-Z]{2,5}_(?:[A-Za-z0-9]+_)?(?:\d{10,14}(?:_[0-9a-f]{6})?|[0-9a-f]{8})\b"
+    r"|\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"
+)
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def _normalize_message(message: str) -> str:
+    """Message with case and whitespace differences removed."""
+    return " ".join(message.split()).casefold()
+
+
+def agent_fingerprint(agent: Any) -> Optional[str]:
+    """Digest of what determines an agent's answer, or None if it is not stable.
+
+    Agents with dynamic (callable) instructions have no stable fingerprint.
+    """
+    instructions = getattr(agent, "instructions", None)
+    if callable(instructions):
+        return None
+
+    tools = []
+    for tool in getattr(agent, "tools", None) or []:
+        schema = getattr(tool, "params_json_schema", None)
+        tools.append([
+            type(tool).__name__,
+            str(getattr(tool, "name", "")),
+            json.dumps(schema, sort_keys=True, default=str)
+        ])
+    tools.sort()
+
+    model = getattr(agent, "model", None)
+    signature = {
+        "name": str(getattr(agent, "name", "")),
+        "instructions": instructions or "",
+        "model": model if isinstance(model, str) or model is None else type(model).__name__,
+        "model_settings": repr(getattr(agent, "model_settings", None)),
+        "tools": tools
+    }
+    return hashlib.sha256(json.dumps(signature, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _iter_tool_outputs(result: Any) -> Iterator[str]:
+    for item in getattr(result, "new_items", None) or []:
+        if getattr(item, "type", None) == "tool_call_output_item":
+            output = getattr(item, "output", "")
+            yield output if isinstance(output, str) else json.dumps(output, default=str)
+
+
+def contains_per_call_ids(result: Any) -> bool:
+    """Whether a run's tool outputs or final output carry per-call identifiers."""
+    if PER_CALL_ID_PATTERN.search(str(getattr(result, "final_output", ""))):
+        return True
+    return any(PER_CALL_ID_PATTERN.search(output) for output in _iter_tool_outputs(result))
+
+
+class ResponseCache:
+    """Runner.run front end that serves repeated prompts from a cache backend.
+
+    With backend=None every call goes to Runner.run.
+    """
+
+    def __init__(self, backend: Any = None, cache_per_call_ids: bool = False):
+        self.backend = backend
+        self.cache_per_call_ids = cache_per_call_ids
+        self.uncacheable = 0
+
+    def cache_key(self, agent: Any, message: str) -> Optional[str]:
+        """Cache key for a message to an agent, or None if it cannot be cached."""
+        fingerprint = agent_fingerprint(agent)
+        if fingerprint is None:
+            return None
+        digest = hashlib.sha256(_normalize_message(message).encode()).hexdigest()
+        return f"agent_run:{fingerprint}:{digest}"
+
+    async def run(self, agent: Any, message: str, context: Any = None) -> Tuple[Any, bool]:
+        """Final output for message and whether it came from the cache."""
+        key = self.cache_key(agent, message) if self.backend is not None else None
+        if key is not None:
+            cached = self.backend.get(key)
+            if cached is not None:
+                return cached, True
+
+        result = await Runner.run(agent, message, context=context)
+        output = result.final_output
+
+        if key is not None:
+            if isinstance(output, str) and (self.cache_per_call_ids or not contains_per_call_ids(result)):
+                self.backend.set(key, output)
+            else:
+                self.uncacheable += 1
+        return output, False
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend hit/miss statistics plus the number of uncacheable runs."""
+        if self.backend is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.backend.stats(), "uncacheable": self.uncacheable}
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache configured from Settings."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                settings = get_settings()
+                backend = None
+                if settings.response_cache_enabled:
+                    if settings.response_cache_backend == "sqlite":
+                        backend = SQLiteTTLCache(
+                            settings.response_cache_path,
+                            settings.response_cache_size,
+                            settings.response_cache_ttl
+                        )
+                    else:
+                        backend = TTLCache(settings.response_cache_size, settings.response_cache_ttl)
+                _response_cache = ResponseCache(backend, settings.response_cache_per_call_ids)
+    return _response_cache
+
+
+def shutdown_response_cache() -> None:
+    """Release the process-wide response cache and its backend."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is not None and hasattr(_response_cache.backend, "close"):
+            _response_cache.backend.close()
+        _response_cache = None
+
+
+__all__ = [
+    "ResponseCache",
+    "agent_fingerprint",
+    "contains_per_call_ids",
+    "get_response_cache",
+    "shutdown_response_cache"
+]
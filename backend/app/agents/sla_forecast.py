@@ -0,0 +1,233 @@
+"""Portfolio-level SLA breach forecasting for tracked queries.
+
+SLAForecaster reads the open queries of a QueryStore as columns (creation
+time, priority, site, escalation level and any per-query sla_hours) and
+computes, for all of them at once:
+
+- the queries that breach their SLA within the next horizon_hours,
+- a cumulative breach curve per site at bucket_hours steps, and
+- the escalations expected per day from the escalation rules.
+
+Forecasts assume nothing is resolved in the meantime. With numpy the
+work is vectorized over the columns, which keeps 100k+ open queries well
+under a second; without it the same forecast is computed query by query.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import math
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    # Forecasts fall back to the scalar path
+    np = None
+
+from app.agents.query_metrics import DEFAULT_SLA_HOURS
+from app.agents.query_store import OPEN_STATUSES, QueryStore, parse_sla_hours
+
+# Site key for queries without a site_id
+UNASSIGNED_SITE = "unassigned"
+
+# Most breaching queries listed individually; breaching_count covers all of them
+MAX_LISTED_BREACHES = 1000
+
+_COLUMNS = ("query_id", "priority", "site_id", "created_at", "escalation_level")
+
+# (query ids, priorities, site ids, created_at, escalation levels, per-query SLA hours or None)
+_Columns = Tuple[Sequence[str], Sequence[str], Sequence[Optional[str]], Sequence[float], Sequence[int], Sequence[Optional[float]]]
+
+
+def _codes(values: Sequence[Any]) -> Tuple[List[Any], "np.ndarray"]:
+    """Distinct values in first-seen order and each value's index among them."""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.intp, count=len(values))
+    return list(index), codes
+
+
+class SLAForecaster:
+    """SLA breach and escalation forecasts over the open queries in a store."""
+
+    def __init__(self, store: QueryStore, rules: Dict[str, Dict[str, Any]]):
+        self.store = store
+        self.rules = rules
+
+    def _sla_hours(self, priority: str) -> float:
+        return float(self.rules.get(priority, {}).get("initial_sla_hours", DEFAULT_SLA_HOURS))
+
+    def _escalation_hours(self, priority: str) -> List[float]:
+        levels = self.rules.get(priority, self.rules["major"])["levels"]
+        return [float(level["after_hours"]) for level in levels]
+
+    def _load(self) -> _Columns:
+        rows = self.store.scan(_COLUMNS, metadata_keys=("sla_hours",), status=OPEN_STATUSES)
+        if not rows:
+            return (), (), (), (), (), ()
+        return tuple(zip(*rows))
+
+    def forecast(
+        self,
+        horizon_hours: float = 72,
+        bucket_hours: float = 24,
+        now: Optional[float] = None,
+        limit: int = MAX_LISTED_BREACHES
+    ) -> Dict[str, Any]:
+        """Breaches, per-site breach curves and escalation load over the horizon.
+
+        Breaching queries are listed soonest first, at most limit of them.
+        Each site curve gives the number of its open queries breached by
+        each of curve_hours from now (hour 0 counts those already
+        breached). escalation_load counts the escalations falling due in
+        each 24-hour day from now; queries already overdue for their
+        next level count once, on the first day.
+        """
+        if horizon_hours <= 0 or bucket_hours <= 0:
+            raise ValueError("horizon_hours and bucket_hours must be positive")
+        now = time.time() if now is None else now
+        columns = self._load()
+        buckets = math.ceil(horizon_hours / bucket_hours)
+        days = math.ceil(horizon_hours / 24)
+
+        compute = self._forecast_vectorized if np is not None else self._forecast_scalar
+        breaching, already_breached, curves, load = compute(columns, now, horizon_hours, bucket_hours, buckets, days)
+
+        return {
+            "generated_at": datetime.fromtimestamp(now).isoformat(),
+            "horizon_hours": horizon_hours,
+            "open_queries": len(columns[0]),
+            "already_breached": already_breached,
+            "breaching_count": len(breaching),
+            "breaching": [
+                {
+                    "query_id": columns[0][index],
+                    "priority": columns[1][index],
+                    "site_id": columns[2][index] or UNASSIGNED_SITE,
+                    "breach_at": datetime.fromtimestamp(breach_at).isoformat(),
+                    "hours_to_breach": round((breach_at - now) / 3600, 2)
+                }
+                for index, breach_at in breaching[:limit]
+            ],
+            "curve_hours": [bucket * bucket_hours for bucket in range(buckets + 1)],
+            "site_breach_curves": curves,
+            "escalation_load": [
+                {"day": day, "date": datetime.fromtimestamp(now + day * 86400).date().isoformat(), "escalations": count}
+                for day, count in enumerate(load)
+            ]
+        }
+
+    def _forecast_vectorized(
+        self,
+        columns: _Columns,
+        now: float,
+        horizon_hours: float,
+        bucket_hours: float,
+        buckets: int,
+        days: int
+    ) -> Tuple[List[Tuple[int, float]], int, Dict[str, List[int]], List[int]]:
+        query_ids, priorities, sites, created_at, levels, sla_hours = columns
+        count = len(query_ids)
+        if count == 0:
+            return [], 0, {}, [0] * days
+
+        priority_names, priority_index = _codes(priorities)
+        site_names, site_index = _codes([site or UNASSIGNED_SITE for site in sites])
+        created = np.fromiter(created_at, dtype=float, count=count)
+        escalation_level = np.fromiter(levels, dtype=int, count=count)
+        own_sla = np.fromiter((parse_sla_hours(hours) or np.nan for hours in sla_hours), dtype=float, count=count)
+
+        priority_sla = np.array([self._sla_hours(name) for name in priority_names])
+        sla = np.where(np.isnan(own_sla), priority_sla[priority_index], own_sla)
+        breach_at = created + sla * 3600
+
+        # Breaches within the horizon, soonest first
+        end = now + horizon_hours * 3600
+        within = np.flatnonzero((breach_at > now) & (breach_at <= end))
+        within = within[np.argsort(breach_at[within], kind="stable")]
+        breaching = list(zip(within.tolist(), breach_at[within].tolist()))
+        already_breached = int(np.count_nonzero(breach_at <= now))
+
+        # Cumulative breaches per site at each bucket edge
+        bucket_seconds = bucket_hours * 3600
+        bucket = np.maximum(np.ceil((breach_at - now) / bucket_seconds), 0)
+        counted = bucket <= buckets
+        width = buckets + 1
+        flat = site_index[counted] * width + bucket[counted].astype(int)
+        curves = np.bincount(flat, minlength=len(site_names) * width).reshape(len(site_names), width).cumsum(axis=1)
+        site_curves = {name: curves[row].tolist() for row, name in sorted(enumerate(site_names), key=lambda item: item[1])}
+
+        # Escalation deadlines per day; padded levels are NaN
+        level_hours = [self._escalation_hours(name) for name in priority_names]
+        table = np.full((len(priority_names), max(len(hours) for hours in level_hours)), np.nan)
+        for row, hours in enumerate(level_hours):
+            table[row, :len(hours)] = hours
+        load = np.zeros(days, dtype=int)
+        overdue = np.zeros(count, dtype=bool)
+        for level in range(table.shape[1]):
+            after = table[priority_index, level]
+            pending = (escalation_level < level + 1) & ~np.isnan(after)
+            deadline = created + np.nan_to_num(after) * 3600
+            overdue |= pending & (deadline <= now)
+            upcoming = pending & (deadline > now) & (deadline < now + days * 86400)
+            load += np.bincount(((deadline[upcoming] - now) // 86400).astype(int), minlength=days)[:days]
+        load[0] += int(np.count_nonzero(overdue))
+
+        return breaching, already_breached, site_curves, load.tolist()
+
+    def _forecast_scalar(
+        self,
+        columns: _Columns,
+        now: float,
+        horizon_hours: float,
+        bucket_hours: float,
+        buckets: int,
+        days: int
+    ) -> Tuple[List[Tuple[int, float]], int, Dict[str, List[int]], List[int]]:
+        query_ids, priorities, sites, created_at, levels, sla_hours = columns
+        end = now + horizon_hours * 3600
+        bucket_seconds = bucket_hours * 3600
+        breaching: List[Tuple[int, float]] = []
+        already_breached = 0
+        site_counts: Dict[str, List[int]] = {}
+        load = [0] * days
+
+        for index in range(len(query_ids)):
+            sla = parse_sla_hours(sla_hours[index]) or self._sla_hours(priorities[index])
+            breach_at = created_at[index] + sla * 3600
+            if breach_at <= now:
+                already_breached += 1
+            elif breach_at <= end:
+                breaching.append((index, breach_at))
+
+            counts = site_counts.setdefault(sites[index] or UNASSIGNED_SITE, [0] * (buckets + 1))
+            bucket = max(math.ceil((breach_at - now) / bucket_seconds), 0)
+            if bucket <= buckets:
+                counts[bucket] += 1
+
+            overdue = False
+            for level, after in enumerate(self._escalation_hours(priorities[index]), start=1):
+                if levels[index] >= level:
+                    continue
+                deadline = created_at[index] + after * 3600
+                if deadline <= now:
+                    overdue = True
+                elif deadline < now + days * 86400:
+                    load[int((deadline - now) // 86400)] += 1
+            if overdue:
+                load[0] += 1
+
+        breaching.sort(key=lambda item: item[1])
+        curves = {}
+        for site in sorted(site_counts):
+            total, curve = 0, []
+            for bucket_count in site_counts[site]:
+                total += bucket_count
+                curve.append(total)
+            curves[site] = curve
+        return breaching, already_breached, curves, load
+
+
+__all__ = [
+    "SLAForecaster",
+    "UNASSIGNED_SITE"
+]
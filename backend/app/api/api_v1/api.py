@@ -1,9 +1,11 @@
 """Main API router for v1 endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from app.api.endpoints.agents import agents_router
 from app.api.endpoints.test_data import router as test_data_router
+from app.api.endpoints.verification import verification_router
+from app.api.dependencies import validate_rate_limits
 
 
 api_router = APIRouter()
@@ -12,7 +14,8 @@ api_router = APIRouter()
 api_router.include_router(
     agents_router,
     prefix="/agents",
-    tags=["agents"]
+    tags=["agents"],
+    dependencies=[Depends(validate_rate_limits)]
 )
 
 # Include test data endpoints
@@ -20,4 +23,12 @@ api_router.include_router(
     test_data_router,
     prefix="/test-data",
     tags=["test-data"]
-)
\ No newline at end of file
+)
+
+# Include bulk verification endpoints
+api_router.include_router(
+    verification_router,
+    prefix="/verification",
+    tags=["verification"],
+    dependencies=[Depends(validate_rate_limits)]
+)
@@ -2,11 +2,13 @@
 
 from functools import lru_cache
 from typing import Optional
+import math
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core.config import Settings, get_settings
+from app.core.rate_limit import get_rate_limiter
 from app.agents.portfolio_manager import PortfolioManager
 from app.agents.query_analyzer import QueryAnalyzer
 from app.agents.data_verifier import DataVerifier
@@ -155,26 +157,87 @@ def get_request_context(request) -> dict:
     }
 
 
-async def validate_rate_limits(
-    request,
-    settings: Settings = Depends(get_current_settings)
+def _client_ip(request: Request, trusted_proxy_hops: int) -> str:
+    """IP of the client, looking through trusted_proxy_hops reverse proxies.
+    
+    Each trusted proxy appends the address it received the request from to
+    X-Forwarded-For, so the client is the entry trusted_proxy_hops from the
+    right. Entries further left are whatever the client sent and are ignored.
+    """
+    if trusted_proxy_hops > 0:
+        forwarded_for = [
+            host.strip()
+            for header in request.headers.getlist("x-forwarded-for")
+            for host in header.split(",")
+            if host.strip()
+        ]
+        if len(forwarded_for) >= trusted_proxy_hops:
+            return forwarded_for[-trusted_proxy_hops]
+    return request.client.host if request.client else "unknown"
+
+
+def _rate_limit_key(request: Request, settings: Settings) -> str:
+    """Client identity for rate limiting: the client IP.
+    
+    Bearer tokens are not verified yet, so they cannot identify a client;
+    keying on them would give every made-up token a fresh budget. Behind
+    a reverse proxy set TRUSTED_PROXY_HOPS, or every client shares the
+    proxy's bucket.
+    """
+    return f"ip:{_client_ip(request, settings.trusted_proxy_hops)}"
+
+
+def get_client_key(request: Request, settings: Settings = Depends(get_current_settings)) -> str:
+    """Client identity used for rate limits and for owning submitted batches."""
+    return _rate_limit_key(request, settings)
+
+
+async def charge_rate_limit(
+    request: Request,
+    settings: Settings,
+    cost: float = 1.0,
+    response: Optional[Response] = None
 ) -> bool:
-    """Validate rate limits for API requests."""
-    # TODO: Implement actual rate limiting
-    # For now, just return True
-    # In production, integrate with Redis for distributed rate limiting
+    """Spend cost tokens from the client's bucket, raising 429 if it runs out.
     
-    if settings.debug:
+    Each client has a bucket of rate_limit_requests tokens refilled over
+    rate_limit_window seconds. Exhausted clients get 429 with Retry-After.
+    Debug mode is not limited.
+    """
+    if settings.debug or cost <= 0:
         return True
     
-    # Basic rate limiting could check:
-    # - Requests per minute/hour per IP
-    # - Requests per minute/hour per API key
-    # - Total system load
+    result = await get_rate_limiter(settings).check(_rate_limit_key(request, settings), cost=cost)
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining)
+    }
     
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded. Please retry later.",
+            headers={**headers, "Retry-After": str(math.ceil(result.retry_after))}
+        )
+    
+    if response is not None:
+        response.headers.update(headers)
     return True
 
 
+async def validate_rate_limits(
+    request: Request,
+    settings: Settings = Depends(get_current_settings),
+    response: Response = None
+) -> bool:
+    """Validate rate limits for API requests: one token per request.
+    
+    Endpoints doing work per item (such as batch chat) charge the
+    remaining items themselves with charge_rate_limit().
+    """
+    return await charge_rate_limit(request, settings, response=response)
+
+
 def get_agent_health_checker():
     """Get agent health checker dependency."""
     async def check_agent_health(agent_id: str) -> dict:
@@ -1,8 +1,8 @@
 """Agent interaction endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from typing import Dict, Any
-import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator
 import time
 import json
 
@@ -12,14 +12,19 @@ from agents import Runner
 from app.api.models.agent_models import (
     ChatRequest, ChatResponse, WorkflowExecutionRequest, WorkflowExecutionResponse,
     AgentStatusResponse, WorkflowStatusRequest, WorkflowStatusResponse,
-    AgentHealthResponse, BatchChatRequest, BatchChatResponse
+    AgentHealthResponse, BatchChatRequest, BatchChatResponse, BatchChatSubmitResponse
 )
 from app.api.dependencies import (
     get_portfolio_manager, get_agent_by_type, validate_openai_key,
-    validate_workflow_permissions, get_request_context
+    validate_workflow_permissions, get_request_context,
+    charge_rate_limit, get_current_settings, get_client_key
 )
+from app.core.config import Settings
 from app.agents.portfolio_manager import PortfolioManager, WorkflowRequest
+from app.agents.clinical_router import route_clinical_message
+from app.agents.response_cache import get_response_cache
 from app.agents.base_agent import AgentResponse
+from app.services.batch_chat_service import BatchItemResult, BatchJob, get_batch_chat_service
 
 
 agents_router = APIRouter()
@@ -53,7 +58,12 @@ async def chat_with_agent(
         message_lower = request.message.lower()
         clinical_keywords = ['analyze', 'hemoglobin', 'blood pressure', 'clinical', 'subject', 'discrepancy', 'verify']
         
-        if any(keyword in message_lower for keyword in clinical_keywords):
+        # Structured lab/vitals payloads are answered locally without the LLM
+        fast_response = route_clinical_message(request.message)
+        
+        if fast_response is not None:
+            response = fast_response
+        elif any(keyword in message_lower for keyword in clinical_keywords):
             # Use workflow orchestration for clinical tasks
             workflow_type = "comprehensive_analysis"
             if "verify" in message_lower or "verification" in message_lower:
@@ -97,12 +107,13 @@ Execute your tools and show the actual results, not just planning descriptions.
                 content=sdk_result.final_output,
                 agent_id="portfolio-manager",
                 execution_time=0.0,
-                metadata={"workflow_executed": True, "workflow_type": workflow_type, "tools_used": True}
+                metadata={"workflow_executed": True, "workflow_type": workflow_type, "tools_used": True, "route": "llm"}
             )
         else:
-            # Process as simple message using OpenAI Agents SDK
+            # Process as simple message using OpenAI Agents SDK; repeated
+            # prompts (e.g. dashboard summaries) are served from the response cache
             
-            sdk_result = await Runner.run(
+            output, cache_hit = await get_response_cache().run(
                 agent.agent,  # Use the actual SDK agent
                 request.message,
                 context=agent.context
@@ -110,10 +121,10 @@ Execute your tools and show the actual results, not just planning descriptions.
             
             response = AgentResponse(
                 success=True,
-                content=sdk_result.final_output,
+                content=output,
                 agent_id="portfolio-manager",
                 execution_time=0.0,
-                metadata={"simple_query": True, "tools_available": True}
+                metadata={"simple_query": True, "tools_available": True, "route": "llm", "cache_hit": cache_hit}
             )
         
         execution_time = time.time() - start_time
@@ -127,7 +138,10 @@ Execute your tools and show the actual results, not just planning descriptions.
             metadata={
                 "request_context": context,
                 "tokens_used": response.metadata.get("tokens_used", 0),
-                "model": response.metadata.get("model", "unknown")
+                "model": response.metadata.get("model", "unknown"),
+                "route": response.metadata.get("route", "llm"),
+                "fast_path_rule": response.metadata.get("fast_path_rule"),
+                "cache_hit": response.metadata.get("cache_hit", False)
             }
         )
         
@@ -375,73 +389,167 @@ async def reset_agent_system(
         )
 
 
+def _batch_item_response(result: BatchItemResult) -> ChatResponse:
+    """ChatResponse for one batch item, with its position and timings in metadata."""
+    return ChatResponse(
+        success=result.success,
+        response=result.content,
+        agent_id=result.agent_id,
+        execution_time=result.execution_time,
+        error=result.error,
+        metadata={
+            **result.metadata,
+            "index": result.index,
+            "queue_time": result.queue_time,
+            "latency": result.latency
+        }
+    )
+
+
+def _batch_chat_response(job: BatchJob) -> BatchChatResponse:
+    """Current state of a batch; responses are the completed items in input order."""
+    finished_at = job.completed_at or time.time()
+    return BatchChatResponse(
+        batch_id=job.batch_id,
+        responses=[_batch_item_response(result) for result in job.completed_results()],
+        total_requests=job.total,
+        successful_requests=job.successful,
+        failed_requests=job.failed,
+        total_execution_time=max(finished_at - job.created_at, 0.0),
+        status=job.status,
+        completed_requests=job.completed,
+        latency=job.latency_summary()
+    )
+
+
+def _batch_concurrency(request: BatchChatRequest) -> int:
+    return request.max_concurrency if request.parallel_execution else 1
+
+
+async def _charge_batch_items(
+    request: BatchChatRequest,
+    http_request: Request,
+    response: Response,
+    settings: Settings
+) -> None:
+    # The router's rate limit dependency charged one token for the request;
+    # charge the other items so a batch costs one token per message. A batch
+    # larger than the bucket could never be paid for, so it costs a full
+    # bucket instead and Retry-After stays the time to refill it.
+    cost = min(len(request.requests), settings.rate_limit_requests)
+    await charge_rate_limit(http_request, settings, cost=cost - 1, response=response)
+
+
 @agents_router.post("/batch/chat", response_model=BatchChatResponse)
 async def batch_chat_with_agents(
     request: BatchChatRequest,
-    portfolio_manager: PortfolioManager = Depends(get_portfolio_manager)
+    http_request: Request,
+    response: Response,
+    portfolio_manager: PortfolioManager = Depends(get_portfolio_manager),
+    settings: Settings = Depends(get_current_settings),
+    client_key: str = Depends(get_client_key)
 ) -> BatchChatResponse:
-    """Process multiple chat requests in batch."""
-    start_time = time.time()
+    """Process multiple chat requests in batch and wait for all of them.
     
+    Requests run through the shared batch scheduler, which bounds how many
+    agent calls are in flight; parallel_execution=False runs them one at a time.
+    Each message counts against the client's rate limit, up to a full bucket.
+    """
+    await _charge_batch_items(request, http_request, response, settings)
     try:
-        if request.parallel_execution:
-            # Execute requests in parallel
-            tasks = []
-            for chat_req in request.requests:
-                task = portfolio_manager.process_message(chat_req.message)
-                tasks.append(task)
-            
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-        else:
-            # Execute requests sequentially
-            responses = []
-            for chat_req in request.requests:
-                response = await portfolio_manager.process_message(chat_req.message)
-                responses.append(response)
-        
-        # Convert to ChatResponse objects
-        chat_responses = []
-        successful_count = 0
-        failed_count = 0
-        
-        for i, response in enumerate(responses):
-            if isinstance(response, Exception):
-                chat_response = ChatResponse(
-                    success=False,
-                    response="",
-                    agent_id="portfolio-manager",
-                    execution_time=0.0,
-                    error=str(response)
-                )
-                failed_count += 1
-            else:
-                chat_response = ChatResponse(
-                    success=response.success,
-                    response=response.content,
-                    agent_id=response.agent_id,
-                    execution_time=response.execution_time,
-                    error=response.error if not response.success else None
-                )
-                if response.success:
-                    successful_count += 1
-                else:
-                    failed_count += 1
-            
-            chat_responses.append(chat_response)
-        
-        total_execution_time = time.time() - start_time
-        
-        return BatchChatResponse(
-            batch_id=request.batch_id,
-            responses=chat_responses,
-            total_requests=len(request.requests),
-            successful_requests=successful_count,
-            failed_requests=failed_count,
-            total_execution_time=total_execution_time
+        job = await get_batch_chat_service().run_batch(
+            request.batch_id,
+            [chat_req.message for chat_req in request.requests],
+            portfolio_manager.process_message,
+            max_concurrency=_batch_concurrency(request),
+            owner=client_key
         )
+        return _batch_chat_response(job)
         
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Batch chat processing failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@agents_router.post(
+    "/batch/chat/submit",
+    response_model=BatchChatSubmitResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_batch_chat(
+    request: BatchChatRequest,
+    http_request: Request,
+    response: Response,
+    portfolio_manager: PortfolioManager = Depends(get_portfolio_manager),
+    settings: Settings = Depends(get_current_settings),
+    client_key: str = Depends(get_client_key)
+) -> BatchChatSubmitResponse:
+    """Start a batch in the background; poll or stream its results by batch id.
+    
+    Only the submitting client can poll or stream the batch, and a batch id
+    cannot be reused while the batch is retained. Each message counts against the client's rate limit, up to a full bucket.
+    """
+    await _charge_batch_items(request, http_request, response, settings)
+    try:
+        job = get_batch_chat_service().submit(
+            request.batch_id,
+            [chat_req.message for chat_req in request.requests],
+            portfolio_manager.process_message,
+            max_concurrency=_batch_concurrency(request),
+            owner=client_key
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    status_url = str(http_request.url_for("get_batch_chat_status", batch_id=job.batch_id))
+    return BatchChatSubmitResponse(
+        batch_id=job.batch_id,
+        status=job.status,
+        total_requests=job.total,
+        status_url=status_url,
+        stream_url=f"{status_url}/stream"
+    )
+
+
+def _get_batch_job(batch_id: str, client_key: str) -> BatchJob:
+    # Other clients' batches are reported as not found
+    job = get_batch_chat_service().get(batch_id, owner=client_key)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch {batch_id} not found"
+        )
+    return job
+
+
+@agents_router.get("/batch/chat/{batch_id}", response_model=BatchChatResponse)
+async def get_batch_chat_status(batch_id: str, client_key: str = Depends(get_client_key)) -> BatchChatResponse:
+    """Get progress and the results completed so far for one of the client's batches."""
+    return _batch_chat_response(_get_batch_job(batch_id, client_key))
+
+
+async def _stream_batch_results(job: BatchJob) -> AsyncIterator[bytes]:
+    """Emit one NDJSON record per completed item, then a summary record."""
+    async for result in get_batch_chat_service().stream(job.batch_id, owner=job.owner):
+        record = {"type": "result", "result": _batch_item_response(result).model_dump(mode="json")}
+        yield (json.dumps(record) + "\n").encode()
+    
+    summary = _batch_chat_response(job).model_dump(mode="json", exclude={"responses"})
+    yield (json.dumps({"type": "summary", **summary}) + "\n").encode()
+
+
+@agents_router.get("/batch/chat/{batch_id}/stream")
+async def stream_batch_chat(batch_id: str, client_key: str = Depends(get_client_key)) -> StreamingResponse:
+    """Stream a batch's results as NDJSON in completion order.
+    
+    Items already finished are sent first; the stream then follows the
+    batch until it completes and ends with a {"type": "summary"} record.
+    """
+    return StreamingResponse(
+        _stream_batch_results(_get_batch_job(batch_id, client_key)),
+        media_type="application/x-ndjson"
+    )
\ No newline at end of file
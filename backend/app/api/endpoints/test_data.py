@@ -4,8 +4,7 @@ from typing import Dict, List, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
-from app.core.config import Settings, get_settings
-from app.services.test_data_service import TestDataService
+from app.services.test_data_service import TestDataService, get_test_data_service as get_shared_test_data_service
 
 router = APIRouter()
 
@@ -40,9 +39,9 @@ class SitePerformanceResponse(BaseModel):
     """Site performance response model."""
     sites: List[Dict[str, Any]]
 
-def get_test_data_service(settings: Settings = Depends(get_settings)) -> TestDataService:
-    """Dependency to get test data service."""
-    return TestDataService(settings)
+def get_test_data_service() -> TestDataService:
+    """Dependency to get the shared test data service."""
+    return get_shared_test_data_service()
 
 @router.get("/status", response_model=TestDataStatusResponse)
 async def get_test_data_status(
@@ -263,7 +262,8 @@ async def regenerate_test_data(
     
     return {
         "message": "Test data regenerated successfully",
-        "preset_used": preset_name or "current preset"
+        "preset_used": preset_name or "current preset",
+        "generation": test_service.generation
     }
 
 # Example endpoint for agent testing
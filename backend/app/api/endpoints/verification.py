@@ -0,0 +1,164 @@
+"""Bulk data verification endpoints."""
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import json
+import uuid
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from starlette.types import Receive, Scope, Send
+
+from app.api.dependencies import get_data_verifier
+from app.agents.data_verifier import DataVerifier, BatchVerificationStats
+
+
+verification_router = APIRouter()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Longest accepted NDJSON line; longer lines are rejected without buffering them
+MAX_LINE_BYTES = 1024 * 1024
+# Rejected lines listed individually in the summary record
+MAX_REPORTED_REJECTIONS = 100
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body generator may still be reading the request.
+
+    StreamingResponse normally drains receive() to watch for disconnects,
+    which would swallow request body chunks the generator has not read
+    yet. Here the generator owns receive(); a disconnect surfaces through
+    request.stream() while reading, or as a failed send while writing.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+        if self.background is not None:
+            await self.background()
+
+
+async def _iter_ndjson_lines(request: Request) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Split the request body into (line_number, line) as chunks arrive.
+
+    Lines longer than MAX_LINE_BYTES are yielded as None and discarded
+    without being held in memory.
+    """
+    buffer = bytearray()
+    line_number = 0
+    discarding = False
+
+    async for chunk in request.stream():
+        buffer.extend(chunk)
+        while True:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                break
+            line_number += 1
+            if discarding or newline > MAX_LINE_BYTES:
+                discarding = False
+                del buffer[:newline + 1]
+                yield line_number, None
+                continue
+            line = bytes(buffer[:newline])
+            del buffer[:newline + 1]
+            yield line_number, line
+
+        if len(buffer) > MAX_LINE_BYTES:
+            discarding = True
+            buffer.clear()
+
+    if discarding or len(buffer) > MAX_LINE_BYTES:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, bytes(buffer)
+
+
+class _PairReader:
+    """Parse NDJSON {edc_data, source_data} lines, recording rejected lines."""
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.rejected_count = 0
+        self.rejections: List[Dict[str, Any]] = []
+
+    def _reject(self, line_number: int, error: str) -> None:
+        self.rejected_count += 1
+        if len(self.rejections) < MAX_REPORTED_REJECTIONS:
+            self.rejections.append({"line": line_number, "error": error})
+
+    async def pairs(self) -> AsyncIterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        async for line_number, line in _iter_ndjson_lines(self.request):
+            if line is None:
+                self._reject(line_number, f"Line exceeds {MAX_LINE_BYTES} bytes")
+                continue
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                self._reject(line_number, "Invalid JSON")
+                continue
+
+            if (
+                not isinstance(record, dict)
+                or not isinstance(record.get("edc_data"), dict)
+                or not isinstance(record.get("source_data"), dict)
+            ):
+                self._reject(line_number, "Line must be an object with edc_data and source_data objects")
+                continue
+
+            yield record["edc_data"], record["source_data"]
+
+
+async def _stream_verification_results(
+    reader: _PairReader,
+    data_verifier: DataVerifier,
+    columnar: Optional[bool]
+) -> AsyncIterator[bytes]:
+    """Emit one NDJSON result record per pair, then a summary record."""
+    batch_id = f"BV_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    stats = BatchVerificationStats()
+
+    async for result in data_verifier.stream_batch_verification(reader.pairs(), stats, columnar):
+        yield (json.dumps({"type": "result", "result": result}) + "\n").encode()
+
+    summary = {
+        "type": "summary",
+        "batch_id": batch_id,
+        "total_subjects": stats.total,
+        "successful_verifications": stats.successful,
+        "failed_verifications": stats.failed,
+        "summary_statistics": stats.summary(),
+        "rejected_lines": reader.rejected_count,
+        "rejections": reader.rejections,
+        "batch_date": datetime.now().isoformat()
+    }
+    yield (json.dumps(summary) + "\n").encode()
+
+
+@verification_router.post("/batch/stream")
+async def stream_batch_verification(
+    request: Request,
+    columnar: Optional[bool] = None,
+    data_verifier: DataVerifier = Depends(get_data_verifier)
+) -> StreamingResponse:
+    """Verify an NDJSON stream of {edc_data, source_data} pairs.
+
+    The body is read incrementally and results are streamed back as NDJSON
+    in input order: one {"type": "result"} record per pair, followed by a
+    {"type": "summary"} record with batch statistics and rejected lines.
+    Only a bounded number of pairs is in flight at any time, so a slow
+    reader on either side applies backpressure instead of buffering.
+    """
+    reader = _PairReader(request)
+    return DuplexStreamingResponse(
+        _stream_verification_results(reader, data_verifier, columnar),
+        media_type=NDJSON_MEDIA_TYPE
+    )
@@ -307,13 +307,17 @@ class AgentHealthResponse(BaseModel):
 
 
 # Batch Request Models
+# Largest batch accepted by the batch chat endpoints
+MAX_BATCH_CHAT_ITEMS = 1000
+
+
 class BatchChatRequest(BaseModel):
     """Request model for batch chat operations."""
     
     requests: List[ChatRequest] = Field(
         ...,
         min_items=1,
-        max_items=10,
+        max_items=MAX_BATCH_CHAT_ITEMS,
         description="List of chat requests to process"
     )
     batch_id: str = Field(
@@ -325,6 +329,11 @@ class BatchChatRequest(BaseModel):
         default=True,
         description="Whether to execute requests in parallel"
     )
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Most requests of this batch in flight at once (capped by the server limit)"
+    )
 
 
 class BatchChatResponse(BaseModel):
@@ -354,4 +363,27 @@ class BatchChatResponse(BaseModel):
         ...,
         ge=0,
         description="Total time to process all requests"
-    )
\ No newline at end of file
+    )
+    status: str = Field(
+        default="completed",
+        description="Batch status: queued, running, completed or cancelled"
+    )
+    completed_requests: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Number of requests finished so far"
+    )
+    latency: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Per-item latency p50/p95/max and mean queue time in seconds"
+    )
+
+
+class BatchChatSubmitResponse(BaseModel):
+    """Response model for an asynchronously submitted batch."""
+    
+    batch_id: str = Field(..., description="Batch identifier")
+    status: str = Field(..., description="Batch status")
+    total_requests: int = Field(..., ge=0, description="Total number of requests in batch")
+    status_url: str = Field(..., description="URL to poll for batch results")
+    stream_url: str = Field(..., description="URL streaming results as NDJSON while they complete")
\ No newline at end of file
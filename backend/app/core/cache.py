@@ -0,0 +1,180 @@
+"""Caches shared by the agents.
+
+TTLCache keeps entries in process; SQLiteTTLCache has the same interface
+and keeps string-keyed, JSON-serializable entries in an on-disk SQLite
+file that survives restarts and can be shared by several workers.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl_seconds.
+
+    Lookups move entries to the most recently used end; inserting past
+    max_size evicts the least recently used entry. Expired entries are
+    dropped when they are looked up.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        if max_size <= 0 or ttl_seconds <= 0:
+            raise ValueError("max_size and ttl_seconds must be positive")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key for ttl_seconds."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.expirations = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss statistics in the same shape as the lru_cache helpers."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTTLCache:
+    """LRU cache with entry expiry, stored in a SQLite file.
+
+    Keys must be strings and values JSON-serializable. Expiry uses wall-clock
+    time so entries written by another process or before a restart are
+    honoured. Statistics are per instance.
+    """
+
+    def __init__(self, path: str, max_size: int, ttl_seconds: float):
+        if max_size <= 0 or ttl_seconds <= 0:
+            raise ValueError("max_size and ttl_seconds must be positive")
+        self.path = path
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_last_used ON cache_entries (last_used)")
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE cache_entries SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key for ttl_seconds."""
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, now + self.ttl_seconds, now)
+            )
+            overflow = len(self) - self.max_size
+            if overflow > 0:
+                self._connection.execute(
+                    "DELETE FROM cache_entries WHERE key IN "
+                    "(SELECT key FROM cache_entries ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+
+    def clear(self) -> None:
+        """Drop all entries and reset the statistics."""
+        with self._lock:
+            self._connection.execute("DELETE FROM cache_entries")
+            self.hits = self.misses = self.expirations = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss statistics in the same shape as TTLCache.stats."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+__all__ = ["TTLCache", "SQLiteTTLCache"]
@@ -42,11 +42,37 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_requests: int = Field(default=100, env="RATE_LIMIT_REQUESTS")
     rate_limit_window: int = Field(default=60, env="RATE_LIMIT_WINDOW")
+    rate_limit_backend: str = Field(default="memory", env="RATE_LIMIT_BACKEND")
+    trusted_proxy_hops: int = Field(default=0, env="TRUSTED_PROXY_HOPS")
     
     # Test Data Configuration
     use_test_data: bool = Field(default=False, env="USE_TEST_DATA")
     test_data_preset: str = Field(default="cardiology_phase2", env="TEST_DATA_PRESET")
     test_data_path: str = Field(default="tests/test_data/", env="TEST_DATA_PATH")
+    
+    # Data Verification
+    verification_workers: int = Field(default=0, env="VERIFICATION_WORKERS")
+    
+    # Query Analysis
+    analysis_history_capacity: int = Field(default=1000, env="ANALYSIS_HISTORY_CAPACITY")
+    analysis_history_spill_dir: str = Field(default="", env="ANALYSIS_HISTORY_SPILL_DIR")
+    
+    # Agent Response Cache
+    response_cache_enabled: bool = Field(default=True, env="RESPONSE_CACHE_ENABLED")
+    response_cache_backend: str = Field(default="memory", env="RESPONSE_CACHE_BACKEND")
+    response_cache_path: str = Field(default="response_cache.sqlite3", env="RESPONSE_CACHE_PATH")
+    response_cache_size: int = Field(default=1024, env="RESPONSE_CACHE_SIZE")
+    response_cache_ttl: float = Field(default=300.0, env="RESPONSE_CACHE_TTL")
+    response_cache_per_call_ids: bool = Field(default=False, env="RESPONSE_CACHE_PER_CALL_IDS")
+    
+    # Batch Chat
+    batch_chat_concurrency: int = Field(default=8, env="BATCH_CHAT_CONCURRENCY")
+    batch_chat_item_timeout: float = Field(default=120.0, env="BATCH_CHAT_ITEM_TIMEOUT")
+    
+    # Query Escalation
+    escalation_scheduler_enabled: bool = Field(default=True, env="ESCALATION_SCHEDULER_ENABLED")
+    escalation_check_interval: float = Field(default=60.0, env="ESCALATION_CHECK_INTERVAL")
+    metrics_consistency_interval: float = Field(default=300.0, env="METRICS_CONSISTENCY_INTERVAL")
 
 
     @field_validator("database_url")
@@ -95,6 +121,80 @@ class Settings(BaseSettings):
             raise ValueError(f"Test data preset must be one of {valid_presets}")
         return v
 
+    @field_validator("verification_workers")
+    @classmethod
+    def validate_verification_workers(cls, v: int) -> int:
+        """Validate verification worker count is not negative."""
+        if v < 0:
+            raise ValueError("Verification workers must be 0 (one per CPU) or more")
+        return v
+
+    @field_validator("analysis_history_capacity")
+    @classmethod
+    def validate_analysis_history_capacity(cls, v: int) -> int:
+        """Validate analysis history capacity is positive."""
+        if v <= 0:
+            raise ValueError("Analysis history capacity must be positive")
+        return v
+
+    @field_validator("rate_limit_requests", "rate_limit_window")
+    @classmethod
+    def validate_rate_limit(cls, v: int) -> int:
+        """Validate rate limit request count and window are positive."""
+        if v <= 0:
+            raise ValueError("Rate limit requests and window must be positive")
+        return v
+
+    @field_validator("trusted_proxy_hops")
+    @classmethod
+    def validate_trusted_proxy_hops(cls, v: int) -> int:
+        """Validate the number of trusted proxy hops is not negative."""
+        if v < 0:
+            raise ValueError("Trusted proxy hops must not be negative")
+        return v
+
+    @field_validator("rate_limit_backend")
+    @classmethod
+    def validate_rate_limit_backend(cls, v: str) -> str:
+        """Validate rate limit backend name."""
+        valid_backends = ["memory", "redis"]
+        if v.lower() not in valid_backends:
+            raise ValueError(f"Rate limit backend must be one of {valid_backends}")
+        return v.lower()
+
+    @field_validator("response_cache_backend")
+    @classmethod
+    def validate_response_cache_backend(cls, v: str) -> str:
+        """Validate response cache backend name."""
+        valid_backends = ["memory", "sqlite"]
+        if v.lower() not in valid_backends:
+            raise ValueError(f"Response cache backend must be one of {valid_backends}")
+        return v.lower()
+
+    @field_validator("response_cache_size", "response_cache_ttl")
+    @classmethod
+    def validate_response_cache_limits(cls, v: float) -> float:
+        """Validate response cache size and TTL are positive."""
+        if v <= 0:
+            raise ValueError("Response cache size and TTL must be positive")
+        return v
+
+    @field_validator("batch_chat_concurrency", "batch_chat_item_timeout")
+    @classmethod
+    def validate_batch_chat_limits(cls, v: float) -> float:
+        """Validate batch chat concurrency and item timeout are positive."""
+        if v <= 0:
+            raise ValueError("Batch chat concurrency and item timeout must be positive")
+        return v
+
+    @field_validator("escalation_check_interval", "metrics_consistency_interval")
+    @classmethod
+    def validate_tracker_intervals(cls, v: float) -> float:
+        """Validate escalation and metrics check intervals are positive."""
+        if v <= 0:
+            raise ValueError("Escalation and metrics check intervals must be positive")
+        return v
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
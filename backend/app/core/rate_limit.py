@@ -0,0 +1,212 @@
+"""Token-bucket rate limiting for the API.
+
+Each client key owns a bucket holding up to `capacity` tokens that refills
+continuously at `refill_rate` tokens per second; a request spends one
+token or is rejected. Buckets are refilled lazily when they are checked,
+so a check is O(1) and idle clients cost nothing.
+
+Buckets live in a BucketStore. InMemoryBucketStore keeps them in process
+(one budget per worker, also the stand-in for the shared store in tests);
+RedisBucketStore keeps them in Redis so all Uvicorn workers enforce one
+budget, updating each bucket atomically in a Lua script.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+import logging
+import threading
+import time
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    # Only the in-process store is available
+    redis_asyncio = None
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# Buckets tracked by the in-process store; the least recently seen is dropped first
+MAX_TRACKED_BUCKETS = 100_000
+
+# Refill and spend in one round trip, using the Redis clock so workers agree on time
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of one rate limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+class BucketStore(ABC):
+    """Where token buckets are kept; take() refills and spends atomically."""
+
+    @abstractmethod
+    async def take(self, key: str, capacity: float, refill_rate: float, cost: float) -> Tuple[bool, float]:
+        """Spend cost tokens from key's bucket if it has them.
+
+        Returns whether the tokens were spent and the tokens left afterwards.
+        """
+
+    @abstractmethod
+    async def reset(self) -> None:
+        """Forget all buckets."""
+
+
+class InMemoryBucketStore(BucketStore):
+    """Buckets in a process-local LRU map.
+
+    Dropping a bucket past max_buckets resets that client to a full bucket,
+    which only matters for clients idle long enough to be least recent.
+    """
+
+    def __init__(self, max_buckets: int = MAX_TRACKED_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: float, refill_rate: float, cost: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, bucket[0]
+            return False, bucket[0]
+
+    async def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared through Redis (or any server speaking its protocol)."""
+
+    def __init__(self, client: Any, key_prefix: str = "rate_limit:"):
+        self.client = client
+        self.key_prefix = key_prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, capacity: float, refill_rate: float, cost: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[self.key_prefix + key], args=[capacity, refill_rate, cost])
+        return bool(int(allowed)), float(tokens)
+
+    async def reset(self) -> None:
+        async for key in self.client.scan_iter(match=self.key_prefix + "*"):
+            await self.client.delete(key)
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets over a BucketStore.
+
+    If the store fails (e.g. Redis is unreachable) the request is allowed
+    and the failure logged, so an outage of the limiter does not take the
+    API down with it.
+    """
+
+    def __init__(self, store: BucketStore, requests: int, window_seconds: float):
+        if requests <= 0 or window_seconds <= 0:
+            raise ValueError("requests and window_seconds must be positive")
+        self.store = store
+        self.capacity = requests
+        self.refill_rate = requests / window_seconds
+
+    async def check(self, key: str, cost: float = 1.0) -> RateLimitResult:
+        """Spend cost tokens for key and report whether the request may proceed."""
+        try:
+            allowed, tokens = await self.store.take(key, self.capacity, self.refill_rate, cost)
+        except Exception as e:
+            logger.warning("Rate limit store unavailable, allowing request: %s", e)
+            return RateLimitResult(allowed=True, limit=self.capacity, remaining=self.capacity, retry_after=0.0)
+
+        retry_after = 0.0 if allowed else (cost - tokens) / self.refill_rate
+        return RateLimitResult(
+            allowed=allowed,
+            limit=self.capacity,
+            remaining=int(tokens),
+            retry_after=retry_after
+        )
+
+
+_rate_limiter: Optional[TokenBucketLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def create_bucket_store(settings: Settings) -> BucketStore:
+    """Bucket store for the configured rate limit backend."""
+    if settings.rate_limit_backend == "redis":
+        if redis_asyncio is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package")
+        return RedisBucketStore(redis_asyncio.Redis.from_url(settings.redis_url))
+    return InMemoryBucketStore()
+
+
+def get_rate_limiter(settings: Optional[Settings] = None) -> TokenBucketLimiter:
+    """Process-wide rate limiter configured from Settings."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                settings = settings or get_settings()
+                _rate_limiter = TokenBucketLimiter(
+                    create_bucket_store(settings),
+                    settings.rate_limit_requests,
+                    settings.rate_limit_window
+                )
+    return _rate_limiter
+
+
+def reset_rate_limiter() -> None:
+    """Drop the process-wide rate limiter; the next request builds a new one."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = None
+
+
+__all__ = [
+    "BucketStore",
+    "InMemoryBucketStore",
+    "RateLimitResult",
+    "RedisBucketStore",
+    "TokenBucketLimiter",
+    "get_rate_limiter",
+    "reset_rate_limiter"
+]
@@ -108,9 +108,27 @@ async def startup_event():
     from app.api.dependencies import initialize_agent_system
     await initialize_agent_system()
     
+    # Build the shared test data snapshot once for all endpoints and tools
+    from app.services.test_data_service import get_test_data_service
+    test_data_service = get_test_data_service(settings)
+    
+    # Fire query escalations as their deadlines pass
+    if settings.escalation_scheduler_enabled:
+        from app.agents.escalation_scheduler import get_escalation_scheduler
+        get_escalation_scheduler().start()
+    
+    # Periodically reconcile the live query metrics with the store
+    from app.agents.query_metrics import get_query_metrics
+    get_query_metrics().start()
+    
     print(f"🚀 {settings.app_name} started successfully")
     print(f"📊 Debug mode: {settings.debug}")
     print(f"🔑 OpenAI API configured: {'Yes' if settings.openai_api_key else 'No'}")
+    print(f"🧪 Test data mode: {'Yes' if test_data_service.is_test_mode() else 'No'} (generation {test_data_service.generation})")
+    
+    from app.agents.query_store import get_query_store
+    query_store_path = get_query_store().path
+    print(f"🗄️ Query store: {query_store_path}{' (lost on restart)' if query_store_path == ':memory:' else ''}")
 
 
 @app.on_event("shutdown")
@@ -122,6 +140,30 @@ async def shutdown_event():
     from app.api.dependencies import cleanup_agent_system
     await cleanup_agent_system()
     
+    from app.services.test_data_service import reset_test_data_service
+    reset_test_data_service()
+    
+    from app.agents.data_verifier import shutdown_verification_executor
+    shutdown_verification_executor()
+    
+    from app.agents.query_analyzer import shutdown_analysis_executor
+    shutdown_analysis_executor()
+    
+    from app.agents.response_cache import shutdown_response_cache
+    shutdown_response_cache()
+    
+    from app.services.batch_chat_service import shutdown_batch_chat_service
+    shutdown_batch_chat_service()
+    
+    from app.agents.escalation_scheduler import shutdown_escalation_scheduler
+    await shutdown_escalation_scheduler()
+    
+    from app.agents.query_metrics import shutdown_query_metrics
+    await shutdown_query_metrics()
+    
+    from app.agents.query_store import close_query_store
+    close_query_store()
+    
     print("✅ Shutdown complete")
 
 
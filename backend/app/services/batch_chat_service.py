@@ -0,0 +1,306 @@
+"""Batch chat scheduling for the agent endpoints.
+
+Batches run on a small pool of worker coroutines that take the next
+message in order. Every agent call also acquires a service-wide
+semaphore, so the number of messages in flight across all batches
+stays below the configured limit no matter how many batches are
+submitted. Batches can be awaited, or submitted in the background and
+then polled or streamed by batch id. Each item records how long it
+waited for a slot and how long the agent took.
+
+Batch ids are chosen by clients, so every batch belongs to an owner (the
+API uses the client's rate limit key) and is only visible to that owner.
+An id stays taken while its batch is retained; submitting it again is
+rejected rather than replacing the earlier batch.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import Settings, get_settings
+
+# Finished batches kept for polling; the oldest finished batch is dropped first
+MAX_RETAINED_BATCHES = 100
+
+ProcessMessage = Callable[[str], Awaitable[Any]]
+
+
+@dataclass
+class BatchItemResult:
+    """Outcome of one message in a batch."""
+
+    index: int
+    success: bool
+    content: str
+    agent_id: str
+    execution_time: float
+    error: Optional[str] = None
+    queue_time: float = 0.0
+    latency: float = 0.0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BatchJob:
+    """State of a submitted batch; results fill in as items complete."""
+
+    batch_id: str
+    messages: List[str]
+    concurrency: int
+    owner: str = ""
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    completed_at: Optional[float] = None
+    results: List[Optional[BatchItemResult]] = field(init=False, default_factory=list)
+    completion_order: List[int] = field(init=False, default_factory=list)
+    task: Optional["asyncio.Task[None]"] = field(init=False, default=None, repr=False)
+    _changed: asyncio.Event = field(init=False, default_factory=asyncio.Event, repr=False)
+
+    def __post_init__(self) -> None:
+        self.results = [None] * len(self.messages)
+
+    @property
+    def total(self) -> int:
+        return len(self.messages)
+
+    @property
+    def completed(self) -> int:
+        return len(self.completion_order)
+
+    @property
+    def successful(self) -> int:
+        return sum(1 for index in self.completion_order if self.results[index].success)
+
+    @property
+    def failed(self) -> int:
+        return self.completed - self.successful
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "cancelled")
+
+    def completed_results(self) -> List[BatchItemResult]:
+        """Results received so far, in input order."""
+        return [result for result in self.results if result is not None]
+
+    def latency_summary(self) -> Dict[str, float]:
+        """Nearest-rank p50/p95/max of per-item latency and mean queue time."""
+        results = self.completed_results()
+        if not results:
+            return {}
+        latencies = sorted(result.latency for result in results)
+
+        def percentile(p: float) -> float:
+            return latencies[max(0, math.ceil(p * len(latencies)) - 1)]
+
+        return {
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": latencies[-1],
+            "mean_queue_time": sum(result.queue_time for result in results) / len(results)
+        }
+
+    def _record(self, result: BatchItemResult) -> None:
+        self.results[result.index] = result
+        self.completion_order.append(result.index)
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class BatchChatService:
+    """Schedules batch chat messages under a shared concurrency limit."""
+
+    def __init__(self, concurrency_limit: int, item_timeout: float, max_retained_batches: int = MAX_RETAINED_BATCHES):
+        if concurrency_limit <= 0 or item_timeout <= 0:
+            raise ValueError("concurrency_limit and item_timeout must be positive")
+        self.concurrency_limit = concurrency_limit
+        self.item_timeout = item_timeout
+        self.max_retained_batches = max_retained_batches
+        self._jobs: "OrderedDict[Tuple[str, str], BatchJob]" = OrderedDict()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _slots(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop; test clients start several
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency_limit)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _register(self, batch_id: str, messages: List[str], max_concurrency: Optional[int], owner: str) -> BatchJob:
+        key = (owner, batch_id)
+        existing = self._jobs.get(key)
+        if existing is not None:
+            state = "already running" if not existing.finished else "already exists"
+            raise ValueError(f"Batch {batch_id} is {state}; submit it with a new batch_id")
+
+        concurrency = min(max_concurrency or self.concurrency_limit, self.concurrency_limit, max(len(messages), 1))
+        job = BatchJob(batch_id=batch_id, messages=list(messages), concurrency=concurrency, owner=owner)
+        self._jobs[key] = job
+
+        while len(self._jobs) > self.max_retained_batches:
+            oldest_finished = next((key for key, queued in self._jobs.items() if queued.finished), None)
+            if oldest_finished is None:
+                break
+            del self._jobs[oldest_finished]
+        return job
+
+    async def _process_item(self, job: BatchJob, index: int, process_message: ProcessMessage) -> BatchItemResult:
+        queued_at = time.perf_counter()
+        response = None
+        error = "No response from agent"
+        async with self._slots():
+            started_at = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(process_message(job.messages[index]), self.item_timeout)
+            except asyncio.TimeoutError:
+                error = f"Timed out after {self.item_timeout}s"
+            except Exception as e:
+                error = str(e)
+            finished_at = time.perf_counter()
+
+        timing = {"queue_time": started_at - queued_at, "latency": finished_at - started_at}
+        if response is None:
+            return BatchItemResult(
+                index=index,
+                success=False,
+                content="",
+                agent_id="portfolio-manager",
+                execution_time=timing["latency"],
+                error=error,
+                **timing
+            )
+        metadata = getattr(response, "metadata", None)
+        return BatchItemResult(
+            index=index,
+            success=bool(response.success),
+            content=response.content,
+            agent_id=response.agent_id,
+            execution_time=response.execution_time,
+            error=response.error if not response.success else None,
+            metadata=dict(metadata) if isinstance(metadata, dict) else {},
+            **timing
+        )
+
+    async def _run(self, job: BatchJob, process_message: ProcessMessage) -> None:
+        job.status = "running"
+        job._notify()
+        next_index = iter(range(job.total))
+
+        async def worker() -> None:
+            for index in next_index:
+                job._record(await self._process_item(job, index, process_message))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(job.concurrency)))
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        finally:
+            job.completed_at = time.time()
+            job._notify()
+
+    async def run_batch(
+        self,
+        batch_id: str,
+        messages: List[str],
+        process_message: ProcessMessage,
+        max_concurrency: Optional[int] = None,
+        owner: str = ""
+    ) -> BatchJob:
+        """Process a batch and return it once every item has completed.
+
+        Raises ValueError if owner already has a batch with this id.
+        """
+        job = self._register(batch_id, messages, max_concurrency, owner)
+        await self._run(job, process_message)
+        return job
+
+    def submit(
+        self,
+        batch_id: str,
+        messages: List[str],
+        process_message: ProcessMessage,
+        max_concurrency: Optional[int] = None,
+        owner: str = ""
+    ) -> BatchJob:
+        """Start a batch in the background and return it immediately.
+
+        Must be called from a running event loop. Raises ValueError if
+        owner already has a batch with this id.
+        """
+        job = self._register(batch_id, messages, max_concurrency, owner)
+        job.task = asyncio.get_running_loop().create_task(self._run(job, process_message))
+        return job
+
+    def get(self, batch_id: str, owner: str = "") -> Optional[BatchJob]:
+        """owner's batch by id, or None if unknown, another owner's or no longer retained."""
+        return self._jobs.get((owner, batch_id))
+
+    async def stream(self, batch_id: str, owner: str = "") -> AsyncIterator[BatchItemResult]:
+        """Yield a batch's item results in completion order until it finishes."""
+        job = self._jobs.get((owner, batch_id))
+        if job is None:
+            raise KeyError(batch_id)
+
+        cursor = 0
+        while True:
+            changed = job._changed
+            while cursor < len(job.completion_order):
+                yield job.results[job.completion_order[cursor]]
+                cursor += 1
+            if job.finished:
+                return
+            await changed.wait()
+
+    def shutdown(self) -> None:
+        """Cancel batches that are still running."""
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+
+_batch_chat_service: Optional[BatchChatService] = None
+_batch_chat_service_lock = threading.Lock()
+
+
+def get_batch_chat_service(settings: Optional[Settings] = None) -> BatchChatService:
+    """Process-wide batch chat service configured from Settings."""
+    global _batch_chat_service
+    if _batch_chat_service is None:
+        with _batch_chat_service_lock:
+            if _batch_chat_service is None:
+                settings = settings or get_settings()
+                _batch_chat_service = BatchChatService(
+                    settings.batch_chat_concurrency,
+                    settings.batch_chat_item_timeout
+                )
+    return _batch_chat_service
+
+
+def shutdown_batch_chat_service() -> None:
+    """Cancel running batches and drop the process-wide service."""
+    global _batch_chat_service
+    with _batch_chat_service_lock:
+        if _batch_chat_service is not None:
+            _batch_chat_service.shutdown()
+        _batch_chat_service = None
+
+
+__all__ = [
+    "BatchChatService",
+    "BatchItemResult",
+    "BatchJob",
+    "get_batch_chat_service",
+    "shutdown_batch_chat_service"
+]
@@ -1,77 +1,153 @@
 """Test Data Service for Clinical Trials Agent System."""
 
+import asyncio
+import copy
 import json
 import os
-from typing import Dict, List, Any, Optional
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional
 from pathlib import Path
 from datetime import datetime
 import logging
 
-from app.core.config import Settings
+from app.core.config import Settings, get_settings
 from tests.test_data.synthetic_data_generator import generate_test_study, STUDY_PRESETS
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class StudySnapshot:
+    """Immutable view of one generated study and its lookup indexes.
+    
+    A snapshot is never mutated after it is built; regeneration builds a
+    new snapshot and swaps the reference, so readers holding the previous
+    one keep a consistent view. Only the indexes are read-only proxies, so
+    TestDataService hands callers deep copies of the records it returns.
+    """
+    
+    generation: int
+    preset: str
+    study: Dict[str, Any]
+    subjects: Mapping[str, Dict[str, Any]]
+    sites: Mapping[str, Dict[str, Any]]
+    visit_data: Mapping[str, Dict[str, Any]]
+    
+    @classmethod
+    def build(cls, study: Dict[str, Any], preset: str, generation: int) -> "StudySnapshot":
+        """Build the lookup indexes for a generated study."""
+        subjects = {
+            subject['subject_id']: subject
+            for subject in study['subjects']
+        }
+        sites = {
+            site['site_id']: site
+            for site in study['sites']
+        }
+        
+        # Visit data index (flattened for easy access)
+        visit_data = {}
+        for subject in study['subjects']:
+            for visit in subject['visits']:
+                key = f"{subject['subject_id']}_{visit['visit_name']}"
+                visit_data[key] = {
+                    'subject_id': subject['subject_id'],
+                    'visit_name': visit['visit_name'],
+                    'edc_data': visit['edc_data'],
+                    'source_data': visit['source_data'],
+                    'discrepancies': visit['discrepancies'],
+                    'queries': visit['queries']
+                }
+        
+        return cls(
+            generation=generation,
+            preset=preset,
+            study=study,
+            subjects=MappingProxyType(subjects),
+            sites=MappingProxyType(sites),
+            visit_data=MappingProxyType(visit_data)
+        )
+
+
+_EMPTY_CACHE: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'subjects': MappingProxyType({}),
+    'sites': MappingProxyType({}),
+    'visit_data': MappingProxyType({})
+})
+
+
 class TestDataService:
     """Service for managing test data integration with agent system."""
     
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.test_data_cache: Dict[str, Any] = {}
-        self.current_study: Optional[Dict[str, Any]] = None
+        self._snapshot: Optional[StudySnapshot] = None
+        self._generation = 0
+        self._swap_lock = threading.Lock()
         
         # Initialize test data if enabled
         if settings.use_test_data:
             self._initialize_test_data()
     
+    @property
+    def snapshot(self) -> Optional[StudySnapshot]:
+        """Current study snapshot, or None if no study is loaded."""
+        return self._snapshot
+    
+    @property
+    def generation(self) -> int:
+        """Generation counter of the current snapshot (0 if none loaded)."""
+        snapshot = self._snapshot
+        return snapshot.generation if snapshot else 0
+    
+    @property
+    def current_study(self) -> Optional[Dict[str, Any]]:
+        """Copy of the raw study dictionary of the current snapshot."""
+        snapshot = self._snapshot
+        return copy.deepcopy(snapshot.study) if snapshot else None
+    
+    @property
+    def test_data_cache(self) -> Mapping[str, Mapping[str, Any]]:
+        """Copies of the lookup indexes of the current snapshot."""
+        snapshot = self._snapshot
+        if not snapshot:
+            return _EMPTY_CACHE
+        return copy.deepcopy({
+            'subjects': dict(snapshot.subjects),
+            'sites': dict(snapshot.sites),
+            'visit_data': dict(snapshot.visit_data)
+        })
+    
     def _initialize_test_data(self):
         """Initialize test data based on configuration."""
         try:
             study_preset = getattr(self.settings, 'test_data_preset', 'cardiology_phase2')
             logger.info(f"Initializing test data with preset: {study_preset}")
             
-            self.current_study = generate_test_study(study_preset)
-            self._build_lookup_cache()
+            snapshot = self._swap_snapshot(study_preset)
             
             logger.info(f"Test data initialized successfully:")
-            logger.info(f"  - Study: {self.current_study['study_info']['protocol_id']}")
-            logger.info(f"  - Subjects: {len(self.current_study['subjects'])}")
-            logger.info(f"  - Sites: {len(self.current_study['sites'])}")
+            logger.info(f"  - Study: {snapshot.study['study_info']['protocol_id']}")
+            logger.info(f"  - Subjects: {len(snapshot.subjects)}")
+            logger.info(f"  - Sites: {len(snapshot.sites)}")
             
         except Exception as e:
             logger.error(f"Failed to initialize test data: {e}")
-            self.current_study = None
+            self._snapshot = None
     
-    def _build_lookup_cache(self):
-        """Build lookup cache for fast data retrieval."""
-        if not self.current_study:
-            return
-            
-        # Subject lookup cache
-        self.test_data_cache['subjects'] = {
-            subject['subject_id']: subject 
-            for subject in self.current_study['subjects']
-        }
+    def _swap_snapshot(self, preset_name: str) -> StudySnapshot:
+        """Generate a study for the preset and atomically publish it.
         
-        # Site lookup cache
-        self.test_data_cache['sites'] = {
-            site['site_id']: site 
-            for site in self.current_study['sites']
-        }
-        
-        # Visit data cache (flattened for easy access)
-        self.test_data_cache['visit_data'] = {}
-        for subject in self.current_study['subjects']:
-            for visit in subject['visits']:
-                key = f"{subject['subject_id']}_{visit['visit_name']}"
-                self.test_data_cache['visit_data'][key] = {
-                    'subject_id': subject['subject_id'],
-                    'visit_name': visit['visit_name'],
-                    'edc_data': visit['edc_data'],
-                    'source_data': visit['source_data'],
-                    'discrepancies': visit['discrepancies'],
-                    'queries': visit['queries']
-                }
+        Generation happens outside the lock; only the generation counter
+        bump and the reference swap are serialized.
+        """
+        study = generate_test_study(preset_name)
+        with self._swap_lock:
+            self._generation += 1
+            snapshot = StudySnapshot.build(study, preset_name, self._generation)
+            self._snapshot = snapshot
+        return snapshot
     
     # Core data retrieval methods for agents
     
@@ -85,13 +161,14 @@ class TestDataService:
         Returns:
             Subject data dictionary or None if not found
         """
-        if not self.settings.use_test_data or subject_id not in self.test_data_cache['subjects']:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot or subject_id not in snapshot.subjects:
             return None
             
-        subject = self.test_data_cache['subjects'][subject_id]
+        subject = snapshot.subjects[subject_id]
         
         if data_source == "both":
-            return {
+            return copy.deepcopy({
                 'subject_info': {
                     'subject_id': subject['subject_id'],
                     'site_id': subject['site_id'],
@@ -101,25 +178,25 @@ class TestDataService:
                 'edc_data': self._extract_all_visit_data(subject, 'edc_data'),
                 'source_data': self._extract_all_visit_data(subject, 'source_data'),
                 'data_quality': subject['data_quality']
-            }
+            })
         elif data_source == "edc":
-            return {
+            return copy.deepcopy({
                 'subject_info': {
                     'subject_id': subject['subject_id'],
                     'site_id': subject['site_id'],
                     'demographics': subject['demographics']
                 },
                 'visit_data': self._extract_all_visit_data(subject, 'edc_data')
-            }
+            })
         elif data_source == "source":
-            return {
+            return copy.deepcopy({
                 'subject_info': {
                     'subject_id': subject['subject_id'],
                     'site_id': subject['site_id'],
                     'demographics': subject['demographics']
                 },
                 'visit_data': self._extract_all_visit_data(subject, 'source_data')
-            }
+            })
         
         return None
     
@@ -134,28 +211,29 @@ class TestDataService:
         Returns:
             Visit data dictionary or None if not found
         """
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return None
             
         key = f"{subject_id}_{visit_name}"
-        if key not in self.test_data_cache['visit_data']:
+        if key not in snapshot.visit_data:
             return None
             
-        visit_data = self.test_data_cache['visit_data'][key]
+        visit_data = snapshot.visit_data[key]
         
         if data_source == "both":
-            return visit_data
+            return copy.deepcopy(visit_data)
         elif data_source == "edc":
             return {
                 'subject_id': visit_data['subject_id'],
                 'visit_name': visit_data['visit_name'],
-                'data': visit_data['edc_data']
+                'data': copy.deepcopy(visit_data['edc_data'])
             }
         elif data_source == "source":
             return {
                 'subject_id': visit_data['subject_id'],
                 'visit_name': visit_data['visit_name'],
-                'data': visit_data['source_data']
+                'data': copy.deepcopy(visit_data['source_data'])
             }
             
         return None
@@ -170,7 +248,8 @@ class TestDataService:
         Returns:
             List of discrepancy dictionaries
         """
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return []
             
         discrepancies = []
@@ -178,16 +257,16 @@ class TestDataService:
         if visit_name:
             # Get discrepancies for specific visit
             key = f"{subject_id}_{visit_name}"
-            if key in self.test_data_cache['visit_data']:
-                discrepancies.extend(self.test_data_cache['visit_data'][key]['discrepancies'])
+            if key in snapshot.visit_data:
+                discrepancies.extend(snapshot.visit_data[key]['discrepancies'])
         else:
             # Get all discrepancies for subject
-            subject = self.test_data_cache['subjects'].get(subject_id)
+            subject = snapshot.subjects.get(subject_id)
             if subject:
                 for visit in subject['visits']:
                     discrepancies.extend(visit['discrepancies'])
         
-        return discrepancies
+        return copy.deepcopy(discrepancies)
     
     async def get_queries(self, subject_id: str, visit_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get existing queries for testing Query Tracker agent.
@@ -199,7 +278,8 @@ class TestDataService:
         Returns:
             List of query dictionaries
         """
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return []
             
         queries = []
@@ -207,16 +287,16 @@ class TestDataService:
         if visit_name:
             # Get queries for specific visit
             key = f"{subject_id}_{visit_name}"
-            if key in self.test_data_cache['visit_data']:
-                queries.extend(self.test_data_cache['visit_data'][key]['queries'])
+            if key in snapshot.visit_data:
+                queries.extend(snapshot.visit_data[key]['queries'])
         else:
             # Get all queries for subject
-            subject = self.test_data_cache['subjects'].get(subject_id)
+            subject = snapshot.subjects.get(subject_id)
             if subject:
                 for visit in subject['visits']:
                     queries.extend(visit['queries'])
         
-        return queries
+        return copy.deepcopy(queries)
     
     async def get_site_data(self, site_id: str) -> Optional[Dict[str, Any]]:
         """Get site information and performance metrics.
@@ -227,10 +307,11 @@ class TestDataService:
         Returns:
             Site data dictionary or None if not found
         """
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return None
             
-        return self.test_data_cache['sites'].get(site_id)
+        return copy.deepcopy(snapshot.sites.get(site_id))
     
     async def get_study_info(self) -> Optional[Dict[str, Any]]:
         """Get current study information.
@@ -238,10 +319,11 @@ class TestDataService:
         Returns:
             Study information dictionary
         """
-        if not self.settings.use_test_data or not self.current_study:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return None
             
-        return self.current_study['study_info']
+        return copy.deepcopy(snapshot.study['study_info'])
     
     # Data analysis methods for agent testing
     
@@ -254,12 +336,13 @@ class TestDataService:
         Returns:
             List of subjects with discrepancy information
         """
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return []
             
         subjects_with_discrepancies = []
         
-        for subject in self.current_study['subjects']:
+        for subject in snapshot.study['subjects']:
             subject_discrepancies = []
             
             for visit in subject['visits']:
@@ -281,7 +364,7 @@ class TestDataService:
                     'discrepancies': subject_discrepancies
                 })
         
-        return subjects_with_discrepancies
+        return copy.deepcopy(subjects_with_discrepancies)
     
     async def get_site_performance_data(self) -> List[Dict[str, Any]]:
         """Get site performance data for testing Portfolio Manager.
@@ -289,15 +372,16 @@ class TestDataService:
         Returns:
             List of site performance summaries
         """
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return []
             
         site_performance = []
         
-        for site_id, site_info in self.test_data_cache['sites'].items():
+        for site_id, site_info in snapshot.sites.items():
             # Calculate actual performance from subject data
             site_subjects = [
-                s for s in self.current_study['subjects'] 
+                s for s in snapshot.study['subjects'] 
                 if s['site_id'] == site_id
             ]
             
@@ -334,23 +418,29 @@ class TestDataService:
     
     def is_test_mode(self) -> bool:
         """Check if system is running in test data mode."""
-        return self.settings.use_test_data and self.current_study is not None
+        return self.settings.use_test_data and self._snapshot is not None
     
     def get_available_subjects(self) -> List[str]:
         """Get list of available subject IDs."""
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return []
-        return list(self.test_data_cache['subjects'].keys())
+        return list(snapshot.subjects.keys())
     
     def get_available_sites(self) -> List[str]:
         """Get list of available site IDs."""
-        if not self.settings.use_test_data:
+        snapshot = self._snapshot
+        if not self.settings.use_test_data or not snapshot:
             return []
-        return list(self.test_data_cache['sites'].keys())
+        return list(snapshot.sites.keys())
     
     async def regenerate_test_data(self, preset_name: str = None) -> bool:
         """Regenerate test data with optional different preset.
         
+        The new study is generated in a worker thread and swapped in as a
+        new snapshot with the next generation number; concurrent readers
+        see either the old or the new snapshot, never a mix.
+        
         Args:
             preset_name: Optional preset name to use
             
@@ -358,21 +448,52 @@ class TestDataService:
             True if successful, False otherwise
         """
         try:
-            if preset_name and preset_name in STUDY_PRESETS:
-                self.current_study = generate_test_study(preset_name)
-            else:
+            if not (preset_name and preset_name in STUDY_PRESETS):
                 # Use current preset
-                current_preset = getattr(self.settings, 'test_data_preset', 'cardiology_phase2')
-                self.current_study = generate_test_study(current_preset)
+                snapshot = self._snapshot
+                preset_name = snapshot.preset if snapshot else getattr(
+                    self.settings, 'test_data_preset', 'cardiology_phase2'
+                )
             
-            self._build_lookup_cache()
-            logger.info("Test data regenerated successfully")
+            snapshot = await asyncio.to_thread(self._swap_snapshot, preset_name)
+            logger.info(f"Test data regenerated successfully (generation {snapshot.generation})")
             return True
             
         except Exception as e:
             logger.error(f"Failed to regenerate test data: {e}")
             return False
 
+# Process-wide shared service
+_test_data_service: Optional[TestDataService] = None
+_test_data_service_lock = threading.Lock()
+
+
+def get_test_data_service(settings: Optional[Settings] = None) -> TestDataService:
+    """Get the process-wide shared test data service, creating it on first use.
+    
+    All endpoints and agent tools read from this one instance so the study
+    is generated once per process rather than once per request.
+    """
+    global _test_data_service
+    
+    service = _test_data_service
+    if service is None:
+        with _test_data_service_lock:
+            if _test_data_service is None:
+                _test_data_service = TestDataService(settings or get_settings())
+            service = _test_data_service
+    
+    return service
+
+
+def reset_test_data_service() -> None:
+    """Drop the shared test data service (used on shutdown and in tests)."""
+    global _test_data_service
+    
+    with _test_data_service_lock:
+        _test_data_service = None
+
+
 # Example usage in agent functions
 async def get_test_data_for_agents(test_data_service: TestDataService) -> Dict[str, Any]:
     """Example of how agents can access test data."""
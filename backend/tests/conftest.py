@@ -0,0 +1,11 @@
+"""Fixtures shared across the backend tests."""
+
+import pytest
+
+from app.agents.query_store import QueryStore
+
+
+@pytest.fixture
+def store():
+    """Empty in-memory query store."""
+    return QueryStore()
@@ -0,0 +1,173 @@
+"""Tests for the bounded analysis history."""
+
+import json
+import os
+
+import pytest
+
+from app.agents import analysis_history
+from app.agents.analysis_history import AnalysisHistory
+from app.agents.query_analyzer import QueryAnalyzer, QueryAnalysisContext
+
+
+def _record(index: int) -> dict:
+    return {
+        "query_id": f"QA_{index:04d}",
+        "subject_id": f"SUBJ{index % 5:03d}",
+        "site_id": f"SITE{index % 2}",
+        "severity": "minor"
+    }
+
+
+class TestAnalysisHistory:
+    """Test the in-memory ring and the spill segment."""
+
+    def test_list_compatible(self):
+        """Test append, len, indexing and equality behave like the old list."""
+        history = AnalysisHistory(capacity=3)
+        assert history == []
+
+        for index in range(5):
+            history.append(_record(index))
+
+        assert len(history) == 3
+        assert history[0]["query_id"] == "QA_0002"
+        assert history[-1]["query_id"] == "QA_0004"
+        assert [record["query_id"] for record in history[1:]] == ["QA_0003", "QA_0004"]
+        assert history == [_record(index) for index in range(2, 5)]
+        assert history.get_stats()["dropped"] == 2
+
+    def test_spills_evicted_records_and_queries_them(self, tmp_path):
+        """Test evicted records reach the segment and stay queryable in order."""
+        history = AnalysisHistory(capacity=10, spill_dir=str(tmp_path))
+        for index in range(200):
+            history.append(_record(index))
+
+        stats = history.get_stats()
+        assert stats["in_memory"] == 10
+        assert stats["spilled"] == 190
+        assert stats["total_recorded"] == 200
+
+        subject_records = history.query(subject_id="SUBJ001")
+        assert [record["query_id"] for record in subject_records] == [f"QA_{i:04d}" for i in range(1, 200, 5)]
+
+        both = history.query(subject_id="SUBJ001", site_id="SITE1", limit=3)
+        assert [record["query_id"] for record in both] == ["QA_0171", "QA_0181", "QA_0191"]
+        assert len(history.query(site_id="SITE0")) == 100
+
+        with open(history.segment_path, "rb") as segment:
+            lines = segment.read().splitlines()
+        assert len(lines) == 190
+        assert json.loads(lines[0].split(b"\t", 2)[2]) == _record(0)
+
+    def test_segments_rotate_and_oldest_are_deleted(self, tmp_path):
+        """Test spilled data is capped by segment size and count."""
+        history = AnalysisHistory(capacity=10, spill_dir=str(tmp_path), segment_max_bytes=4096, max_segments=3)
+        for index in range(2000):
+            history.append(_record(index))
+        history.flush()
+
+        stats = history.get_stats()
+        files = list(tmp_path.glob("*.ndjson"))
+        assert stats["segments"] == len(files) == 3
+        assert sum(path.stat().st_size for path in files) == stats["segment_bytes"]
+        assert stats["segment_bytes"] < 3 * (4096 + 64 * 200)
+        assert stats["spilled"] == 1990
+        kept = history.query()
+        assert len(kept) + stats["dropped"] == 2000
+        assert [record["query_id"] for record in kept] == [f"QA_{i:04d}" for i in range(2000 - len(kept), 2000)]
+
+    def test_restart_reclaims_the_slot_and_removes_old_segments(self, tmp_path):
+        """Test segments left by a previous process are deleted instead of piling up."""
+        first = AnalysisHistory(capacity=1, spill_dir=str(tmp_path), segment_max_bytes=1)
+        for index in range(200):
+            first.append(_record(index))
+        first.close()
+        assert len(list(tmp_path.glob("*.ndjson"))) == 4
+
+        restarted = AnalysisHistory(capacity=1, spill_dir=str(tmp_path), segment_max_bytes=1)
+
+        assert list(tmp_path.glob("*.ndjson")) == []
+        assert restarted.segment_path == first.segment_path.replace("_0003.", "_0000.")
+        assert restarted.query() == []
+
+    @pytest.mark.skipif(analysis_history.fcntl is None, reason="needs advisory file locks")
+    def test_live_histories_get_separate_slots(self, tmp_path):
+        """Test two histories sharing a spill_dir never delete each other's segments."""
+        first = AnalysisHistory(capacity=1, spill_dir=str(tmp_path))
+        for index in range(100):
+            first.append(_record(index))
+        first.flush()
+
+        second = AnalysisHistory(capacity=1, spill_dir=str(tmp_path))
+
+        assert os.path.exists(first.segment_path)
+        assert second.segment_path != first.segment_path
+        assert len(first.query()) == 100
+
+    def test_query_skips_segments_without_the_key(self, tmp_path, monkeypatch):
+        """Test a query only opens segments that can match and stops at limit."""
+        history = AnalysisHistory(capacity=1, spill_dir=str(tmp_path), segment_max_bytes=1)
+        for index in range(257):
+            history.append({"query_id": f"QA_{index}", "subject_id": "EARLY" if index < 64 else "LATE"})
+        history.flush()
+        paths = [segment.path for segment in history._segments]
+        opened = []
+
+        def spy_open(path, *args, **kwargs):
+            opened.append(path)
+            return open(path, *args, **kwargs)
+
+        monkeypatch.setattr(analysis_history, "open", spy_open, raising=False)
+
+        assert [r["query_id"] for r in history.query(subject_id="LATE", limit=2)] == ["QA_255", "QA_256"]
+        assert opened == [paths[-1]]
+        opened.clear()
+        assert len(history.query(subject_id="EARLY")) == 64
+        assert opened == [paths[0]]
+
+    def test_none_and_empty_keys_are_distinct(self):
+        """Test a missing subject does not match an empty-string subject."""
+        history = AnalysisHistory(capacity=5)
+        history.append({"query_id": "QA_NONE", "subject_id": None})
+        history.append({"query_id": "QA_EMPTY", "subject_id": ""})
+
+        assert [record["query_id"] for record in history.query(subject_id="")] == ["QA_EMPTY"]
+        assert len(history.query()) == 2
+
+    def test_site_id_override(self):
+        """Test a site passed at append time is used for queries."""
+        history = AnalysisHistory(capacity=5)
+        history.append({"query_id": "QA_1", "subject_id": "S1"}, site_id="SITE9")
+
+        assert history.query(site_id="SITE9")[0]["query_id"] == "QA_1"
+        assert history.query(site_id="SITE1") == []
+
+    def test_rejects_invalid_capacity(self):
+        """Test capacity must be positive."""
+        with pytest.raises(ValueError):
+            AnalysisHistory(capacity=0)
+
+
+class TestQueryAnalyzerHistory:
+    """Test the analyzer records analyses into the bounded history."""
+
+    @pytest.mark.asyncio
+    async def test_analyses_are_bounded_and_queryable(self, tmp_path):
+        """Test analyze_data_point results can be looked up by subject and site."""
+        analyzer = QueryAnalyzer()
+        analyzer.context = QueryAnalysisContext(analysis_history=AnalysisHistory(capacity=4, spill_dir=str(tmp_path)))
+
+        for index in range(10):
+            await analyzer.analyze_data_point({
+                "subject_id": f"SUBJ{index % 3:03d}",
+                "site_id": "SITE01" if index < 5 else "SITE02",
+                "field_name": "hemoglobin",
+                "edc_value": "12.5",
+                "source_value": "11.0"
+            })
+
+        assert len(analyzer.context.analysis_history) == 4
+        assert [r["subject_id"] for r in analyzer.query_analysis_history(subject_id="SUBJ000")] == ["SUBJ000"] * 4
+        assert len(analyzer.query_analysis_history(site_id="SITE01")) == 5
+        assert len(analyzer.query_analysis_history(site_id="SITE02", limit=2)) == 2
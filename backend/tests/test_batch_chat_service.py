@@ -0,0 +1,195 @@
+"""Tests for the batch chat scheduler and endpoints."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.dependencies import get_client_key, get_portfolio_manager
+from app.services.batch_chat_service import BatchChatService
+
+
+class _TrackingAgent:
+    """process_message stand-in that records how many calls overlap."""
+
+    def __init__(self, delay: float = 0.01, fail_on: str = "", hang_on: str = ""):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.hang_on = hang_on
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def process_message(self, message: str):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if message == self.hang_on:
+                await asyncio.sleep(60)
+            await asyncio.sleep(self.delay)
+            if message == self.fail_on:
+                raise RuntimeError("upstream error")
+            return SimpleNamespace(
+                success=True,
+                content=f"Processed: {message}",
+                agent_id="portfolio-manager",
+                execution_time=self.delay,
+                error=None,
+                metadata={"route": "llm"}
+            )
+        finally:
+            self.in_flight -= 1
+
+
+class TestBatchChatService:
+    """Test scheduling, limits and result streaming."""
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency_across_batches(self):
+        """Test the shared limit holds across concurrent batches and results keep input order."""
+        service = BatchChatService(concurrency_limit=4, item_timeout=5)
+        agent = _TrackingAgent()
+        messages = [f"Subject {index}" for index in range(50)]
+
+        first, second = await asyncio.gather(
+            service.run_batch("B1", messages, agent.process_message),
+            service.run_batch("B2", messages, agent.process_message, max_concurrency=2)
+        )
+
+        assert agent.peak_in_flight == 4
+        assert first.concurrency == 4 and second.concurrency == 2
+        assert [result.content for result in first.completed_results()] == [f"Processed: {m}" for m in messages]
+        assert (first.status, first.successful, first.failed) == ("completed", 50, 0)
+        assert first.latency_summary()["max"] >= first.latency_summary()["p50"] > 0
+
+    @pytest.mark.asyncio
+    async def test_failures_and_timeouts_are_per_item(self):
+        """Test one failing or hanging message does not fail the batch."""
+        service = BatchChatService(concurrency_limit=3, item_timeout=0.2)
+        agent = _TrackingAgent(fail_on="bad", hang_on="slow")
+
+        job = await service.run_batch("B1", ["ok", "bad", "slow", "ok"], agent.process_message)
+
+        results = job.completed_results()
+        assert [result.success for result in results] == [True, False, False, True]
+        assert results[1].error == "upstream error"
+        assert results[2].error.startswith("Timed out")
+        assert results[0].metadata == {"route": "llm"}
+
+    @pytest.mark.asyncio
+    async def test_submit_poll_and_stream(self):
+        """Test a submitted batch can be followed while it runs."""
+        service = BatchChatService(concurrency_limit=2, item_timeout=5)
+        agent = _TrackingAgent()
+
+        job = service.submit("B1", [f"m{index}" for index in range(6)], agent.process_message)
+        assert service.get("B1") is job
+        with pytest.raises(ValueError):
+            service.submit("B1", ["again"], agent.process_message)
+
+        streamed = [result.index async for result in service.stream("B1")]
+
+        assert sorted(streamed) == list(range(6))
+        assert job.status == "completed" and job.completed_at is not None
+        assert [result.index async for result in service.stream("B1")] == streamed
+
+    @pytest.mark.asyncio
+    async def test_batches_are_scoped_to_their_owner(self):
+        """Test a batch id is private to its owner and cannot be reused while retained."""
+        service = BatchChatService(concurrency_limit=2, item_timeout=5)
+        agent = _TrackingAgent(delay=0)
+
+        mine = await service.run_batch("B1", ["m"], agent.process_message, owner="client-a")
+        theirs = await service.run_batch("B1", ["m", "n"], agent.process_message, owner="client-b")
+
+        assert service.get("B1", owner="client-a") is mine
+        assert service.get("B1", owner="client-b") is theirs
+        assert service.get("B1") is None
+        with pytest.raises(KeyError):
+            [result async for result in service.stream("B1", owner="client-c")]
+        with pytest.raises(ValueError):
+            await service.run_batch("B1", ["again"], agent.process_message, owner="client-a")
+        assert service.get("B1", owner="client-a") is mine
+
+    @pytest.mark.asyncio
+    async def test_retains_only_recent_finished_batches(self):
+        """Test old finished batches are dropped past the retention limit."""
+        service = BatchChatService(concurrency_limit=2, item_timeout=5, max_retained_batches=2)
+        agent = _TrackingAgent(delay=0)
+
+        for batch_id in ("B1", "B2", "B3"):
+            await service.run_batch(batch_id, ["m"], agent.process_message)
+
+        assert service.get("B1") is None
+        assert service.get("B3") is not None
+
+
+class TestBatchChatEndpoints:
+    """Test the synchronous, submit, poll and stream endpoints."""
+
+    @pytest.fixture
+    def agent(self):
+        agent = _TrackingAgent()
+        manager = MagicMock()
+        manager.process_message = agent.process_message
+        app.dependency_overrides[get_portfolio_manager] = lambda: manager
+        yield agent
+        app.dependency_overrides.clear()
+
+    def test_large_batch(self, agent):
+        """Test batches beyond the old ten-item cap run with bounded concurrency."""
+        payload = {
+            "batch_id": "summaries",
+            "requests": [{"message": f"Summarize subject {index}"} for index in range(300)]
+        }
+
+        with TestClient(app) as client:
+            data = client.post("/api/v1/agents/batch/chat", json=payload).json()
+
+        assert (data["status"], data["total_requests"], data["successful_requests"]) == ("completed", 300, 300)
+        assert [item["metadata"]["index"] for item in data["responses"]] == list(range(300))
+        assert "latency" in data["responses"][0]["metadata"]
+        assert set(data["latency"]) == {"p50", "p95", "max", "mean_queue_time"}
+        assert agent.peak_in_flight <= 8
+
+    def test_submit_then_stream_and_poll(self, agent):
+        """Test an asynchronously submitted batch can be streamed and polled."""
+        payload = {
+            "batch_id": "async-summaries",
+            "requests": [{"message": f"Summarize subject {index}"} for index in range(20)],
+            "max_concurrency": 3
+        }
+
+        with TestClient(app) as client:
+            submitted = client.post("/api/v1/agents/batch/chat/submit", json=payload)
+            assert submitted.status_code == 202
+            assert submitted.json()["stream_url"].endswith("/batch/chat/async-summaries/stream")
+
+            stream = client.get("/api/v1/agents/batch/chat/async-summaries/stream")
+            records = [json.loads(line) for line in stream.text.splitlines()]
+            status_data = client.get("/api/v1/agents/batch/chat/async-summaries").json()
+            missing = client.get("/api/v1/agents/batch/chat/unknown")
+
+        assert [record["type"] for record in records] == ["result"] * 20 + ["summary"]
+        assert records[-1]["successful_requests"] == 20
+        assert status_data["status"] == "completed"
+        assert status_data["completed_requests"] == 20
+        assert agent.peak_in_flight <= 3
+        assert missing.status_code == 404
+
+    def test_other_clients_cannot_read_a_batch(self, agent):
+        """Test polling or streaming another client's batch id is reported as not found."""
+        payload = {"batch_id": "private-summaries", "requests": [{"message": "Summarize subject 1"}]}
+
+        with TestClient(app) as client:
+            assert client.post("/api/v1/agents/batch/chat", json=payload).status_code == 200
+            assert client.post("/api/v1/agents/batch/chat", json=payload).status_code == 409
+
+            app.dependency_overrides[get_client_key] = lambda: "ip:203.0.113.7"
+            polled = client.get("/api/v1/agents/batch/chat/private-summaries")
+            streamed = client.get("/api/v1/agents/batch/chat/private-summaries/stream")
+
+        assert (polled.status_code, streamed.status_code) == (404, 404)
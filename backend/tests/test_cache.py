@@ -0,0 +1,83 @@
+"""Tests for the shared caches."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.core import cache
+from app.core.cache import SQLiteTTLCache, TTLCache
+
+
+class TestTTLCache:
+    """Test LRU and TTL eviction."""
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        ttl_cache = TTLCache(max_size=2, ttl_seconds=60)
+        ttl_cache.set("a", 1)
+        ttl_cache.set("b", 2)
+        assert ttl_cache.get("a") == 1
+
+        ttl_cache.set("c", 3)
+
+        assert ttl_cache.get("b") is None
+        assert ttl_cache.get("a") == 1
+        assert ttl_cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Test entries expire after ttl_seconds."""
+        ttl_cache = TTLCache(max_size=10, ttl_seconds=5)
+        with patch.object(cache.time, "monotonic", return_value=100.0):
+            ttl_cache.set("a", 1)
+        with patch.object(cache.time, "monotonic", return_value=104.0):
+            assert ttl_cache.get("a") == 1
+        with patch.object(cache.time, "monotonic", return_value=105.0):
+            assert ttl_cache.get("a") is None
+
+        stats = ttl_cache.stats()
+        assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+        assert stats["hit_rate"] == pytest.approx(0.5)
+
+    def test_rejects_invalid_limits(self):
+        """Test size and TTL must be positive."""
+        with pytest.raises(ValueError):
+            TTLCache(max_size=0, ttl_seconds=1)
+
+
+class TestSQLiteTTLCache:
+    """Test the on-disk backend behaves like TTLCache and persists."""
+
+    def test_lru_eviction_and_persistence(self, tmp_path):
+        """Test LRU eviction and that entries survive reopening the file."""
+        path = str(tmp_path / "cache.sqlite3")
+        sqlite_cache = SQLiteTTLCache(path, max_size=2, ttl_seconds=60)
+        now = cache.time.time()
+        with patch.object(cache.time, "time", side_effect=[now, now + 1, now + 2, now + 3]):
+            sqlite_cache.set("a", {"value": 1})
+            sqlite_cache.set("b", [2])
+            assert sqlite_cache.get("a") == {"value": 1}
+            sqlite_cache.set("c", "three")
+
+        assert sqlite_cache.get("b") is None
+        assert sqlite_cache.stats()["evictions"] == 1
+        sqlite_cache.close()
+
+        reopened = SQLiteTTLCache(path, max_size=2, ttl_seconds=60)
+        assert reopened.get("a") == {"value": 1}
+        assert reopened.get("c") == "three"
+        assert len(reopened) == 2
+        reopened.close()
+
+    def test_ttl_expiry(self, tmp_path):
+        """Test entries expire after ttl_seconds of wall-clock time."""
+        sqlite_cache = SQLiteTTLCache(str(tmp_path / "cache.sqlite3"), max_size=10, ttl_seconds=5)
+        with patch.object(cache.time, "time", return_value=100.0):
+            sqlite_cache.set("a", 1)
+        with patch.object(cache.time, "time", return_value=104.0):
+            assert sqlite_cache.get("a") == 1
+        with patch.object(cache.time, "time", return_value=105.0):
+            assert sqlite_cache.get("a") is None
+
+        stats = sqlite_cache.stats()
+        assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+        sqlite_cache.close()
@@ -0,0 +1,150 @@
+"""Tests for the deterministic clinical message pre-router."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.dependencies import validate_openai_key
+from app.agents.clinical_router import route_clinical_message, _parse_measurements, _render
+from app.agents.portfolio_manager import PortfolioManager
+from app.agents.response_cache import get_response_cache
+
+
+class TestMeasurementParsing:
+    """Test the plain-text measurement grammar."""
+
+    def test_parses_measurement_lists(self):
+        """Test aliases, units, separators and blood pressure pairs."""
+        sections = _parse_measurements("Please check: BP 185/115 mmHg, HR 130 bpm and Hgb 7.5 g/dL.")
+
+        assert sections == {
+            "vital_signs": {"systolic_bp": 185.0, "diastolic_bp": 115.0, "heart_rate": 130.0},
+            "laboratory": {"hemoglobin": 7.5}
+        }
+
+    def test_units_match_their_measurement(self):
+        """Test each measurement accepts the unit its clinical rule assumes."""
+        sections = _parse_measurements("troponin 0.5 ng/mL, BNP 450 pg/mL, creatinine 1.4 mg/dL, LVEF 35%")
+
+        assert sections == {
+            "laboratory": {"troponin": 0.5, "bnp": 450.0, "creatinine": 1.4},
+            "imaging": {"lvef": 35.0}
+        }
+
+    @pytest.mark.parametrize("message", [
+        "What does hemoglobin 8 mean for this patient?",
+        "hemoglobin 8, hemoglobin 9",
+        "blood pressure 140",
+        "hemoglobin 8 mmol/l",
+        "troponin 15 pg/ml",
+        "hemoglobin 9 mg/dl",
+        "hr 80 g/dl",
+        "bp 120/80 bpm",
+        "sodium 130",
+        "analyze subject CARD001",
+    ])
+    def test_free_text_and_ambiguous_messages_are_rejected(self, message):
+        """Test anything outside the grammar, including units that do not fit the measurement, is left for the LLM."""
+        assert _parse_measurements(message) is None
+        assert route_clinical_message(message) is None
+
+
+class TestRouteClinicalMessage:
+    """Test locally answered responses."""
+
+    def test_medium_ranks_between_low_and_high(self):
+        """Test a medium result raises the overall severity above low but not above high."""
+        def output(severity):
+            return "analyze_data_point", {"description": "Finding", "severity": severity, "suggested_actions": []}
+
+        assert _render([output("low"), output("medium")])[1] == "medium"
+        assert _render([output("medium"), output("high")])[1] == "high"
+
+    def test_measurements_use_clinical_tools(self):
+        """Test a lab/vitals check is answered with findings and the path taken."""
+        response = route_clinical_message("hemoglobin 7.5, blood pressure 150/95")
+
+        assert response.success is True
+        assert response.metadata["route"] == "fast_path"
+        assert response.metadata["fast_path_rule"] == "measurements"
+        assert response.metadata["tools_used"] == ["analyze_clinical_values", "assess_critical_data"]
+        assert response.metadata["severity"] == "critical"
+        assert "CLINICAL FINDING: CRITICAL: Hemoglobin 7.5 g/dL = Severe anemia" in response.content
+        assert "Stage 2 hypertension" in response.content
+
+    def test_clinical_json(self):
+        """Test nested JSON sections are analyzed, including adverse events."""
+        payload = {
+            "subject_id": "CARD001",
+            "vital_signs": {"systolic_bp": 118, "diastolic_bp": 76, "heart_rate": 72},
+            "adverse_events": [{"term": "Syncope", "serious": True}]
+        }
+
+        response = route_clinical_message(json.dumps(payload))
+
+        assert response.metadata["fast_path_rule"] == "clinical_json"
+        assert response.metadata["severity"] == "critical"
+        assert "Serious AE: Syncope" in response.content
+
+    def test_data_points_use_query_analyzer(self):
+        """Test EDC/source data points are analyzed by the query analyzer."""
+        data_points = [
+            {"subject_id": "S1", "field_name": "hemoglobin", "edc_value": "12.5", "source_value": "11.0"},
+            {"subject_id": "S2", "field_name": "weight", "edc_value": "70", "source_value": "70"}
+        ]
+
+        response = route_clinical_message(json.dumps(data_points))
+
+        assert response.metadata["fast_path_rule"] == "data_points"
+        assert response.metadata["tools_used"] == ["analyze_data_point"]
+        assert response.content.count("TOOL OUTPUT (analyze_data_point)") == 2
+
+    @pytest.mark.parametrize("message", ['{"foo": 1}', '{"vital_signs": {"heart_rate": "fast"}}', "{not json"])
+    def test_unusable_json_escalates(self, message):
+        """Test JSON the rules cannot read goes to the LLM."""
+        assert route_clinical_message(message) is None
+
+
+class TestFastPathIntegration:
+    """Test callers skip the LLM for structured messages."""
+
+    @pytest.mark.asyncio
+    async def test_process_message_skips_runner(self):
+        """Test PortfolioManager answers structured messages without Runner.run."""
+        with patch("app.agents.portfolio_manager.Runner.run", new_callable=AsyncMock) as run:
+            response = await PortfolioManager().process_message("HR 45 bpm")
+
+        run.assert_not_awaited()
+        assert response.metadata["route"] == "fast_path"
+        assert "Bradycardia" in response.content
+
+    @pytest.mark.asyncio
+    async def test_process_message_reports_llm_route(self):
+        """Test free text still goes to the LLM and is labelled as such."""
+        get_response_cache().clear()
+        with patch("app.agents.portfolio_manager.Runner.run", new_callable=AsyncMock) as run:
+            run.return_value = SimpleNamespace(final_output="Done")
+            response = await PortfolioManager().process_message("Summarize enrollment at site 12")
+
+        run.assert_awaited_once()
+        assert response.metadata["route"] == "llm"
+
+    def test_chat_endpoint_reports_route(self):
+        """Test /agents/chat answers locally and reports the route in metadata."""
+        app.dependency_overrides[validate_openai_key] = lambda: True
+        try:
+            with patch("app.api.endpoints.agents.Runner.run", new_callable=AsyncMock) as run:
+                response = TestClient(app).post("/api/v1/agents/chat", json={"message": "Hemoglobin 9.2 g/dL"})
+        finally:
+            app.dependency_overrides.clear()
+
+        run.assert_not_awaited()
+        data = response.json()
+        assert data["success"] is True
+        assert data["metadata"]["route"] == "fast_path"
+        assert data["metadata"]["fast_path_rule"] == "measurements"
+        assert "Moderate anemia" in data["response"]
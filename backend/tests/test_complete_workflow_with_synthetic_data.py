@@ -288,6 +288,96 @@ async def test_synthetic_data_generation():
     print(f"✅ Generated study with {len(subjects)} subjects and {len(subjects_with_discrepancies)} having discrepancies")
 
 
+@pytest.mark.asyncio
+async def test_regenerate_swaps_snapshot_atomically(test_data_service):
+    """Test that regeneration publishes a new snapshot and bumps the generation."""
+    old_snapshot = test_data_service.snapshot
+    assert old_snapshot.generation == 1
+    
+    assert await test_data_service.regenerate_test_data("oncology_phase1")
+    
+    new_snapshot = test_data_service.snapshot
+    assert new_snapshot is not old_snapshot
+    assert new_snapshot.generation == 2
+    assert new_snapshot.preset == "oncology_phase1"
+    # Readers holding the old snapshot keep a consistent view
+    assert old_snapshot.study["study_info"]["protocol_id"] == "CARD-2025-001"
+    assert test_data_service.current_study["study_info"]["protocol_id"] == "ONCO-2025-001"
+    
+    with pytest.raises(TypeError):
+        new_snapshot.subjects["NEW"] = {}
+
+
+@pytest.mark.asyncio
+async def test_mutating_returned_data_does_not_leak(test_data_service):
+    """Test that callers mutating returned records leave the snapshot untouched."""
+    subject_id = test_data_service.get_available_subjects()[0]
+    site_id = test_data_service.get_available_sites()[0]
+    visit_name = test_data_service.snapshot.subjects[subject_id]['visits'][0]['visit_name']
+
+    subject = await test_data_service.get_subject_data(subject_id, "both")
+    subject["subject_info"]["demographics"]["age"] = -1
+    subject["edc_data"][visit_name]["corrupted"] = True
+    visit = await test_data_service.get_visit_data(subject_id, visit_name, "both")
+    visit["edc_data"]["corrupted"] = True
+    visit["discrepancies"].append({"corrupted": True})
+    (await test_data_service.get_site_data(site_id))["site_name"] = "corrupted"
+    (await test_data_service.get_study_info())["protocol_id"] = "corrupted"
+    test_data_service.current_study["subjects"].clear()
+    test_data_service.test_data_cache["subjects"][subject_id]["site_id"] = "corrupted"
+
+    fresh = await test_data_service.get_subject_data(subject_id, "both")
+    assert fresh["subject_info"]["demographics"]["age"] != -1
+    assert "corrupted" not in fresh["edc_data"][visit_name]
+    fresh_visit = await test_data_service.get_visit_data(subject_id, visit_name, "both")
+    assert "corrupted" not in fresh_visit["edc_data"]
+    assert {"corrupted": True} not in fresh_visit["discrepancies"]
+    assert (await test_data_service.get_site_data(site_id))["site_name"] != "corrupted"
+    assert (await test_data_service.get_study_info())["protocol_id"] == "CARD-2025-001"
+    assert test_data_service.current_study["subjects"]
+    assert test_data_service.snapshot.subjects[subject_id]["site_id"] != "corrupted"
+
+
+def test_shared_test_data_service_is_process_wide(test_settings):
+    """Test that the shared service is created once and reused."""
+    from app.services.test_data_service import get_test_data_service, reset_test_data_service
+    
+    reset_test_data_service()
+    try:
+        first = get_test_data_service(test_settings)
+        second = get_test_data_service()
+        assert first is second
+        assert first.generation == 1
+    finally:
+        reset_test_data_service()
+
+
+@pytest.mark.asyncio
+async def test_portfolio_data_tools_run_on_event_loop(test_settings):
+    """Test that the async data-fetch tools await the shared service directly."""
+    import json
+    import threading
+    from agents.tool_context import ToolContext
+    from app.agents.portfolio_manager import get_test_subject_data, get_subject_discrepancies
+    from app.services.test_data_service import get_test_data_service, reset_test_data_service
+    
+    reset_test_data_service()
+    try:
+        service = get_test_data_service(test_settings)
+        subject_id = service.get_available_subjects()[0]
+        arguments = json.dumps({"subject_id": subject_id})
+        threads_before = threading.active_count()
+        
+        for tool in (get_test_subject_data, get_subject_discrepancies):
+            ctx = ToolContext(context=None, tool_name=tool.name, tool_call_id="call_1", tool_arguments=arguments)
+            result = json.loads(await tool.on_invoke_tool(ctx, arguments))
+            assert "error" not in result
+        
+        assert threading.active_count() == threads_before
+    finally:
+        reset_test_data_service()
+
+
 if __name__ == "__main__":
     # Run specific tests for demonstration
     import asyncio
@@ -0,0 +1,24 @@
+"""Tracked query factory shared by the query store, scheduler, metrics and forecast tests."""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.agents.query_store import QueryStatus, TrackedQuery
+
+
+def make_query(
+    query_id: str,
+    age_hours: float = 0,
+    priority: str = "major",
+    now: Optional[datetime] = None,
+    **overrides
+) -> TrackedQuery:
+    """Pending query created age_hours before now (the current time by default)."""
+    values = dict(
+        query_id=query_id,
+        status=QueryStatus.PENDING,
+        created_at=(now or datetime.now()) - timedelta(hours=age_hours),
+        priority=priority
+    )
+    values.update(overrides)
+    return TrackedQuery(**values)
@@ -0,0 +1,527 @@
+"""Tests for the Data Verifier batch and comparison engines."""
+
+import asyncio
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import pytest
+
+from app.agents import data_verifier
+from app.agents.data_verifier import (
+    DataVerifier,
+    batch_verification,
+    cross_system_verification,
+    complete_sdv_verification,
+    COLUMNAR_MIN_BATCH_SIZE,
+    CRITICAL_FIELDS,
+    DiscrepancySeverity,
+    DiscrepancyType,
+    SEVERITY_CACHE_SIZE,
+    _assess_field_severity,
+    _batch_verification,
+    _iter_parallel_verification,
+    _parallel_batch_verification,
+    BatchVerificationStats,
+    get_verification_executor,
+    shutdown_verification_executor,
+    _cross_system_verification,
+    convert_field_unit,
+    np,
+    _compare_values,
+    _parse_date,
+    get_date_cache_stats,
+    normalize_date,
+    normalize_date_column,
+)
+
+
+def _strip_volatile(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop per-call identifiers and timestamps from a verification result."""
+    return {
+        key: value for key, value in result.items()
+        if key not in ("verification_id", "verification_date")
+    }
+
+
+def _mixed_batch(size: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Build a batch mixing numeric, text, missing and out-of-tolerance values."""
+    rng = random.Random(seed)
+    batch = []
+    for i in range(size):
+        hemoglobin = round(rng.uniform(8.0, 16.0), 1)
+        weight = round(rng.uniform(50.0, 110.0), 1)
+        edc = {
+            "subject_id": f"SUBJ{i:04d}",
+            "hemoglobin": hemoglobin,
+            "weight": str(weight),
+            "heart_rate": rng.choice([72, "72", "N/A", 88]),
+            "adverse_events": rng.choice(["none", "headache", ""]),
+            "visit_date": "2025-01-15",
+            "temperature": rng.choice([36.6, float("nan"), None]),
+        }
+        source = {
+            "subject_id": f"SUBJ{i:04d}",
+            "hemoglobin": rng.choice([hemoglobin, hemoglobin + 0.05, hemoglobin + 1.5]),
+            "weight": rng.choice([f" {weight} ", weight + 2, "unknown"]),
+            "heart_rate": rng.choice([72, 80, "N/A"]),
+            "adverse_events": rng.choice(["none", "Headache", "nausea"]),
+            "visit_date": rng.choice(["2025-01-15", "2025-01-16"]),
+            "temperature": rng.choice([36.6, float("nan"), 39.0]),
+            "extra_field": rng.choice([None, "x"]),
+        }
+        batch.append({"edc_data": edc, "source_data": source})
+    return batch
+
+
+class TestColumnarBatchVerification:
+    """Test the columnar batch verification engine."""
+
+    def _run(self, batch: List[Dict[str, Any]], columnar: bool) -> Dict[str, Any]:
+        return json.loads(batch_verification(json.dumps({
+            "batch_data": batch,
+            "context": {"field_tolerances": {"weight": 0.5}},
+            "columnar": columnar
+        })))
+
+    def test_columnar_matches_scalar_results(self):
+        """Test that the columnar engine produces the same records as the scalar path."""
+        batch = _mixed_batch(200)
+
+        scalar = self._run(batch, columnar=False)
+        columnar = self._run(batch, columnar=True)
+
+        assert scalar["verification_mode"] == "scalar"
+        assert columnar["verification_mode"] == "columnar"
+        assert [_strip_volatile(r) for r in columnar["verification_results"]] == \
+            [_strip_volatile(r) for r in scalar["verification_results"]]
+        assert columnar["summary_statistics"] == scalar["summary_statistics"]
+
+    def test_columnar_used_by_default_for_large_batches(self):
+        """Test that large batches pick the columnar engine automatically."""
+        small = json.loads(batch_verification(json.dumps({"batch_data": _mixed_batch(3)})))
+        large = json.loads(batch_verification(json.dumps({
+            "batch_data": _mixed_batch(COLUMNAR_MIN_BATCH_SIZE)
+        })))
+
+        assert small["verification_mode"] == "scalar"
+        assert large["verification_mode"] == "columnar"
+        assert large["successful_verifications"] == COLUMNAR_MIN_BATCH_SIZE
+
+    def test_columnar_isolates_failing_pairs(self):
+        """Test that a malformed pair is reported without failing the batch."""
+        batch = _mixed_batch(4)
+        batch.insert(2, {"edc_data": {"subject_id": "BAD"}, "source_data": ["not", "a", "dict"]})
+
+        result = self._run(batch, columnar=True)
+
+        assert result["failed_verifications"] == 1
+        assert result["verification_results"][2]["status"] == "failed"
+        assert result["verification_results"][3]["subject_id"] == "SUBJ0002"
+
+    def test_columnar_handles_ints_too_large_for_a_float(self):
+        """Test one huge integer is compared on its own instead of failing the column."""
+        batch = _mixed_batch(COLUMNAR_MIN_BATCH_SIZE)
+        batch[3]["edc_data"]["hemoglobin"] = 10 ** 400
+
+        scalar = self._run(batch, columnar=False)
+        columnar = self._run(batch, columnar=True)
+
+        assert columnar["failed_verifications"] == 0
+        assert [_strip_volatile(r) for r in columnar["verification_results"]] == \
+            [_strip_volatile(r) for r in scalar["verification_results"]]
+        flagged = {d["field_name"] for d in columnar["verification_results"][3]["discrepancies"]}
+        assert "hemoglobin" in flagged
+
+    @pytest.mark.asyncio
+    async def test_data_verifier_batch_columnar_flag(self):
+        """Test the DataVerifier wrapper forwards the columnar option."""
+        verifier = DataVerifier()
+        pairs = [(p["edc_data"], p["source_data"]) for p in _mixed_batch(10)]
+
+        result = await verifier.batch_verification(pairs, columnar=True)
+
+        assert result["verification_mode"] == "columnar"
+        assert result["total_subjects"] == 10
+
+
+class TestInProcessToolCores:
+    """Test that DataVerifier methods run the tool cores without JSON round-trips."""
+
+    @pytest.mark.asyncio
+    async def test_wrapper_methods_skip_json_serialization(self):
+        """Test the wrapper methods never serialize through the string tools."""
+        verifier = DataVerifier()
+        pair = _mixed_batch(1)[0]
+
+        with patch("app.agents.data_verifier.json") as mock_json:
+            verification = await verifier.cross_system_verification(pair["edc_data"], pair["source_data"])
+            sdv = await verifier.complete_sdv_verification(pair["edc_data"], pair["source_data"])
+            batch = await verifier.batch_verification([(pair["edc_data"], pair["source_data"])] * 3, columnar=False)
+            assessment = await verifier.assess_critical_data({"subject_id": "SUBJ0000"})
+            patterns = await verifier.detect_discrepancy_patterns([{"site_id": "S1", "field_name": "weight"}])
+            audit = await verifier.generate_audit_trail({"verification_id": verification["verification_id"]})
+
+        assert not mock_json.dumps.called
+        assert not mock_json.loads.called
+        assert verification["subject_id"] == "SUBJ0000"
+        assert sdv["sdv_status"] in ["passed", "requires_review", "failed"]
+        assert batch["successful_verifications"] == 3
+        assert assessment["risk_level"] == "low"
+        assert patterns["site_patterns"]["S1"]["total_discrepancies"] == 1
+        assert audit["verification_id"] == verification["verification_id"]
+
+    def test_string_adapters_match_cores(self):
+        """Test the JSON tool adapters return the same content as the wrappers."""
+        pair = _mixed_batch(1)[0]
+        request = json.dumps({"edc_data": pair["edc_data"], "source_data": pair["source_data"]})
+
+        verification = json.loads(cross_system_verification(request))
+        sdv = json.loads(complete_sdv_verification(request))
+
+        assert [d["field_name"] for d in sdv["discrepancies"]] == \
+            [d["field_name"] for d in verification["discrepancies"]]
+        assert sdv["match_score"] == verification["match_score"]
+
+    def test_string_adapters_reject_invalid_json(self):
+        """Test the JSON tool adapters report malformed requests."""
+        assert "error" in json.loads(cross_system_verification("not json"))
+        assert "error" in json.loads(batch_verification("{"))
+
+
+class TestSeverityClassifierCache:
+    """Test the precompiled, memoized field severity classifier."""
+
+    @staticmethod
+    def _reference_severity(field_name: str, discrepancy_type: DiscrepancyType) -> DiscrepancySeverity:
+        """Original linear-scan classification, used as the oracle."""
+        field_lower = field_name.lower()
+        if any(critical in field_lower for critical in CRITICAL_FIELDS):
+            if discrepancy_type in [DiscrepancyType.VALUE_MISMATCH, DiscrepancyType.MISSING_IN_EDC]:
+                return DiscrepancySeverity.CRITICAL
+            return DiscrepancySeverity.MAJOR
+        if "primary" in field_lower or "endpoint" in field_lower:
+            return DiscrepancySeverity.MAJOR
+        if discrepancy_type == DiscrepancyType.FORMAT_DIFFERENCE:
+            return DiscrepancySeverity.INFO
+        if discrepancy_type in [DiscrepancyType.VALUE_MISMATCH, DiscrepancyType.MISSING_IN_EDC]:
+            return DiscrepancySeverity.MINOR
+        return DiscrepancySeverity.INFO
+
+    def test_matches_linear_scan(self):
+        """Test the compiled classifier agrees with the linear field scan."""
+        fields = list(CRITICAL_FIELDS) + [
+            "Hemoglobin_Baseline", "SERIOUS_ADVERSE_EVENTS_COUNT", "secondary_endpoint",
+            "primary_outcome", "weight", "visit_date", "deathdate", "ae_term", ""
+        ]
+
+        for field in fields:
+            for discrepancy_type in DiscrepancyType:
+                assert _assess_field_severity(field, discrepancy_type) == \
+                    self._reference_severity(field, discrepancy_type), (field, discrepancy_type)
+
+    def test_cache_stats_track_hits_and_misses(self):
+        """Test repeated lookups are served from the bounded cache."""
+        verifier = DataVerifier()
+        _assess_field_severity.cache_clear()
+
+        for _ in range(3):
+            verifier.assess_discrepancy_severity("hemoglobin", DiscrepancyType.VALUE_MISMATCH)
+            verifier.assess_discrepancy_severity("weight", DiscrepancyType.VALUE_MISMATCH)
+
+        stats = verifier.get_severity_cache_stats()
+        assert stats["misses"] == 2
+        assert stats["hits"] == 4
+        assert stats["size"] == 2
+        assert stats["max_size"] == SEVERITY_CACHE_SIZE
+        assert stats["hit_rate"] == pytest.approx(4 / 6)
+
+
+class TestParallelBatchVerification:
+    """Test process pool sharding of batch verification."""
+
+    CONTEXT = {"field_tolerances": {"weight": 0.5}}
+
+    @pytest.fixture
+    def executor(self):
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            yield pool
+
+    @pytest.mark.asyncio
+    async def test_parallel_matches_serial_results(self, executor):
+        """Test sharded results come back in input order and match the serial path."""
+        batch = _mixed_batch(150)
+        batch.insert(40, {"edc_data": {"subject_id": "BAD"}, "source_data": ["not", "a", "dict"]})
+
+        serial = _batch_verification(batch, self.CONTEXT, columnar=False)
+        parallel = await _parallel_batch_verification(
+            batch, self.CONTEXT, columnar=False, executor=executor, max_workers=2, shard_size=16
+        )
+
+        # Results cross a process boundary, so compare serialized forms (NaN != NaN)
+        def canonical(results):
+            return [json.dumps(_strip_volatile(r), sort_keys=True) for r in results]
+
+        assert parallel["verification_mode"] == "parallel"
+        assert canonical(parallel["verification_results"]) == canonical(serial["verification_results"])
+        assert parallel["summary_statistics"] == serial["summary_statistics"]
+        assert parallel["failed_verifications"] == 1
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_falls_back_and_is_replaced(self):
+        """Test a batch on a broken process-wide pool still verifies and the next batch gets a new pool."""
+        broken, _ = get_verification_executor()
+        with pytest.raises(Exception):
+            broken.submit(os._exit, 1).result()
+        batch = _mixed_batch(40)
+
+        try:
+            result = await _parallel_batch_verification(batch, self.CONTEXT, columnar=False, shard_size=8)
+            assert data_verifier._verification_executor is None
+
+            fresh, _ = get_verification_executor()
+            again = await _parallel_batch_verification(batch, self.CONTEXT, columnar=False, shard_size=8)
+        finally:
+            shutdown_verification_executor()
+
+        serial = _batch_verification(batch, self.CONTEXT, columnar=False)
+        assert fresh is not broken
+        assert result["summary_statistics"] == serial["summary_statistics"]
+        assert again["summary_statistics"] == serial["summary_statistics"]
+        assert result["failed_verifications"] == again["failed_verifications"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_consumes_input_lazily(self, executor):
+        """Test the stream only pulls the shards it has room for."""
+        pulled = []
+
+        def pairs():
+            for index, pair in enumerate(_mixed_batch(100)):
+                pulled.append(index)
+                yield pair
+
+        stream = _iter_parallel_verification(pairs(), self.CONTEXT, executor=executor, max_workers=1, shard_size=10)
+        first = await stream.__anext__()
+        await stream.aclose()
+
+        assert first["subject_id"] == "SUBJ0000"
+        assert len(pulled) <= 30
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self):
+        """Test the DataVerifier wrapper does not block other coroutines."""
+        verifier = DataVerifier()
+        pairs = [(p["edc_data"], p["source_data"]) for p in _mixed_batch(400)]
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            result = await verifier.batch_verification(pairs, columnar=False, parallel=False)
+        finally:
+            beat.cancel()
+
+        assert result["total_subjects"] == 400
+        assert ticks > 1
+
+    @pytest.mark.asyncio
+    async def test_stream_batch_verification_aggregates_stats(self):
+        """Test the streaming wrapper updates match_score statistics incrementally."""
+        verifier = DataVerifier()
+        pairs = [(p["edc_data"], p["source_data"]) for p in _mixed_batch(20)]
+        stats = BatchVerificationStats()
+
+        try:
+            subjects = [r["subject_id"] async for r in verifier.stream_batch_verification(pairs, stats)]
+        finally:
+            shutdown_verification_executor()
+
+        serial = _batch_verification([{"edc_data": e, "source_data": s} for e, s in pairs], {
+            "field_tolerances": verifier.context.field_tolerances
+        })
+        assert subjects == [f"SUBJ{i:04d}" for i in range(20)]
+        assert stats.total == 20
+        assert stats.summary() == serial["summary_statistics"]
+        assert stats.min_match_score <= stats.summary()["average_match_score"] <= stats.max_match_score
+
+
+class TestUnitAwareComparison:
+    """Test UNIT_CONVERSIONS-aware value comparison."""
+
+    def test_equivalent_values_in_different_units(self):
+        """Test kg vs lbs companion units yield a unit mismatch, not a value mismatch."""
+        result = _cross_system_verification(
+            {"subject_id": "SUBJ001", "weight": "75", "weight_unit": "kg"},
+            {"subject_id": "SUBJ001", "weight": "165", "weight_unit": "lbs"},
+            {}
+        )
+
+        assert result["total_fields"] == 2
+        [discrepancy] = result["discrepancies"]
+        assert discrepancy["field_name"] == "weight"
+        assert discrepancy["discrepancy_type"] == "unit_mismatch"
+        assert discrepancy["converted_source_value"] == pytest.approx(74.84, abs=0.01)
+
+    def test_equivalent_critical_field_is_informational(self):
+        """Test equal values in different units are not findings and count as matching."""
+        result = _cross_system_verification(
+            {"subject_id": "SUBJ001", "temperature": "37.0 C"},
+            {"subject_id": "SUBJ001", "temperature": "98.6 F"},
+            {}
+        )
+
+        [discrepancy] = result["discrepancies"]
+        assert (discrepancy["discrepancy_type"], discrepancy["severity"]) == ("unit_mismatch", "info")
+        assert result["critical_findings"] == []
+        assert result["match_score"] == 1.0
+
+    @pytest.mark.parametrize("edc, source", [
+        ({"height": "180 cm"}, {"height": "180 kg"}),
+        ({"height": "180 cm"}, {"height": "180 furlongs"}),
+        ({"weight": 80, "weight_unit": "kg"}, {"weight": 80, "weight_unit": "stone"}),
+    ])
+    def test_incompatible_or_unknown_units_are_a_mismatch(self, edc, source):
+        """Test units without a conversion are reported instead of comparing the bare numbers."""
+        result = _cross_system_verification(
+            {"subject_id": "SUBJ001", **edc}, {"subject_id": "SUBJ001", **source}, {}
+        )
+
+        [discrepancy] = result["discrepancies"]
+        assert discrepancy["field_name"] in ("height", "weight")
+        assert discrepancy["discrepancy_type"] == "unit_mismatch"
+        assert result["match_score"] == 0.5
+
+    def test_values_still_differ_after_conversion(self):
+        """Test a real difference is reported as a value mismatch in EDC units."""
+        result = _cross_system_verification(
+            {"subject_id": "SUBJ001", "temperature": "37.0 C"},
+            {"subject_id": "SUBJ001", "temperature": "101.3 F"},
+            {}
+        )
+
+        [discrepancy] = result["discrepancies"]
+        assert discrepancy["discrepancy_type"] == "value_mismatch"
+        assert discrepancy["edc_unit"] == "celsius"
+        assert discrepancy["difference"] == pytest.approx(1.5, abs=0.01)
+
+    def test_inline_units_matching_within_tolerance(self):
+        """Test equal inline units are stripped before the tolerance check."""
+        result = _cross_system_verification(
+            {"subject_id": "SUBJ001", "height": "180 cm"},
+            {"subject_id": "SUBJ001", "height": "180.5cm"},
+            {}
+        )
+
+        assert result["discrepancies"] == []
+        assert result["match_score"] == 1.0
+
+    def test_unconvertible_units_are_compared_as_before(self):
+        """Test fields without a conversion keep their unit fields as ordinary values."""
+        result = _cross_system_verification(
+            {"subject_id": "SUBJ001", "glucose": 95, "glucose_unit": "mg/dL"},
+            {"subject_id": "SUBJ001", "glucose": 5.3, "glucose_unit": "mmol/L"},
+            {}
+        )
+
+        assert {d["field_name"] for d in result["discrepancies"]} == {"glucose", "glucose_unit"}
+
+    def test_columnar_conversion_matches_scalar(self):
+        """Test the vectorized per-row conversion reproduces the scalar results."""
+        rng = random.Random(11)
+        batch = []
+        for i in range(COLUMNAR_MIN_BATCH_SIZE + 6):
+            weight_kg = round(rng.uniform(50.0, 110.0), 1)
+            source_unit = rng.choice(["kg", "lbs", "pounds"])
+            source_weight = weight_kg if source_unit == "kg" else round(weight_kg * 2.20462, 1)
+            batch.append({
+                "edc_data": {"subject_id": f"SUBJ{i:04d}", "weight": weight_kg, "weight_unit": "kg",
+                             "temperature": rng.choice(["37.0 C", 37.0])},
+                "source_data": {"subject_id": f"SUBJ{i:04d}", "weight": rng.choice([source_weight, source_weight + 3]),
+                                "weight_unit": rng.choice([source_unit, source_unit, "stone"]),
+                                "temperature": rng.choice(["98.6 F", "37.0", 37.0, "37.0 kg"])}
+            })
+
+        scalar = _batch_verification(batch, {}, columnar=False)
+        columnar = _batch_verification(batch, {}, columnar=True)
+
+        assert columnar["verification_mode"] == "columnar"
+        assert [_strip_volatile(r) for r in columnar["verification_results"]] == \
+            [_strip_volatile(r) for r in scalar["verification_results"]]
+        types = {d["discrepancy_type"] for r in scalar["verification_results"] for d in r["discrepancies"]}
+        assert "unit_mismatch" in types
+
+    @pytest.mark.skipif(np is None, reason="NumPy not installed")
+    def test_convert_field_unit_scalar_and_array(self):
+        """Test the conversion table applies to floats and NumPy arrays alike."""
+        assert convert_field_unit("body_weight", 100.0, "kg", "lb") == pytest.approx(220.462)
+        assert convert_field_unit("weight", 70.0, "kg", "kg") == 70.0
+        assert np.allclose(convert_field_unit("temperature", np.array([0.0, 100.0]), "C", "F"), [32.0, 212.0])
+        with pytest.raises(ValueError):
+            convert_field_unit("glucose", 95.0, "mg/dL", "mmol/L")
+
+
+class TestDateNormalization:
+    """Test date normalization for format-difference detection."""
+
+    @pytest.mark.parametrize("value", [
+        "2025-01-15", "2025/01/15", "20250115", "2025-01-15T09:30:00",
+        "15-JAN-2025", "15JAN2025", "15 January 2025", "Jan 15, 2025", "15.01.2025", "01/15/2025"
+    ])
+    def test_common_edc_formats(self, value):
+        """Test each supported format normalizes to the ISO date."""
+        assert normalize_date(value) == "2025-01-15"
+
+    def test_non_dates_and_invalid_dates(self):
+        """Test values that are not real dates are not normalized."""
+        assert normalize_date("headache") is None
+        assert normalize_date("2025-02-30") is None
+        assert normalize_date(None) is None
+
+    def test_format_difference_vs_value_mismatch(self):
+        """Test same dates in different formats are format differences, others mismatches."""
+        same = _compare_values("visit_date", "2025-01-15", "15-Jan-2025", {})
+        different = _compare_values("visit_date", "2025-01-15", "16-Jan-2025", {})
+        ambiguous = _compare_values("visit_date", "2025-02-01", "01/02/2025", {})
+        unambiguous = _compare_values("visit_date", "2025-01-13", "13/01/2025", {})
+
+        assert same["discrepancy_type"] == "format_difference"
+        assert different["discrepancy_type"] == "value_mismatch"
+        assert different["description"].startswith("Date mismatch")
+        assert ambiguous["discrepancy_type"] == "value_mismatch"
+        assert unambiguous["discrepancy_type"] == "format_difference"
+
+    @pytest.mark.parametrize("edc_value, source_value", [
+        ("01/02/2025", "02/01/2025"),
+        ("13/01/2025", "01/13/2025"),
+        ("2025-01-15 08:00", "2025-01-15 23:30"),
+    ])
+    def test_real_date_differences_are_mismatches(self, edc_value, source_value):
+        """Test swapped fields in one format and different times are not format differences."""
+        result = _compare_values("visit_date", edc_value, source_value, {})
+
+        assert result["discrepancy_type"] == "value_mismatch"
+        assert result["description"].startswith("Date mismatch")
+
+    def test_same_format_padding_and_one_sided_time(self):
+        """Test zero padding and a time on one side only are format differences."""
+        assert _compare_values("visit_date", "1/2/2025", "01/02/2025", {})["discrepancy_type"] == "format_difference"
+        assert _compare_values("visit_date", "2025-01-15", "2025-01-15 08:00", {})["discrepancy_type"] == "format_difference"
+
+    def test_column_normalization_parses_distinct_values_once(self):
+        """Test the batch API reuses parses across a repeated column."""
+        _parse_date.cache_clear()
+        column = ["2025-01-15", "15-JAN-2025", None, "n/a"] * 50
+
+        normalized = normalize_date_column(column)
+
+        assert normalized[:4] == ["2025-01-15", "2025-01-15", None, None]
+        assert len(normalized) == 200
+        assert get_date_cache_stats()["misses"] == 3
@@ -0,0 +1,215 @@
+"""Tests for the deadline-ordered escalation scheduler."""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.agents import escalation_scheduler
+from app.agents.escalation_scheduler import EscalationScheduler
+from app.agents.query_store import QueryStatus, QueryStore
+from app.agents.query_tracker import ESCALATION_RULES, QueryTracker, _check_queries_for_follow_up
+from tests.test_data.tracked_queries import make_query
+
+
+@pytest.fixture
+def scheduler(store):
+    return EscalationScheduler(store, ESCALATION_RULES)
+
+
+class TestEscalationScheduler:
+    """Test arming, due lookups and firing."""
+
+    def test_due_lists_only_passed_deadlines_in_order(self, store, scheduler):
+        """Test due() returns the escalations past their deadline, earliest first."""
+        store.put(make_query("Q-MAJOR-80H", 80))
+        store.put(make_query("Q-CRIT-30H", 30, priority="critical"))
+        store.put(make_query("Q-MINOR-10H", 10, priority="minor"))
+        store.put(make_query("Q-CRIT-90H", 90, priority="critical", status=QueryStatus.RESOLVED))
+
+        due = scheduler.due()
+
+        assert [item["query_id"] for item in due] == ["Q-MAJOR-80H", "Q-CRIT-30H"]
+        assert (due[0]["action"], due[0]["escalate_to"], due[0]["escalation_level"]) == (
+            "follow_up", "site_coordinator", 1
+        )
+        assert len(scheduler) == 3
+        assert scheduler.due(limit=1)[0]["query_id"] == "Q-MAJOR-80H"
+
+    def test_priority_filter_applies_before_limit(self, store, scheduler):
+        """Test a priority-filtered follow-up check fills its limit from that priority."""
+        store.put_many(make_query(f"Q-MAJOR-{index}", 100 + index) for index in range(5))
+        store.put_many(make_query(f"Q-CRIT-{index}", 30 + index, priority="critical") for index in range(3))
+
+        follow_ups = _check_queries_for_follow_up(scheduler, {"limit": 2, "priority": "critical"})
+
+        assert [item["query_id"] for item in follow_ups] == ["Q-CRIT-2", "Q-CRIT-1"]
+        assert len(_check_queries_for_follow_up(scheduler, {"limit": "4"})) == 4
+        for limit in ("five", -1, True, 2.5):
+            with pytest.raises(ValueError):
+                _check_queries_for_follow_up(scheduler, {"limit": limit})
+
+    @pytest.mark.asyncio
+    async def test_fire_due_escalates_and_rearms_next_level(self, store, scheduler):
+        """Test a fired escalation is stored and the next level is armed."""
+        query = make_query("Q-CRIT-30H", 30, priority="critical")
+        store.put(query)
+
+        fired = await scheduler.fire_due()
+
+        stored = store["Q-CRIT-30H"]
+        assert [item["escalation_level"] for item in fired] == [1]
+        assert (stored.status, stored.escalation_level) == (QueryStatus.PENDING, 1)
+        assert stored.history[-1].event_type == "escalated"
+        assert scheduler.due() == []
+        assert scheduler.next_deadline() == pytest.approx((query.created_at + timedelta(hours=48)).timestamp())
+        assert await scheduler.fire_due() == []
+
+    @pytest.mark.asyncio
+    async def test_only_escalating_levels_change_status(self, store, scheduler):
+        """Test reminders keep the query's status and levels marked escalates set ESCALATED."""
+        store.put(make_query("Q-FOLLOW-UP", 80, status=QueryStatus.IN_PROGRESS))
+        store.put(make_query("Q-ESCALATION", 170, status=QueryStatus.IN_PROGRESS))
+
+        fired = await scheduler.fire_due()
+
+        assert [(item["query_id"], item["action"]) for item in fired] == [
+            ("Q-ESCALATION", "escalation"), ("Q-FOLLOW-UP", "follow_up")
+        ]
+        assert store["Q-FOLLOW-UP"].status == QueryStatus.IN_PROGRESS
+        assert store["Q-FOLLOW-UP"].history[-1].event_type == "escalated"
+        assert store["Q-ESCALATION"].status == QueryStatus.ESCALATED
+
+    @pytest.mark.asyncio
+    async def test_backlog_fires_off_the_event_loop_in_one_flush(self, store, scheduler):
+        """Test a backlog of due queries is written from a worker thread in one flush."""
+        store.put_many(make_query(f"Q-{index}", 80) for index in range(300))
+        store.flush()
+        loop_thread = threading.get_ident()
+        flush_threads = []
+        real_flush = store.flush
+
+        def tracking_flush():
+            flush_threads.append(threading.get_ident())
+            real_flush()
+
+        with patch.object(store, "flush", side_effect=tracking_flush), \
+                patch.object(store, "get", side_effect=AssertionError("per-query read")):
+            fired = await scheduler.fire_due()
+
+        assert len(fired) == 300
+        assert flush_threads and loop_thread not in flush_threads
+        assert all(store[f"Q-{index}"].escalation_level == 1 for index in range(300))
+        assert len(store.history("Q-0")) == 1
+
+    @pytest.mark.asyncio
+    async def test_overdue_query_jumps_to_current_level(self, store, scheduler):
+        """Test a query several levels overdue fires once at its current level."""
+        store.put(make_query("Q-CRIT-60H", 60, priority="critical"))
+
+        fired = await scheduler.fire_due()
+
+        assert [item["escalation_level"] for item in fired] == [2]
+        assert fired[0]["escalate_to"] == "medical_monitor"
+
+    @pytest.mark.asyncio
+    async def test_resolving_or_deleting_disarms(self, store, scheduler):
+        """Test closed and deleted queries no longer escalate."""
+        tracker = QueryTracker(store=store)
+        store.put(make_query("Q-1", 80))
+        store.put(make_query("Q-2", 80))
+
+        await tracker.update_status("Q-1", QueryStatus.RESOLVED)
+        del store["Q-2"]
+
+        assert scheduler.due() == []
+        assert len(scheduler) == 0
+        assert await scheduler.fire_due() == []
+
+    def test_rebuild_from_storage(self, tmp_path):
+        """Test a scheduler over a reopened store finds the same due escalations."""
+        path = str(tmp_path / "queries.db")
+        store = QueryStore(path)
+        live = EscalationScheduler(store, ESCALATION_RULES)
+        store.put_many(make_query(f"Q-{index}", age_hours=index) for index in range(0, 200, 5))
+        expected = [item["query_id"] for item in live.due()]
+        store.close()
+
+        reopened = QueryStore(path)
+        due = EscalationScheduler(reopened, ESCALATION_RULES)
+        assert due.due() == []
+        due.rebuild()
+
+        assert [item["query_id"] for item in due.due()] == expected
+        assert len(expected) == 25
+        reopened.close()
+
+
+class TestEscalationBackgroundTask:
+    """Test the asyncio task that fires escalations."""
+
+    @pytest.mark.asyncio
+    async def test_fires_due_escalations_in_background(self, store):
+        """Test escalations already due at start are fired and handed to the handler."""
+        fired = []
+        store.put(make_query("Q-OVERDUE", 80))
+        scheduler = EscalationScheduler(store, ESCALATION_RULES, on_escalation=fired.append, check_interval=0.05)
+
+        scheduler.start()
+        try:
+            for _ in range(500):
+                if fired:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await scheduler.stop()
+
+        assert [item["query_id"] for item in fired] == ["Q-OVERDUE"]
+        assert store["Q-OVERDUE"].escalation_level == 1
+        assert scheduler.is_running is False
+
+    @pytest.mark.asyncio
+    async def test_clock_jump_rebuilds_schedule(self, store):
+        """Test a wall clock jump rebuilds the heap and fires what became due."""
+        store.put(make_query("Q-SOON", 71.9))
+        scheduler = EscalationScheduler(store, ESCALATION_RULES, check_interval=0.05)
+        real_time = time.time
+        offset = [0.0]
+
+        with patch.object(escalation_scheduler.time, "time", side_effect=lambda: real_time() + offset[0]):
+            scheduler.start()
+            try:
+                await asyncio.sleep(0.1)
+                assert store["Q-SOON"].escalation_level == 0
+                offset[0] = 3600.0
+                for _ in range(500):
+                    if store["Q-SOON"].escalation_level:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await scheduler.stop()
+
+        assert scheduler.rebuild_count >= 2
+        assert store["Q-SOON"].escalation_level == 1
+
+
+class TestQueryTrackerFollowUps:
+    """Test the tracker reports follow-ups from its stored queries."""
+
+    @pytest.mark.asyncio
+    async def test_check_follow_ups(self, store):
+        """Test follow-ups come from the stored queries rather than sample data."""
+        tracker = QueryTracker(store=store)
+        await tracker.track_query({
+            "query_id": "Q-TRACKED",
+            "priority": "critical",
+            "created_at": (datetime.now() - timedelta(hours=25)).isoformat()
+        })
+
+        follow_ups = await tracker.check_follow_ups()
+
+        assert [item["query_id"] for item in follow_ups] == ["Q-TRACKED"]
+        assert follow_ups[0]["action"] == "urgent_reminder"
@@ -0,0 +1,197 @@
+"""Tests for incremental discrepancy pattern aggregation."""
+
+import pytest
+
+from app.agents.pattern_aggregator import DiscrepancyPatternAggregator, TemporalPatternEngine
+from app.agents.data_verifier import DataVerifier
+from app.agents.query_analyzer import QueryAnalyzer
+
+
+def _verifier_events():
+    return [
+        {"site_id": "S1", "field_name": "hemoglobin", "discrepancy_type": "value_mismatch", "frequency": 8, "severity": "major"},
+        {"site_id": "S1", "field_name": "weight", "discrepancy_type": "unit_mismatch", "frequency": 4},
+        {"site_id": "S2", "field_name": "hemoglobin", "discrepancy_type": "value_mismatch"},
+        {"field_name": "visit_date", "discrepancy_type": "format_difference", "frequency": 2},
+    ]
+
+
+class TestDiscrepancyPatternAggregator:
+    """Test the running site and field counters."""
+
+    def test_counters(self):
+        """Test per-site and per-field totals, types and cross references."""
+        aggregator = DiscrepancyPatternAggregator.from_events(_verifier_events())
+
+        assert aggregator.site_totals == {"S1": 12, "S2": 1, "Unknown": 2}
+        assert aggregator.site_fields["S1"] == {"hemoglobin": 8, "weight": 4}
+        assert aggregator.site_severities["S1"] == {"major": 8}
+        assert aggregator.field_totals["hemoglobin"] == 9
+        assert aggregator.field_sites["visit_date"] == {"": 2}
+        assert aggregator.field_types["hemoglobin"] == {"value_mismatch": 9}
+        assert aggregator.sites_over(10) == ["S1"]
+        assert aggregator.get_stats() == {"events_processed": 4, "sites": 3, "fields": 3}
+
+    def test_incremental_equals_full_rebuild(self):
+        """Test folding events in batches gives the same aggregates as one pass."""
+        events = _verifier_events() * 5
+        incremental = DiscrepancyPatternAggregator()
+        for start in range(0, len(events), 3):
+            incremental.extend(events[start:start + 3])
+
+        full = DiscrepancyPatternAggregator.from_events(events)
+
+        assert incremental.site_totals == full.site_totals
+        assert incremental.site_types == full.site_types
+        assert incremental.field_sites == full.field_sites
+        assert incremental.events_processed == full.events_processed
+
+
+DAY = 86400
+
+
+class TestTemporalPatternEngine:
+    """Test time-bucketed rolling windows, trends and spikes."""
+
+    def test_rolling_totals_and_trend(self):
+        """Test window totals and slope for a steadily rising daily count."""
+        engine = TemporalPatternEngine(windows=(7, 30))
+        for day in range(30):
+            for _ in range(day + 1):
+                engine.add(day * DAY, "S1", "hemoglobin")
+
+        summary = engine.summary()
+        site = summary["sites"]["S1"]
+
+        assert site["rolling_totals"] == {"7": sum(range(24, 31)), "30": sum(range(1, 31))}
+        assert site["latest_bucket_count"] == 30
+        assert site["trend_slope"] == pytest.approx(1.0)
+        assert site["trend"] == "increasing"
+        assert summary["fields"]["hemoglobin"] == site
+        assert summary["events_with_timestamp"] == sum(range(1, 31))
+
+    def test_spike_detection(self):
+        """Test a burst well above the baseline is reported, completed or current."""
+        engine = TemporalPatternEngine()
+        for day in range(20):
+            engine.add(day * DAY, "S1", "weight", weight=2 if day % 2 else 1)
+        engine.add(20 * DAY, "S1", "weight", weight=15)
+
+        summary = engine.summary()
+        assert summary["sites"]["S1"]["spike"] is True
+        assert [spike["dimension"] for spike in summary["spikes"]] == ["site", "field"]
+
+        engine.add(21 * DAY, "S1", "weight", weight=1)
+        summary = engine.summary()
+        assert summary["sites"]["S1"]["spike"] is False
+        assert summary["spikes"][0]["bucket_start"].startswith("1970-01-21")
+        assert summary["spikes"][0]["count"] == 15
+
+    def test_gaps_and_late_events(self):
+        """Test empty buckets count toward the baseline and too-late events are dropped."""
+        engine = TemporalPatternEngine(windows=(7,))
+        engine.add(0, "S1", "weight")
+        engine.add(10 * DAY, "S1", "weight")
+        engine.add(9 * DAY, "S1", "weight")
+        engine.add(1 * DAY, "S1", "weight")
+
+        series = engine.series[("site", "S1")]
+        assert series.baseline_n == 10
+        assert series.baseline_mean == pytest.approx(0.1)
+        assert engine.summary()["sites"]["S1"]["rolling_totals"] == {"7": 2}
+        assert engine.late_events == 1
+
+    def test_memory_is_bounded_per_key(self):
+        """Test a long history keeps only the ring of recent buckets per key."""
+        engine = TemporalPatternEngine(windows=(7, 30))
+        for day in range(3 * 365):
+            engine.add(day * DAY + 3600, f"S{day % 3}", "hemoglobin")
+
+        assert all(len(series.counts) == 30 for series in engine.series.values())
+        assert engine.summary()["fields"]["hemoglobin"]["rolling_totals"]["30"] == 30
+
+    def test_aggregator_parses_timestamps(self):
+        """Test events with ISO strings, dates and epochs feed the temporal engine."""
+        events = [
+            {"site_id": "S1", "field_name": "weight", "timestamp": "2024-03-01T10:00:00Z"},
+            {"site_id": "S1", "field_name": "weight", "detected_at": "2024-03-02"},
+            {"site_id": "S2", "field_name": "weight", "timestamp": 1709424000.0},
+            {"site_id": "S2", "field_name": "weight", "timestamp": "not a date"},
+        ]
+        aggregator = DiscrepancyPatternAggregator.from_events(events)
+        summary = aggregator.temporal.summary()
+
+        assert summary["events_with_timestamp"] == 3
+        assert summary["first_bucket_start"] == "2024-03-01T00:00:00+00:00"
+        assert summary["latest_bucket_start"] == "2024-03-03T00:00:00+00:00"
+        assert summary["fields"]["weight"]["rolling_totals"]["7"] == 3
+        assert DiscrepancyPatternAggregator.from_events(_verifier_events()).temporal.summary() == {}
+
+
+    def test_reversed_history_matches_sorted(self):
+        """Test newest-first history gives the same temporal patterns as oldest-first."""
+        events = [
+            {"site_id": "S1", "field_name": "weight", "frequency": 15 if day == 40 else 1 + day % 2, "timestamp": day * DAY}
+            for day in range(41)
+        ]
+
+        oldest_first = DiscrepancyPatternAggregator.from_events(events).temporal.summary()
+        newest_first = DiscrepancyPatternAggregator.from_events(reversed(events)).temporal.summary()
+
+        assert newest_first == oldest_first
+        assert newest_first["late_events"] == 0
+        assert newest_first["sites"]["S1"]["spike"] is True
+
+class TestAgentPatternDetection:
+    """Test agents answering pattern queries from persistent aggregates."""
+
+    @pytest.mark.asyncio
+    async def test_data_verifier_recorded_events(self):
+        """Test DataVerifier patterns from recorded events match a full analysis."""
+        verifier = DataVerifier()
+        events = _verifier_events()
+
+        verifier.record_discrepancy_events(events[:2])
+        verifier.record_discrepancy_events(events[2:])
+        incremental = await verifier.detect_discrepancy_patterns()
+        full = await verifier.detect_discrepancy_patterns(events)
+
+        assert incremental["site_patterns"] == full["site_patterns"]
+        assert incremental["field_patterns"] == full["field_patterns"]
+        assert incremental["data_points_analyzed"] == 4
+        assert incremental["site_patterns"]["S1"]["fields_affected"] == ["hemoglobin", "weight"]
+        assert incremental["recommendations"] == full["recommendations"]
+
+    @pytest.mark.asyncio
+    async def test_query_analyzer_recorded_events(self):
+        """Test QueryAnalyzer patterns keep the detect_patterns result shape."""
+        analyzer = QueryAnalyzer()
+        history = [
+            {"site_name": "Memorial", "field_name": "hemoglobin", "discrepancy_count": 4},
+            {"site_name": "Memorial", "field_name": "", "discrepancy_count": 3},
+            {"field_name": "hemoglobin", "discrepancy_count": 8},
+        ]
+
+        analyzer.record_pattern_events(history)
+        incremental = await analyzer.detect_patterns()
+        full = await analyzer.detect_patterns(history)
+
+        assert incremental["site_patterns"] == full["site_patterns"]
+        assert incremental["site_patterns"]["Memorial"] == {"discrepancy_count": 7, "fields": {"hemoglobin": 4}}
+        assert incremental["field_patterns"]["hemoglobin"] == {"total_discrepancies": 12, "sites": ["Memorial"]}
+        assert len(incremental["recommendations"]) == 2
+        assert analyzer.context.detected_patterns["data_points_analyzed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_temporal_patterns_filled(self):
+        """Test both agents report temporal patterns for timestamped history."""
+        verifier_events = [dict(event, timestamp=f"2024-01-0{i + 1}") for i, event in enumerate(_verifier_events())]
+        verifier_result = await DataVerifier().detect_discrepancy_patterns(verifier_events)
+
+        analyzer_result = await QueryAnalyzer().detect_patterns([
+            {"site_name": "Memorial", "field_name": "hemoglobin", "discrepancy_count": 4, "date": "2024-01-01"},
+            {"site_name": "Memorial", "field_name": "hemoglobin", "discrepancy_count": 6, "date": "2024-01-05"},
+        ])
+
+        assert verifier_result["temporal_patterns"]["sites"]["S1"]["rolling_totals"]["30"] == 12
+        assert analyzer_result["temporal_patterns"]["sites"]["Memorial"]["rolling_totals"] == {"7": 10, "30": 10}
@@ -0,0 +1,384 @@
+"""Tests for the Query Analyzer analysis engines."""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.agents import query_analyzer
+from app.agents.query_analyzer import (
+    QueryAnalyzer,
+    QueryAnalysisContext,
+    QuerySeverity,
+    batch_analyze_data,
+    shutdown_analysis_executor,
+    _batch_analyze_data,
+    _iter_batch_analysis,
+    _analysis_cache,
+    _analyze_data_point,
+    get_analysis_cache_stats,
+    cross_system_match,
+    _leaf_values_match,
+    CRITICAL_MEDICAL_TERMS,
+    MAJOR_MEDICAL_TERMS,
+    MEDICAL_SEVERITY_PATTERN,
+    _assess_severity,
+    _scan_medical_severity,
+)
+
+
+class TestMedicalSeverityScanner:
+    """Test the compiled medical term automaton."""
+
+    @pytest.mark.parametrize("term", sorted(CRITICAL_MEDICAL_TERMS | MAJOR_MEDICAL_TERMS))
+    def test_every_term_matches_as_a_word(self, term):
+        """Test each configured term is found inside a narrative."""
+        expected = QuerySeverity.CRITICAL if term in CRITICAL_MEDICAL_TERMS else QuerySeverity.MAJOR
+
+        assert _scan_medical_severity(f"subject reported {term}, resolved.") == expected
+
+    @pytest.mark.parametrize("text", ["ridiculous delay", "sarcoma noted", "subject studied diary", "aftershock"])
+    def test_word_boundaries(self, text):
+        """Test terms embedded in longer words do not match."""
+        assert _scan_medical_severity(text) is None
+
+    def test_variants(self):
+        """Test plurals and whitespace or hyphen variants of multi-word terms."""
+        assert _scan_medical_severity("two seizures overnight") == QuerySeverity.CRITICAL
+        assert _scan_medical_severity("life -\n threatening reaction") == QuerySeverity.CRITICAL
+        assert _scan_medical_severity("post-surgery review") == QuerySeverity.MAJOR
+
+    def test_highest_severity_wins(self):
+        """Test a critical term anywhere outranks earlier major terms."""
+        narrative = "emergency visit; " * 500 + "later cardiac arrest"
+
+        assert _scan_medical_severity(narrative) == QuerySeverity.CRITICAL
+        assert _scan_medical_severity("icu stay", "patient died") == QuerySeverity.CRITICAL
+        assert MEDICAL_SEVERITY_PATTERN.search("emergency visit").lastgroup == "major"
+
+    def test_assess_severity(self):
+        """Test data point and analyzer severity use the scanner."""
+        assert _assess_severity({}, "ae_term", "Hospitalized", "none") == QuerySeverity.MAJOR
+        assert _assess_severity({}, "ae_term", "Ridiculous", "none") == QuerySeverity.INFO
+
+        analyzer = QueryAnalyzer()
+        assert analyzer.assess_medical_severity("Myocardial Infarction") == QuerySeverity.CRITICAL
+        assert analyzer.assess_medical_severity("routine checkup") == QuerySeverity.INFO
+
+
+def _data_points(count: int) -> list:
+    return [
+        {
+            "subject_id": f"SUBJ{i:03d}",
+            "site_id": f"SITE{i % 3}",
+            "field_name": "hemoglobin",
+            "edc_value": str(12.0 + i * 0.1),
+            "source_value": "11.0"
+        }
+        for i in range(count)
+    ]
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    """Thread pool recording the most tasks outstanding at once."""
+
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.outstanding = 0
+        self.peak = 0
+        self._count_lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._count_lock:
+            self.outstanding += 1
+            self.peak = max(self.peak, self.outstanding)
+        future = super().submit(fn, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._count_lock:
+            self.outstanding -= 1
+
+
+class TestConcurrentBatchAnalysis:
+    """Test chunked, concurrent batch analysis."""
+
+    @pytest.fixture(autouse=True)
+    def _shutdown_pool(self):
+        yield
+        shutdown_analysis_executor()
+
+    def test_results_in_input_order(self):
+        """Test the batch tool returns one ordered result per item and records history."""
+        context = QueryAnalysisContext()
+        data_points = _data_points(60)
+
+        results = json.loads(batch_analyze_data(context, json.dumps(data_points)))
+
+        assert [r["subject_id"] for r in results] == [d["subject_id"] for d in data_points]
+        serial = [query_analyzer._analyze_data_point(d) for d in data_points]
+        assert [(r["category"], r["severity"]) for r in results] == [(r["category"], r["severity"]) for r in serial]
+        assert len(context.analysis_history) == 60
+        assert context.analysis_history.query(site_id="SITE1")[0]["subject_id"] == "SUBJ001"
+        assert context.performance_metrics["total_data_points"] == 60
+
+    def test_honors_chunk_and_in_flight_limits(self):
+        """Test at most max_in_flight items are outstanding on the pool."""
+        executor = _CountingExecutor()
+        try:
+            results = dict(_iter_batch_analysis(_data_points(200), executor, chunk_size=10, max_in_flight=30))
+        finally:
+            executor.shutdown()
+
+        assert sorted(results) == list(range(200))
+        assert executor.peak <= 30
+
+    def test_failures_are_isolated(self, monkeypatch):
+        """Test one failing item yields an error result and the rest succeed."""
+        analyze = query_analyzer._analyze_data_point
+
+        def flaky(data_point):
+            if data_point["subject_id"] == "SUBJ002":
+                raise ValueError("bad value")
+            return analyze(data_point)
+
+        monkeypatch.setattr(query_analyzer, "_analyze_data_point", flaky)
+        context = QueryAnalysisContext()
+
+        results = _batch_analyze_data(context, _data_points(5))
+
+        assert results[2]["error"] == "bad value"
+        assert results[2]["subject_id"] == "SUBJ002"
+        assert all("error" not in r for i, r in enumerate(results) if i != 2)
+        assert context.performance_metrics["batch_failures"] == 1
+        assert len(context.analysis_history) == 4
+
+    def test_item_timeout(self, monkeypatch):
+        """Test a hung item times out without holding back the batch."""
+        analyze = query_analyzer._analyze_data_point
+        release = threading.Event()
+
+        def slow(data_point):
+            if data_point["subject_id"] == "SUBJ001":
+                release.wait(5)
+            return analyze(data_point)
+
+        monkeypatch.setattr(query_analyzer, "_analyze_data_point", slow)
+        context = QueryAnalysisContext()
+
+        started = time.monotonic()
+        results = _batch_analyze_data(context, _data_points(4), chunk_size=2, max_in_flight=4, item_timeout=0.2)
+        elapsed = time.monotonic() - started
+        release.set()
+
+        assert elapsed < 2
+        assert results[1]["error"].startswith("Analysis timed out")
+        assert [r.get("error") for i, r in enumerate(results) if i != 1] == [None, None, None]
+        assert context.performance_metrics["batch_timeouts"] == 1
+
+    def test_timed_out_items_keep_their_slots(self, monkeypatch):
+        """Test hung items are not replaced on the pool while they still run."""
+        analyze = query_analyzer._analyze_data_point
+        release = threading.Event()
+
+        def hang_first_two(data_point):
+            if data_point["subject_id"] in ("SUBJ000", "SUBJ001"):
+                release.wait(5)
+            return analyze(data_point)
+
+        monkeypatch.setattr(query_analyzer, "_analyze_data_point", hang_first_two)
+        executor = _CountingExecutor()
+        try:
+            started = time.monotonic()
+            results = dict(_iter_batch_analysis(_data_points(4), executor, chunk_size=1, max_in_flight=2, item_timeout=0.2))
+            elapsed = time.monotonic() - started
+        finally:
+            release.set()
+            executor.shutdown()
+
+        assert elapsed < 2
+        assert executor.peak <= 2
+        assert all(results[index]["error"].startswith("Analysis timed out") for index in (0, 1))
+        assert all(results[index]["error"] == "Analysis pool is occupied by timed-out items" for index in (2, 3))
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_as_items_finish(self, monkeypatch):
+        """Test streamed results arrive in completion order with input indexes."""
+        analyze = query_analyzer._analyze_data_point
+
+        def slow_first(data_point):
+            if data_point["subject_id"] == "SUBJ000":
+                time.sleep(0.2)
+            return analyze(data_point)
+
+        monkeypatch.setattr(query_analyzer, "_analyze_data_point", slow_first)
+        analyzer = QueryAnalyzer()
+
+        streamed = [(index, result["subject_id"]) async for index, result in analyzer.stream_batch_analysis(_data_points(3))]
+
+        assert streamed[-1] == (0, "SUBJ000")
+        assert sorted(streamed) == [(0, "SUBJ000"), (1, "SUBJ001"), (2, "SUBJ002")]
+        assert len(analyzer.context.analysis_history) == 3
+
+
+class TestAnalysisResultCache:
+    """Test the content-addressed analysis cache."""
+
+    @pytest.fixture(autouse=True)
+    def _empty_cache(self):
+        _analysis_cache.clear()
+        yield
+        _analysis_cache.clear()
+
+    @staticmethod
+    def _stable(result: dict) -> dict:
+        return {k: v for k, v in result.items() if k not in ("query_id", "created_at", "subject_id")}
+
+    def test_hit_regenerates_per_call_fields(self):
+        """Test a repeated data point for another subject reuses the analysis."""
+        first = _analyze_data_point({"subject_id": "SUBJ001", "visit": "Week 4", "field_name": "weight", "edc_value": "70", "source_value": "80"})
+        second = _analyze_data_point({"subject_id": "SUBJ002", "visit": "Week 4", "field_name": "weight", "edc_value": "70", "source_value": "80"})
+
+        assert self._stable(first) == self._stable(second)
+        assert second["subject_id"] == "SUBJ002"
+        assert first["query_id"] != second["query_id"]
+        assert get_analysis_cache_stats()["hits"] == 1
+
+        second["suggested_actions"].append("mutated")
+        third = _analyze_data_point({"subject_id": "SUBJ003", "visit": "Week 4", "field_name": "weight", "edc_value": "70", "source_value": "80"})
+        assert "mutated" not in third["suggested_actions"]
+
+    def test_key_covers_inputs_that_change_the_analysis(self):
+        """Test values, visit and subject presence are part of the key."""
+        base = {"subject_id": "SUBJ001", "visit": "Week 4", "field_name": "weight", "edc_value": "70", "source_value": "80"}
+
+        _analyze_data_point(base)
+        _analyze_data_point(dict(base, visit="Week 8"))
+        _analyze_data_point(dict(base, source_value="70"))
+        no_subject = _analyze_data_point(dict(base, subject_id=""))
+
+        _analyze_data_point(dict(base, visit=["Week", 4]))
+        unhashable = _analyze_data_point(dict(base, visit=["Week", 4]))
+
+        assert get_analysis_cache_stats()["hits"] == 1
+        assert no_subject["confidence"] == pytest.approx(0.8)
+        assert unhashable["visit"] == ["Week", 4]
+
+    def test_hit_rate_in_performance_metrics(self):
+        """Test the analyzer reports the cache hit rate."""
+        analyzer = QueryAnalyzer()
+        context = QueryAnalysisContext()
+
+        batch_analyze_data(context, json.dumps(_data_points(3) * 4))
+        shutdown_analysis_executor()
+
+        assert context.performance_metrics["analysis_cache"]["hits"] == 9
+        assert context.performance_metrics["analysis_cache"]["hit_rate"] == pytest.approx(0.75)
+        assert analyzer.get_performance_metrics()["analysis_cache"]["misses"] == 3
+
+
+class TestCrossSystemMatch:
+    """Test leaf-by-leaf matching of nested documents."""
+
+    @staticmethod
+    def _match(edc_data: dict, source_data: dict) -> dict:
+        return json.loads(cross_system_match(QueryAnalysisContext(), json.dumps(edc_data), json.dumps(source_data)))
+
+    def test_nested_sections_compared_by_path(self):
+        """Test nested vital signs and labs are compared per leaf."""
+        edc_data = {
+            "subject_id": "SUBJ001",
+            "vital_signs": {"systolic_bp": 142.0, "heart_rate": 78},
+            "laboratory": {"hemoglobin": 12.5, "platelets": 250},
+            "notes": "Stable"
+        }
+        source_data = {
+            "subject_id": "subj001",
+            "vital_signs": {"systolic_bp": "142", "heart_rate": 82},
+            "laboratory": {"hemoglobin": 12.5, "alt": 40},
+            "notes": "stable "
+        }
+
+        result = self._match(edc_data, source_data)
+
+        assert result["matching_fields"] == ["subject_id", "vital_signs.systolic_bp", "laboratory.hemoglobin", "notes"]
+        assert result["discrepancies"][0] == {
+            "field": "vital_signs.heart_rate",
+            "edc_value": 78,
+            "source_value": 82,
+            "severity": "major"
+        }
+        assert [(d["field"], d["issue"]) for d in result["discrepancies"][1:]] == [
+            ("laboratory.platelets", "missing_in_source"), ("laboratory.alt", "missing_in_edc")
+        ]
+        assert result["total_fields_compared"] == 7
+        assert result["match_score"] == pytest.approx(4 / 7)
+
+    def test_lists_and_shape_mismatches(self):
+        """Test list items are matched by position and structure changes are discrepancies."""
+        result = self._match(
+            {"adverse_events": [{"term": "Headache"}, {"term": "Nausea"}], "laboratory": {"alt": 40}},
+            {"adverse_events": [{"term": "headache"}], "laboratory": "not done"}
+        )
+
+        assert result["matching_fields"] == ["adverse_events.0.term"]
+        assert [d["field"] for d in result["discrepancies"]] == ["adverse_events.1", "laboratory"]
+        assert result["discrepancies"][0]["edc_value"] == {"term": "Nausea"}
+        assert result["discrepancies"][1]["edc_value"] == {"alt": 40}
+
+    def test_one_sided_entries_are_discrepancies(self):
+        """Test extra list items and keys in the source are reported at their paths."""
+        result = self._match(
+            {"adverse_events": [{"term": "headache"}], "laboratory": {"hemoglobin": 12.5}},
+            {
+                "adverse_events": [{"term": "headache"}, {"term": "myocardial infarction"}],
+                "laboratory": {"hemoglobin": 12.5, "platelets": 40}
+            }
+        )
+
+        assert result["matching_fields"] == ["adverse_events.0.term", "laboratory.hemoglobin"]
+        assert result["discrepancies"] == [
+            {
+                "field": "adverse_events.1",
+                "edc_value": None,
+                "source_value": {"term": "myocardial infarction"},
+                "issue": "missing_in_edc",
+                "severity": "major"
+            },
+            {
+                "field": "laboratory.platelets",
+                "edc_value": None,
+                "source_value": 40,
+                "issue": "missing_in_edc",
+                "severity": "minor"
+            }
+        ]
+        assert result["match_score"] == pytest.approx(0.5)
+
+    def test_one_sided_top_level_keys_are_not_compared(self):
+        """Test keys only one document has at the top level stay out of the score."""
+        result = self._match(
+            {"subject_id": "S1", "entered_by": "crc1", "visit": "Baseline", "laboratory": {"alt": 40}},
+            {"subject_id": "S1", "visit": "baseline", "source_page": 12, "laboratory": {"alt": 40}}
+        )
+
+        assert result["matching_fields"] == ["subject_id", "visit", "laboratory.alt"]
+        assert result["discrepancies"] == []
+        assert result["match_score"] == 1.0
+        assert result["recommendations"] == []
+
+    @pytest.mark.parametrize("edc_value, source_value, expected", [
+        ("75.0", "75", True),
+        (12.5, "12.50", True),
+        ("NaN", "nan", True),
+        (True, "true", True),
+        (True, 1, False),
+        ("Yes", "No", False),
+        (0.1 + 0.2, 0.3, True),
+    ])
+    def test_typed_leaf_comparison(self, edc_value, source_value, expected):
+        """Test numbers compare by value and other leaves case-insensitively."""
+        assert _leaf_values_match(edc_value, source_value) is expected
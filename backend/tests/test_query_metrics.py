@@ -0,0 +1,162 @@
+"""Tests for the live query metrics counters."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.agents.query_metrics import QueryMetrics
+from app.agents.query_store import QueryStatus
+from app.agents.query_tracker import ESCALATION_RULES, QueryTracker
+from tests.test_data.tracked_queries import make_query
+
+
+@pytest.fixture
+def metrics(store):
+    return QueryMetrics(store, ESCALATION_RULES)
+
+
+class TestQueryMetrics:
+    """Test counters follow every state transition."""
+
+    @pytest.mark.asyncio
+    async def test_counters_follow_transitions(self, store, metrics):
+        """Test tracking, status changes and deletes adjust the counts."""
+        tracker = QueryTracker(store=store)
+        for index in range(6):
+            await tracker.track_query({"query_id": f"Q{index}", "priority": ("critical", "major")[index % 2]})
+        await tracker.update_status("Q0", QueryStatus.RESOLVED)
+        await tracker.update_status("Q1", QueryStatus.IN_PROGRESS)
+        del store["Q2"]
+
+        snapshot = metrics.snapshot()
+
+        assert snapshot["total"] == 5
+        assert snapshot["status"] == {
+            "pending": 3, "in_progress": 1, "resolved": 1, "cancelled": 0, "escalated": 0
+        }
+        assert snapshot["priority"] == {"critical": 2, "major": 3}
+        assert snapshot["sla_risk"] == {"on_track": 4, "at_risk": 0, "breached": 0}
+        assert metrics.check_consistency()["consistent"] is True
+
+    def test_snapshot_does_not_read_the_store(self, store, metrics):
+        """Test a snapshot is served from the counters alone."""
+        store.put_many(make_query(f"Q{index}") for index in range(500))
+        store.flush()
+
+        with patch.object(store, "_select", side_effect=AssertionError("store was read")):
+            assert metrics.snapshot()["total"] == 500
+
+    def test_non_numeric_sla_hours_falls_back_to_priority(self, store, metrics):
+        """Test a stored sla_hours that is not a number is treated as absent."""
+        store.put(make_query("Q-BAD", age_hours=100, metadata={"sla_hours": "two days"}))
+        store.put(make_query("Q-OK"))
+
+        snapshot = metrics.snapshot()
+
+        assert snapshot["total"] == 2
+        assert snapshot["sla_risk"] == {"on_track": 1, "at_risk": 1, "breached": 0}
+        assert metrics.check_consistency()["consistent"] is True
+
+    def test_sla_risk_advances_with_time(self, store, metrics):
+        """Test open queries move to at risk and breached as their SLA runs out."""
+        store.put(make_query("Q-CRIT", priority="critical"))
+        store.put(make_query("Q-MAJOR"))
+        store.put(make_query("Q-OLD", age_hours=130))
+        now = time.time()
+
+        assert metrics.snapshot(now)["sla_risk"] == {"on_track": 2, "at_risk": 0, "breached": 1}
+        assert metrics.snapshot(now + 20 * 3600)["sla_risk"] == {"on_track": 1, "at_risk": 1, "breached": 1}
+        assert metrics.snapshot(now + 100 * 3600)["sla_risk"] == {"on_track": 0, "at_risk": 1, "breached": 2}
+
+        store.put(make_query("Q-CRIT", priority="critical", status=QueryStatus.RESOLVED))
+        assert metrics.snapshot(now + 200 * 3600)["sla_risk"] == {"on_track": 0, "at_risk": 0, "breached": 2}
+
+    def test_consistency_check_repairs_drift(self, store, metrics):
+        """Test rows changed outside the store are detected and recounted."""
+        store.put_many(make_query(f"Q{index}") for index in range(10))
+        store.flush()
+        with store._connection:
+            store._connection.execute("UPDATE tracked_queries SET status = 'cancelled' WHERE query_id = 'Q1'")
+
+        result = metrics.check_consistency()
+
+        assert result["consistent"] is False
+        assert result["differences"]["status"]["stored"]["cancelled"] == 1
+        assert metrics.snapshot()["status"]["cancelled"] == 1
+        assert metrics.check_consistency()["consistent"] is True
+
+
+    def test_recount_scans_columns_instead_of_building_queries(self, store, metrics):
+        """Test the consistency check does not build a TrackedQuery per open query."""
+        store.put_many(make_query(f"Q{index}", metadata={"sla_hours": "12"}) for index in range(20))
+        store.flush()
+
+        with patch.object(store, "find", side_effect=AssertionError("built every query")):
+            assert metrics.check_consistency()["consistent"] is True
+
+    def test_write_during_rebuild_read_is_kept(self, store, metrics):
+        """Test a save committed while rebuild() reads the store survives the reset."""
+        store.put_many(make_query(f"Q{index}") for index in range(5))
+        store.flush()
+        real_find = store.find
+
+        def find_then_write(*args, **kwargs):
+            queries = real_find(*args, **kwargs)
+            store.put(make_query("Q-LATE"))
+            store.put(make_query("Q0", status=QueryStatus.RESOLVED))
+            store.flush()
+            return queries
+
+        with patch.object(store, "find", side_effect=find_then_write):
+            metrics.rebuild()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["total"] == 6
+        assert snapshot["status"]["resolved"] == 1
+        assert metrics.check_consistency()["consistent"] is True
+
+    @pytest.mark.asyncio
+    async def test_background_check_runs_off_the_event_loop(self, store):
+        """Test the periodic consistency check runs in a worker thread."""
+        metrics = QueryMetrics(store, ESCALATION_RULES, check_interval=0.01)
+        loop_thread = threading.get_ident()
+        threads = []
+        real_check = metrics.check_consistency
+
+        def tracking_check():
+            threads.append(threading.get_ident())
+            return real_check()
+
+        with patch.object(metrics, "check_consistency", side_effect=tracking_check):
+            metrics.start()
+            try:
+                for _ in range(500):
+                    if threads:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await metrics.stop()
+
+        assert threads and loop_thread not in threads
+
+
+class TestQueryTrackerMetrics:
+    """Test the tracker reads metrics and SLA from the shared rules."""
+
+    @pytest.mark.asyncio
+    async def test_get_metrics_and_sla(self, store):
+        """Test get_metrics reports the counters and SLA uses the priority's hours."""
+        tracker = QueryTracker(store=store)
+        store.put(make_query("Q-CRIT", age_hours=22, priority="critical"))
+        store.put(make_query("Q-DONE", status=QueryStatus.RESOLVED))
+
+        metrics = tracker.get_metrics()
+        sla = await tracker.check_sla_status("Q-CRIT")
+
+        assert (metrics["total_queries"], metrics["resolved_queries"], metrics["resolution_rate"]) == (2, 1, 0.5)
+        assert metrics["sla_risk"]["at_risk"] == 1
+        assert sla["sla_hours"] == 24
+        assert sla["at_risk"] is True and sla["breached"] is False
@@ -0,0 +1,371 @@
+"""Tests for the persistent query store behind the Query Tracker."""
+
+import logging
+import sqlite3
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.agents.query_store import (
+    QueryEvent,
+    QueryStatus,
+    QueryStore,
+    QueryStoreListener,
+    TrackedQuery,
+    close_query_store,
+    get_query_store,
+    sqlite_path_from_url
+)
+from app.core.config import Settings
+from app.agents.query_tracker import QueryTracker, _track_clinical_query
+
+
+def _query(index: int, **overrides) -> TrackedQuery:
+    values = dict(
+        query_id=f"Q{index:05d}",
+        status=QueryStatus.PENDING,
+        created_at=datetime(2026, 1, 1) + timedelta(hours=index),
+        priority=("critical", "major", "minor")[index % 3],
+        site_id=f"SITE{index % 4}",
+        subject_id=f"SUBJ{index % 10}",
+        due_date=datetime(2026, 1, 2) + timedelta(hours=index)
+    )
+    values.update(overrides)
+    return TrackedQuery(**values)
+
+
+class TestQueryStore:
+    """Test indexes, batched writes and lookups."""
+
+    def test_lookups_use_secondary_indexes(self):
+        """Test every filterable column has an index the planner uses."""
+        store = QueryStore()
+        indexes = {row[1] for row in store._connection.execute("PRAGMA index_list(tracked_queries)")}
+        plan = store._connection.execute(
+            "EXPLAIN QUERY PLAN SELECT query_id FROM tracked_queries WHERE site_id = ?", ("SITE1",)
+        ).fetchall()
+
+        for column in ("status", "priority", "site_id", "subject_id", "due_date"):
+            assert f"ix_tracked_queries_{column}" in indexes
+        assert "ix_tracked_queries_site_id" in plan[0][-1]
+
+    def test_writes_are_batched_until_read(self):
+        """Test writes wait in the buffer until it fills or a read flushes it."""
+        store = QueryStore(batch_size=10)
+
+        store.put_many(_query(index) for index in range(5))
+        assert store._connection.execute("SELECT COUNT(*) FROM tracked_queries").fetchone()[0] == 0
+        store.put_many(_query(index) for index in range(5, 12))
+        assert store._connection.execute("SELECT COUNT(*) FROM tracked_queries").fetchone()[0] == 10
+
+        assert len(store) == 12
+        assert store._pending == []
+
+    def test_find_and_count_filters(self):
+        """Test filters combine and due date bounds order results."""
+        store = QueryStore()
+        store.put_many(_query(index) for index in range(120))
+        store.put(_query(200, status=QueryStatus.RESOLVED, site_id="SITE1"))
+
+        site_one = store.find(site_id="SITE1", status=[QueryStatus.PENDING, "in_progress"])
+        due_soon = store.find(due_before=datetime(2026, 1, 2, 5), limit=3)
+
+        assert len(site_one) == 30
+        assert all(query.site_id == "SITE1" and query.status == QueryStatus.PENDING for query in site_one)
+        assert [query.query_id for query in due_soon] == ["Q00000", "Q00001", "Q00002"]
+        assert store.count(priority="critical", subject_id="SUBJ0") == 4
+        assert store.count_by("status") == {"pending": 120, "resolved": 1}
+
+    def test_history_and_row_updates(self):
+        """Test events append to history and save() leaves history in place."""
+        store = QueryStore()
+        query = _query(1)
+        query.add_event("query_tracked", "Started tracking")
+        store.put(query)
+
+        store.add_event("Q00001", QueryEvent("reminder_sent", "Reminder 1"))
+        query.status = QueryStatus.IN_PROGRESS
+        store.save(query)
+
+        stored = store["Q00001"]
+        assert stored.status == QueryStatus.IN_PROGRESS
+        assert [event.event_type for event in stored.history] == ["query_tracked", "reminder_sent"]
+
+        del store["Q00001"]
+        assert "Q00001" not in store
+        assert store.history("Q00001") == []
+
+    def test_failed_write_is_dropped(self):
+        """Test a write the database rejects is dropped without failing later reads."""
+        store = QueryStore()
+        bad_row = QueryStore._query_row(_query(2))[:2] + (None,) + QueryStore._query_row(_query(2))[3:]
+        store.put(_query(1))
+        store._queue("row", bad_row)
+        store.put(_query(3))
+
+        assert sorted(store) == ["Q00001", "Q00003"]
+        assert store.dropped_writes == 1
+        assert store._pending == []
+        store.put(_query(4))
+        assert len(store) == 3
+
+    def test_operational_error_keeps_writes_buffered(self):
+        """Test a transient database error raises and keeps the writes for the next flush."""
+        store = QueryStore()
+        store.put(_query(1))
+        store.put(_query(2))
+
+        with patch.object(store, "_write", side_effect=sqlite3.OperationalError("database is locked")):
+            with pytest.raises(sqlite3.OperationalError):
+                store.flush()
+
+        assert len(store._pending) == 2
+        assert sorted(store) == ["Q00001", "Q00002"]
+        assert store.dropped_writes == 0
+
+    def test_operational_error_during_retry_keeps_remaining_writes(self):
+        """Test writes after a transient error in the one-by-one retry stay buffered."""
+        store = QueryStore()
+        bad_row = QueryStore._query_row(_query(2))[:2] + (None,) + QueryStore._query_row(_query(2))[3:]
+        store.put(_query(1))
+        store._queue("row", bad_row)
+        store.put(_query(3))
+        write = store._write
+        failures = iter([sqlite3.IntegrityError("batch"), None, sqlite3.IntegrityError("row"), sqlite3.OperationalError("disk full")])
+
+        def flaky_write(writes):
+            failure = next(failures, None)
+            if failure is not None:
+                raise failure
+            write(writes)
+
+        with patch.object(store, "_write", side_effect=flaky_write):
+            with pytest.raises(sqlite3.OperationalError):
+                store.flush()
+
+        assert store.dropped_writes == 1
+        assert [operation for operation, _ in store._pending] == ["put"]
+        assert sorted(store) == ["Q00001", "Q00003"]
+
+    def test_invalid_queries_are_rejected_before_queuing(self):
+        """Test put() and save() refuse records the database would reject later."""
+        store = QueryStore()
+
+        with pytest.raises(ValueError):
+            store.put(_query(1, priority=None))
+        with pytest.raises(ValueError):
+            store.save(_query(2, status="pending"))
+        assert store._pending == []
+
+    def test_listeners_hear_only_committed_writes(self):
+        """Test listeners are told about writes after they commit, and never about dropped ones."""
+        store = QueryStore()
+        saved, deleted = [], []
+        listener = QueryStoreListener()
+        listener.query_saved = lambda query: saved.append(query.query_id)
+        listener.queries_deleted = deleted.extend
+        store.subscribe(listener)
+
+        store.put(_query(1))
+        store._queue("row", QueryStore._query_row(_query(2))[:2] + (None,) + QueryStore._query_row(_query(2))[3:])
+        store.delete_many(["Q00001"])
+        assert saved == []
+
+        store.flush()
+        assert (saved, deleted) == (["Q00001"], ["Q00001"])
+
+    def test_failing_listener_does_not_stop_notification(self):
+        """Test a listener that raises neither skips the other listeners nor fails the flush."""
+        store = QueryStore()
+        failing, saved = QueryStoreListener(), []
+        failing.query_saved = lambda query: 1 / 0
+        listener = QueryStoreListener()
+        listener.query_saved = lambda query: saved.append(query.query_id)
+        store.subscribe(failing)
+        store.subscribe(listener)
+
+        store.put_many([_query(1), _query(2)])
+
+        assert len(store) == 2
+        assert saved == ["Q00001", "Q00002"]
+
+    def test_persists_across_reopen(self, tmp_path):
+        """Test queries and history survive closing and reopening the file."""
+        url = f"sqlite:///{tmp_path / 'queries.db'}"
+        store = QueryStore.from_url(url)
+        query = _query(7, metadata={"field": "hemoglobin"})
+        query.add_event("query_tracked", "Started tracking")
+        store.put(query)
+        store.close()
+
+        reopened = QueryStore.from_url(url)
+
+        assert reopened["Q00007"].to_dict() == query.to_dict()
+        reopened.close()
+
+    def test_database_urls(self):
+        """Test which database URLs map to SQLite paths."""
+        assert sqlite_path_from_url("") == ":memory:"
+        assert sqlite_path_from_url("sqlite:///./clinical.db") == "./clinical.db"
+        assert sqlite_path_from_url("sqlite:////var/data/clinical.db") == "/var/data/clinical.db"
+        assert sqlite_path_from_url("postgresql://db/clinical") is None
+        with pytest.raises(ValueError):
+            QueryStore.from_url("postgresql://db/clinical")
+
+
+    def test_in_memory_process_store_warns(self, caplog):
+        """Test the process-wide store warns when tracked queries will not survive a restart."""
+        close_query_store()
+        try:
+            with patch("app.agents.query_store.get_settings", return_value=Settings(database_url="")):
+                with caplog.at_level(logging.WARNING, logger="app.agents.query_store"):
+                    store = get_query_store()
+        finally:
+            close_query_store()
+
+        assert store.path == ":memory:"
+        assert "lost on restart" in caplog.text
+
+class TestQueryTrackerStore:
+    """Test the tracker reads and writes through its store."""
+
+    @pytest.mark.asyncio
+    async def test_track_and_update_persist(self):
+        """Test tracking and status changes are stored with their history."""
+        store = QueryStore()
+        tracker = QueryTracker(store=store)
+
+        tracked = await tracker.track_query({
+            "query_id": "Q-ALT-001",
+            "priority": "critical",
+            "site_id": "SITE01",
+            "subject_id": "SUBJ001",
+            "created_at": "2026-01-05T09:00:00",
+            "due_date": "2026-01-06T09:00:00"
+        })
+        updated = await tracker.update_status("Q-ALT-001", QueryStatus.RESOLVED, notes="Value corrected")
+        missing = await tracker.update_status("Q-UNKNOWN", QueryStatus.RESOLVED)
+
+        stored = store["Q-ALT-001"]
+        assert tracked["status"] == "tracking_started"
+        assert (updated["old_status"], updated["new_status"]) == ("pending", "resolved")
+        assert missing["success"] is False
+        assert stored.site_id == "SITE01" and stored.resolved_at is not None
+        assert stored.due_date == datetime(2026, 1, 6, 9)
+        assert [event["event_type"] for event in tracker.get_query_history("Q-ALT-001")] == [
+            "query_tracked", "status_changed"
+        ]
+        assert tracker.get_metrics()["resolved_queries"] == 1
+
+    def test_tracker_initialization(self):
+        """Test the tracker exposes its assistant and instructions."""
+        tracker = QueryTracker(store=QueryStore())
+
+        assert tracker.assistant.id == "asst_query_tracker"
+        assert tracker.instructions == tracker.agent.instructions
+
+    def test_track_defaults_missing_priority(self):
+        """Test a null priority is tracked as major and bad records are reported, not lost."""
+        store = QueryStore()
+
+        tracked = _track_clinical_query(store, {"query_id": "Q1", "priority": None})
+        invalid = _track_clinical_query(store, {"query_id": 42})
+
+        assert (tracked["status"], tracked["priority"]) == ("tracking_started", "major")
+        assert store["Q1"].priority == "major"
+        assert "error" in invalid and 42 not in store
+
+    def test_track_validates_sla_hours(self):
+        """Test sla_hours is stored as a number and a non-numeric one is rejected."""
+        store = QueryStore()
+
+        tracked = _track_clinical_query(store, {"query_id": "Q1", "sla_hours": "48"})
+        invalid = _track_clinical_query(store, {"query_id": "Q2", "sla_hours": "two days"})
+
+        assert tracked["status"] == "tracking_started"
+        assert store["Q1"].metadata["sla_hours"] == 48.0
+        assert "sla_hours" in invalid["error"] and "Q2" not in store
+
+    @pytest.mark.asyncio
+    async def test_auto_close_deletes_old_resolved(self):
+        """Test old resolved queries are removed from the store."""
+        store = QueryStore()
+        tracker = QueryTracker(store=store)
+        store.put(_query(1, status=QueryStatus.RESOLVED, resolved_at=datetime.now() - timedelta(days=40)))
+        store.put(_query(2, status=QueryStatus.RESOLVED, resolved_at=datetime.now()))
+        store.put(_query(3))
+
+        result = await tracker.auto_close_old_queries(days_old=30)
+
+        assert result["closed_queries"] == ["Q00001"]
+        assert sorted(store) == ["Q00002", "Q00003"]
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_status(self):
+        """Test a bulk update reports each id and writes one event per change."""
+        store = QueryStore(batch_size=10)
+        tracker = QueryTracker(store=store)
+        store.put_many(_query(index) for index in range(50))
+        store.put(_query(60, status=QueryStatus.RESOLVED))
+        query_ids = [f"Q{index:05d}" for index in range(50)] + ["Q00060", "Q-MISSING", "Q00001"]
+
+        result = await tracker.bulk_update_status(query_ids, QueryStatus.RESOLVED, notes="Closeout")
+
+        assert (result["updated_count"], result["total_requested"]) == (50, 53)
+        assert result["outcomes"]["Q00001"] == "updated"
+        assert (result["outcomes"]["Q00060"], result["outcomes"]["Q-MISSING"]) == ("unchanged", "not_found")
+        assert store.count(status=QueryStatus.RESOLVED) == 51
+        assert store["Q00002"].resolved_at is not None
+        assert [event.metadata["notes"] for event in store.history("Q00001")] == ["Closeout"]
+        assert store.history("Q00060") == []
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_rejects_invalid_transitions(self):
+        """Test disallowed transitions are reported and leave those queries untouched."""
+        store = QueryStore()
+        tracker = QueryTracker(store=store)
+        store.put(_query(1, status=QueryStatus.RESOLVED, resolved_at=datetime.now()))
+        store.put(_query(2, status=QueryStatus.CANCELLED))
+        store.put(_query(3))
+
+        result = await tracker.bulk_update_status(["Q00001", "Q00002", "Q00003"], QueryStatus.ESCALATED)
+
+        assert result["outcomes"] == {
+            "Q00001": "invalid_transition", "Q00002": "invalid_transition", "Q00003": "updated"
+        }
+        assert result["updated_count"] == 1
+        assert (store["Q00001"].status, store["Q00002"].status) == (QueryStatus.RESOLVED, QueryStatus.CANCELLED)
+        assert store.history("Q00001") == []
+
+    @pytest.mark.asyncio
+    async def test_reopening_clears_resolved_at(self):
+        """Test a resolved query can only be reopened, which clears resolved_at."""
+        store = QueryStore()
+        tracker = QueryTracker(store=store)
+        store.put(_query(1, status=QueryStatus.RESOLVED, resolved_at=datetime.now()))
+        store.put(_query(2, status=QueryStatus.RESOLVED, resolved_at=datetime.now()))
+
+        rejected = await tracker.update_status("Q00001", QueryStatus.PENDING)
+        reopened = await tracker.update_status("Q00001", QueryStatus.IN_PROGRESS)
+        bulk = await tracker.bulk_update_status(["Q00002"], QueryStatus.IN_PROGRESS)
+
+        assert rejected["success"] is False and "resolved to pending" in rejected["error"]
+        assert reopened["success"] is True
+        assert bulk["outcomes"] == {"Q00002": "updated"}
+        for query_id in ("Q00001", "Q00002"):
+            assert (store[query_id].status, store[query_id].resolved_at) == (QueryStatus.IN_PROGRESS, None)
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_is_one_transaction(self):
+        """Test a failure while writing leaves every query unchanged."""
+        store = QueryStore()
+        tracker = QueryTracker(store=store)
+        store.put_many(_query(index) for index in range(20))
+        store.flush()
+
+        with patch.object(store, "_insert_events", side_effect=sqlite3.OperationalError("disk full")):
+            with pytest.raises(sqlite3.OperationalError):
+                await tracker.bulk_update_status([f"Q{index:05d}" for index in range(20)], QueryStatus.CANCELLED)
+
+        assert store.count_by("status") == {"pending": 20}
@@ -0,0 +1,229 @@
+"""Tests for the token-bucket rate limiter."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.agents.base_agent import AgentResponse
+from app.api.dependencies import get_current_settings, get_portfolio_manager
+from app.core import rate_limit
+from app.core.config import Settings
+from app.core.rate_limit import (
+    BucketStore,
+    InMemoryBucketStore,
+    RedisBucketStore,
+    TOKEN_BUCKET_SCRIPT,
+    TokenBucketLimiter,
+    reset_rate_limiter
+)
+
+
+class _FailingStore(BucketStore):
+    async def take(self, key, capacity, refill_rate, cost):
+        raise ConnectionError("store unavailable")
+
+    async def reset(self):
+        raise ConnectionError("store unavailable")
+
+
+class _FakeRedis:
+    """Stand-in for redis.asyncio.Redis running TOKEN_BUCKET_SCRIPT's logic in Python."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.hashes = {}
+        self.scripts = []
+        self.calls = []
+
+    def register_script(self, source):
+        self.scripts.append(source)
+
+        async def script(keys, args):
+            self.calls.append((keys, args))
+            capacity, refill_rate, cost = (float(arg) for arg in args)
+            tokens, updated_at = self.hashes.get(keys[0], (capacity, self.now))
+            tokens = min(capacity, tokens + max(0.0, self.now - updated_at) * refill_rate)
+            allowed = 0
+            if tokens >= cost:
+                tokens -= cost
+                allowed = 1
+            self.hashes[keys[0]] = (tokens, self.now)
+            return [allowed, str(tokens).encode()]
+
+        return script
+
+    async def scan_iter(self, match):
+        for key in list(self.hashes):
+            if key.startswith(match.rstrip("*")):
+                yield key
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+class TestTokenBucketLimiter:
+    """Test bucket refill, spending and the shared budget."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_lazy_refill(self):
+        """Test a client can burst to capacity and regains tokens with time."""
+        limiter = TokenBucketLimiter(InMemoryBucketStore(), requests=3, window_seconds=30)
+
+        with patch.object(rate_limit.time, "monotonic", return_value=100.0):
+            results = [await limiter.check("client-a") for _ in range(4)]
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[2].remaining == 0
+        assert results[3].retry_after == pytest.approx(10.0)
+
+        with patch.object(rate_limit.time, "monotonic", return_value=105.0):
+            assert (await limiter.check("client-a")).allowed is False
+        with patch.object(rate_limit.time, "monotonic", return_value=110.0):
+            assert (await limiter.check("client-a")).allowed is True
+
+    @pytest.mark.asyncio
+    async def test_clients_have_separate_buckets(self):
+        """Test one noisy client does not use another client's budget."""
+        limiter = TokenBucketLimiter(InMemoryBucketStore(), requests=2, window_seconds=60)
+
+        for _ in range(5):
+            await limiter.check("noisy")
+
+        assert (await limiter.check("quiet")).allowed is True
+
+    @pytest.mark.asyncio
+    async def test_workers_sharing_a_store_enforce_one_budget(self):
+        """Test limiters over one shared store spend from the same buckets."""
+        shared_store = InMemoryBucketStore()
+        workers = [TokenBucketLimiter(shared_store, requests=4, window_seconds=60) for _ in range(2)]
+
+        allowed = [(await workers[i % 2].check("client")).allowed for i in range(6)]
+
+        assert allowed == [True, True, True, True, False, False]
+
+    @pytest.mark.asyncio
+    async def test_tracked_buckets_are_bounded(self):
+        """Test the in-process store drops the least recently seen buckets."""
+        store = InMemoryBucketStore(max_buckets=10)
+        limiter = TokenBucketLimiter(store, requests=5, window_seconds=60)
+
+        for index in range(25):
+            await limiter.check(f"client-{index}")
+
+        assert len(store) == 10
+
+    @pytest.mark.asyncio
+    async def test_store_failure_allows_request(self):
+        """Test an unreachable store does not reject traffic."""
+        limiter = TokenBucketLimiter(_FailingStore(), requests=1, window_seconds=60)
+
+        assert (await limiter.check("client")).allowed is True
+
+
+class TestRedisBucketStore:
+    """Test the Redis store's script calls and result parsing."""
+
+    @pytest.mark.asyncio
+    async def test_workers_share_buckets_through_the_script(self):
+        """Test stores over one Redis client spend from the same prefixed bucket."""
+        redis = _FakeRedis()
+        workers = [TokenBucketLimiter(RedisBucketStore(redis), requests=3, window_seconds=30) for _ in range(2)]
+
+        results = [await workers[i % 2].check("client", cost=1) for i in range(4)]
+
+        assert redis.scripts == [TOKEN_BUCKET_SCRIPT, TOKEN_BUCKET_SCRIPT]
+        assert redis.calls[0] == (["rate_limit:client"], [3, 0.1, 1])
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[1].remaining == 1
+        assert results[3].retry_after == pytest.approx(10.0)
+
+        redis.now += 10.0
+        assert (await workers[0].check("client")).allowed is True
+
+    @pytest.mark.asyncio
+    async def test_reset_deletes_only_prefixed_keys(self):
+        """Test reset() removes this store's buckets and leaves other keys."""
+        redis = _FakeRedis()
+        store = RedisBucketStore(redis, key_prefix="rl:")
+        await store.take("a", 5, 1.0, 1)
+        redis.hashes["other:key"] = (1.0, redis.now)
+
+        await store.reset()
+
+        assert list(redis.hashes) == ["other:key"]
+
+
+class TestValidateRateLimits:
+    """Test the API dependency."""
+
+    @pytest.fixture
+    def client(self):
+        reset_rate_limiter()
+        app.dependency_overrides[get_current_settings] = lambda: Settings(
+            debug=False, rate_limit_requests=3, rate_limit_window=60
+        )
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+        reset_rate_limiter()
+
+    def test_rejects_client_over_budget(self, client):
+        """Test requests past the budget get 429 with Retry-After."""
+        responses = [client.get("/api/v1/agents/status") for _ in range(4)]
+
+        assert [response.status_code for response in responses[:3]] == [200, 200, 200]
+        assert responses[0].headers["X-RateLimit-Remaining"] == "2"
+        assert responses[3].status_code == 429
+        assert responses[3].headers["Retry-After"] == "20"
+
+    def test_new_bearer_tokens_do_not_reset_the_budget(self, client):
+        """Test unverified bearer tokens cannot buy a client a fresh bucket."""
+        responses = [
+            client.get("/api/v1/agents/status", headers={"Authorization": f"Bearer token-{index}"})
+            for index in range(4)
+        ]
+
+        assert [response.status_code for response in responses] == [200, 200, 200, 429]
+
+    def test_trusted_proxy_hop_identifies_clients(self, client):
+        """Test behind a trusted proxy each forwarded client has its own bucket and cannot spoof another."""
+        app.dependency_overrides[get_current_settings] = lambda: Settings(
+            debug=False, rate_limit_requests=3, rate_limit_window=60, trusted_proxy_hops=1
+        )
+
+        def status(forwarded_for):
+            return client.get("/api/v1/agents/status", headers={"X-Forwarded-For": forwarded_for}).status_code
+
+        assert [status("203.0.113.7") for _ in range(4)] == [200, 200, 200, 429]
+        assert status("198.51.100.2") == 200
+        assert status("198.51.100.9, 203.0.113.7") == 429
+
+    def test_batch_chat_costs_one_token_per_item(self, client):
+        """Test a batch is charged for each of its messages before any runs."""
+        app.dependency_overrides[get_portfolio_manager] = lambda: MagicMock()
+        client.get("/api/v1/agents/status")
+        batch = {"batch_id": "rate-limited", "requests": [{"message": f"Message {index}"} for index in range(3)]}
+
+        with patch("app.api.endpoints.agents.get_batch_chat_service") as get_service:
+            response = client.post("/api/v1/agents/batch/chat", json=batch)
+
+        assert response.status_code == 429
+        get_service.assert_not_called()
+
+    def test_batch_larger_than_bucket_costs_a_full_bucket(self, client):
+        """Test a batch past the bucket capacity runs on a full bucket and empties it."""
+        portfolio_manager = MagicMock()
+        portfolio_manager.process_message = AsyncMock(return_value=AgentResponse(
+            success=True, content="ok", agent_id="portfolio-manager", execution_time=0.0
+        ))
+        app.dependency_overrides[get_portfolio_manager] = lambda: portfolio_manager
+        batch = {"batch_id": "larger-than-bucket", "requests": [{"message": f"Message {index}"} for index in range(5)]}
+
+        response = client.post("/api/v1/agents/batch/chat", json=batch)
+        assert response.status_code == 200
+        assert response.json()["successful_requests"] == 5
+        assert response.headers["X-RateLimit-Remaining"] == "0"
+
+        retry = client.post("/api/v1/agents/batch/chat", json={**batch, "batch_id": "retry"})
+        assert retry.status_code == 429
+        assert int(retry.headers["Retry-After"]) <= 60
@@ -0,0 +1,114 @@
+"""Tests for the LLM agent response cache."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.agents.portfolio_manager import portfolio_manager_agent
+from app.agents.response_cache import ResponseCache, agent_fingerprint, contains_per_call_ids
+from app.core.cache import SQLiteTTLCache, TTLCache
+
+
+def _run_result(output: str, *tool_outputs: str) -> SimpleNamespace:
+    items = [SimpleNamespace(type="tool_call_output_item", output=tool_output) for tool_output in tool_outputs]
+    return SimpleNamespace(final_output=output, new_items=items)
+
+
+class TestResponseCache:
+    """Test cache keys, hits and the per-call ID rule."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_prompt_is_served_from_cache(self):
+        """Test a normalized repeat of a prompt does not call Runner.run again."""
+        response_cache = ResponseCache(TTLCache(max_size=10, ttl_seconds=60))
+
+        with patch("app.agents.response_cache.Runner.run", new_callable=AsyncMock) as run:
+            run.return_value = _run_result("Enrollment is on track", '{"enrolled": 42}')
+            first = await response_cache.run(portfolio_manager_agent, "Summarize enrollment")
+            second = await response_cache.run(portfolio_manager_agent, "  summarize   ENROLLMENT ")
+
+        assert first == ("Enrollment is on track", False)
+        assert second == ("Enrollment is on track", True)
+        run.assert_awaited_once()
+        assert response_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_agent_changes_miss(self):
+        """Test different instructions, model or tool set use different keys."""
+        response_cache = ResponseCache(TTLCache(max_size=10, ttl_seconds=60))
+        variants = [
+            portfolio_manager_agent,
+            portfolio_manager_agent.clone(instructions="Answer briefly."),
+            portfolio_manager_agent.clone(model="gpt-4o-mini"),
+            portfolio_manager_agent.clone(tools=portfolio_manager_agent.tools[:2])
+        ]
+
+        with patch("app.agents.response_cache.Runner.run", new_callable=AsyncMock) as run:
+            run.return_value = _run_result("Summary")
+            for agent in variants:
+                await response_cache.run(agent, "Summarize enrollment")
+
+        assert run.await_count == len(variants)
+        assert len({agent_fingerprint(agent) for agent in variants}) == len(variants)
+
+    @pytest.mark.asyncio
+    async def test_per_call_ids_are_not_cached_by_default(self):
+        """Test runs whose tool outputs carry generated IDs are only cached when allowed."""
+        result = _run_result("Workflow planned", '{"workflow_id": "WF_1a2b3c4d", "status": "planned"}')
+        assert contains_per_call_ids(result)
+
+        default_cache = ResponseCache(TTLCache(max_size=10, ttl_seconds=60))
+        permissive_cache = ResponseCache(TTLCache(max_size=10, ttl_seconds=60), cache_per_call_ids=True)
+
+        with patch("app.agents.response_cache.Runner.run", new_callable=AsyncMock) as run:
+            run.return_value = result
+            for response_cache in (default_cache, permissive_cache):
+                await response_cache.run(portfolio_manager_agent, "Plan a workflow")
+                await response_cache.run(portfolio_manager_agent, "Plan a workflow")
+
+        assert run.await_count == 3
+        assert default_cache.stats()["uncacheable"] == 2
+        assert permissive_cache.stats()["hits"] == 1
+
+    @pytest.mark.parametrize("text", [
+        '{"query_id": "QA_20240101120000_ab12cd"}',
+        '{"query_id": "QRY_CARD001_20240101120000"}',
+        '{"workflow_id": "TEST_1719400000"}',
+        "request 3f2b8c1e-0d4a-4b7e-9a1c-2e5f6a7b8c9d"
+    ])
+    def test_detects_generated_id_formats(self, text):
+        """Test each ID format the agents generate is recognised."""
+        assert contains_per_call_ids(_run_result("ok", text))
+
+    def test_stable_values_are_not_ids(self):
+        """Test subject, site and numeric values do not count as per-call IDs."""
+        assert not contains_per_call_ids(_run_result("CARD001 at SITE_01 has BNP 450", '{"hemoglobin": 12.5}'))
+
+    @pytest.mark.asyncio
+    async def test_sqlite_backend_shared_across_instances(self, tmp_path):
+        """Test a response cached by one worker is served to another."""
+        path = str(tmp_path / "responses.sqlite3")
+        first_worker = ResponseCache(SQLiteTTLCache(path, max_size=10, ttl_seconds=60))
+        second_worker = ResponseCache(SQLiteTTLCache(path, max_size=10, ttl_seconds=60))
+
+        with patch("app.agents.response_cache.Runner.run", new_callable=AsyncMock) as run:
+            run.return_value = _run_result("Site 12 has 3 open queries")
+            await first_worker.run(portfolio_manager_agent, "Open queries at site 12")
+            output, cache_hit = await second_worker.run(portfolio_manager_agent, "Open queries at site 12")
+
+        assert (output, cache_hit) == ("Site 12 has 3 open queries", True)
+        run.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_passes_through(self):
+        """Test a cache without a backend always runs the agent."""
+        response_cache = ResponseCache()
+
+        with patch("app.agents.response_cache.Runner.run", new_callable=AsyncMock) as run:
+            run.return_value = _run_result("Summary")
+            await response_cache.run(portfolio_manager_agent, "Summarize enrollment")
+            await response_cache.run(portfolio_manager_agent, "Summarize enrollment")
+
+        assert run.await_count == 2
+        assert response_cache.stats() == {"enabled": False}
@@ -0,0 +1,146 @@
+"""Tests for portfolio SLA breach forecasting."""
+
+import random
+from datetime import datetime
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+
+from app.agents import sla_forecast
+from app.agents.query_store import QueryStatus, QueryStore
+from app.agents.query_tracker import ESCALATION_RULES, QueryTracker
+from app.agents.sla_forecast import SLAForecaster
+from tests.test_data.tracked_queries import make_query
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+# Queries aged relative to the fixed forecast time
+_query = partial(make_query, now=NOW)
+
+
+@pytest.fixture
+def store(store):
+    store.put_many([
+        # Critical SLA 24h: breached 2h ago, breaches in 4h
+        _query("Q-CRIT-LATE", 26, priority="critical", site_id="SITE01"),
+        _query("Q-CRIT-SOON", 20, priority="critical", site_id="SITE01"),
+        # Major SLA 120h: breaches in 30h and in 200h
+        _query("Q-MAJOR", 90, site_id="SITE02"),
+        _query("Q-MAJOR-NEW", 0, site_id="SITE02"),
+        # Own 48h SLA overrides the priority's: breaches in 8h
+        _query("Q-OWN-SLA", 40, priority="minor", metadata={"sla_hours": 48}),
+        # Closed queries are not forecast
+        _query("Q-RESOLVED", 200, status=QueryStatus.RESOLVED, site_id="SITE02")
+    ])
+    return store
+
+
+class TestSLAForecaster:
+    """Test breaches, site curves and escalation load."""
+
+    def test_breaches_within_horizon(self, store):
+        """Test queries breaching in the horizon are listed soonest first."""
+        forecast = SLAForecaster(store, ESCALATION_RULES).forecast(horizon_hours=48, now=NOW.timestamp())
+
+        assert forecast["open_queries"] == 5
+        assert forecast["already_breached"] == 1
+        assert [item["query_id"] for item in forecast["breaching"]] == ["Q-CRIT-SOON", "Q-OWN-SLA", "Q-MAJOR"]
+        assert [item["hours_to_breach"] for item in forecast["breaching"]] == [4.0, 8.0, 30.0]
+        assert forecast["breaching"][1]["site_id"] == "unassigned"
+
+    def test_site_breach_curves(self, store):
+        """Test each site's curve counts its queries breached by every bucket edge."""
+        forecast = SLAForecaster(store, ESCALATION_RULES).forecast(horizon_hours=48, bucket_hours=12, now=NOW.timestamp())
+
+        assert forecast["curve_hours"] == [0, 12, 24, 36, 48]
+        assert forecast["site_breach_curves"] == {
+            "SITE01": [1, 2, 2, 2, 2],
+            "SITE02": [0, 0, 0, 1, 1],
+            "unassigned": [0, 1, 1, 1, 1]
+        }
+
+    def test_escalation_load_per_day(self, store):
+        """Test upcoming escalation deadlines are counted per day, overdue ones once on day 0."""
+        forecast = SLAForecaster(store, ESCALATION_RULES).forecast(horizon_hours=72, now=NOW.timestamp())
+
+        # Day 0: Q-CRIT-LATE and Q-MAJOR overdue for level 1, Q-CRIT-SOON level 1 at +4h,
+        #        Q-CRIT-LATE level 2 at +22h
+        # Day 1: Q-CRIT-SOON level 2 at +28h, Q-MAJOR level 2 at +30h, Q-CRIT-LATE level 3 at +46h
+        # Day 2: Q-CRIT-SOON level 3 at +52h
+        assert [day["escalations"] for day in forecast["escalation_load"]] == [4, 3, 1]
+        assert forecast["escalation_load"][1]["date"] == "2026-03-03"
+
+    def test_escalated_levels_are_not_counted_again(self, store):
+        """Test levels a query has already reached are left out of the load."""
+        store.put(_query("Q-CRIT-LATE", 26, priority="critical", site_id="SITE01", escalation_level=1))
+
+        forecast = SLAForecaster(store, ESCALATION_RULES).forecast(horizon_hours=24, now=NOW.timestamp())
+
+        assert [day["escalations"] for day in forecast["escalation_load"]] == [3]
+
+    def test_scalar_fallback_matches_vectorized(self):
+        """Test the forecast is the same with and without numpy."""
+        rng = random.Random(7)
+        store = QueryStore()
+        store.put_many(
+            _query(
+                f"Q{index}",
+                rng.uniform(0, 300),
+                priority=rng.choice(["critical", "major", "minor", "other"]),
+                site_id=rng.choice([None, "SITE01", "SITE02", "SITE03"]),
+                escalation_level=rng.randint(0, 2),
+                metadata={"sla_hours": 36} if index % 5 == 0 else {}
+            )
+            for index in range(2000)
+        )
+        forecaster = SLAForecaster(store, ESCALATION_RULES)
+
+        vectorized = forecaster.forecast(horizon_hours=96, bucket_hours=6, now=NOW.timestamp())
+        with patch.object(sla_forecast, "np", None):
+            scalar = forecaster.forecast(horizon_hours=96, bucket_hours=6, now=NOW.timestamp())
+
+        assert vectorized == scalar
+        assert vectorized["breaching_count"] > 0
+
+    def test_string_sla_hours(self, store):
+        """Test an sla_hours given as a string is read as a number, with and without numpy."""
+        store.put(_query("Q-OWN-SLA", 40, priority="minor", metadata={"sla_hours": "48"}))
+        forecaster = SLAForecaster(store, ESCALATION_RULES)
+
+        with patch.object(sla_forecast, "np", None):
+            scalar = forecaster.forecast(horizon_hours=48, now=NOW.timestamp())
+
+        assert scalar["breaching"][1]["query_id"] == "Q-OWN-SLA"
+        assert scalar["breaching"][1]["hours_to_breach"] == 8.0
+        assert forecaster.forecast(horizon_hours=48, now=NOW.timestamp()) == scalar
+
+    def test_non_numeric_sla_hours(self, store):
+        """Test an sla_hours that is not a number falls back to the priority's SLA."""
+        store.put(_query("Q-BAD-SLA", 40, priority="minor", metadata={"sla_hours": "two days"}))
+        forecaster = SLAForecaster(store, ESCALATION_RULES)
+
+        with patch.object(sla_forecast, "np", None):
+            scalar = forecaster.forecast(horizon_hours=240, now=NOW.timestamp())
+
+        hours_to_breach = {breach["query_id"]: breach["hours_to_breach"] for breach in scalar["breaching"]}
+        assert hours_to_breach["Q-BAD-SLA"] == 200.0
+        assert forecaster.forecast(horizon_hours=240, now=NOW.timestamp()) == scalar
+
+    def test_empty_portfolio(self):
+        """Test a store with no open queries forecasts nothing."""
+        forecast = SLAForecaster(QueryStore(), ESCALATION_RULES).forecast(horizon_hours=48, now=NOW.timestamp())
+
+        assert (forecast["open_queries"], forecast["breaching"], forecast["site_breach_curves"]) == (0, [], {})
+        assert [day["escalations"] for day in forecast["escalation_load"]] == [0, 0]
+
+
+class TestQueryTrackerForecast:
+    """Test the tracker entry point."""
+
+    def test_forecast_sla(self, store):
+        """Test the tracker forecasts over its own store."""
+        forecast = QueryTracker(store=store).forecast_sla(horizon_hours=24)
+
+        assert forecast["open_queries"] == 5
+        assert forecast["horizon_hours"] == 24
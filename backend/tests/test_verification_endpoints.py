@@ -0,0 +1,79 @@
+"""Tests for the bulk verification endpoints."""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.agents.data_verifier import shutdown_verification_executor
+from app.api.endpoints import verification
+
+
+class TestStreamBatchVerification:
+    """Test the NDJSON batch verification stream."""
+
+    URL = "/api/v1/verification/batch/stream"
+
+    @pytest.fixture
+    def client(self):
+        yield TestClient(app)
+        shutdown_verification_executor()
+
+    @staticmethod
+    def _pair(index: int, source_hemoglobin: float = 12.5) -> dict:
+        return {
+            "edc_data": {"subject_id": f"SUBJ{index:03d}", "hemoglobin": 12.5, "weight": 70},
+            "source_data": {"subject_id": f"SUBJ{index:03d}", "hemoglobin": source_hemoglobin, "weight": 70}
+        }
+
+    @staticmethod
+    def _records(response) -> list:
+        return [json.loads(line) for line in response.text.splitlines() if line]
+
+    def test_streams_results_in_order_with_summary(self, client):
+        """Test one result per pair in input order followed by a summary record."""
+        lines = [json.dumps(self._pair(i, 12.5 if i % 3 else 9.0)) for i in range(25)]
+
+        response = client.post(self.URL, content="\n".join(lines) + "\n")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = self._records(response)
+        results = [r["result"] for r in records if r["type"] == "result"]
+        summary = records[-1]
+
+        assert [r["subject_id"] for r in results] == [f"SUBJ{i:03d}" for i in range(25)]
+        assert results[0]["discrepancies"][0]["field_name"] == "hemoglobin"
+        assert results[1]["match_score"] == 1.0
+        assert summary["type"] == "summary"
+        assert summary["total_subjects"] == 25
+        assert summary["summary_statistics"]["total_discrepancies"] == 9
+        assert summary["rejected_lines"] == 0
+
+    def test_rejects_malformed_lines_without_failing_stream(self, client):
+        """Test invalid lines are reported in the summary and the rest are verified."""
+        body = "\n".join([
+            json.dumps(self._pair(0)),
+            "not json",
+            "",
+            json.dumps({"edc_data": {"subject_id": "X"}}),
+            json.dumps(self._pair(1))
+        ])
+
+        records = self._records(client.post(self.URL, content=body))
+        summary = records[-1]
+
+        assert [r["result"]["subject_id"] for r in records[:-1]] == ["SUBJ000", "SUBJ001"]
+        assert summary["rejected_lines"] == 2
+        assert [r["line"] for r in summary["rejections"]] == [2, 4]
+
+    def test_oversized_line_is_discarded(self, client, monkeypatch):
+        """Test lines over the size limit are rejected without being buffered."""
+        monkeypatch.setattr(verification, "MAX_LINE_BYTES", 256)
+        body = json.dumps({"edc_data": {"notes": "x" * 500}, "source_data": {}}) + "\n" + json.dumps(self._pair(7))
+
+        records = self._records(client.post(self.URL, content=body))
+
+        assert [r["result"]["subject_id"] for r in records[:-1]] == ["SUBJ007"]
+        assert records[-1]["rejections"][0]["line"] == 1